@@ -2,7 +2,7 @@ import json
 from data.data_locker import DataLocker
 from uuid import uuid4
 from data.models import AlertType, AlertClass, Status
-from typing import Optional
+from typing import Iterable, Optional
 from datetime import datetime
 import logging
 import sqlite3
@@ -131,8 +131,7 @@ class AlertController:
             cols = ", ".join(alert.keys())
             vals = ", ".join(f":{k}" for k in alert.keys())
             sql = f"INSERT INTO alerts ({cols}) VALUES ({vals})"
-            self.data_locker.conn.execute(sql, alert)
-            self.data_locker.conn.commit()
+            self.data_locker.execute_write(sql, alert)
             log_alert_update(self.data_locker, alert['id'], 'system', 'Initial creation', '', 'Created')
             return True
         except sqlite3.IntegrityError:
@@ -163,27 +162,41 @@ class AlertController:
                 created.append(alert.to_dict())
         return created
 
-    def create_all_position_alerts(self) -> list[dict]:
+    def create_all_position_alerts(self, position_ids: Optional[Iterable[str]] = None) -> list[dict]:
+        """
+        Creates the configured alerts for positions that don't have them yet.
+        With position_ids, only those positions are considered (differential sync
+        passes the positions that just appeared).
+        """
         created = []
         ranges = self._load_limits()
         tp_cfg = ranges.get("travel_percent_liquid_ranges", {})
         pr_cfg = ranges.get("profit_ranges", {})
         hi_cfg = ranges.get("heat_index_ranges", {})
+        lp_cfg = ranges.get("liquidation_probability_ranges", {})
 
-        for pos in self.data_locker.read_positions():
+        positions = self.data_locker.read_positions()
+        if position_ids is not None:
+            wanted = set(position_ids)
+            positions = [p for p in positions if p.get("id") in wanted]
+        if not positions:
+            return created
+        existing = self.data_locker.get_position_alert_types()
+
+        for pos in positions:
             pid = pos.get("id")
 
-            if tp_cfg.get("enabled", False) and not self.data_locker.has_alert_mapping(pid, AlertType.TRAVEL_PERCENT_LIQUID.value):
+            if tp_cfg.get("enabled", False) and (pid, AlertType.TRAVEL_PERCENT_LIQUID.value) not in existing:
                 trigger_tp = float(tp_cfg.get("low", 0))
                 ta = self.create_alert_for_position(pos, AlertType.TRAVEL_PERCENT_LIQUID.value, trigger_tp, "BELOW", "Call")
                 if ta: created.append(ta)
 
-            if pr_cfg.get("enabled", False) and not self.data_locker.has_alert_mapping(pid, AlertType.PROFIT.value):
+            if pr_cfg.get("enabled", False) and (pid, AlertType.PROFIT.value) not in existing:
                 trigger_pr = float(pr_cfg.get("low", 0))
                 pa = self.create_alert_for_position(pos, AlertType.PROFIT.value, trigger_pr, "ABOVE", "Call")
                 if pa: created.append(pa)
 
-            if hi_cfg.get("enabled", False) and not self.data_locker.has_alert_mapping(pid, AlertType.HEAT_INDEX.value):
+            if hi_cfg.get("enabled", False) and (pid, AlertType.HEAT_INDEX.value) not in existing:
                 raw_low = hi_cfg.get("low", 7.0)
                 try:
                     trigger_hi = float(raw_low)
@@ -192,6 +205,11 @@ class AlertController:
                 ha = self.create_alert_for_position(pos, AlertType.HEAT_INDEX.value, trigger_hi, "ABOVE", "Call")
                 if ha: created.append(ha)
 
+            if lp_cfg.get("enabled", False) and (pid, AlertType.LIQUIDATION_PROBABILITY.value) not in existing:
+                trigger_lp = float(lp_cfg.get("low", 0.05))
+                la = self.create_alert_for_position(pos, AlertType.LIQUIDATION_PROBABILITY.value, trigger_lp, "ABOVE", "Call")
+                if la: created.append(la)
+
         return created
 
     def create_alert_for_position(self, pos: dict, alert_type: str, trigger_value: float, condition: str,
@@ -207,10 +225,8 @@ class AlertController:
         )
         if self.create_alert(alert):
             pos_id = pos.get("id")
-            self.data_locker.add_position_alert_mapping(pos_id, alert.alert_type)
-            cursor = self.data_locker.conn.cursor()
-            cursor.execute("UPDATE positions SET alert_reference_id = ? WHERE id = ?", (alert.id, pos_id))
-            self.data_locker.conn.commit()
+            self.data_locker.add_position_alert_mapping(pos_id, alert.id)
+            self.data_locker.update_position_fields(pos_id, {"alert_reference_id": alert.id})
             return alert.to_dict()
         return None
 
@@ -240,14 +256,25 @@ class AlertController:
 
     def delete_alert(self, alert_id: str) -> bool:
         try:
-            cursor = self.data_locker.conn.cursor()
-            cursor.execute("DELETE FROM alerts WHERE id = ?", (alert_id,))
-            self.data_locker.conn.commit()
+            self.data_locker.delete_alert(alert_id)
             return True
         except Exception:
             self.logger.exception("Error deleting alert.")
             return False
 
+    def delete_alerts_for_positions(self, position_ids: Iterable[str]) -> int:
+        """Removes the alerts of positions that have closed."""
+        position_ids = list(position_ids)
+        if not position_ids:
+            return 0
+        try:
+            count = self.data_locker.delete_alerts_for_positions(position_ids)
+            self.logger.info(f"Deleted {count} alerts for {len(position_ids)} closed positions.")
+            return count
+        except Exception:
+            self.logger.exception("Error deleting alerts for closed positions.")
+            return 0
+
     def delete_all_alerts(self) -> int:
         count = 0
         for alert in self.data_locker.get_alerts():
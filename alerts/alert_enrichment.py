@@ -16,6 +16,7 @@ def normalize_alert_type(alert: dict) -> dict:
       - Time
       - Profit
       - HeatIndex
+      - LiquidationProbability
 
     :param alert: Dictionary containing at least the "alert_type" key.
     :return: The alert dictionary with normalized "alert_type".
@@ -36,6 +37,8 @@ def normalize_alert_type(alert: dict) -> dict:
         normalized = AlertType.PROFIT.value  # Expected to be "Profit"
     elif normalized in ["HEATINDEX", "HEATINDEXALERT"]:
         normalized = AlertType.HEAT_INDEX.value  # Expected to be "HeatIndex"
+    elif normalized in ["LIQUIDATIONPROBABILITY", "LIQUIDATIONPROBABILITYALERT"]:
+        normalized = AlertType.LIQUIDATION_PROBABILITY.value  # Expected to be "LiquidationProbability"
     elif normalized in ["DELTACHANGE"]:
         normalized = AlertType.DELTA_CHANGE.value  # Expected to be "DeltaChange"
     elif normalized in ["TIME"]:
@@ -117,6 +120,22 @@ def populate_evaluated_value_for_alert(alert: dict, data_locker, logger: logging
             logger.debug("No matching position found for id: %s", pos_id)
             evaluated_value = 0.0
 
+    elif alert_type == AlertType.LIQUIDATION_PROBABILITY.value:
+        pos_id = alert.get("position_reference_id") or alert.get("id")
+        logger.debug("Processing LiquidationProbability for position id: %s", pos_id)
+        positions = data_locker.read_positions()
+        position = next((p for p in positions if p.get("id") == pos_id), None)
+        if position:
+            try:
+                evaluated_value = float(position.get("liquidation_probability") or 0.0)
+                logger.debug("Parsed liquidation_probability: %f", evaluated_value)
+            except Exception as e:
+                logger.error("Error parsing liquidation_probability: %s", e, exc_info=True)
+                evaluated_value = 0.0
+        else:
+            logger.debug("No matching position found for id: %s", pos_id)
+            evaluated_value = 0.0
+
     else:
         logger.debug("Alert type %s not recognized; defaulting evaluated_value to 0.0", alert_type)
         evaluated_value = 0.0
@@ -284,7 +303,8 @@ def enrich_alert_data(alert: dict, data_locker, logger: logging.Logger, alert_co
     # Enforce classification based on alert type.
     if normalized_alert_type in [AlertType.TRAVEL_PERCENT_LIQUID.value,
                                  AlertType.PROFIT.value,
-                                 AlertType.HEAT_INDEX.value]:
+                                 AlertType.HEAT_INDEX.value,
+                                 AlertType.LIQUIDATION_PROBABILITY.value]:
         alert["alert_class"] = "Position"
         if not alert.get("position_reference_id"):
             logger.error("Position alert missing position_reference_id.")
@@ -367,6 +387,16 @@ def enrich_alert_data(alert: dict, data_locker, logger: logging.Logger, alert_co
             alert["condition"] = config.get("condition", "ABOVE")
         if not alert.get("notification_type"):
             alert["notification_type"] = "Email"
+
+    elif alert["alert_type"] == AlertType.LIQUIDATION_PROBABILITY.value:
+        config = alert_limits.get("alert_ranges", {}).get("liquidation_probability_ranges", {})
+        logger.debug("Liquidation probability alert config: %s", config)
+        if config.get("enabled", False):
+            if float(alert.get("trigger_value", 0.0)) == 0.0:
+                alert["trigger_value"] = float(config.get("low", 0.05))
+            alert["condition"] = "ABOVE"
+        if not alert.get("notification_type"):
+            alert["notification_type"] = "Email"
     else:
         if not alert.get("notification_type"):
             alert["notification_type"] = "Email"
@@ -7,6 +7,7 @@ from utils.unified_logger import UnifiedLogger
 from utils.calc_services import CalcServices
 from alerts.alert_enrichment import enrich_alert_data, update_trigger_value_FUCK_ME
 from alerts.alert_controller import DummyPositionAlert
+from alerts.alert_rules import CompiledAlertRules, load_rules
 from data.models import Alert, AlertType, AlertClass, NotificationType, Status
 from uuid import uuid4
 
@@ -61,9 +62,9 @@ class AlertEvaluator:
                 file="cyclone.py"
             )
 
-    def evaluate_profit_alert(self, pos: dict) -> str:
+    def evaluate_profit_alert(self, pos: dict, data_locker=None) -> str:
         asset = pos.get("asset_type", "BTC")
-        price_record = self.data_locker.get_latest_price(asset)
+        price_record = (data_locker or self.data_locker).get_latest_price(asset)
         if price_record and "current_price" in price_record:
             current_price = float(price_record["current_price"])
         else:
@@ -89,9 +90,9 @@ class AlertEvaluator:
         # Continue with threshold comparisons and updating alerts…
         return f"Profit ALERT: Position {pos.get('id')} profit {profit_val:.2f}"
 
-    def evaluate_swing_alert(self, pos: dict) -> str:
+    def evaluate_swing_alert(self, pos: dict, data_locker=None) -> str:
         asset = pos.get("asset_type", "BTC")
-        price_record = self.data_locker.get_latest_price(asset)
+        price_record = (data_locker or self.data_locker).get_latest_price(asset)
         if price_record and "current_price" in price_record:
             current_price = float(price_record["current_price"])
         else:
@@ -109,9 +110,9 @@ class AlertEvaluator:
         # Continue with threshold comparisons and alert updates…
         return f"Swing ALERT: Position {pos.get('id')} liquidation distance {current_value:.2f}"
 
-    def evaluate_blast_alert(self, pos: dict) -> str:
+    def evaluate_blast_alert(self, pos: dict, data_locker=None) -> str:
         asset = pos.get("asset_type", "BTC")
-        price_record = self.data_locker.get_latest_price(asset)
+        price_record = (data_locker or self.data_locker).get_latest_price(asset)
         if price_record and "current_price" in price_record:
             current_price = float(price_record["current_price"])
         else:
@@ -129,7 +130,7 @@ class AlertEvaluator:
         # Continue with threshold comparisons and updating the alert level…
         return f"Blast ALERT: Position {pos.get('id')} liquidation distance {current_value:.2f}"
 
-    def evaluate_heat_index_alert(self, pos: dict) -> str:
+    def evaluate_heat_index_alert(self, pos: dict, data_locker=None) -> str:
         """
         Evaluate heat index alert for a position.
         Always invoke _update_alert_level (which now persists the alert_reference_id)
@@ -165,7 +166,8 @@ class AlertEvaluator:
             pos,
             level,
             evaluated_value=current_heat,
-            custom_alert_type=AlertType.HEAT_INDEX.value
+            custom_alert_type=AlertType.HEAT_INDEX.value,
+            data_locker=data_locker
         )
 
         # Only return a message for non‑Normal levels
@@ -226,16 +228,17 @@ class AlertEvaluator:
     # -------------------------
     # Major Evaluation Methods
     # -------------------------
-    def evaluate_alerts(self, positions: list = None, market_data: dict = None) -> dict:
+    def evaluate_alerts(self, positions: list = None, market_data: dict = None, data_locker=None) -> dict:
         """
         Master evaluation method that aggregates market, position, and system alerts.
         :param positions: List of position dictionaries.
         :param market_data: Dictionary containing market data.
+        :param data_locker: DataLocker to read and write through (Cyclone passes its CycleContext view).
         :return: Dictionary with keys 'market', 'position', and 'system' and their respective alert messages.
         """
         return {
             "market": self.evaluate_market_alerts(market_data) if market_data is not None else [],
-            "position": self.evaluate_position_alerts(positions) if positions is not None else [],
+            "position": self.evaluate_position_alerts(positions, data_locker) if positions is not None else [],
             "system": self.evaluate_system_alerts()
         }
 
@@ -247,29 +250,30 @@ class AlertEvaluator:
         """
         return self.evaluate_price_alerts(market_data)
 
-    def evaluate_position_alerts(self, positions: list) -> list:
+    def evaluate_position_alerts(self, positions: list, data_locker=None) -> list:
         """
         Evaluate position-related alerts by checking travel, profit, swing, blast, and heat index alerts.
         :param positions: List of position dictionaries.
+        :param data_locker: DataLocker to read and write through; defaults to self.data_locker.
         :return: List of triggered position alert messages.
         """
         alerts = []
         for pos in positions:
-            travel_result = self.evaluate_travel_alert(pos)
+            travel_result = self.evaluate_travel_alert(pos, data_locker)
             if travel_result is not None:
                 state, evaluated_value = travel_result
                 if state != "Normal":
                     alerts.append(f"Position ALERT (Travel): {pos.get('id')} travel percent {evaluated_value} => {state}")
-            profit_msg = self.evaluate_profit_alert(pos)
+            profit_msg = self.evaluate_profit_alert(pos, data_locker)
             if profit_msg:
                 alerts.append(profit_msg)
-            heat_msg = self.evaluate_heat_index_alert(pos)
+            heat_msg = self.evaluate_heat_index_alert(pos, data_locker)
             if heat_msg:
                 alerts.append(heat_msg)
-            swing_msg = self.evaluate_swing_alert(pos)
+            swing_msg = self.evaluate_swing_alert(pos, data_locker)
             if swing_msg:
                 alerts.append(swing_msg)
-            blast_msg = self.evaluate_blast_alert(pos)
+            blast_msg = self.evaluate_blast_alert(pos, data_locker)
             if blast_msg:
                 alerts.append(blast_msg)
         return alerts
@@ -297,14 +301,15 @@ class AlertEvaluator:
                 self._debug_log(f"[System Alert] {msg}")
         return alerts
 
-    def evaluate_travel_alert(self, pos: dict):
+    def evaluate_travel_alert(self, pos: dict, data_locker=None):
         """
         Evaluate the Travel Percent for a position, determining its level based on
         absolute value thresholds. Writes detailed debug info to both console and tp_level.txt.
         Updates both the alert record (trigger_value and level) and the position record (travel_percent)
-        using the DataLocker’s DB connection, updates the in-memory position dictionary, and
-        reads back both the position and alert records for verification.
+        through data_locker (default self.data_locker), updates the in-memory position dictionary, and
+        reads back the alert record for verification.
         """
+        dl = data_locker or self.data_locker
         debug_file = "tp_level.txt"
         readback_file = "level_test.txt"
 
@@ -328,7 +333,7 @@ class AlertEvaluator:
         dbg(f"[Travel Alert] Position data: {pos}")
 
         asset = pos.get("asset_type", "BTC")
-        price_record = self.data_locker.get_latest_price(asset)
+        price_record = dl.get_latest_price(asset)
         if price_record and "current_price" in price_record:
             current_price = float(price_record["current_price"])
             dbg(f"[Travel Alert] Latest price for {asset}: {current_price}")
@@ -416,15 +421,13 @@ class AlertEvaluator:
             update_fields = {"trigger_value": next_trigger, "level": level}
             dbg(f"[Travel Alert] Attempting to update alert {alert_id} with {update_fields}")
             try:
-                self.data_locker.update_alert_conditions(alert_id, update_fields)
+                dl.update_alert_conditions(alert_id, update_fields)
                 dbg(f"[Travel Alert] Successfully updated alert {alert_id} with trigger_value {next_trigger} and level {level}")
             except Exception as e:
                 dbg(f"[Travel Alert] Failed to update alert {alert_id}: {e}")
             # Read back alert record
             try:
-                cursor = self.data_locker.conn.cursor()
-                cursor.execute("SELECT level, trigger_value FROM alerts WHERE id=?", (alert_id,))
-                alert_row = cursor.fetchone()
+                alert_row = dl.get_alert(alert_id)
                 if alert_row:
                     dbg(f"[Travel Alert] Read-back alert: level = {alert_row['level']}, trigger_value = {alert_row['trigger_value']}")
                     dbg_readback(
@@ -440,88 +443,49 @@ class AlertEvaluator:
 
         # 6) Update the position record with the newly computed travel_percent.
         try:
-            cursor = self.data_locker.conn.cursor()
-            cursor.execute("UPDATE positions SET travel_percent=? WHERE id=?", (current_val, pos.get("id")))
-            self.data_locker.conn.commit()
+            dl.update_position_fields(pos.get("id"), {"travel_percent": current_val})
             pos["travel_percent"] = current_val
             dbg(f"[Travel Alert] Successfully updated position {pos.get('id')} travel_percent to {current_val}")
         except Exception as e:
             dbg(f"[Travel Alert] Failed to update position travel_percent: {e}")
 
-        # 7) Read back from DB for position verification.
-        try:
-            cursor.execute("SELECT travel_percent FROM positions WHERE id=?", (pos.get("id"),))
-            row = cursor.fetchone()
-            if row:
-                readback_value = row["travel_percent"]
-                dbg(f"[Travel Alert] Read-back: DB travel_percent for {pos.get('id')} = {readback_value}")
-                dbg_readback(f"Position {pos.get('id')}: travel_percent = {readback_value}")
-            else:
-                dbg("[Travel Alert] Read-back: No row found for position update.")
-                dbg_readback(f"Position {pos.get('id')}: No row found during read-back")
-        except Exception as e:
-            dbg(f"[Travel Alert] Exception during position read-back: {e}")
-            dbg_readback(f"Position {pos.get('id')}: Exception during read-back: {e}")
-
         dbg(f"[Travel Alert] Returning => (level={level}, travel_percent={current_val})")
         dbg("=============================================================\n")
         return level, current_val
 
-    def update_alerts_evaluated_value(self):
+    def update_alerts_evaluated_value(self, data_locker=None, rules: Optional[CompiledAlertRules] = None,
+                                      alerts: Optional[list] = None) -> dict:
         """
-        Updates the evaluated_value for each alert based on its alert type.
-
-        - For PriceThreshold alerts, sets evaluated_value to the latest asset price.
-        - For TravelPercent alerts, sets evaluated_value to the position's travel percent.
-        - For Profit alerts, sets evaluated_value to the position's pnl_after_fees_usd.
-        - For HeatIndex alerts, sets evaluated_value to the position's current_heat_index.
+        Updates the evaluated_value and level of every alert (or just `alerts`,
+        e.g. the ones AlertManager's dependency index selected) in one pass, using
+        the thresholds from alert_limits.json compiled by alerts.alert_rules.
+
+        - For PriceThreshold alerts, evaluated_value is the latest asset price.
+        - For TravelPercent alerts, the position's travel percent (the alert's
+          trigger_value also moves to the next threshold).
+        - For Profit alerts, the position's pnl_after_fees_usd.
+        - For HeatIndex alerts, the position's current_heat_index.
+
+        Only alerts whose values changed are written, in one batch. Cyclone passes
+        its CycleContext view as data_locker to read from the cycle's snapshot.
+        Returns the evaluation results (see CompiledAlertRules.evaluate).
         """
-        alerts = self.data_locker.get_alerts()
-        positions = self.data_locker.read_positions()
-        pos_lookup = {pos.get("id"): pos for pos in positions}
-
-        for alert in alerts:
-            evaluated_val = 0.0
-            alert_type = alert.get("alert_type", "")
-            if alert_type == AlertType.PRICE_THRESHOLD.value:
-                asset_type = alert.get("asset_type", "BTC")
-                price_data = self.data_locker.get_latest_price(asset_type)
-                if price_data and "current_price" in price_data:
-                    try:
-                        evaluated_val = float(price_data["current_price"])
-                    except Exception as e:
-                        self.logger.error(f"Error converting latest price for asset {asset_type}: {e}", exc_info=True)
-            elif alert_type == AlertType.TRAVEL_PERCENT_LIQUID.value:
-                pos_id = alert.get("position_reference_id") or alert.get("position_id")
-                if pos_id and pos_id in pos_lookup:
-                    try:
-                        # Use "travel_percent" instead of "current_travel_percent"
-                        evaluated_val = float(pos_lookup[pos_id].get("travel_percent", 0))
-                    except Exception as e:
-                        self.logger.error(f"Error retrieving travel percent for position {pos_id}: {e}", exc_info=True)
-            elif alert_type == AlertType.PROFIT.value:
-                pos_id = alert.get("position_reference_id") or alert.get("position_id")
-                if pos_id and pos_id in pos_lookup:
-                    try:
-                        evaluated_val = float(pos_lookup[pos_id].get("pnl_after_fees_usd", 0))
-                    except Exception as e:
-                        self.logger.error(f"Error retrieving pnl for position {pos_id}: {e}", exc_info=True)
-            elif alert_type == AlertType.HEAT_INDEX.value:
-                pos_id = alert.get("position_reference_id") or alert.get("position_id")
-                if pos_id and pos_id in pos_lookup:
-                    try:
-                        evaluated_val = float(pos_lookup[pos_id].get("current_heat_index", 0))
-                    except Exception as e:
-                        self.logger.error(f"Error retrieving heat index for position {pos_id}: {e}", exc_info=True)
-
-            try:
-                self.data_locker.update_alert_conditions(alert.get("id"), {"evaluated_value": evaluated_val})
-                self.logger.info(f"Updated alert {alert.get('id')} evaluated_value to {evaluated_val}")
-            except Exception as update_ex:
-                self.logger.error(f"Failed to update evaluated_value for alert {alert.get('id')}: {update_ex}",
-                                  exc_info=True)
+        dl = data_locker or self.data_locker
+        rules = rules or load_rules()
+        if alerts is None:
+            alerts = dl.get_alerts()
+        if not alerts:
+            return rules.evaluate([], [], {})
+        results = rules.evaluate(alerts, dl.read_positions(), dl.get_latest_prices())
+        try:
+            written = rules.write_back(dl, alerts, results)
+        except Exception as e:
+            self.logger.error(f"Failed to write back evaluated alerts: {e}", exc_info=True)
+            raise
+        self.logger.info(f"Evaluated {len(alerts)} alerts; {written} changed.")
+        return results
 
-    def evaluate_heat_index_alert(self, pos: dict) -> str:
+    def evaluate_heat_index_alert(self, pos: dict, data_locker=None) -> str:
         """
         Evaluate heat index alert for a position.
         Returns a message if triggered, else an empty string.
@@ -544,7 +508,8 @@ class AlertEvaluator:
 
         if current_heat <= trigger_value:
             print("[DEBUG] evaluate_heat_index_alert: current_heat is below or equal to trigger, setting state to Normal.")
-            self._update_alert_level(pos, "Normal", evaluated_value=current_heat, custom_alert_type=AlertType.HEAT_INDEX.value)
+            self._update_alert_level(pos, "Normal", evaluated_value=current_heat,
+                                     custom_alert_type=AlertType.HEAT_INDEX.value, data_locker=data_locker)
             return ""
         if current_heat < trigger_value * 1.5:
             current_level = "Low"
@@ -554,7 +519,8 @@ class AlertEvaluator:
             current_level = "High"
 
         print(f"[DEBUG] evaluate_heat_index_alert: Determined alert level as {current_level}")
-        self._update_alert_level(pos, current_level, evaluated_value=current_heat, custom_alert_type=AlertType.HEAT_INDEX.value)
+        self._update_alert_level(pos, current_level, evaluated_value=current_heat,
+                                 custom_alert_type=AlertType.HEAT_INDEX.value, data_locker=data_locker)
         msg = (f"Heat Index ALERT: Position {pos.get('id')} heat index {current_heat:.2f} "
                f"exceeds trigger {trigger_value} (Level: {current_level})")
         self._debug_log(f"[Heat Alert] {msg}")
@@ -671,7 +637,8 @@ class AlertEvaluator:
         return alerts
 
     def _update_alert_level(self, pos: dict, new_level: str, evaluated_value: Optional[float] = None,
-                            custom_alert_type: str = None):
+                            custom_alert_type: str = None, data_locker=None):
+        dl = data_locker or self.data_locker
         alert_id = pos.get("alert_reference_id")
 
         # If no existing alert, create one
@@ -700,13 +667,7 @@ class AlertEvaluator:
             created = self.alert_controller.create_alert(new_alert)
             if created:
                 pos["alert_reference_id"] = new_alert.id
-                conn = self.data_locker.get_db_connection()
-                cursor = conn.cursor()
-                cursor.execute(
-                    "UPDATE positions SET alert_reference_id=? WHERE id=?",
-                    (new_alert.id, pos.get("id"))
-                )
-                conn.commit()
+                dl.update_position_fields(pos.get("id"), {"alert_reference_id": new_alert.id})
                 alert_id = new_alert.id
                 self._debug_log(
                     f"[AlertEvaluator] Created new alert with id {new_alert.id} for position {pos.get('id')}."
@@ -724,7 +685,7 @@ class AlertEvaluator:
 
         self._debug_log(f"[AlertEvaluator] Updating alert '{alert_id}' with fields: {update_fields}")
         try:
-            num_updated = self.data_locker.update_alert_conditions(alert_id, update_fields)
+            num_updated = dl.update_alert_conditions(alert_id, update_fields)
             if num_updated == 0:
                 self._debug_log(f"[AlertEvaluator] No alert record found for id '{alert_id}'.")
             else:
@@ -0,0 +1,133 @@
+#!/usr/bin/env python
+"""
+alert_index.py
+Description:
+    Dependency index from positions and assets to the alerts that read them,
+    fed by DataLocker change events (data/change_bus.py).
+
+    Position alerts (TravelPercent, Profit, HeatIndex) depend on their
+    position_reference_id; price alerts (and alerts with no position) depend on
+    their asset_type. select() returns only the alerts whose position, asset or
+    own row changed since the previous selection, so a re-evaluation skips the
+    rest.
+
+    Everything is selected when:
+      - it is the first selection, or a bulk change (keys=None) arrived,
+      - the caller forces it (e.g. the alert thresholds were reloaded),
+      - every `full_every` selections, as a safety net for writes made by
+        other processes, which never reach this process's bus.
+    Alerts the index has not seen before are always selected.
+Usage:
+    index = AlertDependencyIndex()
+    change_bus.subscribe(index.on_change)
+    alerts_to_evaluate = index.select(data_locker.get_alerts())
+    index.last_stats    # {"evaluated", "skipped", "full"}
+"""
+
+import logging
+import threading
+from typing import Dict, List, Set
+
+from data import change_bus
+from data.models import AlertType
+
+logger = logging.getLogger("AlertIndex")
+
+# create_alert stores its normalized spelling; the evaluator uses the enum value.
+PRICE_ALERT_TYPES = {AlertType.PRICE_THRESHOLD.value, "PRICE_THRESHOLD"}
+
+
+class AlertDependencyIndex:
+    DEFAULT_FULL_EVERY = 10
+
+    def __init__(self, full_every: int = DEFAULT_FULL_EVERY):
+        self.full_every = max(1, int(full_every))
+        self._lock = threading.Lock()
+        self._full_pending = True
+        self._selections_since_full = 0
+        self._dirty = {change_bus.POSITIONS: set(), change_bus.PRICES: set(), change_bus.ALERTS: set()}
+        # Rebuilt from the alerts whenever the set of alerts (or any alert) changes.
+        self._alert_ids: Set[str] = set()
+        self._by_position: Dict[str, Set[str]] = {}
+        self._by_asset: Dict[str, Set[str]] = {}
+        self.last_stats = {"evaluated": 0, "skipped": 0, "full": False}
+
+    @staticmethod
+    def dependency(alert: dict) -> tuple:
+        """(topic, key) of the data an alert is evaluated on."""
+        position_id = alert.get("position_reference_id") or alert.get("position_id")
+        if alert.get("alert_type") in PRICE_ALERT_TYPES or not position_id:
+            return change_bus.PRICES, alert.get("asset_type") or "BTC"
+        return change_bus.POSITIONS, position_id
+
+    # ----------------------------------------------------------------
+    # Change events
+    # ----------------------------------------------------------------
+
+    def on_change(self, topic: str, keys):
+        """change_bus subscriber."""
+        with self._lock:
+            if topic not in self._dirty:
+                return
+            if keys is None:
+                self._full_pending = True
+            else:
+                self._dirty[topic].update(keys)
+
+    def mark_full(self):
+        """Selects everything next time (e.g. after a failed evaluation consumed the changes)."""
+        with self._lock:
+            self._full_pending = True
+
+    # ----------------------------------------------------------------
+    # Selection
+    # ----------------------------------------------------------------
+
+    def _rebuild(self, alerts: List[dict]):
+        by_position: Dict[str, Set[str]] = {}
+        by_asset: Dict[str, Set[str]] = {}
+        for alert in alerts:
+            topic, key = self.dependency(alert)
+            target = by_asset if topic == change_bus.PRICES else by_position
+            target.setdefault(key, set()).add(alert.get("id"))
+        self._by_position, self._by_asset = by_position, by_asset
+        self._alert_ids = {alert.get("id") for alert in alerts}
+
+    def select(self, alerts: List[dict], force_full: bool = False) -> List[dict]:
+        """The alerts affected by changes since the last call, in their original order."""
+        with self._lock:
+            dirty = self._dirty
+            self._dirty = {topic: set() for topic in dirty}
+            full = (force_full or self._full_pending
+                    or self._selections_since_full + 1 >= self.full_every)
+            self._full_pending = False
+
+            alert_ids = [alert.get("id") for alert in alerts]
+            known = self._alert_ids
+            if full or dirty[change_bus.ALERTS] or len(alert_ids) != len(known) \
+                    or any(alert_id not in known for alert_id in alert_ids):
+                self._rebuild(alerts)
+
+            if full:
+                self._selections_since_full = 0
+                selected = list(alerts)
+            else:
+                self._selections_since_full += 1
+                wanted = set(dirty[change_bus.ALERTS])
+                for position_id in dirty[change_bus.POSITIONS]:
+                    wanted.update(self._by_position.get(position_id, ()))
+                for asset in dirty[change_bus.PRICES]:
+                    wanted.update(self._by_asset.get(asset, ()))
+                selected = [alert for alert, alert_id in zip(alerts, alert_ids)
+                            if alert_id in wanted or alert_id not in known]
+
+            self.last_stats = {
+                "evaluated": len(selected),
+                "skipped": len(alerts) - len(selected),
+                "full": full,
+            }
+        logger.debug(
+            f"Alert selection: {self.last_stats['evaluated']} to evaluate, "
+            f"{self.last_stats['skipped']} skipped (full={full})."
+        )
+        return selected
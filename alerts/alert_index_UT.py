@@ -0,0 +1,79 @@
+import gc
+import unittest
+import weakref
+
+from alerts.alert_index import AlertDependencyIndex
+from data import change_bus
+
+ALERTS = [
+    {"id": "t1", "alert_type": "TravelPercent", "position_reference_id": "p1", "asset_type": "BTC"},
+    {"id": "h2", "alert_type": "HeatIndex", "position_reference_id": "p2", "asset_type": "ETH"},
+    {"id": "btc", "alert_type": "PriceThreshold", "asset_type": "BTC"},
+    {"id": "eth", "alert_type": "PRICE_THRESHOLD", "asset_type": "ETH"},
+]
+
+
+class TestAlertDependencyIndex(unittest.TestCase):
+    def setUp(self):
+        self.index = AlertDependencyIndex(full_every=5)
+        # The first selection is always full.
+        self.assertEqual(len(self.index.select(ALERTS)), len(ALERTS))
+
+    def _ids(self, alerts=ALERTS, **kwargs):
+        return [a["id"] for a in self.index.select(alerts, **kwargs)]
+
+    def test_only_dependent_alerts_are_selected(self):
+        self.assertEqual(self._ids(), [])
+        self.assertEqual(self.index.last_stats, {"evaluated": 0, "skipped": 4, "full": False})
+
+        self.index.on_change(change_bus.POSITIONS, {"p2"})
+        self.index.on_change(change_bus.PRICES, {"BTC"})
+        self.assertEqual(self._ids(), ["h2", "btc"])
+        self.assertEqual(self.index.last_stats["skipped"], 2)
+
+        self.index.on_change(change_bus.ALERTS, {"eth"})
+        self.assertEqual(self._ids(), ["eth"])
+
+    def test_new_alerts_and_bulk_changes(self):
+        new_alert = {"id": "p3", "alert_type": "Profit", "position_reference_id": "p3"}
+        self.assertEqual(self._ids(ALERTS + [new_alert]), ["p3"])
+
+        self.index.on_change(change_bus.POSITIONS, None)
+        self.assertEqual(len(self._ids()), 4)
+        self.assertTrue(self.index.last_stats["full"])
+
+    def test_forced_and_periodic_full_runs(self):
+        self.assertEqual(len(self._ids(force_full=True)), 4)
+        # full_every=5: four incremental selections, then a full one.
+        for _ in range(4):
+            self.assertEqual(self._ids(), [])
+        self.assertEqual(len(self._ids()), 4)
+
+    def test_subscribed_to_bus(self):
+        change_bus.subscribe(self.index.on_change)
+        try:
+            change_bus.publish(change_bus.POSITIONS, {"p1"})
+            with change_bus.suppressed():
+                change_bus.publish(change_bus.POSITIONS, {"p2"})
+        finally:
+            change_bus.unsubscribe(self.index.on_change)
+        self.assertEqual(self._ids(), ["t1"])
+
+
+class TestWeakSubscription(unittest.TestCase):
+    def test_collected_index_leaves_the_bus(self):
+        index = AlertDependencyIndex()
+        index.select(ALERTS)
+        change_bus.subscribe(index.on_change, weak=True)
+        change_bus.publish(change_bus.POSITIONS, {"p1"})
+        self.assertEqual([a["id"] for a in index.select(ALERTS)], ["t1"])
+
+        ref = weakref.ref(index)
+        del index
+        gc.collect()
+        self.assertIsNone(ref())
+        change_bus.publish(change_bus.POSITIONS, {"p1"})  # the dead entry is pruned, not called
+
+
+if __name__ == "__main__":
+    unittest.main()
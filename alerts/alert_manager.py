@@ -18,7 +18,7 @@ import inspect
 from utils.unified_logger import UnifiedLogger
 from data.models import NotificationType, Status, Alert, Position
 from data.models import AlertType, Alert, AlertClass  # for standardizing alert types
-from xcom.xcom import send_sms
+from xcom.notification_dispatcher import NotificationDispatcher
 # Fix for AlertController import
 try:
     # When running as a package
@@ -29,6 +29,10 @@ except ImportError:
 
 # And ensure your evaluator import is absolute
 from alerts.alert_evaluator import AlertEvaluator
+from alerts.alert_index import AlertDependencyIndex
+from alerts.alert_rules import load_rules
+from alerts.notification_policy import AlertNotificationPolicy
+from data import change_bus
 
 u_logger = UnifiedLogger()
 
@@ -160,7 +164,13 @@ class AlertManager:
             .get("sms", {})
 
         self.twilio_config = self.config.get("twilio_config", {})
+        # SMS and calls go out on a background worker over reused SMTP/Twilio connections.
+        self.notifier = NotificationDispatcher.from_config(full_comms, twilio_config=self.twilio_config)
         self.cooldown = self.config.get("alert_cooldown_seconds", 900)
+        # Level hysteresis, per-alert cooldowns and digest windows for check_alerts notifications.
+        self.notification_policy = AlertNotificationPolicy.from_config(
+            self.config.get("notification_policy", {}), cooldown_seconds=self.cooldown
+        )
         self.call_refractory_period = self.config.get("call_refractory_period", 3600)
         self.snooze_countdown = self.config.get("snooze_countdown", 300)
         self.monitor_enabled = self.config.get("system_config", {}).get("alert_monitor_enabled", True)
@@ -176,6 +186,17 @@ class AlertManager:
         self.alert_controller = AlertController(db_path=self.db_path)
         self.alert_evaluator = AlertEvaluator(self.config, self.data_locker, self.alert_controller)
 
+        # Only alerts whose position/asset changed are re-evaluated (see alerts/alert_index.py).
+        self.alert_index = AlertDependencyIndex(
+            self.config.get("system_config", {}).get(
+                "alert_full_reevaluation_every", AlertDependencyIndex.DEFAULT_FULL_EVERY
+            )
+        )
+        # Weak, so managers built per request or monitor can still be collected.
+        change_bus.subscribe(self.alert_index.on_change, weak=True)
+        self._evaluated_rules = None
+        self.last_evaluation_stats = dict(self.alert_index.last_stats)
+
     def reload_config(self):
         from config.config_manager import load_config
         db_conn = self.data_locker.get_db_connection()
@@ -232,15 +253,32 @@ class AlertManager:
         except Exception as e:
             self.logger.error(f"Error updating alert level for id '{alert_id}': {e}", exc_info=True)
 
-    def reevaluate_alerts(self):
+    def reevaluate_alerts(self, data_locker=None) -> dict:
         """
-        Reevaluate all alert conditions by delegating evaluation to AlertEvaluator.
+        Reevaluate alert conditions by delegating evaluation to AlertEvaluator:
+        evaluated values and levels in one pass, written back in one batch.
+        Only alerts whose position, asset price or own row changed since the last
+        run are evaluated; all of them when the thresholds were reloaded.
+        Returns {"evaluated", "skipped", "full"} (also kept in last_evaluation_stats).
         """
-        positions = self.data_locker.read_positions()
-        evaluation_results = self.alert_evaluator.evaluate_alerts(positions=positions)
-        self.logger.debug(f"Reevaluation completed. Position Alerts: {evaluation_results.get('position')}, "
-                          f"Market Alerts: {evaluation_results.get('market')}, "
-                          f"System Alerts: {evaluation_results.get('system')}")
+        dl = data_locker or self.data_locker
+        rules = load_rules()
+        alerts = dl.get_alerts()
+        selected = self.alert_index.select(alerts, force_full=rules is not self._evaluated_rules)
+        try:
+            results = self.alert_evaluator.update_alerts_evaluated_value(dl, rules=rules, alerts=selected)
+        except Exception:
+            # The selection consumed the pending changes; don't lose them.
+            self.alert_index.mark_full()
+            raise
+        self._evaluated_rules = rules
+        self.last_evaluation_stats = dict(self.alert_index.last_stats)
+        triggered = sum(1 for level in results["level"] if level != "Normal")
+        self.logger.debug(
+            f"Reevaluation completed: {self.last_evaluation_stats['evaluated']} evaluated, "
+            f"{self.last_evaluation_stats['skipped']} skipped, {triggered} above Normal."
+        )
+        return self.last_evaluation_stats
 
     def send_sms_alert(self, message: str, key: str):
         now = current_time()
@@ -249,13 +287,14 @@ class AlertManager:
             # … logging suppressed …
             return False   # <–– also return False when you suppress
 
-        result = send_sms("", message)  # or your full‑config call
+        # Delivery (and retries) happen on the dispatcher's worker thread.
+        result = self.notifier.enqueue("sms", message, key=key)
 
         if result:
             self.last_call_triggered[key] = now
             u_logger.log_operation(
-                operation_type="SMS Sent",
-                primary_text=f"SMS alert sent: {key}",
+                operation_type="SMS Queued",
+                primary_text=f"SMS alert queued: {key}",
                 source="AlertManager",
                 file="alert_manager.py",
                 extra_data={"log_line": inspect.currentframe().f_back.f_lineno}
@@ -263,7 +302,7 @@ class AlertManager:
         else:
             u_logger.log_operation(
                 operation_type="SMS Failed",
-                primary_text=f"Failed to send SMS alert: {key}",
+                primary_text=f"Failed to queue SMS alert: {key}",
                 source="AlertManager",
                 file="alert_manager.py",
                 extra_data={"log_line": inspect.currentframe().f_back.f_lineno}
@@ -273,11 +312,13 @@ class AlertManager:
 
 
 
-    def check_alerts(self, source: Optional[str] = None):
+    def check_alerts(self, source: Optional[str] = None, data_locker=None):
         """
         Reevaluate alert conditions, retrieve updated alerts from DB,
         and trigger notifications if needed.
+        data_locker may be a Cyclone CycleContext view to read positions from the cycle's snapshot.
         """
+        dl = data_locker or self.data_locker
         if not self.monitor_enabled:
             u_logger.log_operation(
                 operation_type="Monitor Loop",
@@ -293,7 +334,7 @@ class AlertManager:
         self.logger.debug("Global alert config enabled flag: " + str(global_config.get("enabled", False)))
 
         if global_config.get("enabled", False):
-            positions = self.data_locker.read_positions()
+            positions = dl.read_positions()
             # For debugging, using dummy market data:
             market_data = {"BTC": 75000, "ETH": 1600, "SOL": 130}
             global_alerts = self.alert_evaluator.evaluate_global_alerts(positions, market_data)
@@ -336,9 +377,14 @@ class AlertManager:
 
         else:
             # Position & Market Alerts branch
-            self.reevaluate_alerts()
-            alerts = self.data_locker.get_alerts()
-            triggered_alerts = [a for a in alerts if a.get("level", "Normal") != "Normal"]
+            self.reevaluate_alerts(dl)
+            # dl sees the levels just written (or buffered, for a cycle context).
+            alerts = dl.get_alerts()
+            now = current_time()
+            observed = self.notification_policy.observe(alerts, now, snoozed=self._is_snoozed(now))
+            self.suppressed_count = observed["suppressed"]
+            # Escalations since the last digest, one entry per alert; [] until the digest window closes.
+            triggered_alerts = self.notification_policy.take_digest(now)
 
             if triggered_alerts:
                 combined_message = "\n".join(
@@ -372,7 +418,8 @@ class AlertManager:
                         break
 
                 if any_sms:
-                    self.send_sms_alert(combined_message, "all_alerts")
+                    # The policy already rate-limits per alert, so the digest skips send_sms_alert's refractory.
+                    self.notifier.enqueue("sms", combined_message, key="all_alerts")
                 else:
                     self.logger.info("SMS suppressed for all_alerts—notify_by.sms not enabled for these levels.")
 
@@ -393,15 +440,26 @@ class AlertManager:
                     extra_data={"log_line": inspect.currentframe().f_back.f_lineno}
                 )
 
+    def get_notification_metrics(self) -> dict:
+        """Sent/suppressed/coalesced counts from the notification policy, plus dispatcher delivery stats."""
+        return {"policy": self.notification_policy.get_metrics(), "dispatcher": self.notifier.get_stats()}
+
+    def _is_snoozed(self, now: float) -> bool:
+        snooze_start = self.config.get("snooze_start")
+        return snooze_start is not None and now - snooze_start < self.snooze_countdown
+
 
     def update_timer_states(self):
+        """
+        Expires the call refractory and snooze timers. The timers are held in
+        memory; the expired start times left in alert_limits.json read as
+        "no time remaining", so the file isn't rewritten on every poll.
+        """
         now = current_time()
-        updated = False
         call_start = self.config.get("call_refractory_start")
         if call_start is not None:
             if now - call_start >= self.call_refractory_period:
                 self.config["call_refractory_start"] = None
-                updated = True
                 u_logger.log_operation(
                     operation_type="Timer Reset",
                     primary_text="Call refractory timer reset",
@@ -413,7 +471,6 @@ class AlertManager:
         if snooze_start is not None:
             if now - snooze_start >= self.snooze_countdown:
                 self.config["snooze_start"] = None
-                updated = True
                 u_logger.log_operation(
                     operation_type="Timer Reset",
                     primary_text="Snooze timer reset",
@@ -421,8 +478,6 @@ class AlertManager:
                     file="alert_manager.py",
                     extra_data={"log_line": inspect.currentframe().f_back.f_lineno}
                 )
-        if updated:
-            self.save_config(self.config, ALERT_LIMITS_PATH)
 
     def send_call(self, body: str, key: str):
         now = current_time()
@@ -456,9 +511,11 @@ class AlertManager:
             return
 
         try:
-            trigger_twilio_flow(body, self.twilio_config)
+            if not self.notifier.enqueue("call", body, key=key):
+                raise RuntimeError("call notification was not queued")
             self.last_call_triggered[key] = now
             self.config["call_refractory_start"] = now
+            # Persisted so the title-bar timer shows it and a restart keeps the refractory.
             self.save_config(self.config, ALERT_LIMITS_PATH)
             u_logger.log_operation(
                 operation_type="Timer Set",
@@ -557,11 +614,7 @@ class AlertManager:
 
             success = self.data_locker.create_alert(alert_dict)
             if success:
-                conn = self.data_locker.get_db_connection()
-                cursor = conn.cursor()
-                cursor.execute("UPDATE positions SET alert_reference_id=? WHERE id=?", (new_alert.id, position.get("id")))
-                conn.commit()
-                cursor.close()
+                self.data_locker.update_position_fields(position.get("id"), {"alert_reference_id": new_alert.id})
 
                 self.u_logger.log_operation(
                     operation_type="Alert Creation and Linking",
@@ -589,11 +642,7 @@ class AlertManager:
 
     def update_alert_link(self, position: dict, new_alert_id: str) -> bool:
         try:
-            conn = self.data_locker.get_db_connection()
-            cursor = conn.cursor()
-            cursor.execute("UPDATE positions SET alert_reference_id=? WHERE id=?", (new_alert_id, position.get("id")))
-            conn.commit()
-            cursor.close()
+            self.data_locker.update_position_fields(position.get("id"), {"alert_reference_id": new_alert_id})
             self.logger.log_operation(
                 operation_type="Alert Link Update",
                 primary_text=f"Updated alert link for position {position.get('id')} to alert {new_alert_id}",
@@ -612,11 +661,7 @@ class AlertManager:
 
     def clear_alert_link(self, position: dict) -> bool:
         try:
-            conn = self.data_locker.get_db_connection()
-            cursor = conn.cursor()
-            cursor.execute("UPDATE positions SET alert_reference_id=NULL WHERE id=?", (position.get("id"),))
-            conn.commit()
-            cursor.close()
+            self.data_locker.update_position_fields(position.get("id"), {"alert_reference_id": None})
             self.logger.log_operation(
                 operation_type="Alert Link Cleared",
                 primary_text=f"Cleared alert link for position {position.get('id')}",
@@ -654,9 +699,7 @@ class AlertManager:
         for pos in positions:
             alert_id = pos.get("alert_reference_id")
             if alert_id and alert_id not in valid_alert_ids:
-                cursor = self.data_locker.conn.cursor()
-                cursor.execute("UPDATE positions SET alert_reference_id = NULL WHERE id = ?", (pos.get("id"),))
-                self.data_locker.conn.commit()
+                self.data_locker.update_position_fields(pos.get("id"), {"alert_reference_id": None})
                 updated_positions += 1
 
         print(f"Cleared stale alert references in {updated_positions} position(s).")
@@ -0,0 +1,243 @@
+#!/usr/bin/env python
+"""
+alert_rules.py
+Description:
+    The thresholds in alert_limits.json compiled into a rule table, so the
+    evaluated value and level of every alert are computed in one NumPy pass
+    against a joined positions/prices snapshot and written back in one batch.
+
+    Every rule is reduced to three ascending thresholds on a signed value x:
+        level = (x >= low) + (x >= medium) + (x >= high)  ->  Normal/Low/Medium/High
+      - Profit, HeatIndex, LiquidationProbability: x = value, thresholds from
+        profit_ranges / heat_index_ranges / liquidation_probability_ranges.
+      - TravelPercent: x = -value against the absolute travel_percent_liquid_ranges
+        (travel goes negative toward liquidation); zero or positive travel is Normal.
+        The alert's trigger_value moves to the next threshold, as evaluate_travel_alert did.
+      - PriceThreshold: x = value (ABOVE) or -value (BELOW) with all three thresholds
+        at the trigger, so a met condition is High.
+    Disabled ranges, missing positions/prices and unknown alert types stay Normal.
+Usage:
+    rules = load_rules()                        # recompiled only when the file changes
+    results = rules.evaluate(alerts, positions, latest_prices)
+    rules.write_back(data_locker, alerts, results)
+"""
+
+import json
+import logging
+import os
+import threading
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from config.config_constants import ALERT_LIMITS_PATH
+from data import change_bus
+from data.models import AlertType
+
+logger = logging.getLogger("AlertRules")
+
+LEVELS = ("Normal", "Low", "Medium", "High")
+
+# Position field each position alert type is evaluated on.
+POSITION_FIELDS = {
+    AlertType.TRAVEL_PERCENT_LIQUID.value: "travel_percent",
+    AlertType.PROFIT.value: "pnl_after_fees_usd",
+    AlertType.HEAT_INDEX.value: "current_heat_index",
+    AlertType.LIQUIDATION_PROBABILITY.value: "liquidation_probability",
+}
+
+# alert_limits.json range block for each position alert type.
+RANGE_KEYS = {
+    AlertType.TRAVEL_PERCENT_LIQUID.value: "travel_percent_liquid_ranges",
+    AlertType.PROFIT.value: "profit_ranges",
+    AlertType.HEAT_INDEX.value: "heat_index_ranges",
+    AlertType.LIQUIDATION_PROBABILITY.value: "liquidation_probability_ranges",
+}
+
+DEFAULT_TRAVEL_RANGES = (-25.0, -50.0, -75.0)
+
+# How positions' liquidation_probability is computed (liquidation_probability_ranges).
+DEFAULT_LIQUIDATION_SETTINGS = {
+    "horizon_hours": 24.0,
+    "horizons_hours": [1.0, 24.0, 168.0],
+    "lookback_hours": 168.0,
+    "drift": 0.0,
+    "default_volatility": 0.8,
+}
+
+_NEVER = (np.inf, np.inf, np.inf)
+
+
+def _to_float(value, default: float = 0.0) -> float:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return default
+
+
+class CompiledAlertRules:
+    def __init__(self, alert_limits: dict):
+        ranges = alert_limits.get("alert_ranges", {}) or {}
+
+        # alert_type -> (sign, low, medium, high) on the signed value.
+        self.position_rules: Dict[str, tuple] = {}
+        for alert_type, key in RANGE_KEYS.items():
+            cfg = ranges.get(key) or {}
+            if not cfg.get("enabled", False):
+                continue
+            if alert_type == AlertType.TRAVEL_PERCENT_LIQUID.value:
+                thresholds = tuple(
+                    abs(_to_float(cfg.get(k), d)) for k, d in zip(("low", "medium", "high"), DEFAULT_TRAVEL_RANGES)
+                )
+                self.position_rules[alert_type] = (-1.0,) + thresholds
+            else:
+                thresholds = tuple(_to_float(cfg.get(k), np.inf) for k in ("low", "medium", "high"))
+                self.position_rules[alert_type] = (1.0,) + thresholds
+
+        # Applies whether or not the alerts are enabled: the position fields are always kept.
+        liquidation_cfg = ranges.get("liquidation_probability_ranges") or {}
+        self.liquidation_settings = dict(DEFAULT_LIQUIDATION_SETTINGS)
+        for key, default in DEFAULT_LIQUIDATION_SETTINGS.items():
+            if isinstance(default, list):
+                horizons = [_to_float(h) for h in liquidation_cfg.get(key) or default]
+                self.liquidation_settings[key] = [h for h in horizons if h > 0] or default
+            else:
+                self.liquidation_settings[key] = _to_float(liquidation_cfg.get(key), default)
+
+        travel_cfg = ranges.get("travel_percent_liquid_ranges") or {}
+        # Negative travel trigger for each level (Normal/Low -> next threshold, Medium/High -> high).
+        low, medium, high = (
+            _to_float(travel_cfg.get(k), d) for k, d in zip(("low", "medium", "high"), DEFAULT_TRAVEL_RANGES)
+        )
+        self.travel_triggers = np.array([low, medium, high, high])
+
+        # asset -> {"enabled", "condition", "trigger_value"}
+        self.price_rules: Dict[str, dict] = {
+            asset: {
+                "enabled": bool(cfg.get("enabled", False)),
+                "condition": (cfg.get("condition") or "ABOVE").upper(),
+                "trigger_value": _to_float(cfg.get("trigger_value")),
+            }
+            for asset, cfg in (ranges.get("price_alerts") or {}).items()
+        }
+
+    # ----------------------------------------------------------------
+    # Evaluation
+    # ----------------------------------------------------------------
+
+    def _price_rule(self, alert: dict) -> tuple:
+        asset_rule = self.price_rules.get(alert.get("asset_type", "BTC"))
+        if asset_rule is not None and not asset_rule["enabled"]:
+            return (1.0,) + _NEVER
+        # The alert's own trigger/condition win; enrichment copies the config's in when unset.
+        trigger = _to_float(alert.get("trigger_value"))
+        condition = (alert.get("condition") or "").upper()
+        if asset_rule is not None:
+            trigger = trigger or asset_rule["trigger_value"]
+            condition = condition or asset_rule["condition"]
+        if not trigger:
+            return (1.0,) + _NEVER
+        sign = -1.0 if condition == "BELOW" else 1.0
+        return (sign,) + (sign * trigger,) * 3
+
+    def evaluate(self, alerts: List[dict], positions: List[dict], latest_prices: Dict[str, dict]) -> dict:
+        """
+        Evaluates every alert in one pass. Returns parallel sequences:
+          "ids", "evaluated_value" (float array), "level_index" (int array, index into LEVELS),
+          "level" (list of names) and "trigger_value" (float array, NaN where the
+          alert's trigger is left alone).
+        """
+        n = len(alerts)
+        pos_lookup = {p.get("id"): p for p in positions}
+        values = np.zeros(n)
+        rules = np.empty((n, 4))
+        rules[:] = (1.0,) + _NEVER
+        is_travel = np.zeros(n, dtype=bool)
+
+        # Join alerts to their position / latest price; the level math below is vectorized.
+        for i, alert in enumerate(alerts):
+            alert_type = alert.get("alert_type", "")
+            if alert_type == AlertType.PRICE_THRESHOLD.value:
+                price = latest_prices.get(alert.get("asset_type", "BTC"))
+                if price and price.get("current_price") is not None:
+                    values[i] = _to_float(price["current_price"])
+                    rules[i] = self._price_rule(alert)
+            elif alert_type in POSITION_FIELDS:
+                position = pos_lookup.get(alert.get("position_reference_id") or alert.get("position_id"))
+                if position is not None:
+                    values[i] = _to_float(position.get(POSITION_FIELDS[alert_type]))
+                    rules[i] = self.position_rules.get(alert_type, (1.0,) + _NEVER)
+                    is_travel[i] = alert_type == AlertType.TRAVEL_PERCENT_LIQUID.value
+
+        signed = values * rules[:, 0]
+        level_index = ((signed >= rules[:, 1]).astype(int)
+                       + (signed >= rules[:, 2])
+                       + (signed >= rules[:, 3]))
+        level_index[is_travel & (values >= 0)] = 0
+        trigger_value = np.where(is_travel, self.travel_triggers[level_index], np.nan)
+        if AlertType.TRAVEL_PERCENT_LIQUID.value not in self.position_rules:
+            trigger_value[:] = np.nan
+
+        return {
+            "ids": [a.get("id") for a in alerts],
+            "evaluated_value": values,
+            "level_index": level_index,
+            "level": [LEVELS[i] for i in level_index.tolist()],
+            "trigger_value": trigger_value,
+        }
+
+    # ----------------------------------------------------------------
+    # Write-back
+    # ----------------------------------------------------------------
+
+    @staticmethod
+    def write_back(data_locker, alerts: List[dict], results: dict) -> int:
+        """
+        Writes evaluated_value / level / trigger_value for the alerts whose values
+        changed, in one batch. Returns the number of alerts written.
+        These writes are the evaluation's own output, so they publish no change events.
+        """
+        written = 0
+        with change_bus.suppressed(), data_locker.batch():
+            for alert, value, level, trigger in zip(alerts, results["evaluated_value"].tolist(),
+                                                    results["level"], results["trigger_value"].tolist()):
+                if trigger != trigger:  # NaN: keep the alert's trigger
+                    trigger = alert.get("trigger_value")
+                if (alert.get("evaluated_value") == value and alert.get("level") == level
+                        and alert.get("trigger_value") == trigger):
+                    continue
+                # Same columns for every row, so the batch goes out as one executemany.
+                data_locker.update_alert_conditions(alert.get("id"), {
+                    "evaluated_value": value,
+                    "level": level,
+                    "trigger_value": trigger,
+                })
+                written += 1
+        return written
+
+
+_cache_lock = threading.Lock()
+_cache: Dict[str, tuple] = {}
+
+
+def load_rules(path: Optional[str] = None) -> CompiledAlertRules:
+    """Rules compiled from alert_limits.json; recompiled only when the file changes."""
+    path = str(path or ALERT_LIMITS_PATH)
+    try:
+        mtime = os.path.getmtime(path)
+    except OSError:
+        mtime = None
+    with _cache_lock:
+        cached = _cache.get(path)
+        if cached is not None and cached[0] == mtime:
+            return cached[1]
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                limits = json.load(f)
+        except Exception as e:
+            logger.error(f"Could not load alert limits from {path}: {e}", exc_info=True)
+            limits = {}
+        rules = CompiledAlertRules(limits)
+        _cache[path] = (mtime, rules)
+        logger.debug(f"Compiled alert rules from {path}.")
+        return rules
@@ -0,0 +1,94 @@
+import unittest
+
+from alerts.alert_rules import CompiledAlertRules
+from data.data_locker import DataLocker
+from data.query_stats import QueryStats, track
+
+LIMITS = {
+    "alert_ranges": {
+        "travel_percent_liquid_ranges": {"enabled": True, "low": -25.0, "medium": -50.0, "high": -75.0},
+        "heat_index_ranges": {"enabled": True, "low": 7.0, "medium": 33.0, "high": 66.0},
+        "profit_ranges": {"enabled": False, "low": 22.0, "medium": 51.0, "high": 99.0},
+        "price_alerts": {
+            "BTC": {"enabled": True, "condition": "ABOVE", "trigger_value": 70000.0},
+            "ETH": {"enabled": True, "condition": "BELOW", "trigger_value": 2000.0},
+        },
+    }
+}
+
+
+class TestCompiledAlertRules(unittest.TestCase):
+    def setUp(self):
+        self.rules = CompiledAlertRules(LIMITS)
+        self.positions = [
+            {"id": "p1", "travel_percent": -60.0, "current_heat_index": 40.0, "pnl_after_fees_usd": 500.0},
+            {"id": "p2", "travel_percent": 10.0, "current_heat_index": 5.0, "pnl_after_fees_usd": 0.0},
+        ]
+        self.prices = {"BTC": {"current_price": 71000.0}, "ETH": {"current_price": 2500.0}}
+
+    def _levels(self, alerts):
+        results = self.rules.evaluate(alerts, self.positions, self.prices)
+        return dict(zip(results["ids"], results["level"])), results
+
+    def test_position_levels(self):
+        levels, results = self._levels([
+            {"id": "t1", "alert_type": "TravelPercent", "position_reference_id": "p1"},
+            {"id": "t2", "alert_type": "TravelPercent", "position_reference_id": "p2"},
+            {"id": "h1", "alert_type": "HeatIndex", "position_reference_id": "p1"},
+            {"id": "h2", "alert_type": "HeatIndex", "position_reference_id": "p2"},
+            {"id": "pr", "alert_type": "Profit", "position_reference_id": "p1"},
+            {"id": "orphan", "alert_type": "HeatIndex", "position_reference_id": "gone"},
+        ])
+        self.assertEqual(levels, {"t1": "Medium", "t2": "Normal", "h1": "Medium", "h2": "Normal",
+                                  "pr": "Normal", "orphan": "Normal"})
+        self.assertEqual(results["evaluated_value"].tolist()[:3], [-60.0, 10.0, 40.0])
+        # Travel alerts move their trigger to the next threshold.
+        self.assertEqual(results["trigger_value"].tolist()[:2], [-75.0, -25.0])
+
+    def test_price_conditions(self):
+        levels, _ = self._levels([
+            {"id": "btc", "alert_type": "PriceThreshold", "asset_type": "BTC"},
+            {"id": "eth", "alert_type": "PriceThreshold", "asset_type": "ETH"},
+            {"id": "eth_own", "alert_type": "PriceThreshold", "asset_type": "ETH",
+             "condition": "BELOW", "trigger_value": 3000.0},
+            {"id": "sol", "alert_type": "PriceThreshold", "asset_type": "SOL"},
+        ])
+        self.assertEqual(levels, {"btc": "High", "eth": "Normal", "eth_own": "High", "sol": "Normal"})
+
+
+class TestAlertRulesWriteBack(unittest.TestCase):
+    def setUp(self):
+        DataLocker._instance = None
+        self.dl = DataLocker(":memory:")
+        self.dl.create_position({"id": "p1", "travel_percent": -60.0, "current_heat_index": 40.0})
+        for alert_id, alert_type in (("a1", "TravelPercent"), ("a2", "HeatIndex")):
+            self.dl._execute_write(
+                "INSERT INTO alerts (id, alert_type, position_reference_id, evaluated_value, level) "
+                "VALUES (?, ?, 'p1', 0, 'Normal')",
+                (alert_id, alert_type)
+            )
+        self.rules = CompiledAlertRules(LIMITS)
+
+    def tearDown(self):
+        self.dl.close()
+        DataLocker._instance = None
+
+    def _evaluate(self):
+        alerts = self.dl.get_alerts()
+        results = self.rules.evaluate(alerts, self.dl.read_positions(), self.dl.get_latest_prices())
+        return self.rules.write_back(self.dl, alerts, results)
+
+    def test_changed_alerts_are_written_once(self):
+        stats = QueryStats()
+        with track(stats):
+            self.assertEqual(self._evaluate(), 2)
+        self.assertEqual(stats.as_dict()["rows_written"], 2)
+        self.assertEqual(self.dl.get_alert("a1")["level"], "Medium")
+        self.assertEqual(self.dl.get_alert("a2")["evaluated_value"], 40.0)
+
+        # Nothing changed: nothing written.
+        self.assertEqual(self._evaluate(), 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
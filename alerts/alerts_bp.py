@@ -214,12 +214,7 @@ def format_alert_config_table(alert_ranges: dict) -> str:
 def clear_alert_ledger_backend(self):
     """Clear all records from the alert_ledger table."""
     try:
-        dl = DataLocker.get_instance()
-        cursor = dl.conn.cursor()
-        cursor.execute("DELETE FROM alert_ledger")
-        dl.conn.commit()
-        deleted = cursor.rowcount
-        cursor.close()
+        deleted = DataLocker.get_instance().clear_alert_ledger()
         self.u_logger.log_cyclone(
             operation_type="Clear Alert Ledger",
             primary_text=f"Cleared {deleted} alert ledger record(s)",
@@ -463,6 +458,12 @@ def test_sms():
                    message='SMS sent!' if success else 'SMS failed'), status_code
 
 
+@alerts_bp.route('/notification_metrics', methods=['GET'], endpoint="notification_metrics")
+def notification_metrics():
+    """Sent vs suppressed notification counts (policy) and delivery stats (dispatcher)."""
+    return jsonify(alert_manager.get_notification_metrics())
+
+
 @alerts_bp.route('/matrix', methods=['GET'], endpoint="alert_matrix")
 def alert_matrix():
     from flask import url_for
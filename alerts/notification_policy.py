@@ -0,0 +1,172 @@
+#!/usr/bin/env python
+"""
+notification_policy.py
+Description:
+    Decides which alert level changes are worth a notification, so check_alerts
+    stops re-sending every elevated alert on every cycle.
+
+    Per alert, a small level state machine (Normal < Low < Medium < High):
+      - Escalation (the evaluated level rises above the held level) is taken
+        at once; a held level above the last notified one is what notifies.
+      - De-escalation has hysteresis: the level must stay lower for
+        `clear_after` consecutive observations before the held level drops,
+        so a value flapping around a threshold doesn't re-notify each time
+        it crosses back up.
+      - A steady elevated level stays quiet; with `reminder_seconds` set it is
+        re-sent at most once per that interval.
+      - A notified alert is held back for `cooldown_seconds` (in memory); an
+        escalation inside the cooldown, or during a snooze, goes out after it.
+    Notifications collect in a digest that is released once per
+    `digest_window_seconds` (0 = every check); repeats of an alert inside one
+    window merge into its single digest entry.
+
+    Metrics: sent (digest entries delivered), digests, suppressed (elevated
+    observations that didn't notify: steady, cooldown, snooze), coalesced
+    (repeats merged into a pending entry).
+Usage:
+    policy = AlertNotificationPolicy.from_config(config.get("notification_policy", {}))
+    policy.observe(alerts)
+    entries = policy.take_digest()          # [] until the window closes
+"""
+
+import logging
+import threading
+import time
+from typing import Dict, List, Optional
+
+logger = logging.getLogger("AlertNotificationPolicy")
+
+LEVEL_RANK = {"Normal": 0, "Low": 1, "Medium": 2, "High": 3}
+LEVEL_NAMES = {rank: name for name, rank in LEVEL_RANK.items()}
+
+
+class AlertNotificationPolicy:
+    def __init__(self, cooldown_seconds: float = 900.0, digest_window_seconds: float = 0.0,
+                 clear_after: int = 2, reminder_seconds: Optional[float] = None):
+        self.cooldown_seconds = float(cooldown_seconds or 0.0)
+        self.digest_window_seconds = float(digest_window_seconds or 0.0)
+        self.clear_after = max(1, int(clear_after))
+        self.reminder_seconds = float(reminder_seconds) if reminder_seconds else None
+        self._lock = threading.Lock()
+        # alert id -> {"level": held rank, "notified_level": rank last sent,
+        #              "lower_count": int, "last_notified": float or None}
+        self._states: Dict[str, dict] = {}
+        # alert id -> digest entry, in first-notified order
+        self._digest: Dict[str, dict] = {}
+        self._digest_opened: Optional[float] = None
+        self._metrics = {"sent": 0, "digests": 0, "suppressed": 0, "coalesced": 0}
+
+    @classmethod
+    def from_config(cls, policy_config: dict, cooldown_seconds: float = 900.0) -> "AlertNotificationPolicy":
+        return cls(
+            cooldown_seconds=policy_config.get("cooldown_seconds", cooldown_seconds),
+            digest_window_seconds=policy_config.get("digest_window_seconds", 0.0),
+            clear_after=policy_config.get("clear_after_checks", 2),
+            reminder_seconds=policy_config.get("reminder_seconds"),
+        )
+
+    # ----------------------------------------------------------------
+    # State machine
+    # ----------------------------------------------------------------
+
+    def _step(self, state: dict, rank: int):
+        """Moves the held level toward `rank`: straight up, down only after clear_after lower readings."""
+        if rank > state["level"]:
+            state["level"] = rank
+            state["lower_count"] = 0
+        elif rank < state["level"]:
+            state["lower_count"] += 1
+            if state["lower_count"] >= self.clear_after:
+                state["level"] = rank
+                state["lower_count"] = 0
+                # Climbing back up from here is news again.
+                state["notified_level"] = min(state["notified_level"], rank)
+        else:
+            state["lower_count"] = 0
+
+    def observe(self, alerts: List[dict], now: Optional[float] = None, snoozed: bool = False) -> dict:
+        """
+        Feeds one check's evaluated alerts through the state machines.
+        Returns {"notified", "suppressed"} for this call.
+        """
+        now = time.time() if now is None else now
+        notified = suppressed = 0
+        with self._lock:
+            seen = set()
+            for alert in alerts:
+                alert_id = alert.get("id")
+                seen.add(alert_id)
+                rank = LEVEL_RANK.get(alert.get("level") or "Normal", 0)
+                state = self._states.setdefault(
+                    alert_id, {"level": 0, "notified_level": 0, "lower_count": 0, "last_notified": None}
+                )
+                self._step(state, rank)
+                if state["level"] == 0:
+                    continue
+
+                last = state["last_notified"]
+                if state["level"] > state["notified_level"]:
+                    due = last is None or now - last >= self.cooldown_seconds
+                else:
+                    due = (self.reminder_seconds is not None and last is not None
+                           and now - last >= max(self.reminder_seconds, self.cooldown_seconds))
+                if not due or snoozed:
+                    suppressed += 1
+                    continue
+
+                state["notified_level"] = state["level"]
+                state["last_notified"] = now
+                self._add_to_digest(alert, LEVEL_NAMES[state["level"]], now)
+                notified += 1
+
+            # Alerts that were deleted take their state with them.
+            for alert_id in list(self._states):
+                if alert_id not in seen:
+                    del self._states[alert_id]
+            self._metrics["suppressed"] += suppressed
+        return {"notified": notified, "suppressed": suppressed}
+
+    # ----------------------------------------------------------------
+    # Digest
+    # ----------------------------------------------------------------
+
+    def _add_to_digest(self, alert: dict, level: str, now: float):
+        entry = self._digest.get(alert.get("id"))
+        if entry is not None:
+            self._metrics["coalesced"] += 1
+            entry.update(level=level, evaluated_value=alert.get("evaluated_value"), count=entry["count"] + 1)
+            return
+        if self._digest_opened is None:
+            self._digest_opened = now
+        self._digest[alert.get("id")] = {
+            "id": alert.get("id"),
+            "alert_type": alert.get("alert_type"),
+            "asset_type": alert.get("asset_type"),
+            "position_reference_id": alert.get("position_reference_id"),
+            "level": level,
+            "evaluated_value": alert.get("evaluated_value"),
+            "first_notified": now,
+            "count": 1,
+        }
+
+    def take_digest(self, now: Optional[float] = None) -> List[dict]:
+        """The pending entries once the digest window has closed (and resets it); else []."""
+        now = time.time() if now is None else now
+        with self._lock:
+            if not self._digest or now - self._digest_opened < self.digest_window_seconds:
+                return []
+            entries = list(self._digest.values())
+            self._digest = {}
+            self._digest_opened = None
+            self._metrics["sent"] += len(entries)
+            self._metrics["digests"] += 1
+        return entries
+
+    def held_level(self, alert_id: str) -> str:
+        with self._lock:
+            state = self._states.get(alert_id)
+            return LEVEL_NAMES[state["level"]] if state else "Normal"
+
+    def get_metrics(self) -> dict:
+        with self._lock:
+            return dict(self._metrics, pending=len(self._digest))
@@ -0,0 +1,65 @@
+import unittest
+
+from alerts.notification_policy import AlertNotificationPolicy
+
+
+def alert(level, alert_id="a1", value=0.0):
+    return {"id": alert_id, "alert_type": "HeatIndex", "asset_type": "BTC", "level": level, "evaluated_value": value}
+
+
+class TestAlertNotificationPolicy(unittest.TestCase):
+    def test_steady_elevated_level_notifies_once(self):
+        policy = AlertNotificationPolicy(cooldown_seconds=0)
+        for t in range(5):
+            policy.observe([alert("Medium")], now=float(t))
+        self.assertEqual(len(policy.take_digest(now=5.0)), 1)
+        metrics = policy.get_metrics()
+        self.assertEqual((metrics["sent"], metrics["suppressed"]), (1, 4))
+
+    def test_hysteresis_ignores_flapping(self):
+        policy = AlertNotificationPolicy(cooldown_seconds=0, clear_after=3)
+        sent = 0
+        # Flaps across the Low threshold: one dip never clears the held level.
+        for t, level in enumerate(["Low", "Normal", "Low", "Normal", "Low"]):
+            policy.observe([alert(level)], now=float(t))
+            sent += len(policy.take_digest(now=float(t)))
+        self.assertEqual(sent, 1)
+
+        # Three lower readings in a row clear it; the next rise notifies again.
+        for t in range(5, 8):
+            policy.observe([alert("Normal")], now=float(t))
+        self.assertEqual(policy.held_level("a1"), "Normal")
+        policy.observe([alert("Low")], now=8.0)
+        self.assertEqual(len(policy.take_digest(now=8.0)), 1)
+
+    def test_escalation_inside_cooldown_is_sent_after_it(self):
+        policy = AlertNotificationPolicy(cooldown_seconds=100)
+        policy.observe([alert("Low")], now=0.0)
+        self.assertEqual(policy.take_digest(now=0.0)[0]["level"], "Low")
+
+        policy.observe([alert("High")], now=10.0)
+        self.assertEqual(policy.take_digest(now=10.0), [])
+        policy.observe([alert("High")], now=100.0)
+        self.assertEqual(policy.take_digest(now=100.0)[0]["level"], "High")
+
+    def test_digest_window_merges_alerts(self):
+        policy = AlertNotificationPolicy(cooldown_seconds=0, digest_window_seconds=60)
+        policy.observe([alert("Low"), alert("Low", "a2")], now=0.0)
+        policy.observe([alert("High"), alert("Low", "a2")], now=30.0)
+        self.assertEqual(policy.take_digest(now=30.0), [])
+
+        entries = policy.take_digest(now=60.0)
+        self.assertEqual([(e["id"], e["level"], e["count"]) for e in entries], [("a1", "High", 2), ("a2", "Low", 1)])
+        metrics = policy.get_metrics()
+        self.assertEqual((metrics["digests"], metrics["coalesced"]), (1, 1))
+
+    def test_snooze_defers_notifications(self):
+        policy = AlertNotificationPolicy(cooldown_seconds=0)
+        policy.observe([alert("High")], now=0.0, snoozed=True)
+        self.assertEqual(policy.take_digest(now=0.0), [])
+        policy.observe([alert("High")], now=1.0)
+        self.assertEqual(len(policy.take_digest(now=1.0)), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,2 @@
+# Regular package so pytest imports cyclone/*_UT.py as cyclone.<name>; without it
+# cyclone/cyclone.py shadows the package when the test directory is put on sys.path.
@@ -0,0 +1,238 @@
+#!/usr/bin/env python
+"""
+cycle_context.py
+Description:
+    In-memory state shared by the steps of one Cyclone.run_cycle.
+
+    The context loads latest prices, positions and alerts from SQLite the first
+    time a step asks for them and hands the same snapshot to every later step,
+    so enrichment, alert evaluation and hedge linking stop re-reading the
+    database. Field updates made by steps (enriched position values, alert
+    evaluated values, hedge links) are applied to the in-memory rows and
+    written back once, in a single transaction, by flush() at the end of the
+    cycle.
+
+    `context.locker` is a DataLocker stand-in for existing helpers that take a
+    data_locker argument: reads of positions/alerts/prices come from the
+    context, field updates are buffered, everything else passes through to the
+    real DataLocker. A step that inserts or deletes rows through the real
+    DataLocker calls the matching invalidate_*() so the next read reloads.
+
+    Buffered updates that change a value publish their change event
+    (data/change_bus.py) right away, so later steps of the same cycle - alert
+    evaluation in particular - see which rows moved; flush() itself publishes
+    nothing new.
+Usage:
+    ctx = CycleContext(DataLocker.get_instance())
+    positions = ctx.positions()
+    ctx.update_position(pos_id, {"heat_index": 4.2})
+    ctx.flush()
+"""
+
+import logging
+import threading
+from contextlib import nullcontext
+from typing import Dict, Iterable, List, Optional
+
+from data import change_bus
+from data.data_locker import DataLocker
+
+logger = logging.getLogger("Cyclone")
+
+
+class CycleContext:
+    def __init__(self, data_locker: DataLocker):
+        self.data_locker = data_locker
+        self.locker = CycleDataView(self)
+        # Result of this cycle's position sync ({"appeared": [...], "vanished": [...], ...});
+        # None when positions weren't synced.
+        self.position_delta: Optional[dict] = None
+        # Steps run concurrently on executor threads.
+        self._lock = threading.RLock()
+        self._prices: Optional[Dict[str, dict]] = None
+        self._positions: Optional[Dict[str, dict]] = None
+        self._alerts: Optional[Dict[str, dict]] = None
+        self._position_updates: Dict[str, dict] = {}
+        self._alert_updates: Dict[str, dict] = {}
+
+    # ----------------------------------------------------------------
+    # Reads
+    # ----------------------------------------------------------------
+
+    def prices(self) -> Dict[str, dict]:
+        """Latest price row per asset."""
+        with self._lock:
+            if self._prices is None:
+                self._prices = self.data_locker.get_latest_prices()
+            return self._prices
+
+    def positions(self) -> List[dict]:
+        """Open positions, including updates made earlier in the cycle."""
+        with self._lock:
+            if self._positions is None:
+                self._positions = self._overlay(
+                    {p["id"]: p for p in self.data_locker.read_positions()}, self._position_updates
+                )
+            return list(self._positions.values())
+
+    def position(self, position_id: str) -> Optional[dict]:
+        with self._lock:
+            self.positions()
+            return self._positions.get(position_id)
+
+    def alerts(self) -> List[dict]:
+        with self._lock:
+            if self._alerts is None:
+                self._alerts = self._overlay(
+                    {a["id"]: a for a in self.data_locker.get_alerts()}, self._alert_updates
+                )
+            return list(self._alerts.values())
+
+    def alert(self, alert_id: str) -> Optional[dict]:
+        with self._lock:
+            self.alerts()
+            return self._alerts.get(alert_id)
+
+    @staticmethod
+    def _overlay(rows: Dict[str, dict], updates: Dict[str, dict]) -> Dict[str, dict]:
+        # Buffered updates survive a reload.
+        for row_id, fields in updates.items():
+            if row_id in rows:
+                rows[row_id].update(fields)
+        return rows
+
+    def invalidate_prices(self):
+        with self._lock:
+            self._prices = None
+
+    def invalidate_positions(self):
+        with self._lock:
+            self._positions = None
+
+    def invalidate_alerts(self):
+        with self._lock:
+            self._alerts = None
+
+    # ----------------------------------------------------------------
+    # Buffered writes
+    # ----------------------------------------------------------------
+
+    @staticmethod
+    def _changes(row: dict, fields: dict) -> bool:
+        return any(row.get(key) != value for key, value in fields.items())
+
+    def update_position(self, position_id: str, fields: dict) -> int:
+        """Applies fields to the in-memory position; written back by flush()."""
+        with self._lock:
+            position = self.position(position_id)
+            if position is None:
+                return 0
+            changed = self._changes(position, fields)
+            position.update(fields)
+            self._position_updates.setdefault(position_id, {}).update(fields)
+        if changed:
+            change_bus.publish(change_bus.POSITIONS, {position_id})
+        return 1
+
+    def update_alert(self, alert_id: str, fields: dict) -> int:
+        """Applies fields to the in-memory alert; written back by flush()."""
+        with self._lock:
+            alert = self.alert(alert_id)
+            if alert is None:
+                # Possibly created through the real DataLocker earlier in the cycle.
+                self.invalidate_alerts()
+                alert = self.alert(alert_id)
+            if alert is None:
+                return 0
+            changed = self._changes(alert, fields)
+            alert.update(fields)
+            self._alert_updates.setdefault(alert_id, {}).update(fields)
+        if changed:
+            change_bus.publish(change_bus.ALERTS, {alert_id})
+        return 1
+
+    def pending_writes(self) -> int:
+        with self._lock:
+            return len(self._position_updates) + len(self._alert_updates)
+
+    def flush(self) -> int:
+        """Writes every buffered update in one transaction; returns the number of rows touched."""
+        with self._lock:
+            position_updates, self._position_updates = self._position_updates, {}
+            alert_updates, self._alert_updates = self._alert_updates, {}
+        if not position_updates and not alert_updates:
+            return 0
+        dl = self.data_locker
+        try:
+            # Events for these rows went out when they were buffered.
+            with change_bus.suppressed(), dl.batch():
+                for position_id, fields in position_updates.items():
+                    dl.update_position_fields(position_id, fields)
+                for alert_id, fields in alert_updates.items():
+                    dl.update_alert_conditions(alert_id, fields)
+        except Exception:
+            # Keep the updates so a retry (or the next flush) can write them.
+            with self._lock:
+                for position_id, fields in position_updates.items():
+                    self._position_updates.setdefault(position_id, {}).update(fields)
+                for alert_id, fields in alert_updates.items():
+                    self._alert_updates.setdefault(alert_id, {}).update(fields)
+            raise
+        count = len(position_updates) + len(alert_updates)
+        logger.debug(f"Cycle context flushed {count} row update(s).")
+        return count
+
+
+class CycleDataView:
+    """
+    DataLocker stand-in backed by a CycleContext. Only the reads and field
+    updates the cycle's helpers use are served from the context; any other
+    attribute goes to the real DataLocker.
+    """
+
+    def __init__(self, context: CycleContext):
+        self._context = context
+
+    def __getattr__(self, name):
+        return getattr(self._context.data_locker, name)
+
+    # Positions
+    def get_positions(self, include_closed: bool = False) -> List[dict]:
+        if include_closed:
+            return self._context.data_locker.get_positions(include_closed=True)
+        return [dict(p) for p in self._context.positions()]
+
+    def read_positions(self) -> List[dict]:
+        return self.get_positions()
+
+    def read_positions_raw(self) -> List[dict]:
+        return self.get_positions()
+
+    def update_position_fields(self, position_id: str, update_fields: dict) -> int:
+        return self._context.update_position(position_id, update_fields)
+
+    # Alerts
+    def get_alerts(self) -> List[dict]:
+        return [dict(a) for a in self._context.alerts()]
+
+    def get_alert(self, alert_id: str) -> Optional[dict]:
+        alert = self._context.alert(alert_id)
+        return dict(alert) if alert is not None else None
+
+    def update_alert_conditions(self, alert_id: str, update_fields: dict) -> int:
+        return self._context.update_alert(alert_id, update_fields)
+
+    # Prices
+    def get_latest_price(self, asset_type: str) -> Optional[dict]:
+        price = self._context.prices().get(asset_type)
+        return dict(price) if price is not None else None
+
+    def get_latest_prices(self, assets: Optional[Iterable[str]] = None) -> Dict[str, dict]:
+        prices = self._context.prices()
+        if assets is not None:
+            prices = {a: prices[a] for a in assets if a in prices}
+        return {asset: dict(row) for asset, row in prices.items()}
+
+    # Writes are buffered by the context, so a batch has nothing to group.
+    def batch(self):
+        return nullcontext(self)
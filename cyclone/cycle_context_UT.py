@@ -0,0 +1,97 @@
+import os
+import tempfile
+import unittest
+
+from alerts.alert_evaluator import AlertEvaluator
+from cyclone.cycle_context import CycleContext
+from data import change_bus
+from data.data_locker import DataLocker
+from data.query_stats import QueryStats, track
+
+
+class TestCycleContext(unittest.TestCase):
+    def setUp(self):
+        DataLocker._instance = None
+        self.dl = DataLocker(":memory:")
+        self.dl.create_position({"id": "p1", "asset_type": "BTC", "heat_index": 1.0})
+        self.dl.insert_or_update_price("BTC", 100.0, "Test")
+        self.dl._execute_write(
+            "INSERT INTO alerts (id, alert_type, position_reference_id, evaluated_value) VALUES ('a1', 'Profit', 'p1', 0)"
+        )
+        self.ctx = CycleContext(self.dl)
+
+    def tearDown(self):
+        self.dl.close()
+        DataLocker._instance = None
+
+    def test_reads_hit_the_database_once(self):
+        stats = QueryStats()
+        with track(stats):
+            for _ in range(3):
+                self.ctx.locker.read_positions()
+                self.ctx.locker.get_alerts()
+                self.ctx.locker.get_latest_price("BTC")
+        self.assertEqual(stats.as_dict()["queries"], 3)
+
+    def test_updates_are_buffered_until_flush(self):
+        self.ctx.locker.update_position_fields("p1", {"heat_index": 9.0})
+        self.ctx.locker.update_alert_conditions("a1", {"evaluated_value": 5.0})
+
+        # Visible to later steps, not yet in the database.
+        self.assertEqual(self.ctx.position("p1")["heat_index"], 9.0)
+        self.assertEqual(self.dl.get_positions()[0]["heat_index"], 1.0)
+
+        self.assertEqual(self.ctx.flush(), 2)
+        self.assertEqual(self.dl.get_positions()[0]["heat_index"], 9.0)
+        self.assertEqual(self.dl.get_alert("a1")["evaluated_value"], 5.0)
+        self.assertEqual(self.ctx.flush(), 0)
+
+    def test_buffered_updates_survive_invalidation(self):
+        self.ctx.update_position("p1", {"heat_index": 7.0})
+        self.ctx.invalidate_positions()
+        self.assertEqual(self.ctx.position("p1")["heat_index"], 7.0)
+
+    def test_view_returns_copies(self):
+        self.ctx.locker.read_positions()[0]["heat_index"] = 42.0
+        self.assertEqual(self.ctx.position("p1")["heat_index"], 1.0)
+
+    def test_changed_updates_publish_once(self):
+        events = []
+        record = lambda topic, keys: events.append((topic, keys))
+        change_bus.subscribe(record)
+        try:
+            self.ctx.update_position("p1", {"heat_index": 1.0})  # unchanged
+            self.ctx.update_position("p1", {"heat_index": 3.0})
+            self.ctx.flush()
+        finally:
+            change_bus.unsubscribe(record)
+        self.assertEqual(events, [(change_bus.POSITIONS, {"p1"})])
+
+    def test_alert_created_mid_cycle_is_buffered(self):
+        self.ctx.alerts()
+        self.dl._execute_write("INSERT INTO alerts (id, alert_type, evaluated_value) VALUES ('a2', 'HeatIndex', 0)")
+        self.assertEqual(self.ctx.locker.update_alert_conditions("a2", {"evaluated_value": 3.0}), 1)
+        self.ctx.flush()
+        self.assertEqual(self.dl.get_alert("a2")["evaluated_value"], 3.0)
+
+    def test_evaluator_writes_go_through_the_context(self):
+        self.dl.update_position_fields("p1", {"alert_reference_id": "a1", "entry_price": 120.0,
+                                              "liquidation_price": 50.0, "position_type": "LONG"})
+        evaluator = AlertEvaluator({}, self.dl, None)
+        cwd = os.getcwd()
+        with tempfile.TemporaryDirectory() as tmp:
+            os.chdir(tmp)  # the travel check writes debug files to the working directory
+            try:
+                level, travel = evaluator.evaluate_travel_alert(self.ctx.position("p1"), self.ctx.locker)
+            finally:
+                os.chdir(cwd)
+
+        self.assertEqual(self.dl.get_alert("a1")["level"], None)
+        self.assertEqual(self.ctx.alert("a1")["level"], level)
+        self.ctx.flush()
+        self.assertEqual(self.dl.get_alert("a1")["level"], level)
+        self.assertAlmostEqual(self.dl.get_positions()[0]["travel_percent"], travel)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,139 @@
+#!/usr/bin/env python
+"""
+cycle_profile.py
+Description:
+    Persists the per-step metrics returned by CycleScheduler.run() into the
+    'cycle_metrics' table and rolls them up into p50/p95/p99 per step, so the
+    slowest parts of the 60s Cyclone budget can be seen over the last N cycles.
+
+    Each cycle stores one row per step plus a CYCLE_STEP row for the whole
+    cycle (wall time, summed CPU/query/row counts).
+Usage:
+    record_cycle(data_locker, summary)       # after Cyclone.run_cycle
+    load_profile(data_locker, last_n_cycles=50)
+"""
+
+import logging
+import math
+from typing import Dict, List, Optional
+from uuid import uuid4
+
+from data.data_locker import DataLocker
+
+logger = logging.getLogger("Cyclone")
+
+# Step name used for the whole-cycle row.
+CYCLE_STEP = "(cycle)"
+
+DEFAULT_KEEP_CYCLES = 2000
+DEFAULT_PROFILE_CYCLES = 50
+
+
+def percentile(values: List[float], pct: float) -> Optional[float]:
+    """Linear-interpolated percentile (pct in 0..100); None for no values."""
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = (len(ordered) - 1) * pct / 100.0
+    lower = math.floor(rank)
+    upper = math.ceil(rank)
+    if lower == upper:
+        return ordered[lower]
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (rank - lower)
+
+
+def metrics_rows(summary: dict, cycle_id: Optional[str] = None) -> List[dict]:
+    """Converts a CycleScheduler summary into cycle_metrics rows (times in ms)."""
+    cycle_id = cycle_id or str(uuid4())
+    critical = set(summary.get("critical_path", []))
+    rows = []
+    totals = {"cpu_ms": 0.0, "queries": 0, "rows_read": 0, "rows_written": 0}
+    failed = False
+    for step, m in summary.get("steps", {}).items():
+        row = {
+            "cycle_id": cycle_id,
+            "step": step,
+            "started_at": m.get("started_at"),
+            "wall_ms": m.get("wall_time", 0.0) * 1000,
+            "cpu_ms": m.get("cpu_time", 0.0) * 1000,
+            "queries": m.get("queries", 0),
+            "rows_read": m.get("rows_read", 0),
+            "rows_written": m.get("rows_written", 0),
+            "status": m.get("status", "ok"),
+            "on_critical_path": 1 if step in critical else 0,
+        }
+        for key in totals:
+            totals[key] += row[key]
+        failed = failed or row["status"] != "ok"
+        rows.append(row)
+
+    rows.append({
+        "cycle_id": cycle_id,
+        "step": CYCLE_STEP,
+        "started_at": summary.get("started_at"),
+        "wall_ms": summary.get("wall_time", 0.0) * 1000,
+        "status": "error" if failed else "ok",
+        "on_critical_path": 0,
+        **totals,
+    })
+    return rows
+
+
+def record_cycle(data_locker: DataLocker, summary: dict,
+                 keep_cycles: Optional[int] = DEFAULT_KEEP_CYCLES) -> str:
+    """Stores a cycle's metrics, trims old cycles and returns the new cycle_id."""
+    cycle_id = str(uuid4())
+    data_locker.record_cycle_metrics(metrics_rows(summary, cycle_id))
+    if keep_cycles:
+        data_locker.prune_cycle_metrics(keep_cycles)
+    return cycle_id
+
+
+def step_rollups(rows: List[dict]) -> List[dict]:
+    """
+    Groups cycle_metrics rows by step and returns one rollup per step, slowest
+    p95 first: runs, p50/p95/p99/max wall ms, average CPU ms / queries / rows,
+    error count and how often the step was on the critical path.
+    """
+    by_step: Dict[str, List[dict]] = {}
+    for row in rows:
+        by_step.setdefault(row["step"], []).append(row)
+
+    rollups = []
+    for step, step_rows in by_step.items():
+        walls = [r["wall_ms"] or 0.0 for r in step_rows]
+        runs = len(step_rows)
+        rollups.append({
+            "step": step,
+            "runs": runs,
+            "p50_ms": percentile(walls, 50),
+            "p95_ms": percentile(walls, 95),
+            "p99_ms": percentile(walls, 99),
+            "max_ms": max(walls),
+            "avg_cpu_ms": sum(r["cpu_ms"] or 0.0 for r in step_rows) / runs,
+            "avg_queries": sum(r["queries"] or 0 for r in step_rows) / runs,
+            "avg_rows_read": sum(r["rows_read"] or 0 for r in step_rows) / runs,
+            "avg_rows_written": sum(r["rows_written"] or 0 for r in step_rows) / runs,
+            "errors": sum(1 for r in step_rows if r["status"] != "ok"),
+            "critical_share": sum(r["on_critical_path"] or 0 for r in step_rows) / runs,
+        })
+    rollups.sort(key=lambda r: r["p95_ms"], reverse=True)
+    return rollups
+
+
+def load_profile(data_locker: DataLocker, last_n_cycles: int = DEFAULT_PROFILE_CYCLES) -> dict:
+    """
+    Profile over the last N cycles:
+    {"cycles", "cycle" (whole-cycle rollup or None), "steps" (per-step rollups),
+     "recent" (whole-cycle rows, newest first)}.
+    """
+    rows = data_locker.get_cycle_metrics(last_n_cycles)
+    cycle_rows = [r for r in rows if r["step"] == CYCLE_STEP]
+    step_rows = [r for r in rows if r["step"] != CYCLE_STEP]
+    cycle_rollup = step_rollups(cycle_rows)
+    return {
+        "cycles": len(cycle_rows),
+        "cycle": cycle_rollup[0] if cycle_rollup else None,
+        "steps": step_rollups(step_rows),
+        "recent": cycle_rows,
+    }
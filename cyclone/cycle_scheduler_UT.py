@@ -0,0 +1,124 @@
+import asyncio
+import unittest
+
+from cyclone.cycle_scheduler import CycleStep, CycleScheduler
+from cyclone.cycle_profile import CYCLE_STEP, metrics_rows, percentile, step_rollups
+from data.query_stats import record_statement
+
+
+class TestCycleScheduler(unittest.TestCase):
+    def _make_steps(self, events):
+        def step(name, delay):
+            async def _run():
+                events.append(("start", name))
+                await asyncio.sleep(delay)
+                events.append(("end", name))
+            return _run
+
+        return {
+            "market": CycleStep("market", step("market", 0.05), outputs={"prices"}),
+            "position": CycleStep("position", step("position", 0.05), outputs={"positions"}),
+            "enrich": CycleStep("enrich", step("enrich", 0.01),
+                                inputs={"prices", "positions"}, outputs={"positions"}),
+            "system": CycleStep("system", step("system", 0.0), outputs={"system"}),
+        }
+
+    def test_graph_respects_declared_dependencies(self):
+        scheduler = CycleScheduler(self._make_steps([]))
+        graph = scheduler.build_graph(["market", "position", "enrich", "system"])
+        self.assertEqual(graph["position"], [])
+        self.assertEqual(sorted(graph["enrich"]), ["market", "position"])
+        self.assertEqual(graph["system"], [])
+
+    def test_independent_steps_overlap_and_dependents_wait(self):
+        events = []
+        scheduler = CycleScheduler(self._make_steps(events))
+        summary = asyncio.run(scheduler.run(["market", "position", "enrich"]))
+
+        # market and position both start before either finishes.
+        self.assertEqual({e for e in events[:2]}, {("start", "market"), ("start", "position")})
+        self.assertLess(events.index(("end", "market")), events.index(("start", "enrich")))
+        self.assertLess(events.index(("end", "position")), events.index(("start", "enrich")))
+        self.assertEqual(summary["critical_path"][-1], "enrich")
+        self.assertEqual(len(summary["critical_path"]), 2)
+        self.assertLess(summary["wall_time"], 0.1 + 0.05)
+
+    def test_failing_step_does_not_block_dependents(self):
+        ran = []
+
+        async def boom():
+            raise RuntimeError("boom")
+
+        async def after():
+            ran.append("after")
+
+        scheduler = CycleScheduler({
+            "a": CycleStep("a", boom, outputs={"x"}),
+            "b": CycleStep("b", after, inputs={"x"}),
+        })
+        summary = asyncio.run(scheduler.run(["a", "b", "missing"]))
+        self.assertEqual(ran, ["after"])
+        self.assertEqual(summary["steps"]["a"]["status"], "error")
+        self.assertEqual(summary["steps"]["b"]["status"], "ok")
+
+    def test_step_metrics_are_attributed_per_step(self):
+        def step(queries, delay):
+            async def _run():
+                for _ in range(queries):
+                    record_statement("SELECT 1")
+                    await asyncio.sleep(delay)
+            return _run
+
+        scheduler = CycleScheduler({
+            "a": CycleStep("a", step(3, 0.01), outputs={"x"}),
+            "b": CycleStep("b", step(5, 0.0), outputs={"y"}),
+        })
+        summary = asyncio.run(scheduler.run(["a", "b"]))
+        # a and b overlap, but each only sees its own statements.
+        self.assertEqual(summary["steps"]["a"]["queries"], 3)
+        self.assertEqual(summary["steps"]["b"]["queries"], 5)
+
+        rows = metrics_rows(summary, "cycle-1")
+        total = [r for r in rows if r["step"] == CYCLE_STEP][0]
+        self.assertEqual(total["queries"], 8)
+        self.assertEqual(len(rows), 3)
+
+
+    def test_context_is_passed_to_every_step(self):
+        seen = []
+
+        def step(name):
+            async def _run(ctx):
+                seen.append((name, ctx))
+            return _run
+
+        context = object()
+        scheduler = CycleScheduler({
+            "a": CycleStep("a", step("a"), outputs={"x"}),
+            "b": CycleStep("b", step("b"), inputs={"x"}),
+        })
+        asyncio.run(scheduler.run(["a", "b"], context=context))
+        self.assertEqual(seen, [("a", context), ("b", context)])
+
+
+class TestCycleProfile(unittest.TestCase):
+    def test_percentile_interpolates(self):
+        self.assertEqual(percentile([10, 20, 30, 40, 50], 50), 30)
+        self.assertAlmostEqual(percentile([10, 20], 95), 19.5)
+        self.assertIsNone(percentile([], 50))
+
+    def test_rollups_sorted_by_p95(self):
+        rows = []
+        for wall in (100, 200, 300):
+            rows.append({"step": "fast", "wall_ms": wall / 10, "cpu_ms": 1, "queries": 1, "rows_read": 1,
+                         "rows_written": 0, "status": "ok", "on_critical_path": 0})
+            rows.append({"step": "slow", "wall_ms": wall, "cpu_ms": 5, "queries": 4, "rows_read": 20,
+                         "rows_written": 2, "status": "ok", "on_critical_path": 1})
+        rollups = step_rollups(rows)
+        self.assertEqual([r["step"] for r in rollups], ["slow", "fast"])
+        self.assertEqual(rollups[0]["p50_ms"], 200)
+        self.assertEqual(rollups[0]["critical_share"], 1.0)
+
+
+if __name__ == "__main__":
+    unittest.main()
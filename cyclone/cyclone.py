@@ -2,13 +2,19 @@ import asyncio
 import logging
 import sys
 import os
+from typing import Optional
 
 from monitor.price_monitor import PriceMonitor
 from alerts.alert_manager import AlertManager
 from data.data_locker import DataLocker
+from data.async_data_locker import AsyncDataLocker
+from cyclone.cycle_scheduler import CycleStep, CycleScheduler
+from cyclone.cycle_profile import record_cycle, DEFAULT_KEEP_CYCLES
+from cyclone.cycle_context import CycleContext
 from utils.unified_logger import UnifiedLogger
 from sonic_labs.hedge_manager import HedgeManager  # Import HedgeManager directly
 from positions.position_service import PositionService
+from positions import jupiter_fetcher
 from alerts.alert_controller import AlertController
 from config.unified_config_manager import UnifiedConfigManager
 from config.config_constants import CONFIG_PATH
@@ -24,15 +30,22 @@ class Cyclone:
 
         # Initialize core components
         self.data_locker = DataLocker.get_instance()
+        # Blocking DB/service calls from the async steps run on this bounded executor.
+        self.async_locker = AsyncDataLocker.get_instance(self.data_locker)
         self.price_monitor = PriceMonitor()  # Market Updates
         self.alert_manager = AlertManager()    # Alert Updates
         self.config = UnifiedConfigManager(CONFIG_PATH).load_config()
+        # "differential" (default): positions are upserted and alerts follow the deltas.
+        # "rebuild": the old clear-everything-and-recreate cycle.
+        self.sync_mode = self.config.get("cyclone", {}).get("sync_mode", "differential")
         # self.alert_evaluator = AlertEvaluator(self.config, self.data_locker)
 
-    async def run_market_updates(self):
+    async def run_market_updates(self, ctx: Optional[CycleContext] = None):
         self.logger.info("Starting Market Updates")
         try:
             await self.price_monitor.update_prices(source="Market Updates")
+            if ctx:
+                ctx.invalidate_prices()
             self.u_logger.log_cyclone(
                 operation_type="Market Updates",
                 primary_text="Prices updated successfully",
@@ -48,11 +61,45 @@ class Cyclone:
                 file="cyclone.py"
             )
 
-    async def run_position_updates(self):
+    async def run_price_compaction(self, ctx: Optional[CycleContext] = None):
+        self.logger.info("Starting Price Compaction")
+        try:
+            from prices.price_compactor import PriceCompactor, DEFAULT_RAW_RETENTION_HOURS
+            settings = self.config.get("price_compaction", {})
+            compactor = PriceCompactor(
+                self.data_locker,
+                raw_retention_hours=settings.get("raw_retention_hours", DEFAULT_RAW_RETENTION_HOURS),
+                bar_retention_hours=settings.get("bar_retention_hours")
+            )
+            summary = await self.async_locker.run(compactor.compact)
+            self.u_logger.log_cyclone(
+                operation_type="Price Compaction",
+                primary_text=f"Compacted {summary['compacted']} rows, pruned {summary['pruned_raw']} raw rows",
+                source="Cyclone",
+                file="cyclone.py"
+            )
+        except Exception as e:
+            self.logger.error(f"Price Compaction failed: {e}", exc_info=True)
+            self.u_logger.log_cyclone(
+                operation_type="Price Compaction",
+                primary_text=f"Failed: {e}",
+                source="Cyclone",
+                file="cyclone.py"
+            )
+
+    async def run_position_updates(self, ctx: Optional[CycleContext] = None):
         self.logger.info("Starting Position Updates")
         try:
-            # Fetch and persist positions via your PositionService
-            result = PositionService.update_jupiter_positions()
+            # Wallets are fetched concurrently on the loop; DB work runs on the async_locker executor.
+            jupiter_cfg = self.config.get("jupiter", {})
+            result = await PositionService.update_jupiter_positions_async(
+                base_url=jupiter_cfg.get("base_url", jupiter_fetcher.JUPITER_BASE_URL),
+                timeout=jupiter_cfg.get("timeout_seconds", jupiter_fetcher.DEFAULT_TIMEOUT_SECONDS),
+                max_concurrency=jupiter_cfg.get("max_concurrency", jupiter_fetcher.DEFAULT_MAX_CONCURRENCY)
+            )
+            if ctx:
+                ctx.position_delta = None if "error" in result else result
+                ctx.invalidate_positions()
 
             # Cyclone unified log
             self.u_logger.log_cyclone(
@@ -99,47 +146,7 @@ class Cyclone:
             ledger.write("position_ledger.json", entry)
 
 
-    async def run_enrich_positions(self):
-        self.logger.info("Starting Position Enrichment")
-        try:
-            enriched_positions = PositionService.get_all_positions()
-            count = len(enriched_positions)
-            self.u_logger.log_cyclone(
-                operation_type="Position Enrichment",
-                primary_text=f"Enriched {count} positions",
-                source="Cyclone",
-                file="cyclone.py"
-            )
-            print(f"Enriched {count} positions.")
-        except Exception as e:
-            self.logger.error(f"Position Enrichment failed: {e}")
-            self.u_logger.log_cyclone(
-                operation_type="Position Enrichment",
-                primary_text=f"Failed: {e}",
-                source="Cyclone",
-                file="cyclone.py"
-            )
-        self.logger.info("Starting Position Data Enrichment")
-        try:
-            enriched_positions = PositionService.get_all_positions()
-            count = len(enriched_positions)
-            self.u_logger.log_cyclone(
-                operation_type="Position Enrichment",
-                primary_text=f"Enriched {count} positions",
-                source="Cyclone",
-                file="cyclone.py"
-            )
-            print(f"Enriched {count} positions.")
-        except Exception as e:
-            self.logger.error(f"Position Data Enrichment failed: {e}")
-            self.u_logger.log_cyclone(
-                operation_type="Position Enrichment",
-                primary_text=f"Failed: {e}",
-                source="Cyclone",
-                file="cyclone.py"
-            )
-
-    async def run_create_market_alerts(self):
+    async def run_create_market_alerts(self, ctx: Optional[CycleContext] = None):
         self.logger.info("Creating Market Alerts via AlertController")
         try:
             ac = AlertController()
@@ -190,7 +197,13 @@ class Cyclone:
                     }
 
             dummy_alert = DummyPriceAlert()
-            if ac.create_alert(dummy_alert):
+            if self.sync_mode != "rebuild" and await self.async_locker.has_market_alert(
+                    dummy_alert.asset_type, dummy_alert.alert_type):
+                self.logger.debug("Market alert already exists; nothing to create.")
+                return
+            if await self.async_locker.run(ac.create_alert, dummy_alert):
+                if ctx:
+                    ctx.invalidate_alerts()
                 self.u_logger.log_cyclone(
                     operation_type="Create Market Alerts",
                     primary_text="Market alert created successfully via AlertController",
@@ -211,13 +224,15 @@ class Cyclone:
             print(f"Error creating market alerts: {e}")
         return
 
-    async def run_update_hedges(self):
+    async def run_update_hedges(self, ctx: Optional[CycleContext] = None):
         self.logger.info("Starting Hedge Update")
         try:
-            hedge_groups = HedgeManager.find_hedges()
+            locker = ctx.locker if ctx else None
+            hedge_groups = await self.async_locker.run(HedgeManager.find_hedges, data_locker=locker)
             self.logger.info(f"Found {len(hedge_groups)} hedge group(s) using find_hedges.")
 
-            positions = [dict(pos) for pos in self.data_locker.read_positions()]
+            positions = ctx.locker.read_positions() if ctx else await self.async_locker.read_positions()
+            positions = [dict(pos) for pos in positions]
             hedge_manager = HedgeManager(positions)
             hedges = hedge_manager.get_hedges()
             self.logger.info(f"Built {len(hedges)} hedge(s) using HedgeManager instance.")
@@ -245,11 +260,7 @@ class Cyclone:
         Synchronous helper to clear all alert records.
         """
         try:
-            conn = self.data_locker.get_db_connection()
-            cursor = conn.cursor()
-            cursor.execute("DELETE FROM alerts")
-            conn.commit()
-            cursor.close()
+            self.data_locker.clear_alerts()
             self.logger.info("Cleared alert records successfully.")
             print("Cleared alert records successfully.")
         except Exception as e:
@@ -265,12 +276,7 @@ class Cyclone:
 
     def clear_prices_backend(self):
         try:
-            dl = DataLocker.get_instance()
-            cursor = dl.conn.cursor()
-            cursor.execute("DELETE FROM prices")
-            dl.conn.commit()
-            deleted = cursor.rowcount
-            cursor.close()
+            deleted = DataLocker.get_instance().clear_prices()
             self.u_logger.log_cyclone(
                 operation_type="Clear Prices",
                 primary_text=f"Cleared {deleted} price record(s)",
@@ -283,12 +289,7 @@ class Cyclone:
 
     def clear_positions_backend(self):
         try:
-            dl = DataLocker.get_instance()
-            cursor = dl.conn.cursor()
-            cursor.execute("DELETE FROM positions")
-            dl.conn.commit()
-            deleted = cursor.rowcount
-            cursor.close()
+            deleted = DataLocker.get_instance().delete_all_positions()
             self.u_logger.log_cyclone(
                 operation_type="Clear Positions",
                 primary_text=f"Cleared {deleted} position record(s)",
@@ -307,14 +308,18 @@ class Cyclone:
         self.clear_prices_backend()
         self.clear_positions_backend()
 
-    async def run_clear_all_data(self):
+    async def run_clear_all_data(self, ctx: Optional[CycleContext] = None):
         """
         Async method to clear all data in a non-interactive way.
         """
         self.logger.info("Starting Clear All Data (non-interactive)")
         try:
             # Run the synchronous _clear_all_data_core in a thread.
-            await asyncio.to_thread(self._clear_all_data_core)
+            await self.async_locker.run(self._clear_all_data_core)
+            if ctx:
+                ctx.invalidate_prices()
+                ctx.invalidate_positions()
+                ctx.invalidate_alerts()
             self.u_logger.log_cyclone(
                 operation_type="Clear All Data",
                 primary_text="All alerts, prices, and positions have been deleted.",
@@ -353,10 +358,13 @@ class Cyclone:
         except Exception as e:
             print(f"Error deleting data: {e}")
 
-    async def run_cleanse_ids(self):
+    async def run_cleanse_ids(self, ctx: Optional[CycleContext] = None):
         self.logger.info("Running cleanse_ids step: clearing stale IDs.")
         try:
-            self.alert_manager.clear_stale_alerts()
+            await self.async_locker.run(self.alert_manager.clear_stale_alerts)
+            if ctx:
+                ctx.invalidate_positions()
+                ctx.invalidate_alerts()
             self.u_logger.log_cyclone(
                 operation_type="Clear IDs",
                 primary_text="Stale alert, position, and hedge IDs cleared successfully",
@@ -370,31 +378,31 @@ class Cyclone:
 
         # In cyclone.py (Cyclone class)
 
-    async def run_alert_enrichment(self):
+    async def run_alert_enrichment(self, ctx: Optional[CycleContext] = None):
         """
         Async method to enrich all alerts using the shared enrichment routine.
         """
         try:
             from alerts.alert_enrichment import enrich_alert_data
-            alerts = self.data_locker.get_alerts()
-            enriched_alerts = []
-            for alert in alerts:
-                enriched = enrich_alert_data(
-                    alert,
-                    self.data_locker,
-                    self.logger,
-                    self.alert_manager.alert_controller
-                )
-                enriched_alerts.append(enriched)
+            locker = ctx.locker if ctx else self.data_locker
+
+            def _enrich_all():
+                return [
+                    enrich_alert_data(alert, locker, self.logger, self.alert_manager.alert_controller)
+                    for alert in locker.get_alerts()
+                ]
+            enriched_alerts = await self.async_locker.run(_enrich_all)
             self.logger.debug(f"Enriched {len(enriched_alerts)} alerts")
         except Exception as e:
             self.logger.error("Alert Data Enrichment failed: %s", e, exc_info=True)
         return
 
-    async def run_enrich_positions(self):
+    async def run_enrich_positions(self, ctx: Optional[CycleContext] = None):
         self.logger.info("Starting Position Enrichment")
         try:
-            enriched_positions = PositionService.get_all_positions()
+            # With a cycle context, enriched values stay in memory until run_cycle flushes them.
+            locker = ctx.locker if ctx else None
+            enriched_positions = await self.async_locker.run(PositionService.get_all_positions, data_locker=locker)
             count = len(enriched_positions)
             self.u_logger.log_cyclone(
                 operation_type="Position Enrichment",
@@ -412,45 +420,122 @@ class Cyclone:
                 file="cyclone.py"
             )
 
+    # Step orders. Data dependencies between these are declared in
+    # _build_cycle_steps(); independent steps run concurrently.
+    # Differential: positions are upserted/closed in place and alerts are only
+    # created/deleted for positions that appeared/vanished, so a steady-state
+    # cycle writes only deltas.
+    DEFAULT_CYCLE_STEPS = [
+        "market", "compact_prices", "position",
+        "enrich positions", "enrich alerts", "create_market_alerts",
+        "create_position_alerts", "create_system_alerts", "update_evaluated_value",
+        "alert", "system", "link_hedges"
+    ]
+    # Rebuild: wipe prices/positions/alerts and recreate everything each cycle.
+    REBUILD_CYCLE_STEPS = [
+        "clear_all_data", "market", "compact_prices", "position", "cleanse_ids",
+        "enrich positions", "enrich alerts", "create_market_alerts",
+        "create_position_alerts", "create_system_alerts", "update_evaluated_value",
+        "alert", "system", "link_hedges"
+    ]
+
+    def _build_cycle_steps(self):
+        """
+        Every step with the data it reads (inputs) and writes (outputs).
+        The scheduler orders two steps only when these overlap.
+        """
+        return {
+            "clear_all_data": CycleStep("clear_all_data", self.run_clear_all_data,
+                                        outputs={"prices", "positions", "alerts"}),
+            "market": CycleStep("market", self.run_market_updates,
+                                outputs={"prices"}),
+            "compact_prices": CycleStep("compact_prices", self.run_price_compaction,
+                                        inputs={"prices"}, outputs={"price_bars"}),
+            "position": CycleStep("position", self.run_position_updates,
+                                  outputs={"positions", "hedges"}),
+            "cleanse_ids": CycleStep("cleanse_ids", self.run_cleanse_ids,
+                                     inputs={"positions", "alerts"}, outputs={"positions", "alerts", "hedges"}),
+            "link_hedges": CycleStep("link_hedges", self.run_link_hedges,
+                                     inputs={"positions"}, outputs={"hedges"}),
+            "enrich positions": CycleStep("enrich positions", self.run_enrich_positions,
+                                          inputs={"positions", "prices"}, outputs={"positions"}),
+            "enrich alerts": CycleStep("enrich alerts", self.run_alert_enrichment,
+                                       inputs={"alerts", "positions", "prices"}, outputs={"alerts"}),
+            "create_market_alerts": CycleStep("create_market_alerts", self.run_create_market_alerts,
+                                              outputs={"alerts"}),
+            "create_position_alerts": CycleStep("create_position_alerts", self.run_create_position_alerts,
+                                                inputs={"positions"}, outputs={"alerts"}),
+            "create_system_alerts": CycleStep("create_system_alerts", self.run_create_system_alerts,
+                                              outputs={"alerts"}),
+            "update_evaluated_value": CycleStep("update_evaluated_value", self.run_update_evaluated_value,
+                                                inputs={"alerts", "positions", "prices"}, outputs={"alerts"}),
+            "alert": CycleStep("alert", self.run_alert_updates,
+                               inputs={"alerts", "positions", "prices"}, outputs={"alerts", "notifications"}),
+            "system": CycleStep("system", self.run_system_updates,
+                                outputs={"system"}),
+        }
+
     async def run_cycle(self, steps=None):
         """
         Master run_cycle method to run various steps.
-        New default ordering includes "enrich alerts" and renames the position enrichment step.
+        Steps run as a dependency graph: a step waits only for earlier steps whose
+        declared outputs it reads/writes (or whose inputs it writes). Returns the
+        scheduler summary, including the critical path for the cycle.
+        Per-step wall/CPU time and DB counts are stored in 'cycle_metrics'
+        (see /cyclone/profile). Each step receives the cycle's CycleContext.
         """
-        available_steps = {
-            "clear_all_data": self.run_clear_all_data,
-            "market": self.run_market_updates,
-            "position": self.run_position_updates,
-            "cleanse_ids": self.run_cleanse_ids,
-            "link_hedges": self.run_link_hedges,
-            "enrich positions": self.run_enrich_positions,  # Renamed step for positions
-            "enrich alerts": self.run_alert_enrichment,  # New step for alert enrichment
-            "create_market_alerts": self.run_create_market_alerts,
-            "create_position_alerts": self.run_create_position_alerts,
-            "create_system_alerts": self.run_create_system_alerts,
-            "update_evaluated_value": self.run_update_evaluated_value,
-            "alert": self.run_alert_updates,
-            "system": self.run_system_updates
-        }
-        if steps:
-            for step in steps:
-                if step in available_steps:
-                    await available_steps[step]()
-                else:
-                    self.logger.warning(f"Unknown step requested: {step}")
-        else:
-            for step in [
-                "clear_all_data", "market", "position", "cleanse_ids",
-                "enrich positions", "enrich alerts", "create_market_alerts",
-                "create_position_alerts", "create_system_alerts", "update_evaluated_value",
-                "alert", "system", "link_hedges"
-            ]:
-                await available_steps[step]()
-
-    async def run_link_hedges(self):
+        if not steps:
+            steps = self.REBUILD_CYCLE_STEPS if self.sync_mode == "rebuild" else self.DEFAULT_CYCLE_STEPS
+        # Prices, positions and alerts are read once into the context and shared by
+        # every step; field updates are written back in one transaction after the steps.
+        ctx = CycleContext(self.data_locker)
+        scheduler = CycleScheduler(self._build_cycle_steps())
+        summary = await scheduler.run(list(steps), context=ctx)
+        try:
+            written = await self.async_locker.run(ctx.flush)
+            self.logger.info(f"Cycle context wrote back {written} row update(s).")
+        except Exception as e:
+            self.logger.error(f"Writing back cycle context failed: {e}", exc_info=True)
+
+        critical_path = " -> ".join(summary["critical_path"]) or "none"
+        self.logger.info(
+            f"Cycle finished in {summary['wall_time']:.2f}s; "
+            f"critical path {summary['critical_path_time']:.2f}s: {critical_path}"
+        )
+        self.u_logger.log_cyclone(
+            operation_type="Cycle Schedule",
+            primary_text=f"Critical path {summary['critical_path_time']:.2f}s "
+                         f"of {summary['wall_time']:.2f}s wall ({critical_path})",
+            source="Cyclone",
+            file="cyclone.py"
+        )
+
+        pool_stats = self.data_locker.get_pool_stats()
+        self.logger.info(
+            f"DB writer contention: {pool_stats['write_waits']} waits, "
+            f"{pool_stats['write_wait_total_ms']:.1f} ms total, "
+            f"{pool_stats['write_wait_max_ms']:.1f} ms max"
+        )
+
+        if summary["steps"]:
+            slowest = max(summary["steps"], key=lambda name: summary["steps"][name]["wall_time"])
+            m = summary["steps"][slowest]
+            self.logger.info(
+                f"Slowest step '{slowest}': {m['wall_time']:.2f}s wall, {m['cpu_time']:.2f}s CPU, "
+                f"{m['queries']} queries, {m['rows_read']} rows read, {m['rows_written']} rows written"
+            )
+        try:
+            keep_cycles = self.config.get("cycle_profile", {}).get("keep_cycles", DEFAULT_KEEP_CYCLES)
+            await self.async_locker.run(record_cycle, self.data_locker, summary, keep_cycles)
+        except Exception as e:
+            self.logger.error(f"Recording cycle metrics failed: {e}", exc_info=True)
+        return summary
+
+    async def run_link_hedges(self, ctx: Optional[CycleContext] = None):
         self.logger.info("Starting Link Hedges step")
         try:
-            hedge_groups = HedgeManager.find_hedges()
+            locker = ctx.locker if ctx else None
+            hedge_groups = await self.async_locker.run(HedgeManager.find_hedges, data_locker=locker)
             count = len(hedge_groups)
             msg = f"Linked hedges: {count} hedge group(s) found."
             self.u_logger.log_cyclone(
@@ -469,13 +554,28 @@ class Cyclone:
                 file="cyclone.py"
             )
 
-    async def run_create_position_alerts(self):
+    async def run_create_position_alerts(self, ctx: Optional[CycleContext] = None):
         self.logger.info("Creating Position Alerts using AlertManager linking")
         try:
-            # Call the new method from the AlertController that creates all alerts per position.
-            # This method should return a list of created alert dictionaries.
-            created_alerts = self.alert_manager.alert_controller.create_all_position_alerts()
+            controller = self.alert_manager.alert_controller
+            delta = ctx.position_delta if ctx else None
+            if self.sync_mode != "rebuild" and delta is not None:
+                # Only positions that appeared/vanished in this cycle's sync need work.
+                removed = await self.async_locker.run(controller.delete_alerts_for_positions, delta["vanished"])
+                if removed:
+                    print("Deleted {} alerts for closed positions.".format(removed))
+                position_ids = delta["appeared"]
+            else:
+                # No delta (rebuild mode, or the position step didn't run): check every position.
+                position_ids = None
+            created_alerts = []
+            if position_ids is None or position_ids:
+                created_alerts = await self.async_locker.run(controller.create_all_position_alerts, position_ids)
             count = len(created_alerts) if created_alerts else 0
+            if ctx and (count or (delta and delta["vanished"])):
+                # New alerts (and alert_reference_id links) were written straight to the DB.
+                ctx.invalidate_alerts()
+                ctx.invalidate_positions()
             self.logger.debug("run_create_position_alerts completed. Created {} alerts.".format(count))
             print("Created {} position alerts.".format(count))
         except Exception as e:
@@ -483,17 +583,21 @@ class Cyclone:
             print("Error in run_create_position_alerts: {}".format(e))
 
 
-    async def run_create_system_alerts(self):
+    async def run_create_system_alerts(self, ctx: Optional[CycleContext] = None):
         self.logger.info("Creating System Alerts")
         return
 
-    async def run_update_evaluated_value(self):
+    async def run_update_evaluated_value(self, ctx: Optional[CycleContext] = None):
         self.logger.info("Updating Evaluated Values for Alerts...")
         try:
-            await asyncio.to_thread(self.alert_manager.alert_evaluator.update_alerts_evaluated_value)
+            stats = await self.async_locker.run(
+                self.alert_manager.reevaluate_alerts,
+                ctx.locker if ctx else None
+            )
             self.u_logger.log_cyclone(
                 operation_type="Update Evaluated Value",
-                primary_text="Alert evaluated values updated successfully",
+                primary_text=(f"Alert evaluated values updated: {stats['evaluated']} evaluated, "
+                              f"{stats['skipped']} skipped"),
                 source="Cyclone",
                 file="cyclone.py"
             )
@@ -507,18 +611,21 @@ class Cyclone:
                 file="cyclone.py"
             )
 
-    async def run_alert_updates(self):
+    async def run_alert_updates(self, ctx: Optional[CycleContext] = None):
         self.logger.info("Starting Alert Evaluations")
         try:
-            positions = self.data_locker.read_positions()
-            combined_eval = self.alert_manager.alert_evaluator.evaluate_alerts(positions=positions, market_data={})
+            evaluator = self.alert_manager.alert_evaluator
+            dl = ctx.locker if ctx else None
+            positions = ctx.locker.read_positions() if ctx else await self.async_locker.read_positions()
+            combined_eval = await self.async_locker.run(evaluator.evaluate_alerts, positions=positions,
+                                                        market_data={}, data_locker=dl)
             self.u_logger.log_cyclone(
                 operation_type="Alert Evaluations",
                 primary_text="Combined alert evaluations completed",
                 source="Cyclone",
                 file="cyclone.py"
             )
-            market_alerts = self.alert_manager.alert_evaluator.evaluate_market_alerts(market_data={})
+            market_alerts = await self.async_locker.run(evaluator.evaluate_market_alerts, market_data={})
             for msg in market_alerts:
                 self.u_logger.log_cyclone(
                     operation_type="Market Alert Evaluation",
@@ -526,7 +633,7 @@ class Cyclone:
                     source="Cyclone",
                     file="cyclone.py"
                 )
-            position_alerts = self.alert_manager.alert_evaluator.evaluate_position_alerts(positions)
+            position_alerts = await self.async_locker.run(evaluator.evaluate_position_alerts, positions, dl)
             for msg in position_alerts:
                 self.u_logger.log_cyclone(
                     operation_type="Position Alert Evaluation",
@@ -534,7 +641,7 @@ class Cyclone:
                     source="Cyclone",
                     file="cyclone.py"
                 )
-            system_alerts = self.alert_manager.alert_evaluator.evaluate_system_alerts()
+            system_alerts = await self.async_locker.run(evaluator.evaluate_system_alerts)
             for msg in system_alerts:
                 self.u_logger.log_cyclone(
                     operation_type="System Alert Evaluation",
@@ -551,7 +658,7 @@ class Cyclone:
                 file="cyclone.py"
             )
 
-    async def run_system_updates(self):
+    async def run_system_updates(self, ctx: Optional[CycleContext] = None):
         self.logger.info("Starting System Updates")
         try:
             self.u_logger.log_cyclone(
@@ -706,15 +813,14 @@ class Cyclone:
                 balance = float(balance_str)
             except Exception:
                 balance = 0.0
-            dl = DataLocker.get_instance()
-            cursor = dl.conn.cursor()
-            cursor.execute(
-                "INSERT INTO wallets (name, public_address, private_address, image_path, balance) VALUES (?, ?, ?, ?, ?)",
-                (name, public_address, private_address, image_path, balance)
-            )
-            dl.conn.commit()
-            inserted = cursor.rowcount
-            cursor.close()
+            DataLocker.get_instance().create_wallet({
+                "name": name,
+                "public_address": public_address,
+                "private_address": private_address,
+                "image_path": image_path,
+                "balance": balance,
+            })
+            inserted = 1
             self.u_logger.log_cyclone(
                 operation_type="Add Wallet",
                 primary_text=f"Added wallet '{name}' ({inserted} row inserted)",
@@ -727,12 +833,7 @@ class Cyclone:
 
     def clear_wallets_backend(self):
         try:
-            dl = DataLocker.get_instance()
-            cursor = dl.conn.cursor()
-            cursor.execute("DELETE FROM wallets")
-            dl.conn.commit()
-            deleted = cursor.rowcount
-            cursor.close()
+            deleted = DataLocker.get_instance().clear_wallets()
             self.u_logger.log_cyclone(
                 operation_type="Clear Wallets",
                 primary_text=f"Cleared {deleted} wallet record(s)",
@@ -745,12 +846,7 @@ class Cyclone:
 
     def clear_alert_ledger_backend(self):
         try:
-            dl = DataLocker.get_instance()
-            cursor = dl.conn.cursor()
-            cursor.execute("DELETE FROM alert_ledger")
-            dl.conn.commit()
-            deleted = cursor.rowcount
-            cursor.close()
+            deleted = DataLocker.get_instance().clear_alert_ledger()
             self.u_logger.log_cyclone(
                 operation_type="Clear Alert Ledger",
                 primary_text=f"Cleared {deleted} alert ledger record(s)",
@@ -768,93 +864,11 @@ class Cyclone:
             return
         try:
             from positions.position_service import delete_position_and_cleanup
-            await asyncio.to_thread(delete_position_and_cleanup, position_id)
+            await self.async_locker.run(delete_position_and_cleanup, position_id)
             print(f"Position {position_id} deleted along with associated alerts and hedges.")
         except Exception as e:
             print(f"Error deleting position {position_id}: {e}")
 
-    async def run_update_evaluated_value(self):
-        self.logger.info("Updating Evaluated Values for Alerts...")
-        try:
-            await asyncio.to_thread(self.alert_manager.alert_evaluator.update_alerts_evaluated_value)
-            self.u_logger.log_cyclone(
-                operation_type="Update Evaluated Value",
-                primary_text="Alert evaluated values updated successfully",
-                source="Cyclone",
-                file="cyclone.py"
-            )
-            print("Alert evaluated values updated.")
-        except Exception as e:
-            self.logger.error(f"Updating evaluated values failed: {e}")
-            self.u_logger.log_cyclone(
-                operation_type="Update Evaluated Value",
-                primary_text=f"Failed: {e}",
-                source="Cyclone",
-                file="cyclone.py"
-            )
-
-    async def run_alert_updates(self):
-        self.logger.info("Starting Alert Evaluations")
-        try:
-            positions = self.data_locker.read_positions()
-            combined_eval = self.alert_manager.alert_evaluator.evaluate_alerts(positions=positions, market_data={})
-            self.u_logger.log_cyclone(
-                operation_type="Alert Evaluations",
-                primary_text="Combined alert evaluations completed",
-                source="Cyclone",
-                file="cyclone.py"
-            )
-            market_alerts = self.alert_manager.alert_evaluator.evaluate_market_alerts(market_data={})
-            for msg in market_alerts:
-                self.u_logger.log_cyclone(
-                    operation_type="Market Alert Evaluation",
-                    primary_text=msg,
-                    source="Cyclone",
-                    file="cyclone.py"
-                )
-            position_alerts = self.alert_manager.alert_evaluator.evaluate_position_alerts(positions)
-            for msg in position_alerts:
-                self.u_logger.log_cyclone(
-                    operation_type="Position Alert Evaluation",
-                    primary_text=msg,
-                    source="Cyclone",
-                    file="cyclone.py"
-                )
-            system_alerts = self.alert_manager.alert_evaluator.evaluate_system_alerts()
-            for msg in system_alerts:
-                self.u_logger.log_cyclone(
-                    operation_type="System Alert Evaluation",
-                    primary_text=msg,
-                    source="Cyclone",
-                    file="cyclone.py"
-                )
-        except Exception as e:
-            self.logger.error(f"Alert Evaluations failed: {e}")
-            self.u_logger.log_cyclone(
-                operation_type="Alert Evaluations",
-                primary_text=f"Failed: {e}",
-                source="Cyclone",
-                file="cyclone.py"
-            )
-
-    async def run_system_updates(self):
-        self.logger.info("Starting System Updates")
-        try:
-            self.u_logger.log_cyclone(
-                operation_type="System Updates",
-                primary_text="System state updated",
-                source="Cyclone",
-                file="cyclone.py"
-            )
-        except Exception as e:
-            self.logger.error(f"System Updates failed: {e}")
-            self.u_logger.log_cyclone(
-                operation_type="System Updates",
-                primary_text=f"Failed: {e}",
-                source="Cyclone",
-                file="cyclone.py"
-            )
-
 # The interactive console (menu and navigation) has been moved into a separate helper class.
 # The Cyclone class now focuses solely on processing logic.
 if __name__ == "__main__":
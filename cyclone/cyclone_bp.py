@@ -5,6 +5,7 @@ Description:
     Flask blueprint for the Cyclone dashboard and related routes.
     - The main Cyclone view (cyclone.html).
     - A log polling endpoint for real-time console updates.
+    - The cycle profile (per-step p50/p95/p99 timings) at /cyclone/profile.
     - Routes for the various control actions.
 Usage:
     Import and register this blueprint in your main application, e.g.:
@@ -14,7 +15,7 @@ Usage:
 
 import logging
 import os
-from flask import Blueprint, jsonify, render_template, current_app
+from flask import Blueprint, jsonify, render_template, current_app, request
 from config.config_constants import BASE_DIR
 
 logger = logging.getLogger("CycloneBlueprint")
@@ -26,6 +27,31 @@ cyclone_bp = Blueprint("cyclone", __name__, template_folder=".")
 def cyclone_dashboard():
     return render_template("cyclone.html")
 
+# --- Cycle Profile ---
+from data.data_locker import DataLocker
+from .cycle_profile import load_profile, DEFAULT_PROFILE_CYCLES
+
+@cyclone_bp.route("/cyclone/profile")
+def cyclone_profile():
+    """
+    Slowest Cyclone steps over the last N cycles (?cycles=N).
+    """
+    last_n = request.args.get("cycles", DEFAULT_PROFILE_CYCLES, type=int)
+    profile = load_profile(DataLocker.get_instance(), last_n)
+    return render_template("cyclone_profile.html", profile=profile)
+
+@cyclone_bp.route("/api/cyclone_profile", methods=["GET"])
+def api_cyclone_profile():
+    """
+    JSON version of /cyclone/profile.
+    """
+    try:
+        last_n = request.args.get("cycles", DEFAULT_PROFILE_CYCLES, type=int)
+        return jsonify(load_profile(DataLocker.get_instance(), last_n))
+    except Exception as e:
+        current_app.logger.exception("Error loading cycle profile:", exc_info=True)
+        return jsonify({"error": str(e)}), 500
+
 # --- Full Cycle Update Route ---
 import asyncio
 from .cyclone import Cyclone
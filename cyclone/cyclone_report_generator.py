@@ -57,11 +57,67 @@ def query_update_ledger():
         print(f"Error querying update ledger: {e}")
     return ledger_entries
 
-def generate_cycle_report():
+def query_cycle_profile(last_n_cycles=20):
+    """
+    Per-step timing rollups (p50/p95/p99, slowest first) over the last N cycles
+    from the cycle_metrics table. Returns None if the profile can't be loaded.
+    """
+    try:
+        from data.data_locker import DataLocker
+        from cyclone.cycle_profile import load_profile
+        return load_profile(DataLocker.get_instance(), last_n_cycles)
+    except Exception as e:
+        print(f"Error querying cycle profile: {e}")
+        return None
+
+def build_profile_html(profile, last_n_cycles, top_n=10):
+    """Renders the slowest-steps table for the report."""
+    html = f"<h2>Slowest Steps (last {last_n_cycles} cycles)</h2>\n"
+    if not profile or not profile["steps"]:
+        return html + "<p>No cycle metrics recorded yet.</p>\n"
+    cycle = profile["cycle"]
+    if cycle:
+        html += (f"<p>{profile['cycles']} cycles &mdash; wall time p50 {cycle['p50_ms']:.0f} ms, "
+                 f"p95 {cycle['p95_ms']:.0f} ms, p99 {cycle['p99_ms']:.0f} ms</p>\n")
+    html += """    <table>
+        <tr>
+            <th>Step</th>
+            <th>Runs</th>
+            <th>p50 ms</th>
+            <th>p95 ms</th>
+            <th>p99 ms</th>
+            <th>Max ms</th>
+            <th>Avg CPU ms</th>
+            <th>Avg Queries</th>
+            <th>Avg Rows Read</th>
+            <th>Avg Rows Written</th>
+            <th>Critical Path</th>
+        </tr>
+"""
+    for step in profile["steps"][:top_n]:
+        html += f"""        <tr>
+            <td>{step['step']}</td>
+            <td>{step['runs']}</td>
+            <td>{step['p50_ms']:.0f}</td>
+            <td>{step['p95_ms']:.0f}</td>
+            <td>{step['p99_ms']:.0f}</td>
+            <td>{step['max_ms']:.0f}</td>
+            <td>{step['avg_cpu_ms']:.0f}</td>
+            <td>{step['avg_queries']:.1f}</td>
+            <td>{step['avg_rows_read']:.0f}</td>
+            <td>{step['avg_rows_written']:.0f}</td>
+            <td>{step['critical_share'] * 100:.0f}%</td>
+        </tr>
+"""
+    html += "    </table>\n"
+    return html
+
+def generate_cycle_report(last_n_cycles=20):
     """
     Reads the cyclone log file (cyclone_log.txt) from the logs folder (using LOG_DIR),
     builds a summary and detailed table from the JSON log records,
     queries the alert ledger table for alert state modifications,
+    adds the slowest steps over the last `last_n_cycles` cycles from cycle_metrics,
     and writes a pretty dark mode HTML report to cyclone_report.html.
     The header now shows a huge green check mark (✅) if no errors occurred
     or a skull (💀) if there were any errors. The ledger details are shown
@@ -122,6 +178,9 @@ def generate_cycle_report():
         ledger_html += "<p>No ledger entries recorded.</p>"
     ledger_html += "</div>"
 
+    # Slowest steps over recent cycles
+    profile_html = build_profile_html(query_cycle_profile(last_n_cycles), last_n_cycles)
+
     # Get current date and time
     current_datetime = datetime.datetime.now().strftime(LOG_DATE_FORMAT)
 
@@ -229,6 +288,7 @@ def generate_cycle_report():
     <div class="joke">
         <strong>Joke of the Day:</strong> {joke}
     </div>
+{profile_html}
     <h2>Detailed Log Entries</h2>
     <table>
         <tr>
@@ -90,7 +90,7 @@ def _convert_iso_to_pst(iso_str):
 
 # Helper: Compute Size Composition.
 def compute_size_composition():
-    positions = PositionService.get_all_positions(DB_PATH) or []
+    positions = PositionService.get_positions_snapshot(DB_PATH) or []
     long_total = sum(float(p.get("size", 0)) for p in positions if p.get("position_type", "").upper() == "LONG")
     short_total = sum(float(p.get("size", 0)) for p in positions if p.get("position_type", "").upper() == "SHORT")
     total = long_total + short_total
@@ -103,7 +103,7 @@ def compute_size_composition():
 
 # Helper: Compute Value Composition.
 def compute_value_composition():
-    positions = PositionService.get_all_positions(DB_PATH) or []
+    positions = PositionService.get_positions_snapshot(DB_PATH) or []
     long_total = 0.0
     short_total = 0.0
     for p in positions:
@@ -138,7 +138,7 @@ def compute_value_composition():
 
 # Helper: Compute Collateral Composition.
 def compute_collateral_composition():
-    positions = PositionService.get_all_positions(DB_PATH) or []
+    positions = PositionService.get_positions_snapshot(DB_PATH) or []
     long_total = sum(float(p.get("collateral", 0)) for p in positions if p.get("position_type", "").upper() == "LONG")
     short_total = sum(float(p.get("collateral", 0)) for p in positions if p.get("position_type", "").upper() == "SHORT")
     total = long_total + short_total
@@ -190,7 +190,7 @@ def api_value_composition():
 @dashboard_bp.route("/api/hedges", methods=["GET"])
 def get_hedges():
     try:
-        positions = PositionService.get_all_positions(DB_PATH)
+        positions = PositionService.get_positions_snapshot(DB_PATH)
         from hedge_manager import HedgeManager  # Adjust the import path as needed
         hedge_manager = HedgeManager(positions)
         hedges = hedge_manager.get_hedges()
@@ -221,10 +221,11 @@ def get_alert_limits():
 def title_bar():
     # Get the latest price data from the DataLocker
     dl = DataLocker.get_instance()
-    btc_data = dl.get_latest_price("BTC") or {}
-    eth_data = dl.get_latest_price("ETH") or {}
-    sol_data = dl.get_latest_price("SOL") or {}
-    sp500_data = dl.get_latest_price("SP500") or {}
+    latest_prices = dl.get_latest_prices(["BTC", "ETH", "SOL", "SP500"])
+    btc_data = latest_prices.get("BTC") or {}
+    eth_data = latest_prices.get("ETH") or {}
+    sol_data = latest_prices.get("SOL") or {}
+    sp500_data = latest_prices.get("SP500") or {}
 
     # Format prices from the database
     try:
@@ -255,7 +256,7 @@ def title_bar():
 @dashboard_bp.route("/api/size_balance")
 def api_size_balance():
     try:
-        positions = PositionService.get_all_positions(DB_PATH) or []
+        positions = PositionService.get_positions_snapshot(DB_PATH) or []
         groups = {}
         for pos in positions:
             wallet = pos.get("wallet", "ObiVault")
@@ -301,7 +302,7 @@ def database_viewer():
         dl = DataLocker.get_instance()
 
         # Retrieve positions.
-        positions = PositionService.get_all_positions(DB_PATH) or []
+        positions = PositionService.get_positions_snapshot(DB_PATH) or []
         pos_headers = ["Ref ID", "Name", "Email", "Actions"]
         pos_rows = []
         for pos in positions:
@@ -325,10 +326,11 @@ def database_viewer():
             })
 
         # Retrieve prices data.
-        btc_data = dl.get_latest_price("BTC") or {}
-        eth_data = dl.get_latest_price("ETH") or {}
-        sol_data = dl.get_latest_price("SOL") or {}
-        sp500_data = dl.get_latest_price("SP500") or {}
+        latest_prices = dl.get_latest_prices(["BTC", "ETH", "SOL", "SP500"])
+        btc_data = latest_prices.get("BTC") or {}
+        eth_data = latest_prices.get("ETH") or {}
+        sol_data = latest_prices.get("SOL") or {}
+        sp500_data = latest_prices.get("SP500") or {}
         prices_headers = ["Asset", "Current Price", "Timestamp", "Actions"]
         prices_rows = [
             {
@@ -366,7 +368,7 @@ def database_viewer():
 
         # Retrieve hedges data.
         from sonic_labs.hedge_manager import HedgeManager  # adjust import if needed
-        positions_for_hedges = PositionService.get_all_positions(DB_PATH) or []
+        positions_for_hedges = PositionService.get_positions_snapshot(DB_PATH) or []
         hedge_manager = HedgeManager(positions_for_hedges)
         hedges = hedge_manager.get_hedges() or []
         hedge_headers = ["Hedge ID", "Total Long Size", "Total Short Size", "Long Heat Index", "Short Heat Index", "Total Heat Index", "Notes", "Actions"]
@@ -432,11 +434,7 @@ def api_delete_entry():
         return jsonify({"success": False, "error": "Missing table or id parameter."}), 400
     try:
         if table == "positions":
-            conn = sqlite3.connect(DB_PATH)
-            cursor = conn.cursor()
-            cursor.execute("DELETE FROM positions WHERE id = ?", (record_id,))
-            conn.commit()
-            conn.close()
+            DataLocker.get_instance().delete_position(record_id)
             return jsonify({"success": True})
         elif table == "alerts":
             dl = DataLocker.get_instance()
@@ -456,7 +454,7 @@ def api_delete_entry():
                 return jsonify({"success": False, "error": "Wallet deletion failed."}), 500
         elif table == "hedges":
             from sonic_labs.hedge_manager import HedgeManager
-            positions = PositionService.get_all_positions(DB_PATH) or []
+            positions = PositionService.get_positions_snapshot(DB_PATH) or []
             hedge_manager = HedgeManager(positions)
             # Assuming HedgeManager.delete_hedge(record_id) exists.
             result = hedge_manager.delete_hedge(record_id)
@@ -523,7 +521,7 @@ def api_update_entry():
 
 @dashboard_bp.route("/api/collateral_composition")
 def compute_collateral_composition():
-    positions = PositionService.get_all_positions(DB_PATH) or []
+    positions = PositionService.get_positions_snapshot(DB_PATH) or []
     long_total = sum(float(p.get("collateral") or p.get("collateral_amount", 0))
                      for p in positions if p.get("position_type", "").upper() == "LONG")
     short_total = sum(float(p.get("collateral") or p.get("collateral_amount", 0))
@@ -650,14 +648,19 @@ def update_performance_data():
 @dashboard_bp.route("/api/asset_percent_changes")
 def api_asset_percent_changes():
     try:
+        from prices.price_compactor import percent_change
         hours = int(request.args.get("hours", 24))
-        factor = 24 / hours
-        asset_changes = {
-            "BTC": 2.34 * factor,
-            "ETH": -1.23 * factor,
-            "SOL": 0.56 * factor,
-            "SP500": -4.23 * factor
-        }
+        dl = DataLocker.get_instance()
+        assets = ["BTC", "ETH", "SOL", "SP500"]
+        # 1h/24h/7d come precomputed from the rolling stats; other windows read price history.
+        column = {1: "return_1h", 24: "return_24h", 168: "return_7d"}.get(hours)
+        stats = dl.get_asset_stats(assets) if column else {}
+        asset_changes = {}
+        for asset in assets:
+            change = (stats.get(asset) or {}).get(column) if column else None
+            if change is None:
+                change = percent_change(dl, asset, hours)
+            asset_changes[asset] = round(change, 2) if change is not None else 0.0
         return jsonify(asset_changes)
     except Exception as e:
         logger.error(f"Error in api_asset_percent_changes: {e}", exc_info=True)
@@ -729,7 +732,7 @@ def dash_page():
     from positions.position_service import PositionService
 
     # ---- Portfolio / Positions ----
-    all_positions = PositionService.get_all_positions(DB_PATH) or []
+    all_positions = PositionService.get_positions_snapshot(DB_PATH) or []
     if all_positions:
         total_value       = sum(float(p.get("value",0)) for p in all_positions)
         total_collateral  = sum(float(p.get("collateral",0)) for p in all_positions)
@@ -760,10 +763,11 @@ def dash_page():
         theme_config = {}
 
     # ---- Price data ----
-    btc_data  = dl.get_latest_price("BTC") or {}
-    eth_data  = dl.get_latest_price("ETH") or {}
-    sol_data  = dl.get_latest_price("SOL") or {}
-    sp500_data= dl.get_latest_price("SP500") or {}
+    latest_prices = dl.get_latest_prices(["BTC", "ETH", "SOL", "SP500"])
+    btc_data  = latest_prices.get("BTC") or {}
+    eth_data  = latest_prices.get("ETH") or {}
+    sol_data  = latest_prices.get("SOL") or {}
+    sp500_data= latest_prices.get("SP500") or {}
 
     btc_price  = "{:,.0f}".format(float(btc_data.get("current_price",0)))
     eth_price  = "{:,.0f}".format(float(eth_data.get("current_price",0)))
@@ -0,0 +1,92 @@
+#!/usr/bin/env python
+"""
+async_data_locker.py
+Description:
+    Awaitable facade over DataLocker for code running on an asyncio event loop
+    (Cyclone). Every DataLocker method is available as a coroutine of the same
+    name, executed on a small bounded thread pool so DB work never blocks the
+    loop and the number of pooled reader connections stays capped.
+
+    Arbitrary blocking callables (PositionService, AlertController, ...) can be
+    pushed onto the same executor with run().
+Usage:
+    adl = AsyncDataLocker.get_instance()
+    positions = await adl.read_positions()
+    positions = await adl.run(PositionService.get_all_positions)
+"""
+
+import asyncio
+import contextvars
+import functools
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Optional
+
+from data import query_stats
+from data.data_locker import DataLocker
+
+logger = logging.getLogger("DataLockerLogger")
+
+DEFAULT_MAX_WORKERS = 4
+
+
+class AsyncDataLocker:
+    _instance: Optional['AsyncDataLocker'] = None
+
+    def __init__(self, data_locker: Optional[DataLocker] = None, max_workers: int = DEFAULT_MAX_WORKERS):
+        self.data_locker = data_locker or DataLocker.get_instance()
+        self.max_workers = max_workers
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="datalocker")
+
+    @classmethod
+    def get_instance(cls, data_locker: Optional[DataLocker] = None) -> 'AsyncDataLocker':
+        if cls._instance is None:
+            cls._instance = cls(data_locker)
+        return cls._instance
+
+    async def run(self, func: Callable, *args, **kwargs) -> Any:
+        """
+        Runs a blocking callable on the DB executor and awaits its result.
+        The caller's context is carried over, so query_stats tracking started by
+        the caller (e.g. a Cyclone step) also counts the work done on the thread.
+        """
+        loop = asyncio.get_running_loop()
+        call = functools.partial(func, *args, **kwargs)
+
+        def _timed():
+            started = time.thread_time()
+            try:
+                return call()
+            finally:
+                query_stats.record_cpu_time(time.thread_time() - started)
+
+        ctx = contextvars.copy_context()
+        return await loop.run_in_executor(self._executor, ctx.run, _timed)
+
+    async def run_in_batch(self, func: Callable, *args, **kwargs) -> Any:
+        """
+        Runs func inside DataLocker.batch() on a single executor thread, so all of
+        its writes commit together. (batch() is per-thread, so it can't span awaits.)
+        """
+        def _batched():
+            with self.data_locker.batch():
+                return func(*args, **kwargs)
+        return await self.run(_batched)
+
+    def __getattr__(self, name: str):
+        if name.startswith("_") or name == "batch":
+            raise AttributeError(name)
+        attr = getattr(self.data_locker, name)
+        if not callable(attr):
+            return attr
+
+        @functools.wraps(attr)
+        async def _awaitable(*args, **kwargs):
+            return await self.run(attr, *args, **kwargs)
+        return _awaitable
+
+    def shutdown(self, wait: bool = True):
+        self._executor.shutdown(wait=wait)
+        if AsyncDataLocker._instance is self:
+            AsyncDataLocker._instance = None
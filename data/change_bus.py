@@ -0,0 +1,129 @@
+#!/usr/bin/env python
+"""
+change_bus.py
+Description:
+    In-process publish/subscribe bus for data changes.
+
+    DataLocker publishes what its writes touched - position ids, asset types
+    or alert ids - so consumers such as AlertManager can react to just the
+    changed rows instead of rescanning everything. Writes made inside a
+    DataLocker.batch() are published once the batch commits; a rolled-back
+    batch publishes nothing.
+
+    Topics and their keys:
+      - POSITIONS  position ids
+      - PRICES     asset types
+      - ALERTS     alert ids
+    keys=None means "anything in this topic may have changed" (bulk deletes,
+    rebuilds).
+
+    Only changes made in this process are seen; subscribers that must also
+    catch writes from other processes need their own periodic full pass.
+    A subscriber that should not be kept alive by the bus (e.g. the index of
+    an AlertManager built per request) subscribes with weak=True; it drops
+    out once garbage-collected.
+Usage:
+    change_bus.subscribe(callback)          # callback(topic, keys)
+    change_bus.subscribe(obj.on_change, weak=True)
+    change_bus.publish(change_bus.POSITIONS, {"pos-1"})
+    with change_bus.suppressed():
+        ...                                 # writes that nobody should react to
+"""
+
+import logging
+import threading
+import weakref
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Callable, Iterable, List, Optional
+
+logger = logging.getLogger("ChangeBus")
+
+POSITIONS = "positions"
+PRICES = "prices"
+ALERTS = "alerts"
+
+_lock = threading.Lock()
+# References: calling one returns the subscriber, or None once a weak one is collected.
+_subscribers: List[Callable[[], Optional[Callable]]] = []
+
+# A ContextVar, so suppression follows AsyncDataLocker.run() executor calls.
+_suppressed: ContextVar[bool] = ContextVar("change_bus_suppressed", default=False)
+
+
+class _StrongRef:
+    __slots__ = ("callback",)
+
+    def __init__(self, callback: Callable):
+        self.callback = callback
+
+    def __call__(self) -> Callable:
+        return self.callback
+
+
+def subscribe(callback: Callable, weak: bool = False):
+    """
+    Registers callback(topic, keys); keys is a set, or None for "everything".
+    With weak=True the bus holds only a weak reference (a WeakMethod for bound
+    methods), so the subscriber is dropped when its owner is collected.
+    """
+    if weak:
+        ref = weakref.WeakMethod(callback) if hasattr(callback, "__self__") else weakref.ref(callback)
+    else:
+        ref = _StrongRef(callback)
+    with _lock:
+        if not any(existing() == callback for existing in _subscribers):
+            _subscribers.append(ref)
+
+
+def unsubscribe(callback: Callable):
+    with _lock:
+        _subscribers[:] = [ref for ref in _subscribers if ref() not in (None, callback)]
+
+
+def is_suppressed() -> bool:
+    return _suppressed.get()
+
+
+@contextmanager
+def suppressed():
+    """Drops every event published in the enclosed block (and tasks/threads that copy this context)."""
+    token = _suppressed.set(True)
+    try:
+        yield
+    finally:
+        _suppressed.reset(token)
+
+
+def publish(topic: str, keys: Optional[Iterable] = None):
+    """Delivers an event to every subscriber. A failing subscriber never breaks the writer."""
+    if _suppressed.get():
+        return
+    keys = None if keys is None else set(keys)
+    if keys is not None and not keys:
+        return
+    with _lock:
+        callbacks = [ref() for ref in _subscribers]
+        if None in callbacks:
+            _subscribers[:] = [ref for ref, cb in zip(_subscribers, callbacks) if cb is not None]
+    for callback in callbacks:
+        if callback is None:
+            continue
+        try:
+            callback(topic, keys)
+        except Exception as e:
+            logger.error(f"Change subscriber {callback!r} failed on {topic}: {e}", exc_info=True)
+
+
+def merge_events(events: List[tuple]) -> List[tuple]:
+    """Collapses queued (topic, keys) events to one per topic, in first-seen order."""
+    merged = {}
+    for topic, keys in events:
+        if topic not in merged:
+            merged[topic] = None if keys is None else set(keys)
+        elif merged[topic] is not None:
+            if keys is None:
+                merged[topic] = None
+            else:
+                merged[topic].update(keys)
+    return list(merged.items())
@@ -0,0 +1,166 @@
+#!/usr/bin/env python
+"""
+connection_pool.py
+Description:
+    SQLite connection pool used by DataLocker.
+      - Each thread gets its own read-only connection (PRAGMA query_only) so
+        Flask request threads, Cyclone executor threads and asyncio.to_thread
+        calls read concurrently under WAL instead of sharing one cursor stream.
+      - All writes go through a single writer connection. Writers queue on a
+        lock, and the time spent waiting for it is recorded so contention can
+        be seen in get_stats().
+    In-memory databases can't be shared across connections, so for ":memory:"
+    the writer connection doubles as the reader.
+    Every connection reports statements and row counts to data/query_stats.py,
+    which attributes them to the Cyclone step (or other tracked task) running.
+"""
+
+import logging
+import sqlite3
+import threading
+import time
+import weakref
+from contextlib import contextmanager
+from typing import Optional, Type
+
+from data import query_stats
+
+logger = logging.getLogger("DataLockerLogger")
+
+BUSY_TIMEOUT_MS = 5000
+
+
+class _CountingCursor(sqlite3.Cursor):
+    """Cursor that reports fetched and written row counts to query_stats."""
+
+    def execute(self, *args, **kwargs):
+        result = super().execute(*args, **kwargs)
+        query_stats.record_rows_written(self.rowcount)
+        return result
+
+    def executemany(self, *args, **kwargs):
+        result = super().executemany(*args, **kwargs)
+        query_stats.record_rows_written(self.rowcount)
+        return result
+
+    def fetchone(self):
+        row = super().fetchone()
+        if row is not None:
+            query_stats.record_rows_read(1)
+        return row
+
+    def fetchmany(self, *args, **kwargs):
+        rows = super().fetchmany(*args, **kwargs)
+        query_stats.record_rows_read(len(rows))
+        return rows
+
+    def fetchall(self):
+        rows = super().fetchall()
+        query_stats.record_rows_read(len(rows))
+        return rows
+
+
+class _PooledConnection(sqlite3.Connection):
+    """
+    sqlite3.Connection subclass so reader connections can be weak-referenced,
+    and so cursors count rows for query_stats.
+    """
+
+    def cursor(self, factory=_CountingCursor):
+        return super().cursor(factory)
+
+
+class ConnectionPool:
+    def __init__(self, db_path: str, row_factory: Optional[Type[sqlite3.Row]] = None):
+        self.db_path = db_path
+        self.row_factory = row_factory
+        self.shared_memory = db_path == ":memory:" or db_path.startswith("file::memory:")
+        self._local = threading.local()
+        self._readers = weakref.WeakSet()
+        self._write_lock = threading.RLock()
+        self._stats_lock = threading.Lock()
+        self._stats = {
+            "reader_connections_opened": 0,
+            "writes": 0,
+            "write_waits": 0,
+            "write_wait_total_ms": 0.0,
+            "write_wait_max_ms": 0.0,
+            "write_hold_total_ms": 0.0,
+        }
+        self.writer = self._connect(check_same_thread=False)
+        self.writer.execute("PRAGMA journal_mode=WAL;")
+
+    def _connect(self, check_same_thread: bool) -> sqlite3.Connection:
+        conn = sqlite3.connect(
+            self.db_path,
+            check_same_thread=check_same_thread,
+            timeout=BUSY_TIMEOUT_MS / 1000,
+            factory=_PooledConnection
+        )
+        conn.execute(f"PRAGMA busy_timeout = {BUSY_TIMEOUT_MS}")
+        conn.set_trace_callback(query_stats.record_statement)
+        if self.row_factory is not None:
+            conn.row_factory = self.row_factory
+        return conn
+
+    def reader(self) -> sqlite3.Connection:
+        """Returns the calling thread's read-only connection, opening it on first use."""
+        if self.shared_memory:
+            return self.writer
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._connect(check_same_thread=True)
+            # Autocommit, so every SELECT sees the latest committed WAL snapshot.
+            conn.isolation_level = None
+            conn.execute("PRAGMA query_only = ON")
+            self._local.conn = conn
+            self._readers.add(conn)
+            with self._stats_lock:
+                self._stats["reader_connections_opened"] += 1
+        return conn
+
+    @contextmanager
+    def write(self):
+        """Serializes access to the writer connection and records queueing time."""
+        requested = time.perf_counter()
+        contended = not self._write_lock.acquire(blocking=False)
+        if contended:
+            self._write_lock.acquire()
+        acquired = time.perf_counter()
+        try:
+            yield self.writer
+        finally:
+            released = time.perf_counter()
+            self._write_lock.release()
+            waited_ms = (acquired - requested) * 1000
+            with self._stats_lock:
+                self._stats["writes"] += 1
+                self._stats["write_hold_total_ms"] += (released - acquired) * 1000
+                if contended:
+                    self._stats["write_waits"] += 1
+                    self._stats["write_wait_total_ms"] += waited_ms
+                    self._stats["write_wait_max_ms"] = max(self._stats["write_wait_max_ms"], waited_ms)
+
+    def get_stats(self) -> dict:
+        with self._stats_lock:
+            stats = dict(self._stats)
+        stats["open_reader_connections"] = len(self._readers)
+        stats["avg_write_wait_ms"] = (
+            stats["write_wait_total_ms"] / stats["write_waits"] if stats["write_waits"] else 0.0
+        )
+        return stats
+
+    def reset_stats(self):
+        with self._stats_lock:
+            for key in self._stats:
+                self._stats[key] = 0 if isinstance(self._stats[key], int) else 0.0
+
+    def close(self):
+        for conn in list(self._readers):
+            try:
+                conn.close()
+            except sqlite3.ProgrammingError:
+                # Connection belongs to another live thread; it closes when that thread ends.
+                pass
+        self._local = threading.local()
+        self.writer.close()
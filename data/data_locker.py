@@ -1,33 +1,57 @@
 #!/usr/bin/env python
+import hashlib
+import json
 import os
 import sqlite3
 import logging
-from typing import List, Dict, Optional
+import threading
+from contextlib import contextmanager
+from itertools import groupby
+from typing import List, Dict, Iterator, Optional
 from datetime import datetime
 from uuid import uuid4
 from config.config_constants import DB_PATH
+from data.migrations import apply_migrations
+from data.connection_pool import ConnectionPool
+from data import change_bus
 
 class DataLocker:
     """
     A synchronous DataLocker that manages database interactions using sqlite3.
     Stores:
-      - Prices in the 'prices' table.
+      - Prices in the 'prices' table (latest per asset mirrored in 'prices_latest').
       - Positions in the 'positions' table.
       - Alerts in the 'alerts' table.
       - System variables (timestamps, balance vars, and strategy performance data) in the 'system_vars' table.
       - Brokers in the 'brokers' table.
       - Wallets in the 'wallets' table.
       - Aggregated positions snapshots in the 'positions_totals_history' table.
+      - Per-step Cyclone timings in the 'cycle_metrics' table.
+    Schema versions are managed by data/migrations.py.
     """
 
     _instance: Optional['DataLocker'] = None
 
+    # Positions the differential sync has marked CLOSED are hidden from normal reads.
+    _OPEN_POSITION_FILTER = "COALESCE(status, 'OPEN') != 'CLOSED'"
+
+    # Position columns owned by the exchange feed. Importers overwrite these;
+    # enrichment fields (current_price, heat_index, ...) are left alone.
+    POSITION_SYNC_FIELDS = (
+        "asset_type", "position_type", "entry_price", "liquidation_price", "collateral",
+        "size", "leverage", "value", "last_updated", "wallet_name", "pnl_after_fees_usd",
+    )
+    # IDs per "IN (...)" lookup; stays well under SQLite's bound-parameter limit.
+    _IN_CHUNK = 500
+
     def __init__(self, db_path: Optional[str] = None):
         if db_path is None:
             db_path = DB_PATH
         self.db_path = db_path
         self.logger = logging.getLogger("DataLockerLogger")
         self.conn = None
+        self._pool: Optional[ConnectionPool] = None
+        self._batch_state = threading.local()
         self._initialize_database()
 
     class DictRow(sqlite3.Row):
@@ -40,217 +64,8 @@ class DataLocker:
     def _initialize_database(self):
         try:
             self._init_sqlite_if_needed()
-            cursor = self.conn.cursor()
-
-            # Create system_vars table (if needed)
-            cursor.execute("""
-                CREATE TABLE IF NOT EXISTS system_vars (
-                    id INTEGER PRIMARY KEY,
-                    last_update_time_positions DATETIME,
-                    last_update_positions_source TEXT,
-                    last_update_time_prices DATETIME,
-                    last_update_prices_source TEXT,
-                    last_update_time_jupiter DATETIME
-                )
-            """)
-            cursor.execute("""
-                INSERT OR IGNORE INTO system_vars (
-                    id,
-                    last_update_time_positions,
-                    last_update_positions_source,
-                    last_update_time_prices,
-                    last_update_prices_source,
-                    last_update_time_jupiter
-                )
-                VALUES (1, NULL, NULL, NULL, NULL, NULL)
-            """)
-
-            # Add new columns for Jupiter updates if missing
-            cursor.execute("PRAGMA table_info(system_vars)")
-            existing_cols = [row["name"] for row in cursor.fetchall()]
-            if "last_update_time_jupiter" not in existing_cols:
-                cursor.execute("""
-                    ALTER TABLE system_vars
-                    ADD COLUMN last_update_time_jupiter DATETIME
-                """)
-                self.logger.info("Added 'last_update_time_jupiter' column to 'system_vars' table.")
-            if "last_update_jupiter_source" not in existing_cols:
-                cursor.execute("""
-                    ALTER TABLE system_vars
-                    ADD COLUMN last_update_jupiter_source TEXT
-                """)
-                self.logger.info("Added 'last_update_jupiter_source' column to 'system_vars' table.")
-
-            cursor.execute("PRAGMA table_info(system_vars)")
-            existing_cols = [row["name"] for row in cursor.fetchall()]
-            if "theme_mode" not in existing_cols:
-                cursor.execute("ALTER TABLE system_vars ADD COLUMN theme_mode TEXT DEFAULT 'light'")
-                self.logger.info("Added 'theme_mode' column to 'system_vars' table.")
-
-            # Add additional balance columns if missing
-            cursor.execute("PRAGMA table_info(system_vars)")
-            existing_cols = [row["name"] for row in cursor.fetchall()]
-            for col, sql in [
-                ("total_brokerage_balance",
-                 "ALTER TABLE system_vars ADD COLUMN total_brokerage_balance REAL DEFAULT 0.0"),
-                ("total_wallet_balance", "ALTER TABLE system_vars ADD COLUMN total_wallet_balance REAL DEFAULT 0.0"),
-                ("total_balance", "ALTER TABLE system_vars ADD COLUMN total_balance REAL DEFAULT 0.0")
-            ]:
-                if col not in existing_cols:
-                    cursor.execute(sql)
-                    self.logger.info(f"Added '{col}' column to 'system_vars' table.")
-
-            # NEW: Create position_alert_map table to support multiple alerts per position.
-            cursor.execute("""
-                CREATE TABLE IF NOT EXISTS position_alert_map (
-                    id TEXT PRIMARY KEY,
-                    position_id TEXT NOT NULL,
-                    alert_id TEXT NOT NULL,
-                    FOREIGN KEY(position_id) REFERENCES positions(id),
-                    FOREIGN KEY(alert_id) REFERENCES alerts(id)
-                )
-            """)
-
-            # NEW: Add columns for strategy performance persistence
-            cursor.execute("PRAGMA table_info(system_vars)")
-            existing_cols = [row["name"] for row in cursor.fetchall()]
-            if "strategy_start_value" not in existing_cols:
-                cursor.execute("ALTER TABLE system_vars ADD COLUMN strategy_start_value REAL DEFAULT 0.0")
-               # self.logger.info("Added 'strategy_start_value' column to 'system_vars' table.")
-            if "strategy_description" not in existing_cols:
-                cursor.execute("ALTER TABLE system_vars ADD COLUMN strategy_description TEXT DEFAULT ''")
-               # self.logger.info("Added 'strategy_description' column to 'system_vars' table.")
-
-            # Create prices table if it doesn't exist
-            cursor.execute("""
-                CREATE TABLE IF NOT EXISTS prices (
-                    id TEXT PRIMARY KEY,
-                    asset_type TEXT,
-                    current_price REAL,
-                    previous_price REAL,
-                    last_update_time DATETIME,
-                    previous_update_time DATETIME,
-                    source TEXT
-                )
-            """)
-
-            # Create positions table if it doesn't exist
-            cursor.execute("""
-                CREATE TABLE IF NOT EXISTS positions (
-                    id TEXT PRIMARY KEY,
-                    asset_type TEXT,
-                    position_type TEXT,
-                    entry_price REAL,
-                    liquidation_price REAL,
-                    travel_percent REAL,  -- Unified column name for travel percent
-                    value REAL,
-                    collateral REAL,
-                    size REAL,
-                    leverage REAL,
-                    wallet_name TEXT,
-                    last_updated DATETIME,
-                    alert_reference_id TEXT,
-                    hedge_buddy_id TEXT,
-                    current_price REAL,
-                    liquidation_distance REAL,
-                    heat_index REAL,
-                    current_heat_index REAL,
-                    pnl_after_fees_usd REAL
-                )
-            """)
-
-            # Create alerts table if it doesn't exist
-            # Inside _initialize_database() in DataLocker, update the alerts table creation:
-            cursor.execute("""
-                CREATE TABLE IF NOT EXISTS alerts (
-                    id TEXT PRIMARY KEY,
-                    created_at DATETIME,
-                    alert_type TEXT,
-                    alert_class TEXT,
-                    asset_type TEXT,
-                    trigger_value REAL,
-                    condition TEXT,
-                    notification_type TEXT,
-                    level TEXT,
-                    last_triggered DATETIME,
-                    status TEXT,
-                    frequency INTEGER,
-                    counter INTEGER,
-                    liquidation_distance REAL,
-                    travel_percent REAL,
-                    liquidation_price REAL,
-                    notes TEXT,
-                    description TEXT,
-                    position_reference_id TEXT,
-                    evaluated_value REAL
-                )
-            """)
-
-            # Now, check if 'position_type' column exists in alerts table:
-            cursor.execute("PRAGMA table_info(alerts)")
-            existing_cols = [row["name"] for row in cursor.fetchall()]
-            if "position_type" not in existing_cols:
-                cursor.execute("ALTER TABLE alerts ADD COLUMN position_type TEXT")
-                self.logger.info("Added 'position_type' column to 'alerts' table.")
-
-            # Create new ledger table for update ledger (alert ledger)
-            cursor.execute("""
-                CREATE TABLE IF NOT EXISTS alert_ledger (
-                    id TEXT PRIMARY KEY,
-                    alert_id TEXT,
-                    modified_by TEXT,
-                    reason TEXT,
-                    before_value TEXT,
-                    after_value TEXT,
-                    timestamp DATETIME
-                )
-            """)
-
-            # Create brokers table if it doesn't exist
-            cursor.execute("""
-                CREATE TABLE IF NOT EXISTS brokers (
-                    name TEXT PRIMARY KEY,
-                    image_path TEXT,
-                    web_address TEXT,
-                    total_holding REAL DEFAULT 0.0
-                )
-            """)
-
-            # Create wallets table if it doesn't exist
-            cursor.execute("""
-                CREATE TABLE IF NOT EXISTS wallets (
-                    name TEXT PRIMARY KEY,
-                    public_address TEXT,
-                    private_address TEXT,
-                    image_path TEXT,
-                    balance REAL DEFAULT 0.0
-                )
-            """)
-
-            # Create portfolio_entries table if it doesn't exist
-            cursor.execute("""
-                CREATE TABLE IF NOT EXISTS portfolio_entries (
-                    id TEXT PRIMARY KEY,
-                    snapshot_time DATETIME,
-                    total_value REAL NOT NULL
-                )
-            """)
-
-            # Create positions_totals_history table if it doesn't exist
-            cursor.execute("""
-                CREATE TABLE IF NOT EXISTS positions_totals_history (
-                    id TEXT PRIMARY KEY,
-                    snapshot_time DATETIME,
-                    total_size REAL,
-                    total_value REAL,
-                    total_collateral REAL,
-                    avg_leverage REAL,
-                    avg_travel_percent REAL,
-                    avg_heat_index REAL
-                )
-            """)
-            self.conn.commit()
-           # self.logger.debug("Database initialization complete.")
+            # Schema lives in data/migrations.py; an up-to-date DB costs one pragma read.
+            apply_migrations(self.conn)
         except sqlite3.Error as e:
             self.logger.error(f"Error initializing database: {e}", exc_info=True)
             raise
@@ -267,32 +82,133 @@ class DataLocker:
             os.makedirs(db_dir, exist_ok=True)
           #  self.logger.debug(f"Created directory for DB: {db_dir}")
         if self.conn is None:
-            self.conn = sqlite3.connect(self.db_path, check_same_thread=False)
-            self.conn.execute("PRAGMA journal_mode=WAL;")
-            self.conn.row_factory = self.DictRow
+            self._pool = ConnectionPool(self.db_path, row_factory=self.DictRow)
+            # self.conn is the single writer connection; reads go through _reader().
+            self.conn = self._pool.writer
 
     def get_db_connection(self) -> sqlite3.Connection:
         self._init_sqlite_if_needed()
         return self.conn
 
+    def _reader(self) -> sqlite3.Connection:
+        """The calling thread's read-only connection."""
+        self._init_sqlite_if_needed()
+        return self._pool.reader()
+
+    def get_pool_stats(self) -> dict:
+        """Reader/writer counters, including time spent queued for the writer."""
+        self._init_sqlite_if_needed()
+        return self._pool.get_stats()
+
+    # ----------------------------------------------------------------
+    # BATCHED WRITES (unit of work)
+    # ----------------------------------------------------------------
+
+    @contextmanager
+    def batch(self):
+        """
+        Unit of work for bulk writes. While a batch is open on the current thread,
+        mutators queue their statements instead of committing one row at a time.
+        On a clean exit the queue is flushed with executemany inside a single
+        transaction; if the block raises, the queued writes are discarded.
+        Nested batch() calls join the outermost batch.
+
+        Reads inside the block do not see queued writes. Change events for the
+        queued writes are published after the commit.
+        """
+        if self.in_batch():
+            yield self
+            return
+        self._batch_state.pending = []
+        self._batch_state.events = []
+        try:
+            yield self
+            self._flush_batch(self._batch_state.pending)
+            events = self._batch_state.events
+        finally:
+            self._batch_state.pending = None
+            self._batch_state.events = None
+        for topic, keys in change_bus.merge_events(events):
+            change_bus.publish(topic, keys)
+
+    def in_batch(self) -> bool:
+        return getattr(self._batch_state, "pending", None) is not None
+
+    def _execute_write(self, sql: str, params=()) -> int:
+        """
+        Executes and commits a single write, or queues it when a batch is open.
+        Returns the affected row count (1 for a queued statement).
+        """
+        self._init_sqlite_if_needed()
+        if self.in_batch():
+            queued = dict(params) if isinstance(params, dict) else tuple(params)
+            self._batch_state.pending.append((sql, queued))
+            return 1
+        with self._pool.write() as conn:
+            cursor = conn.cursor()
+            try:
+                cursor.execute(sql, params)
+                conn.commit()
+                return cursor.rowcount
+            except Exception:
+                conn.rollback()
+                raise
+            finally:
+                cursor.close()
+
+    def execute_write(self, sql: str, params=()) -> int:
+        """
+        One-off write for callers outside DataLocker that have no dedicated
+        method. Goes through the single writer (or the open batch) like every
+        other write; committing on self.conn directly could commit in the
+        middle of another thread's batch(). Publishes no change events.
+        """
+        return self._execute_write(sql, params)
+
+    def _publish(self, topic: str, keys=None):
+        """Publishes a change event now, or when the open batch commits (see data/change_bus.py)."""
+        if change_bus.is_suppressed():
+            return
+        if self.in_batch():
+            self._batch_state.events.append((topic, None if keys is None else set(keys)))
+        else:
+            change_bus.publish(topic, keys)
+
+    def _flush_batch(self, pending: list):
+        if not pending:
+            return
+        self._init_sqlite_if_needed()
+        with self._pool.write() as conn:
+            cursor = conn.cursor()
+            try:
+                # Consecutive statements with the same SQL go out as one executemany;
+                # ordering between different statements is preserved.
+                for sql, group in groupby(pending, key=lambda item: item[0]):
+                    cursor.executemany(sql, [params for _, params in group])
+                conn.commit()
+                self.logger.debug(f"Flushed batch of {len(pending)} writes in one transaction.")
+            except Exception as ex:
+                conn.rollback()
+                self.logger.exception(f"Error flushing write batch, rolled back: {ex}")
+                raise
+            finally:
+                cursor.close()
+
     def add_position_alert_mapping(self, position_id: str, alert_id: str) -> None:
         """Adds a mapping record linking a position to an alert."""
-        cursor = self.conn.cursor()
         sql = """
             INSERT INTO position_alert_map (id, position_id, alert_id)
             VALUES (?, ?, ?)
         """
         mapping_id = str(uuid4())
-        cursor.execute(sql, (mapping_id, position_id, alert_id))
-        self.conn.commit()
-        cursor.close()
+        self._execute_write(sql, (mapping_id, position_id, alert_id))
 
     def has_alert_mapping(self, position_id: str, alert_type: str) -> bool:
         """
         Checks whether an alert of a specific type already exists for a position,
         by joining the alerts table with the mapping table.
         """
-        cursor = self.conn.cursor()
+        cursor = self._reader().cursor()
         sql = """
             SELECT a.id FROM alerts a
             JOIN position_alert_map pam ON a.id = pam.alert_id
@@ -305,16 +221,14 @@ class DataLocker:
 
     def get_theme_mode(self) -> str:
         self._init_sqlite_if_needed()
-        cursor = self.conn.cursor()
+        cursor = self._reader().cursor()
         cursor.execute("SELECT theme_mode FROM system_vars WHERE id = 1 LIMIT 1")
         row = cursor.fetchone()
         return row["theme_mode"] if row and "theme_mode" in row and row["theme_mode"] else "light"
 
     def set_theme_mode(self, mode: str):
         self._init_sqlite_if_needed()
-        cursor = self.conn.cursor()
-        cursor.execute("UPDATE system_vars SET theme_mode = ? WHERE id = 1", (mode,))
-        self.conn.commit()
+        self._execute_write("UPDATE system_vars SET theme_mode = ? WHERE id = 1", (mode,))
 
     # ----------------------------------------------------------------
     # Strategy Performance Data Persistence
@@ -322,19 +236,17 @@ class DataLocker:
 
     def set_strategy_performance_data(self, start_value: float, description: str):
         self._init_sqlite_if_needed()
-        cursor = self.conn.cursor()
-        cursor.execute("""
+        self._execute_write("""
             UPDATE system_vars
                SET strategy_start_value = ?,
                    strategy_description = ?
             WHERE id = 1
         """, (start_value, description))
-        self.conn.commit()
        # self.logger.debug(f"Updated strategy performance data: start_value={start_value}, description={description}")
 
     def get_strategy_performance_data(self) -> dict:
         self._init_sqlite_if_needed()
-        cursor = self.conn.cursor()
+        cursor = self._reader().cursor()
         cursor.execute("""
             SELECT strategy_start_value, strategy_description
             FROM system_vars
@@ -371,23 +283,43 @@ class DataLocker:
                 price_dict["previous_update_time"] = None
             if "source" not in price_dict:
                 price_dict["source"] = "Manual"
-            cursor = self.conn.cursor()
-            cursor.execute("""
-                INSERT INTO prices (
-                    id,
-                    asset_type,
-                    current_price,
-                    previous_price,
-                    last_update_time,
-                    previous_update_time,
-                    source
-                )
-                VALUES (
-                    :id, :asset_type, :current_price, :previous_price,
-                    :last_update_time, :previous_update_time, :source
-                )
-            """, price_dict)
-            self.conn.commit()
+            with self.batch():
+                self._execute_write("""
+                    INSERT INTO prices (
+                        id,
+                        asset_type,
+                        current_price,
+                        previous_price,
+                        last_update_time,
+                        previous_update_time,
+                        source
+                    )
+                    VALUES (
+                        :id, :asset_type, :current_price, :previous_price,
+                        :last_update_time, :previous_update_time, :source
+                    )
+                """, price_dict)
+                # Keep prices_latest in step; an older timestamp never replaces a newer one.
+                self._execute_write("""
+                    INSERT INTO prices_latest (
+                        asset_type, id, current_price, previous_price,
+                        last_update_time, previous_update_time, source
+                    )
+                    VALUES (
+                        :asset_type, :id, :current_price, :previous_price,
+                        :last_update_time, :previous_update_time, :source
+                    )
+                    ON CONFLICT(asset_type) DO UPDATE SET
+                        id = excluded.id,
+                        current_price = excluded.current_price,
+                        previous_price = excluded.previous_price,
+                        last_update_time = excluded.last_update_time,
+                        previous_update_time = excluded.previous_update_time,
+                        source = excluded.source
+                    WHERE prices_latest.last_update_time IS NULL
+                       OR excluded.last_update_time >= prices_latest.last_update_time
+                """, price_dict)
+                self._publish(change_bus.PRICES, {price_dict["asset_type"]})
             self.logger.debug(f"Inserted price row with ID={price_dict['id']}")
         except Exception as e:
             self.logger.exception(f"Unexpected error in insert_price: {e}")
@@ -396,7 +328,7 @@ class DataLocker:
     def get_prices(self, asset_type: Optional[str] = None) -> List[dict]:
         try:
             self._init_sqlite_if_needed()
-            cursor = self.conn.cursor()
+            cursor = self._reader().cursor()
             if asset_type:
                 cursor.execute("""
                     SELECT *
@@ -423,7 +355,7 @@ class DataLocker:
 
     def read_prices(self) -> List[dict]:
         self._init_sqlite_if_needed()
-        cursor = self.conn.cursor()
+        cursor = self._reader().cursor()
         cursor.execute("SELECT * FROM prices ORDER BY last_update_time DESC")
         rows = cursor.fetchall()
         return [dict(r) for r in rows]
@@ -431,13 +363,12 @@ class DataLocker:
     def get_latest_price(self, asset_type: str) -> Optional[dict]:
         try:
             self._init_sqlite_if_needed()
-            cursor = self.conn.cursor()
+            cursor = self._reader().cursor()
             cursor.execute("""
-                SELECT *
-                  FROM prices
+                SELECT id, asset_type, current_price, previous_price,
+                       last_update_time, previous_update_time, source
+                  FROM prices_latest
                  WHERE asset_type=?
-                 ORDER BY last_update_time DESC
-                 LIMIT 1
             """, (asset_type,))
             row = cursor.fetchone()
             return dict(row) if row else None
@@ -448,12 +379,77 @@ class DataLocker:
             self.logger.exception(f"Unexpected error in get_latest_price: {ex}")
             return None
 
+    def get_data_versions(self) -> Dict[str, int]:
+        """
+        {"positions": n, "prices": n}: change counters bumped by triggers whenever
+        positions or latest prices are written. Cache keys for derived data.
+        """
+        try:
+            self._init_sqlite_if_needed()
+            cursor = self._reader().cursor()
+            cursor.execute("SELECT name, version FROM data_versions")
+            return {row["name"]: row["version"] for row in cursor.fetchall()}
+        except sqlite3.Error as e:
+            self.logger.error(f"Database error in get_data_versions: {e}", exc_info=True)
+            return {}
+
+    def get_latest_prices(self, assets: Optional[List[str]] = None) -> Dict[str, dict]:
+        """
+        Returns {asset_type: latest price row} for the given assets (all assets if None)
+        in a single query. Assets with no stored price are omitted.
+        """
+        try:
+            self._init_sqlite_if_needed()
+            cursor = self._reader().cursor()
+            sql = """
+                SELECT id, asset_type, current_price, previous_price,
+                       last_update_time, previous_update_time, source
+                  FROM prices_latest
+            """
+            if assets is None:
+                cursor.execute(sql)
+            else:
+                assets = list(assets)
+                if not assets:
+                    return {}
+                placeholders = ", ".join("?" for _ in assets)
+                cursor.execute(f"{sql} WHERE asset_type IN ({placeholders})", assets)
+            return {row["asset_type"]: dict(row) for row in cursor.fetchall()}
+        except sqlite3.Error as e:
+            self.logger.error(f"Database error in get_latest_prices: {e}", exc_info=True)
+            return {}
+        except Exception as ex:
+            self.logger.exception(f"Unexpected error in get_latest_prices: {ex}")
+            return {}
+
+    def _refresh_latest_price(self, asset_type: str):
+        """Rebuilds the prices_latest row for one asset from the prices history."""
+        self._execute_write("DELETE FROM prices_latest WHERE asset_type=?", (asset_type,))
+        self._execute_write("""
+            INSERT INTO prices_latest (
+                asset_type, id, current_price, previous_price,
+                last_update_time, previous_update_time, source
+            )
+            SELECT asset_type, id, current_price, previous_price,
+                   last_update_time, previous_update_time, source
+              FROM prices
+             WHERE asset_type=?
+             ORDER BY last_update_time DESC
+             LIMIT 1
+        """, (asset_type,))
+
     def delete_price(self, price_id: str):
         try:
             self._init_sqlite_if_needed()
-            cursor = self.conn.cursor()
-            cursor.execute("DELETE FROM prices WHERE id=?", (price_id,))
-            self.conn.commit()
+            cursor = self._reader().cursor()
+            cursor.execute("SELECT asset_type FROM prices WHERE id=?", (price_id,))
+            row = cursor.fetchone()
+            cursor.close()
+            with self.batch():
+                self._execute_write("DELETE FROM prices WHERE id=?", (price_id,))
+                if row and row["asset_type"]:
+                    self._refresh_latest_price(row["asset_type"])
+                    self._publish(change_bus.PRICES, {row["asset_type"]})
             self.logger.debug(f"Deleted price row ID={price_id}")
         except sqlite3.Error as e:
             self.logger.error(f"Database error in delete_price: {e}", exc_info=True)
@@ -462,9 +458,311 @@ class DataLocker:
             self.logger.exception(f"Unexpected error in delete_price: {ex}")
             raise
 
+    def clear_prices(self) -> int:
+        """
+        Deletes every price row and the prices_latest mirror in one transaction,
+        so get_latest_price() can't return a cleared price. Returns the number
+        of rows deleted from prices.
+        """
+        try:
+            self._init_sqlite_if_needed()
+            cursor = self._reader().cursor()
+            cursor.execute("SELECT COUNT(*) AS n FROM prices")
+            deleted = cursor.fetchone()["n"]
+            cursor.close()
+            with self.batch():
+                self._execute_write("DELETE FROM prices")
+                self._execute_write("DELETE FROM prices_latest")
+                self._publish(change_bus.PRICES)
+            self.logger.debug(f"Cleared {deleted} price row(s).")
+            return deleted
+        except sqlite3.Error as e:
+            self.logger.error(f"Database error in clear_prices: {e}", exc_info=True)
+            raise
+        except Exception as ex:
+            self.logger.exception(f"Unexpected error in clear_prices: {ex}")
+            raise
+
+    def get_price_points(self, asset_type: str, since_iso: str) -> List[dict]:
+        """Raw (current_price, last_update_time) rows for one asset since a cutoff, oldest first."""
+        try:
+            self._init_sqlite_if_needed()
+            cursor = self._reader().cursor()
+            cursor.execute("""
+                SELECT current_price, last_update_time
+                  FROM prices
+                 WHERE asset_type = ? AND last_update_time >= ?
+                 ORDER BY last_update_time ASC
+            """, (asset_type, since_iso))
+            return [dict(r) for r in cursor.fetchall()]
+        except sqlite3.Error as e:
+            self.logger.error(f"Database error in get_price_points: {e}", exc_info=True)
+            return []
+
+    def iter_price_points(self, asset_type: str, start_iso: str, end_iso: Optional[str] = None,
+                          chunk_size: int = 5000) -> Iterator[dict]:
+        """
+        Yields (current_price, last_update_time) rows for one asset in
+        [start_iso, end_iso], oldest first, reading chunk_size rows at a time
+        (keyset paging on time and rowid), so long ranges never load at once.
+        """
+        self._init_sqlite_if_needed()
+        end_iso = end_iso or datetime.max.isoformat()
+        last_time, last_rowid = start_iso, -1
+        while True:
+            cursor = self._reader().cursor()
+            cursor.execute("""
+                SELECT rowid AS row_id, current_price, last_update_time
+                  FROM prices
+                 WHERE asset_type = ?
+                   AND (last_update_time > ? OR (last_update_time = ? AND rowid > ?))
+                   AND last_update_time <= ?
+                 ORDER BY last_update_time ASC, rowid ASC
+                 LIMIT ?
+            """, (asset_type, last_time, last_time, last_rowid, end_iso, chunk_size))
+            rows = [dict(r) for r in cursor.fetchall()]
+            cursor.close()
+            for row in rows:
+                yield row
+            if len(rows) < chunk_size:
+                return
+            last_time, last_rowid = rows[-1]["last_update_time"], rows[-1]["row_id"]
+
+    # ----------------------------------------------------------------
+    # PRICE BARS (compacted OHLC history)
+    # ----------------------------------------------------------------
+
+    def get_price_compaction_watermark(self) -> int:
+        self._init_sqlite_if_needed()
+        cursor = self._reader().cursor()
+        cursor.execute("SELECT last_rowid FROM price_compaction_state WHERE id = 1")
+        row = cursor.fetchone()
+        cursor.close()
+        return int(row["last_rowid"] or 0) if row else 0
+
+    def set_price_compaction_watermark(self, last_rowid: int):
+        self._execute_write("""
+            INSERT INTO price_compaction_state (id, last_rowid, last_run_time)
+            VALUES (1, ?, ?)
+            ON CONFLICT(id) DO UPDATE SET
+                last_rowid = excluded.last_rowid,
+                last_run_time = excluded.last_run_time
+        """, (last_rowid, datetime.now().isoformat()))
+
+    def get_prices_after_rowid(self, last_rowid: int, limit: int = 5000) -> List[dict]:
+        """Raw price rows inserted after the given rowid, in insertion order."""
+        self._init_sqlite_if_needed()
+        cursor = self._reader().cursor()
+        cursor.execute("""
+            SELECT rowid AS row_id, asset_type, current_price, last_update_time
+              FROM prices
+             WHERE rowid > ?
+             ORDER BY rowid ASC
+             LIMIT ?
+        """, (last_rowid, limit))
+        rows = [dict(r) for r in cursor.fetchall()]
+        cursor.close()
+        return rows
+
+    def upsert_price_bars(self, bars: List[dict]):
+        """
+        Merges partial OHLC bars into price_bars. A bar that already exists keeps
+        the earliest open, the latest close and the running high/low/sample count.
+        """
+        try:
+            with self.batch():
+                for bar in bars:
+                    self._execute_write("""
+                        INSERT INTO price_bars (
+                            asset_type, resolution, bucket_start,
+                            open, high, low, close, open_ts, close_ts, samples
+                        ) VALUES (
+                            :asset_type, :resolution, :bucket_start,
+                            :open, :high, :low, :close, :open_ts, :close_ts, :samples
+                        )
+                        ON CONFLICT(asset_type, resolution, bucket_start) DO UPDATE SET
+                            open = CASE WHEN excluded.open_ts < price_bars.open_ts
+                                        THEN excluded.open ELSE price_bars.open END,
+                            close = CASE WHEN excluded.close_ts >= price_bars.close_ts
+                                         THEN excluded.close ELSE price_bars.close END,
+                            high = MAX(price_bars.high, excluded.high),
+                            low = MIN(price_bars.low, excluded.low),
+                            open_ts = MIN(price_bars.open_ts, excluded.open_ts),
+                            close_ts = MAX(price_bars.close_ts, excluded.close_ts),
+                            samples = price_bars.samples + excluded.samples
+                    """, bar)
+        except Exception as ex:
+            self.logger.exception(f"Error upserting price bars: {ex}")
+            raise
+
+    def get_price_bars(self, asset_type: str, resolution: str, since_ts: float) -> List[dict]:
+        try:
+            self._init_sqlite_if_needed()
+            cursor = self._reader().cursor()
+            cursor.execute("""
+                SELECT bucket_start, open, high, low, close, samples
+                  FROM price_bars
+                 WHERE asset_type = ? AND resolution = ? AND bucket_start >= ?
+                 ORDER BY bucket_start ASC
+            """, (asset_type, resolution, int(since_ts)))
+            return [dict(r) for r in cursor.fetchall()]
+        except sqlite3.Error as e:
+            self.logger.error(f"Database error in get_price_bars: {e}", exc_info=True)
+            return []
+
+    def iter_price_bars(self, asset_type: str, resolution: str, start_ts: float,
+                        end_ts: Optional[float] = None, chunk_size: int = 5000) -> Iterator[dict]:
+        """Like get_price_bars over [start_ts, end_ts], yielded chunk_size bars at a time."""
+        self._init_sqlite_if_needed()
+        last_bucket = int(start_ts) - 1
+        end_bucket = int(end_ts) if end_ts is not None else 2 ** 62
+        while True:
+            cursor = self._reader().cursor()
+            cursor.execute("""
+                SELECT bucket_start, open, high, low, close, samples
+                  FROM price_bars
+                 WHERE asset_type = ? AND resolution = ? AND bucket_start > ? AND bucket_start <= ?
+                 ORDER BY bucket_start ASC
+                 LIMIT ?
+            """, (asset_type, resolution, last_bucket, end_bucket, chunk_size))
+            bars = [dict(r) for r in cursor.fetchall()]
+            cursor.close()
+            for bar in bars:
+                yield bar
+            if len(bars) < chunk_size:
+                return
+            last_bucket = bars[-1]["bucket_start"]
+
+    def prune_prices(self, before_iso: str, max_rowid: int) -> int:
+        """Deletes raw price rows older than before_iso that have already been compacted."""
+        try:
+            return self._execute_write(
+                "DELETE FROM prices WHERE last_update_time < ? AND rowid <= ?",
+                (before_iso, max_rowid)
+            )
+        except Exception as ex:
+            self.logger.exception(f"Error pruning prices: {ex}")
+            raise
+
+    def prune_price_bars(self, resolution: str, before_ts: float) -> int:
+        try:
+            return self._execute_write(
+                "DELETE FROM price_bars WHERE resolution = ? AND bucket_start < ?",
+                (resolution, int(before_ts))
+            )
+        except Exception as ex:
+            self.logger.exception(f"Error pruning {resolution} price bars: {ex}")
+            raise
+
+    # ----------------------------------------------------------------
+    # ASSET STATS (rolling volatility / returns)
+    # ----------------------------------------------------------------
+
+    def upsert_asset_stats(self, stats: dict):
+        """Replaces the rolling statistics row of one asset (see prices/rolling_stats.py)."""
+        self._execute_write("""
+            INSERT INTO asset_stats (
+                asset_type, last_price, last_ts, samples, ewma_variance, volatility,
+                return_1h, return_24h, return_7d, state, updated_at
+            ) VALUES (
+                :asset_type, :last_price, :last_ts, :samples, :ewma_variance, :volatility,
+                :return_1h, :return_24h, :return_7d, :state, :updated_at
+            )
+            ON CONFLICT(asset_type) DO UPDATE SET
+                last_price = excluded.last_price,
+                last_ts = excluded.last_ts,
+                samples = excluded.samples,
+                ewma_variance = excluded.ewma_variance,
+                volatility = excluded.volatility,
+                return_1h = excluded.return_1h,
+                return_24h = excluded.return_24h,
+                return_7d = excluded.return_7d,
+                state = excluded.state,
+                updated_at = excluded.updated_at
+        """, stats)
+
+    def get_asset_stats(self, assets: Optional[List[str]] = None) -> Dict[str, dict]:
+        """{asset_type: stats row} for the given assets (all if None); assets without stats are omitted."""
+        try:
+            self._init_sqlite_if_needed()
+            cursor = self._reader().cursor()
+            if assets is None:
+                cursor.execute("SELECT * FROM asset_stats")
+            else:
+                assets = list(assets)
+                if not assets:
+                    return {}
+                placeholders = ",".join("?" for _ in assets)
+                cursor.execute(f"SELECT * FROM asset_stats WHERE asset_type IN ({placeholders})", assets)
+            rows = {r["asset_type"]: dict(r) for r in cursor.fetchall()}
+            cursor.close()
+            return rows
+        except sqlite3.Error as e:
+            self.logger.error(f"Database error in get_asset_stats: {e}", exc_info=True)
+            return {}
+
+    # ----------------------------------------------------------------
+    # CYCLE METRICS (Cyclone step profiling)
+    # ----------------------------------------------------------------
+
+    def record_cycle_metrics(self, metrics: List[dict]):
+        """Stores one row per step of a Cyclone cycle (see cyclone/cycle_profile.py)."""
+        try:
+            with self.batch():
+                for row in metrics:
+                    self._execute_write("""
+                        INSERT INTO cycle_metrics (
+                            cycle_id, step, started_at, wall_ms, cpu_ms,
+                            queries, rows_read, rows_written, status, on_critical_path
+                        ) VALUES (
+                            :cycle_id, :step, :started_at, :wall_ms, :cpu_ms,
+                            :queries, :rows_read, :rows_written, :status, :on_critical_path
+                        )
+                    """, row)
+        except Exception as ex:
+            self.logger.exception(f"Error recording cycle metrics: {ex}")
+            raise
+
+    def get_cycle_metrics(self, last_n_cycles: int = 50) -> List[dict]:
+        """Step rows for the most recent `last_n_cycles` cycles, newest cycle first."""
+        try:
+            self._init_sqlite_if_needed()
+            cursor = self._reader().cursor()
+            cursor.execute("""
+                SELECT m.*
+                  FROM cycle_metrics m
+                  JOIN (SELECT cycle_id, MIN(started_at) AS cycle_start
+                          FROM cycle_metrics
+                         GROUP BY cycle_id
+                         ORDER BY cycle_start DESC
+                         LIMIT ?) recent
+                    ON recent.cycle_id = m.cycle_id
+                 ORDER BY recent.cycle_start DESC, m.started_at ASC
+            """, (last_n_cycles,))
+            return [dict(r) for r in cursor.fetchall()]
+        except sqlite3.Error as e:
+            self.logger.error(f"Database error in get_cycle_metrics: {e}", exc_info=True)
+            return []
+
+    def prune_cycle_metrics(self, keep_cycles: int) -> int:
+        """Deletes metrics for all but the newest `keep_cycles` cycles."""
+        try:
+            return self._execute_write("""
+                DELETE FROM cycle_metrics
+                 WHERE cycle_id NOT IN (
+                    SELECT cycle_id FROM cycle_metrics
+                     GROUP BY cycle_id
+                     ORDER BY MIN(started_at) DESC
+                     LIMIT ?
+                 )
+            """, (keep_cycles,))
+        except Exception as ex:
+            self.logger.exception(f"Error pruning cycle metrics: {ex}")
+            raise
+
     def get_portfolio_history(self) -> List[dict]:
         self._init_sqlite_if_needed()
-        cursor = self.conn.cursor()
+        cursor = self._reader().cursor()
         cursor.execute("""
             SELECT *
               FROM positions_totals_history
@@ -477,7 +775,7 @@ class DataLocker:
 
     def get_latest_portfolio_snapshot(self) -> Optional[dict]:
         self._init_sqlite_if_needed()
-        cursor = self.conn.cursor()
+        cursor = self._reader().cursor()
         cursor.execute("""
             SELECT *
               FROM positions_totals_history
@@ -585,7 +883,6 @@ class DataLocker:
             self.logger.debug(f"Final alert_dict to insert: {alert_dict}")
 
             # Insert alert into the database with updated column names.
-            cursor = self.conn.cursor()
             sql = """
                 INSERT INTO alerts (
                     id,
@@ -633,8 +930,8 @@ class DataLocker:
             """
             print(f"[DEBUG] Executing SQL: {sql}")
             self.logger.debug(f"Executing SQL for alert creation: {sql}")
-            cursor.execute(sql, alert_dict)
-            self.conn.commit()
+            self._execute_write(sql, alert_dict)
+            self._publish(change_bus.ALERTS, {alert_dict["id"]})
             print(f"[DEBUG] Alert inserted successfully with ID: {alert_dict['id']}")
             self.logger.debug(f"Alert inserted successfully with ID: {alert_dict['id']}")
 
@@ -654,7 +951,7 @@ class DataLocker:
             raise
 
     def get_alert(self, alert_id: str) -> Optional[dict]:
-        cursor = self.conn.cursor()
+        cursor = self._reader().cursor()
         cursor.execute("SELECT * FROM alerts WHERE id=?", (alert_id,))
         row = cursor.fetchone()
         cursor.close()
@@ -664,15 +961,13 @@ class DataLocker:
 
     def update_alert_conditions(self, alert_id: str, update_fields: dict) -> int:
         try:
-            cursor = self.conn.cursor()
             set_clause = ", ".join(f"{key}=?" for key in update_fields.keys())
             values = list(update_fields.values())
             values.append(alert_id)
             sql = f"UPDATE alerts SET {set_clause} WHERE id=?"
             self.logger.debug("Executing SQL: %s with values: %s", sql, values)
-            cursor.execute(sql, values)
-            self.conn.commit()
-            num_updated = cursor.rowcount
+            num_updated = self._execute_write(sql, values)
+            self._publish(change_bus.ALERTS, {alert_id})
             self.logger.info("Alert %s updated, rows affected: %s", alert_id, num_updated)
             return num_updated
         except Exception as ex:
@@ -682,7 +977,7 @@ class DataLocker:
     def get_alerts(self) -> List[dict]:
         try:
             self._init_sqlite_if_needed()
-            cursor = self.conn.cursor()
+            cursor = self._reader().cursor()
             cursor.execute("SELECT * FROM alerts")
             rows = cursor.fetchall()
             alert_list = [dict(r) for r in rows]
@@ -698,13 +993,12 @@ class DataLocker:
     def update_alert_status(self, alert_id: str, new_status: str):
         try:
             self._init_sqlite_if_needed()
-            cursor = self.conn.cursor()
-            cursor.execute("""
+            self._execute_write("""
                 UPDATE alerts
                    SET status=?
                  WHERE id=?
             """, (new_status, alert_id))
-            self.conn.commit()
+            self._publish(change_bus.ALERTS, {alert_id})
             self.logger.debug(f"Alert {alert_id} => status={new_status}")
         except sqlite3.Error as e:
             self.logger.error(f"DB error update_alert_status: {e}", exc_info=True)
@@ -717,9 +1011,8 @@ class DataLocker:
         try:
             self._init_sqlite_if_needed()
             self.logger.debug(f"Preparing to delete alert with id: {alert_id}")
-            cursor = self.conn.cursor()
-            cursor.execute("DELETE FROM alerts WHERE id=?", (alert_id,))
-            self.conn.commit()
+            self._execute_write("DELETE FROM alerts WHERE id=?", (alert_id,))
+            self._publish(change_bus.ALERTS, {alert_id})
             self.logger.debug(f"Deleted alert with id: {alert_id} successfully.")
         except sqlite3.Error as e:
             self.logger.error(f"SQLite error while deleting alert {alert_id}: {e}", exc_info=True)
@@ -728,6 +1021,73 @@ class DataLocker:
             self.logger.exception(f"Unexpected error while deleting alert {alert_id}: {ex}")
             raise
 
+    def clear_alerts(self) -> int:
+        try:
+            self._init_sqlite_if_needed()
+            deleted = self._execute_write("DELETE FROM alerts")
+            self._publish(change_bus.ALERTS)
+            self.logger.debug("Deleted all alerts.")
+            return deleted
+        except Exception as ex:
+            self.logger.exception(f"Error in clear_alerts: {ex}")
+            raise
+
+    def clear_alert_ledger(self) -> int:
+        self._init_sqlite_if_needed()
+        return self._execute_write("DELETE FROM alert_ledger")
+
+    def get_position_alert_types(self) -> set:
+        """(position_reference_id, alert_type) for every position alert that exists."""
+        self._init_sqlite_if_needed()
+        cursor = self._reader().cursor()
+        cursor.execute("""
+            SELECT DISTINCT position_reference_id, alert_type
+              FROM alerts
+             WHERE position_reference_id IS NOT NULL
+        """)
+        pairs = {(row["position_reference_id"], row["alert_type"]) for row in cursor.fetchall()}
+        cursor.close()
+        return pairs
+
+    def has_market_alert(self, asset_type: str, alert_type: str) -> bool:
+        """True if a non-position alert of this type already exists for the asset."""
+        self._init_sqlite_if_needed()
+        cursor = self._reader().cursor()
+        cursor.execute("""
+            SELECT 1 FROM alerts
+             WHERE asset_type = ? AND alert_type = ? AND position_reference_id IS NULL
+             LIMIT 1
+        """, (asset_type, alert_type))
+        row = cursor.fetchone()
+        cursor.close()
+        return row is not None
+
+    def delete_alerts_for_positions(self, position_ids: List[str]) -> int:
+        """Deletes the alerts (and alert mappings) of the given positions in one transaction."""
+        if not position_ids:
+            return 0
+        placeholders = ",".join("?" for _ in position_ids)
+        try:
+            cursor = self._reader().cursor()
+            cursor.execute(
+                f"SELECT id FROM alerts WHERE position_reference_id IN ({placeholders})",
+                list(position_ids)
+            )
+            alert_ids = [row["id"] for row in cursor.fetchall()]
+            cursor.close()
+            with self.batch():
+                self._execute_write(
+                    f"DELETE FROM alerts WHERE position_reference_id IN ({placeholders})", list(position_ids)
+                )
+                self._execute_write(
+                    f"DELETE FROM position_alert_map WHERE position_id IN ({placeholders})", list(position_ids)
+                )
+                self._publish(change_bus.ALERTS, alert_ids)
+            return len(alert_ids)
+        except Exception as ex:
+            self.logger.exception(f"Error deleting alerts for positions: {ex}")
+            raise
+
     # ----------------------------------------------------------------
     # Insert/Update Price
     # ----------------------------------------------------------------
@@ -751,15 +1111,23 @@ class DataLocker:
     def update_price(self, price_id: str, current_price: float, last_update_time: str) -> int:
         try:
             self._init_sqlite_if_needed()
-            cursor = self.conn.cursor()
-            cursor.execute(
-                "UPDATE prices SET current_price = ?, last_update_time = ? WHERE id = ?",
-                (current_price, last_update_time, price_id)
-            )
-            self.conn.commit()
+            cursor = self._reader().cursor()
+            cursor.execute("SELECT asset_type FROM prices WHERE id = ?", (price_id,))
+            row = cursor.fetchone()
+            cursor.close()
+            if not row:
+                return 0
+            with self.batch():
+                self._execute_write(
+                    "UPDATE prices SET current_price = ?, last_update_time = ? WHERE id = ?",
+                    (current_price, last_update_time, price_id)
+                )
+                if row["asset_type"]:
+                    self._refresh_latest_price(row["asset_type"])
+                    self._publish(change_bus.PRICES, {row["asset_type"]})
             self.logger.debug(
                 f"Updated price {price_id}: current_price={current_price}, last_update_time={last_update_time}")
-            return cursor.rowcount
+            return 1
         except Exception as ex:
             self.logger.exception(f"Error updating price {price_id}: {ex}")
             raise
@@ -768,7 +1136,8 @@ class DataLocker:
     # POSITIONS
     # ----------------------------------------------------------------
 
-    def create_position(self, pos_dict: dict):
+    @staticmethod
+    def _apply_position_defaults(pos_dict: dict) -> dict:
         if "id" not in pos_dict:
             pos_dict["id"] = str(uuid4())
         pos_dict.setdefault("asset_type", "BTC")
@@ -789,10 +1158,12 @@ class DataLocker:
         pos_dict.setdefault("heat_index", 0.0)
         pos_dict.setdefault("current_heat_index", 0.0)
         pos_dict.setdefault("pnl_after_fees_usd", 0.0)
+        return pos_dict
+
+    def create_position(self, pos_dict: dict):
+        self._apply_position_defaults(pos_dict)
         try:
-            self._init_sqlite_if_needed()
-            cursor = self.conn.cursor()
-            cursor.execute("""
+            self._execute_write("""
                 INSERT INTO positions (
                     id, asset_type, position_type,
                     entry_price, liquidation_price, travel_percent,
@@ -809,17 +1180,21 @@ class DataLocker:
                     :pnl_after_fees_usd
                 )
             """, pos_dict)
-            self.conn.commit()
+            self._publish(change_bus.POSITIONS, {pos_dict["id"]})
             self.logger.debug(f"Created position ID={pos_dict['id']}")
         except Exception as ex:
             self.logger.exception(f"Error creating position: {ex}")
             raise
 
-    def get_positions(self) -> List[dict]:
+    def get_positions(self, include_closed: bool = False) -> List[dict]:
+        """Open positions; pass include_closed=True to also get ones the sync marked CLOSED."""
         try:
             self._init_sqlite_if_needed()
-            cursor = self.conn.cursor()
-            cursor.execute("SELECT * FROM positions")
+            cursor = self._reader().cursor()
+            if include_closed:
+                cursor.execute("SELECT * FROM positions")
+            else:
+                cursor.execute(f"SELECT * FROM positions WHERE {self._OPEN_POSITION_FILTER}")
             rows = cursor.fetchall()
             results = [dict(r) for r in rows]
             self.logger.debug(f"Fetched {len(results)} positions.")
@@ -834,12 +1209,136 @@ class DataLocker:
     def read_positions(self) -> List[dict]:
         return self.get_positions()
 
+    def close_positions(self, position_ids: List[str]) -> int:
+        """Marks positions CLOSED (they no longer exist upstream) in one transaction."""
+        closed_at = datetime.now().isoformat()
+        try:
+            with self.batch():
+                for position_id in position_ids:
+                    self._execute_write(
+                        "UPDATE positions SET status = 'CLOSED', closed_at = ? WHERE id = ?",
+                        (closed_at, position_id)
+                    )
+                self._publish(change_bus.POSITIONS, position_ids)
+            self.logger.debug(f"Closed {len(position_ids)} positions.")
+            return len(position_ids)
+        except Exception as ex:
+            self.logger.exception(f"Error closing positions: {ex}")
+            raise
+
+    @classmethod
+    def position_content_hash(cls, pos_dict: dict) -> str:
+        """Stable hash of the POSITION_SYNC_FIELDS values of a position."""
+        values = [pos_dict.get(field) for field in cls.POSITION_SYNC_FIELDS]
+        return hashlib.sha1(json.dumps(values, default=str).encode("utf-8")).hexdigest()
+
+    def _position_hashes(self, position_ids: List[str]) -> Dict[str, dict]:
+        """{id: {"content_hash", "status"}} for the given IDs that exist."""
+        found = {}
+        cursor = self._reader().cursor()
+        try:
+            for start in range(0, len(position_ids), self._IN_CHUNK):
+                chunk = position_ids[start:start + self._IN_CHUNK]
+                placeholders = ",".join("?" for _ in chunk)
+                cursor.execute(
+                    f"SELECT id, content_hash, status FROM positions WHERE id IN ({placeholders})", chunk
+                )
+                for row in cursor.fetchall():
+                    found[row["id"]] = {"content_hash": row["content_hash"], "status": row["status"]}
+        finally:
+            cursor.close()
+        return found
+
+    def upsert_positions(self, rows: List[dict]) -> dict:
+        """
+        Bulk insert-or-update of imported positions in one transaction.
+
+        Each row's POSITION_SYNC_FIELDS are hashed; existing rows are only
+        rewritten when the hash differs (or the row was CLOSED, which reopens
+        it). Enrichment columns of existing rows are never touched.
+
+        Returns {"inserted", "updated", "unchanged"} counts plus the matching
+        "inserted_ids", "updated_ids" and "reopened_ids".
+        """
+        self._init_sqlite_if_needed()
+        prepared = {}
+        for row in rows:
+            # Hash what the feed sent, before defaults (a defaulted last_updated changes every call).
+            content_hash = self.position_content_hash(row)
+            pos = self._apply_position_defaults(dict(row))
+            pos["content_hash"] = content_hash
+            # The last copy of a duplicated ID wins.
+            prepared[pos["id"]] = pos
+
+        existing = self._position_hashes(list(prepared))
+        inserted_ids, updated_ids, reopened_ids = [], [], []
+        to_write = []
+        for pid, pos in prepared.items():
+            current = existing.get(pid)
+            if current is None:
+                inserted_ids.append(pid)
+            elif current["status"] == "CLOSED":
+                reopened_ids.append(pid)
+                updated_ids.append(pid)
+            elif current["content_hash"] != pos["content_hash"]:
+                updated_ids.append(pid)
+            else:
+                continue
+            to_write.append(pos)
+
+        update_sets = ", ".join(f"{field} = excluded.{field}" for field in self.POSITION_SYNC_FIELDS)
+        sql = f"""
+            INSERT INTO positions (
+                id, asset_type, position_type,
+                entry_price, liquidation_price, travel_percent,
+                value, collateral, size, wallet_name, leverage, last_updated,
+                alert_reference_id, hedge_buddy_id, current_price,
+                liquidation_distance, heat_index, current_heat_index,
+                pnl_after_fees_usd, content_hash
+            ) VALUES (
+                :id, :asset_type, :position_type,
+                :entry_price, :liquidation_price, :travel_percent,
+                :value, :collateral, :size, :wallet_name, :leverage, :last_updated,
+                :alert_reference_id, :hedge_buddy_id, :current_price,
+                :liquidation_distance, :heat_index, :current_heat_index,
+                :pnl_after_fees_usd, :content_hash
+            )
+            ON CONFLICT(id) DO UPDATE SET
+                {update_sets},
+                content_hash = excluded.content_hash,
+                status = 'OPEN',
+                closed_at = NULL
+            WHERE positions.content_hash IS NOT excluded.content_hash
+               OR COALESCE(positions.status, 'OPEN') = 'CLOSED'
+        """
+        try:
+            with self.batch():
+                for pos in to_write:
+                    self._execute_write(sql, pos)
+                self._publish(change_bus.POSITIONS, [pos["id"] for pos in to_write])
+        except Exception as ex:
+            self.logger.exception(f"Error upserting positions: {ex}")
+            raise
+
+        result = {
+            "inserted": len(inserted_ids),
+            "updated": len(updated_ids),
+            "unchanged": len(prepared) - len(to_write),
+            "inserted_ids": inserted_ids,
+            "updated_ids": updated_ids,
+            "reopened_ids": reopened_ids,
+        }
+        self.logger.debug(
+            f"Upserted positions: {result['inserted']} inserted, {result['updated']} updated, "
+            f"{result['unchanged']} unchanged."
+        )
+        return result
+
     def delete_position(self, position_id: str):
         try:
             self._init_sqlite_if_needed()
-            cursor = self.conn.cursor()
-            cursor.execute("DELETE FROM positions WHERE id=?", (position_id,))
-            self.conn.commit()
+            self._execute_write("DELETE FROM positions WHERE id=?", (position_id,))
+            self._publish(change_bus.POSITIONS, {position_id})
             self.logger.debug(f"Deleted position ID={position_id}")
         except sqlite3.Error as e:
             self.logger.error(f"DB error delete_position: {e}", exc_info=True)
@@ -848,17 +1347,33 @@ class DataLocker:
             self.logger.exception(f"Error delete_position: {ex}")
             raise
 
-    def delete_all_positions(self):
+    def delete_all_positions(self) -> int:
         try:
             self._init_sqlite_if_needed()
-            cursor = self.conn.cursor()
-            cursor.execute("DELETE FROM positions")
-            self.conn.commit()
+            deleted = self._execute_write("DELETE FROM positions")
+            self._publish(change_bus.POSITIONS)
             self.logger.debug("Deleted all positions.")
+            return deleted
         except Exception as ex:
             self.logger.exception(f"Error in delete_all_positions: {ex}")
             raise
 
+    def clear_hedge_links(self, position_id: Optional[str] = None) -> int:
+        """Resets hedge_buddy_id on every position, or only on those pointing at position_id."""
+        try:
+            self._init_sqlite_if_needed()
+            if position_id is None:
+                cleared = self._execute_write(
+                    "UPDATE positions SET hedge_buddy_id = NULL WHERE hedge_buddy_id IS NOT NULL")
+            else:
+                cleared = self._execute_write(
+                    "UPDATE positions SET hedge_buddy_id = NULL WHERE hedge_buddy_id = ?", (position_id,))
+            self._publish(change_bus.POSITIONS)
+            return cleared
+        except Exception as ex:
+            self.logger.exception(f"Error in clear_hedge_links: {ex}")
+            raise
+
     # ----------------------------------------------------------------
     # GET / SET last update times (system_vars table)
     # ----------------------------------------------------------------
@@ -869,9 +1384,8 @@ class DataLocker:
         new_prices_dt = prices_dt.isoformat() if prices_dt else current.get("last_update_time_prices", None)
         new_jupiter_dt = jupiter_dt.isoformat() if jupiter_dt else current.get("last_update_time_jupiter", None)
 
-        cursor = self.conn.cursor()
         if current:
-            cursor.execute("""
+            self._execute_write("""
                 UPDATE system_vars
                    SET last_update_time_positions = ?,
                        last_update_positions_source = ?,
@@ -881,17 +1395,15 @@ class DataLocker:
                  WHERE id = 1
             """, (new_positions_dt, positions_source, new_prices_dt, prices_source, new_jupiter_dt))
         else:
-            cursor.execute("""
+            self._execute_write("""
                 INSERT INTO system_vars 
                     (id, last_update_time_positions, last_update_positions_source,
                      last_update_time_prices, last_update_prices_source, last_update_time_jupiter)
                 VALUES (1, ?, ?, ?, ?, ?)
             """, (new_positions_dt, positions_source, new_prices_dt, prices_source, new_jupiter_dt))
-        self.conn.commit()
-        cursor.close()
 
     def get_last_update_times(self):
-        cursor = self.conn.cursor()
+        cursor = self._reader().cursor()
         cursor.execute("""
             SELECT last_update_time_positions, last_update_positions_source,
                    last_update_time_prices, last_update_prices_source,
@@ -913,7 +1425,7 @@ class DataLocker:
 
     def read_wallets(self) -> List[dict]:
         self._init_sqlite_if_needed()
-        cursor = self.conn.cursor()
+        cursor = self._reader().cursor()
         cursor.execute("SELECT * FROM wallets")
         rows = cursor.fetchall()
         results = []
@@ -938,8 +1450,7 @@ class DataLocker:
                    balance = ?
              WHERE name = ?
         """
-        cursor = self.conn.cursor()
-        cursor.execute(query, (
+        self._execute_write(query, (
             wallet_dict.get("name"),
             wallet_dict.get("public_address"),
             wallet_dict.get("private_address"),
@@ -947,37 +1458,49 @@ class DataLocker:
             wallet_dict.get("balance"),
             wallet_name
         ))
-        self.conn.commit()
 
     def delete_positions_for_wallet(self, wallet_name: str):
         self._init_sqlite_if_needed()
         self.logger.info(f"Deleting positions for wallet: {wallet_name}")
-        cursor = self.conn.cursor()
-        cursor.execute("DELETE FROM positions WHERE wallet_name IS NOT NULL")
-        self.conn.commit()
-        cursor.close()
+        self._execute_write("DELETE FROM positions WHERE wallet_name IS NOT NULL")
+        self._publish(change_bus.POSITIONS)
 
     def update_position(self, position_id: str, size: float, collateral: float):
         try:
             self._init_sqlite_if_needed()
-            cursor = self.conn.cursor()
             query = """
             UPDATE positions
                SET size=?,
-                   collateral=?
+                   collateral=?,
+                   content_hash=NULL
              WHERE id=?
             """
-            cursor.execute(query, (size, collateral, position_id))
-            self.conn.commit()
+            self._execute_write(query, (size, collateral, position_id))
+            self._publish(change_bus.POSITIONS, {position_id})
         except Exception as ex:
             self.logger.exception(f"Error updating position {position_id}: {ex}")
             raise
 
+    def update_position_fields(self, position_id: str, update_fields: dict) -> int:
+        try:
+            if "content_hash" not in update_fields and any(f in update_fields for f in self.POSITION_SYNC_FIELDS):
+                # A hand edit of an imported field: let the next import rewrite the row.
+                update_fields = {**update_fields, "content_hash": None}
+            set_clause = ", ".join(f"{key}=?" for key in update_fields.keys())
+            values = list(update_fields.values())
+            values.append(position_id)
+            sql = f"UPDATE positions SET {set_clause} WHERE id=?"
+            updated = self._execute_write(sql, values)
+            self._publish(change_bus.POSITIONS, {position_id})
+            return updated
+        except Exception as ex:
+            self.logger.exception(f"Error updating fields for position {position_id}: {ex}")
+            raise
+
     def create_wallet(self, wallet_dict: dict):
         try:
             self._init_sqlite_if_needed()
-            cursor = self.conn.cursor()
-            cursor.execute("""
+            self._execute_write("""
                 INSERT INTO wallets (name, public_address, private_address, image_path, balance)
                 VALUES (?,?,?,?,?)
             """, (
@@ -987,16 +1510,24 @@ class DataLocker:
                 wallet_dict.get("image_path"),
                 wallet_dict.get("balance", 0.0)
             ))
-            self.conn.commit()
         except Exception as ex:
             self.logger.exception(f"Error creating wallet: {ex}")
             raise
 
+    def delete_wallet(self, wallet_name: str) -> int:
+        self._init_sqlite_if_needed()
+        deleted = self._execute_write("DELETE FROM wallets WHERE name=?", (wallet_name,))
+        self.logger.debug(f"Deleted wallet {wallet_name}")
+        return deleted
+
+    def clear_wallets(self) -> int:
+        self._init_sqlite_if_needed()
+        return self._execute_write("DELETE FROM wallets")
+
     def create_broker(self, broker_dict: dict):
         self._init_sqlite_if_needed()
         try:
-            cursor = self.conn.cursor()
-            cursor.execute("""
+            self._execute_write("""
                 INSERT OR REPLACE INTO brokers (name, image_path, web_address, total_holding)
                 VALUES (?,?,?,?)
             """, (
@@ -1005,14 +1536,13 @@ class DataLocker:
                 broker_dict.get("web_address"),
                 broker_dict.get("total_holding", 0.0)
             ))
-            self.conn.commit()
         except sqlite3.Error as ex:
             self.logger.error(f"DB error create_broker: {ex}", exc_info=True)
             raise
 
     def read_brokers(self) -> List[dict]:
         self._init_sqlite_if_needed()
-        cursor = self.conn.cursor()
+        cursor = self._reader().cursor()
         cursor.execute("SELECT * FROM brokers")
         rows = cursor.fetchall()
         results = []
@@ -1030,8 +1560,8 @@ class DataLocker:
         results: List[Dict] = []
         try:
             self.logger.debug("Reading positions raw...")
-            cursor = self.conn.cursor()
-            cursor.execute("SELECT * FROM positions")
+            cursor = self._reader().cursor()
+            cursor.execute(f"SELECT * FROM positions WHERE {self._OPEN_POSITION_FILTER}")
             rows = cursor.fetchall()
             for row in rows:
                 results.append(dict(row))
@@ -1046,8 +1576,7 @@ class DataLocker:
             self._init_sqlite_if_needed()
             snapshot_id = str(uuid4())
             snapshot_time = datetime.now().isoformat()
-            cursor = self.conn.cursor()
-            cursor.execute("""
+            self._execute_write("""
                 INSERT INTO positions_totals_history (
                     id, snapshot_time, total_size, total_value, total_collateral,
                     avg_leverage, avg_travel_percent, avg_heat_index
@@ -1062,7 +1591,6 @@ class DataLocker:
                 totals.get("avg_travel_percent", 0.0),
                 totals.get("avg_heat_index", 0.0)
             ))
-            self.conn.commit()
             self.logger.debug(f"Recorded positions totals snapshot with ID={snapshot_id}.")
         except Exception as e:
             self.logger.exception(f"Error recording positions totals snapshot: {e}")
@@ -1070,14 +1598,12 @@ class DataLocker:
 
     def update_position_size(self, position_id: str, new_size: float):
         try:
-            self._init_sqlite_if_needed()
-            cursor = self.conn.cursor()
-            cursor.execute("""
+            self._execute_write("""
                 UPDATE positions
                    SET size=?
                  WHERE id=?
             """, (new_size, position_id))
-            self.conn.commit()
+            self._publish(change_bus.POSITIONS, {position_id})
             self.logger.debug(f"Updated position {position_id} => size={new_size}")
         except sqlite3.Error as ex:
             self.logger.error(f"DB error in update_position_size: {ex}", exc_info=True)
@@ -1115,17 +1641,15 @@ class DataLocker:
             entry["snapshot_time"] = datetime.now().isoformat()
         if "total_value" not in entry:
             raise ValueError("total_value is required for a portfolio entry")
-        cursor = self.conn.cursor()
-        cursor.execute("""
+        self._execute_write("""
              INSERT INTO portfolio_entries (id, snapshot_time, total_value)
              VALUES (:id, :snapshot_time, :total_value)
          """, entry)
-        self.conn.commit()
         self.logger.debug(f"Inserted portfolio entry with ID={entry['id']}")
 
     def get_portfolio_entries(self) -> List[dict]:
         self._init_sqlite_if_needed()
-        cursor = self.conn.cursor()
+        cursor = self._reader().cursor()
         cursor.execute("""
              SELECT * FROM portfolio_entries
              ORDER BY snapshot_time ASC
@@ -1137,7 +1661,7 @@ class DataLocker:
 
     def get_portfolio_entry_by_id(self, entry_id: str) -> Optional[dict]:
         self._init_sqlite_if_needed()
-        cursor = self.conn.cursor()
+        cursor = self._reader().cursor()
         cursor.execute("""
              SELECT * FROM portfolio_entries
              WHERE id = ?
@@ -1150,28 +1674,24 @@ class DataLocker:
         self._init_sqlite_if_needed()
         set_clause = ", ".join([f"{key}=:{key}" for key in updated_fields.keys()])
         updated_fields["id"] = entry_id
-        cursor = self.conn.cursor()
-        cursor.execute(f"""
+        self._execute_write(f"""
              UPDATE portfolio_entries
                 SET {set_clause}
               WHERE id=:id
          """, updated_fields)
-        self.conn.commit()
         self.logger.debug(f"Updated portfolio entry {entry_id} with fields {updated_fields}")
 
     def delete_portfolio_entry(self, entry_id: str):
         self._init_sqlite_if_needed()
-        cursor = self.conn.cursor()
-        cursor.execute("""
+        self._execute_write("""
              DELETE FROM portfolio_entries
              WHERE id = ?
          """, (entry_id,))
-        self.conn.commit()
         self.logger.debug(f"Deleted portfolio entry with ID={entry_id}")
 
     def get_wallet_by_name(self, wallet_name: str) -> Optional[dict]:
         self._init_sqlite_if_needed()
-        cursor = self.conn.cursor()
+        cursor = self._reader().cursor()
         cursor.execute("""
             SELECT name,
                    public_address,
@@ -1194,6 +1714,8 @@ class DataLocker:
         }
 
     def close(self):
-        if self.conn:
-            self.conn.close()
-            self.logger.debug("Database connection closed.")
+        if self._pool:
+            self._pool.close()
+            self._pool = None
+            self.conn = None
+            self.logger.debug("Database connections closed.")
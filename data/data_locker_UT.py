@@ -0,0 +1,391 @@
+import asyncio
+import os
+import sqlite3
+import tempfile
+import threading
+import unittest
+from data.data_locker import DataLocker
+from data.async_data_locker import AsyncDataLocker
+from data import change_bus
+from data.migrations import SCHEMA_VERSION, apply_migrations, get_schema_version
+from data.query_stats import QueryStats, track
+
+
+class TestDataLockerBatch(unittest.TestCase):
+    def setUp(self):
+        # Use an in-memory SQLite DB; reset the DataLocker singleton.
+        DataLocker._instance = None
+        self.dl = DataLocker(":memory:")
+
+    def tearDown(self):
+        self.dl.close()
+        DataLocker._instance = None
+
+    def test_batch_flushes_on_exit(self):
+        with self.dl.batch():
+            for price in (100.0, 101.0, 102.0):
+                self.dl.insert_or_update_price("BTC", price, "Test")
+            self.assertTrue(self.dl.in_batch())
+            # Queued writes are not visible until the batch is flushed.
+            self.assertEqual(self.dl.get_prices("BTC"), [])
+        self.assertFalse(self.dl.in_batch())
+        self.assertEqual(len(self.dl.get_prices("BTC")), 3)
+
+    def test_batch_discards_on_error(self):
+        with self.assertRaises(RuntimeError):
+            with self.dl.batch():
+                self.dl.insert_or_update_price("ETH", 2000.0, "Test")
+                raise RuntimeError("boom")
+        self.assertEqual(self.dl.get_prices("ETH"), [])
+
+    def test_nested_batch_joins_outer(self):
+        self.dl.create_position({"id": "pos1", "size": 1.0})
+        with self.dl.batch():
+            self.dl.update_position_size("pos1", 2.0)
+            with self.dl.batch():
+                self.dl.update_position_fields("pos1", {"collateral": 5.0})
+            self.assertEqual(self.dl.get_positions()[0]["size"], 1.0)
+        position = self.dl.get_positions()[0]
+        self.assertEqual(position["size"], 2.0)
+        self.assertEqual(position["collateral"], 5.0)
+
+    def test_writes_outside_batch_commit_immediately(self):
+        self.dl.insert_or_update_price("SOL", 150.0, "Test")
+        self.assertEqual(self.dl.get_latest_price("SOL")["current_price"], 150.0)
+
+
+class TestDataLockerLatestPrices(unittest.TestCase):
+    def setUp(self):
+        DataLocker._instance = None
+        self.dl = DataLocker(":memory:")
+
+    def tearDown(self):
+        self.dl.close()
+        DataLocker._instance = None
+
+    def test_latest_price_tracks_newest_timestamp(self):
+        self.dl.insert_price({"asset_type": "BTC", "current_price": 2.0, "last_update_time": "2024-01-02T00:00:00"})
+        # An older row arriving late must not replace the newer one.
+        self.dl.insert_price({"asset_type": "BTC", "current_price": 1.0, "last_update_time": "2024-01-01T00:00:00"})
+        self.assertEqual(self.dl.get_latest_price("BTC")["current_price"], 2.0)
+
+    def test_get_latest_prices_bulk(self):
+        self.dl.insert_or_update_price("BTC", 100.0, "Test")
+        self.dl.insert_or_update_price("ETH", 10.0, "Test")
+        latest = self.dl.get_latest_prices(["BTC", "ETH", "SOL"])
+        self.assertEqual(set(latest), {"BTC", "ETH"})
+        self.assertEqual(latest["ETH"]["current_price"], 10.0)
+
+    def test_delete_price_falls_back_to_previous(self):
+        self.dl.insert_price({"id": "old", "asset_type": "SOL", "current_price": 1.0,
+                              "last_update_time": "2024-01-01T00:00:00"})
+        self.dl.insert_price({"id": "new", "asset_type": "SOL", "current_price": 2.0,
+                              "last_update_time": "2024-01-02T00:00:00"})
+        self.dl.delete_price("new")
+        self.assertEqual(self.dl.get_latest_price("SOL")["id"], "old")
+
+    def test_clear_prices_clears_latest(self):
+        self.dl.insert_or_update_price("BTC", 100.0, "Test")
+        self.dl.insert_or_update_price("ETH", 10.0, "Test")
+        self.assertEqual(self.dl.clear_prices(), 2)
+        self.assertIsNone(self.dl.get_latest_price("BTC"))
+        self.assertEqual(self.dl.get_latest_prices(["BTC", "ETH"]), {})
+
+
+
+class TestDataLockerMigrations(unittest.TestCase):
+    def setUp(self):
+        DataLocker._instance = None
+        self.dl = DataLocker(":memory:")
+
+    def tearDown(self):
+        self.dl.close()
+        DataLocker._instance = None
+
+    def test_fresh_database_is_at_latest_version(self):
+        self.assertEqual(get_schema_version(self.dl.conn), SCHEMA_VERSION)
+
+    def test_migrations_are_not_reapplied(self):
+        self.dl.conn.execute("DROP INDEX idx_prices_asset_time")
+        self.assertEqual(apply_migrations(self.dl.conn), SCHEMA_VERSION)
+        names = [row[0] for row in self.dl.conn.execute("SELECT name FROM sqlite_master WHERE type='index'")]
+        self.assertNotIn("idx_prices_asset_time", names)
+
+
+
+class TestDataLockerConnectionPool(unittest.TestCase):
+    def setUp(self):
+        DataLocker._instance = None
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.dl = DataLocker(os.path.join(self.tmp_dir.name, "pool.db"))
+
+    def tearDown(self):
+        self.dl.close()
+        DataLocker._instance = None
+        self.tmp_dir.cleanup()
+
+    def test_reader_connections_are_per_thread_and_read_only(self):
+        main_reader = self.dl._reader()
+        seen = {}
+
+        def worker():
+            seen["reader"] = self.dl._reader()
+            seen["price"] = self.dl.get_latest_price("BTC")
+
+        self.dl.insert_or_update_price("BTC", 100.0, "Test")
+        thread = threading.Thread(target=worker)
+        thread.start()
+        thread.join()
+        self.assertIsNot(seen["reader"], main_reader)
+        self.assertIsNot(main_reader, self.dl.conn)
+        self.assertEqual(seen["price"]["current_price"], 100.0)
+        with self.assertRaises(sqlite3.OperationalError):
+            main_reader.execute("DELETE FROM prices")
+
+    def test_writes_are_counted(self):
+        self.dl.insert_or_update_price("ETH", 10.0, "Test")
+        stats = self.dl.get_pool_stats()
+        self.assertGreaterEqual(stats["writes"], 1)
+        self.assertIn("write_wait_total_ms", stats)
+
+    def test_execute_write_joins_open_batch(self):
+        self.dl.create_wallet({"name": "w1"})
+        with self.dl.batch():
+            self.dl.execute_write("UPDATE wallets SET balance=? WHERE name=?", (5.0, "w1"))
+            self.assertEqual(self.dl.get_wallet_by_name("w1")["balance"], 0.0)
+        self.assertEqual(self.dl.get_wallet_by_name("w1")["balance"], 5.0)
+
+    def test_failed_write_is_rolled_back(self):
+        self.dl.create_wallet({"name": "w1"})
+        with self.assertRaises(sqlite3.Error):
+            self.dl.execute_write("INSERT INTO no_such_table VALUES (1)")
+        self.assertFalse(self.dl.conn.in_transaction)
+
+    def test_clear_helpers(self):
+        self.dl.create_position({"id": "a", "size": 1.0})
+        self.dl.create_position({"id": "b", "size": 1.0})
+        self.dl.update_position_fields("b", {"hedge_buddy_id": "a"})
+        self.assertEqual(self.dl.clear_hedge_links("a"), 1)
+        by_id = {p["id"]: p for p in self.dl.get_positions()}
+        self.assertIsNone(by_id["b"]["hedge_buddy_id"])
+        self.assertEqual(self.dl.delete_all_positions(), 2)
+        self.dl.create_wallet({"name": "w1"})
+        self.assertEqual(self.dl.delete_wallet("w1"), 1)
+        self.assertIsNone(self.dl.get_wallet_by_name("w1"))
+
+
+
+class TestAsyncDataLocker(unittest.TestCase):
+    def setUp(self):
+        DataLocker._instance = None
+        self.dl = DataLocker(":memory:")
+        self.adl = AsyncDataLocker(self.dl, max_workers=2)
+
+    def tearDown(self):
+        self.adl.shutdown()
+        self.dl.close()
+        DataLocker._instance = None
+
+    def test_methods_are_awaitable(self):
+        async def scenario():
+            await self.adl.insert_or_update_price("BTC", 100.0, "Test")
+            return await self.adl.get_latest_price("BTC")
+        self.assertEqual(asyncio.run(scenario())["current_price"], 100.0)
+
+    def test_run_in_batch_commits_together(self):
+        def write_two():
+            self.assertTrue(self.dl.in_batch())
+            self.dl.insert_or_update_price("ETH", 1.0, "Test")
+            self.dl.insert_or_update_price("ETH", 2.0, "Test")
+        asyncio.run(self.adl.run_in_batch(write_two))
+        self.assertEqual(len(self.dl.get_prices("ETH")), 2)
+
+    def test_query_stats_follow_run_into_executor(self):
+        self.dl.insert_or_update_price("BTC", 1.0, "Test")
+        self.dl.insert_or_update_price("ETH", 2.0, "Test")
+        stats = QueryStats()
+
+        async def scenario():
+            with track(stats):
+                await self.adl.get_latest_prices()
+                await self.adl.insert_or_update_price("SOL", 3.0, "Test")
+        asyncio.run(scenario())
+
+        counts = stats.as_dict()
+        self.assertGreaterEqual(counts["queries"], 3)
+        self.assertEqual(counts["rows_read"], 2)
+        self.assertGreaterEqual(counts["rows_written"], 2)
+
+
+class TestDataLockerPositionSync(unittest.TestCase):
+    def setUp(self):
+        DataLocker._instance = None
+        self.dl = DataLocker(":memory:")
+
+    def tearDown(self):
+        self.dl.close()
+        DataLocker._instance = None
+
+    def test_closed_positions_are_hidden_from_reads(self):
+        self.dl.create_position({"id": "p1", "wallet_name": "W"})
+        self.dl.create_position({"id": "p2", "wallet_name": "W"})
+        self.assertEqual(self.dl.close_positions(["p1"]), 1)
+
+        self.assertEqual([p["id"] for p in self.dl.read_positions()], ["p2"])
+        closed = {p["id"]: p for p in self.dl.get_positions(include_closed=True)}["p1"]
+        self.assertEqual(closed["status"], "CLOSED")
+        self.assertIsNotNone(closed["closed_at"])
+
+    def test_delete_alerts_for_positions(self):
+        for alert_id, pos_id in (("a1", "p1"), ("a2", "p1"), ("a3", "p2")):
+            self.dl._execute_write(
+                "INSERT INTO alerts (id, alert_type, position_reference_id) VALUES (?, 'Profit', ?)",
+                (alert_id, pos_id)
+            )
+        self.assertEqual(self.dl.get_position_alert_types(), {("p1", "Profit"), ("p2", "Profit")})
+        self.assertEqual(self.dl.delete_alerts_for_positions(["p1"]), 2)
+        self.assertEqual(self.dl.get_position_alert_types(), {("p2", "Profit")})
+
+    def test_upsert_positions_only_rewrites_changed_rows(self):
+        rows = [{"id": "p1", "wallet_name": "W", "size": 1.0}, {"id": "p2", "wallet_name": "W", "size": 2.0}]
+        first = self.dl.upsert_positions(rows)
+        self.assertEqual((first["inserted"], first["updated"], first["unchanged"]), (2, 0, 0))
+
+        self.dl.update_position_fields("p1", {"heat_index": 7.0})
+        stats = QueryStats()
+        with track(stats):
+            second = self.dl.upsert_positions([{"id": "p1", "wallet_name": "W", "size": 1.5}, rows[1]])
+        self.assertEqual((second["inserted"], second["updated"], second["unchanged"]), (0, 1, 1))
+        self.assertEqual(stats.as_dict()["rows_written"], 1)
+
+        p1 = {p["id"]: p for p in self.dl.read_positions()}["p1"]
+        self.assertEqual(p1["size"], 1.5)
+        self.assertEqual(p1["heat_index"], 7.0)
+
+    def test_data_versions_bump_on_writes(self):
+        before = self.dl.get_data_versions()
+        self.dl.upsert_positions([{"id": "p1", "wallet_name": "W", "size": 1.0}])
+        after_insert = self.dl.get_data_versions()
+        self.assertGreater(after_insert["positions"], before["positions"])
+        self.assertEqual(after_insert["prices"], before["prices"])
+
+        # An unchanged re-import writes nothing, so cached snapshots stay valid.
+        self.dl.upsert_positions([{"id": "p1", "wallet_name": "W", "size": 1.0}])
+        self.assertEqual(self.dl.get_data_versions(), after_insert)
+
+        self.dl.insert_or_update_price("BTC", 100.0, "Test")
+        self.assertGreater(self.dl.get_data_versions()["prices"], after_insert["prices"])
+
+    def test_upsert_positions_reopens_closed_rows(self):
+        self.dl.upsert_positions([{"id": "p1", "wallet_name": "W"}])
+        self.dl.close_positions(["p1"])
+        result = self.dl.upsert_positions([{"id": "p1", "wallet_name": "W"}])
+
+        self.assertEqual(result["reopened_ids"], ["p1"])
+        self.assertEqual([p["id"] for p in self.dl.read_positions()], ["p1"])
+
+
+class TestDataLockerChangeEvents(unittest.TestCase):
+    def setUp(self):
+        DataLocker._instance = None
+        self.dl = DataLocker(":memory:")
+        self.events = []
+        change_bus.subscribe(self._record)
+
+    def tearDown(self):
+        change_bus.unsubscribe(self._record)
+        self.dl.close()
+        DataLocker._instance = None
+
+    def _record(self, topic, keys):
+        self.events.append((topic, keys))
+
+    def test_writes_publish_what_they_touched(self):
+        self.dl.create_position({"id": "p1"})
+        self.dl.insert_or_update_price("BTC", 100.0, "Test")
+        self.dl.delete_all_positions()
+        self.assertEqual(self.events, [
+            (change_bus.POSITIONS, {"p1"}), (change_bus.PRICES, {"BTC"}), (change_bus.POSITIONS, None),
+        ])
+
+    def test_batch_publishes_after_commit_only(self):
+        with self.dl.batch():
+            self.dl.update_position_fields("p1", {"size": 1.0})
+            self.dl.update_position_fields("p2", {"size": 2.0})
+            self.assertEqual(self.events, [])
+        self.assertEqual(self.events, [(change_bus.POSITIONS, {"p1", "p2"})])
+
+        self.events.clear()
+        with self.assertRaises(RuntimeError):
+            with self.dl.batch():
+                self.dl.insert_or_update_price("ETH", 1.0, "Test")
+                raise RuntimeError("boom")
+        self.assertEqual(self.events, [])
+
+    def test_unchanged_upsert_and_suppressed_writes_publish_nothing(self):
+        self.dl.upsert_positions([{"id": "p1", "wallet_name": "W", "size": 1.0}])
+        self.events.clear()
+        self.dl.upsert_positions([{"id": "p1", "wallet_name": "W", "size": 1.0}])
+        with change_bus.suppressed():
+            self.dl.update_position_fields("p1", {"heat_index": 3.0})
+        self.assertEqual(self.events, [])
+
+
+class TestDataLockerCycleMetrics(unittest.TestCase):
+    def setUp(self):
+        DataLocker._instance = None
+        self.dl = DataLocker(":memory:")
+
+    def _record(self, cycle_id, started_at, wall_ms):
+        self.dl.record_cycle_metrics([{
+            "cycle_id": cycle_id, "step": "market", "started_at": started_at,
+            "wall_ms": wall_ms, "cpu_ms": 1.0, "queries": 3, "rows_read": 10,
+            "rows_written": 2, "status": "ok", "on_critical_path": 1,
+        }])
+
+    def tearDown(self):
+        self.dl.close()
+        DataLocker._instance = None
+
+    def test_recent_cycles_newest_first_and_prune(self):
+        for i in range(5):
+            self._record(f"c{i}", f"2024-01-01T00:0{i}:00", 100.0 * i)
+        recent = self.dl.get_cycle_metrics(2)
+        self.assertEqual([r["cycle_id"] for r in recent], ["c4", "c3"])
+
+        self.assertEqual(self.dl.prune_cycle_metrics(3), 2)
+        self.assertEqual({r["cycle_id"] for r in self.dl.get_cycle_metrics(10)}, {"c2", "c3", "c4"})
+
+
+class TestDataLockerPriceIterators(unittest.TestCase):
+    def setUp(self):
+        DataLocker._instance = None
+        self.dl = DataLocker(":memory:")
+
+    def tearDown(self):
+        self.dl.close()
+        DataLocker._instance = None
+
+    def test_iter_price_points_pages_through_range(self):
+        # Two rows share a timestamp so paging must tie-break on rowid.
+        times = ["2024-01-01T00:00:00", "2024-01-01T00:01:00", "2024-01-01T00:01:00",
+                 "2024-01-01T00:02:00", "2024-01-01T00:03:00"]
+        for i, when in enumerate(times):
+            self.dl.insert_price({"asset_type": "BTC", "current_price": 100.0 + i, "last_update_time": when})
+        self.dl.insert_price({"asset_type": "ETH", "current_price": 5.0, "last_update_time": times[1]})
+
+        rows = list(self.dl.iter_price_points("BTC", times[0], "2024-01-01T00:02:00", chunk_size=2))
+        self.assertEqual([r["current_price"] for r in rows], [100.0, 101.0, 102.0, 103.0])
+
+    def test_iter_price_bars_pages_through_range(self):
+        self.dl.upsert_price_bars([
+            {"asset_type": "BTC", "resolution": "1m", "bucket_start": 60 * i, "open": i, "high": i,
+             "low": i, "close": i, "open_ts": 60.0 * i, "close_ts": 60.0 * i, "samples": 1}
+            for i in range(5)
+        ])
+        bars = list(self.dl.iter_price_bars("BTC", "1m", 60, 240, chunk_size=2))
+        self.assertEqual([b["bucket_start"] for b in bars], [60, 120, 180, 240])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,410 @@
+#!/usr/bin/env python
+"""
+migrations.py
+Description:
+    Numbered schema migrations for the DataLocker SQLite database.
+    The applied version is kept in PRAGMA user_version, so startup is a single
+    pragma read; only migrations above that version are run, each inside its
+    own transaction together with the version bump.
+Usage:
+    Append new migrations to MIGRATIONS. Never edit or reorder one that has
+    already shipped -- databases in the field have recorded it as applied.
+"""
+
+import logging
+import sqlite3
+from typing import Callable, List
+
+logger = logging.getLogger("DataLockerLogger")
+
+
+def _add_column_if_missing(cursor: sqlite3.Cursor, table: str, column: str, definition: str):
+    cursor.execute(f"PRAGMA table_info({table})")
+    existing_cols = [row[1] for row in cursor.fetchall()]
+    if column not in existing_cols:
+        cursor.execute(f"ALTER TABLE {table} ADD COLUMN {column} {definition}")
+        logger.info(f"Added '{column}' column to '{table}' table.")
+
+
+# ----------------------------------------------------------------
+# MIGRATIONS
+# ----------------------------------------------------------------
+
+def migration_001_base_schema(cursor: sqlite3.Cursor):
+    """
+    Base schema. Pre-versioning databases (user_version 0) already have most of
+    these tables, so everything here is idempotent; the column probes run once
+    to bring those databases up to date.
+    """
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS system_vars (
+            id INTEGER PRIMARY KEY,
+            last_update_time_positions DATETIME,
+            last_update_positions_source TEXT,
+            last_update_time_prices DATETIME,
+            last_update_prices_source TEXT,
+            last_update_time_jupiter DATETIME
+        )
+    """)
+    cursor.execute("""
+        INSERT OR IGNORE INTO system_vars (
+            id,
+            last_update_time_positions,
+            last_update_positions_source,
+            last_update_time_prices,
+            last_update_prices_source,
+            last_update_time_jupiter
+        )
+        VALUES (1, NULL, NULL, NULL, NULL, NULL)
+    """)
+    for column, definition in [
+        ("last_update_time_jupiter", "DATETIME"),
+        ("last_update_jupiter_source", "TEXT"),
+        ("theme_mode", "TEXT DEFAULT 'light'"),
+        ("total_brokerage_balance", "REAL DEFAULT 0.0"),
+        ("total_wallet_balance", "REAL DEFAULT 0.0"),
+        ("total_balance", "REAL DEFAULT 0.0"),
+        ("strategy_start_value", "REAL DEFAULT 0.0"),
+        ("strategy_description", "TEXT DEFAULT ''"),
+    ]:
+        _add_column_if_missing(cursor, "system_vars", column, definition)
+
+    # position_alert_map supports multiple alerts per position.
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS position_alert_map (
+            id TEXT PRIMARY KEY,
+            position_id TEXT NOT NULL,
+            alert_id TEXT NOT NULL,
+            FOREIGN KEY(position_id) REFERENCES positions(id),
+            FOREIGN KEY(alert_id) REFERENCES alerts(id)
+        )
+    """)
+
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS prices (
+            id TEXT PRIMARY KEY,
+            asset_type TEXT,
+            current_price REAL,
+            previous_price REAL,
+            last_update_time DATETIME,
+            previous_update_time DATETIME,
+            source TEXT
+        )
+    """)
+
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS positions (
+            id TEXT PRIMARY KEY,
+            asset_type TEXT,
+            position_type TEXT,
+            entry_price REAL,
+            liquidation_price REAL,
+            travel_percent REAL,  -- Unified column name for travel percent
+            value REAL,
+            collateral REAL,
+            size REAL,
+            leverage REAL,
+            wallet_name TEXT,
+            last_updated DATETIME,
+            alert_reference_id TEXT,
+            hedge_buddy_id TEXT,
+            current_price REAL,
+            liquidation_distance REAL,
+            heat_index REAL,
+            current_heat_index REAL,
+            pnl_after_fees_usd REAL
+        )
+    """)
+
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS alerts (
+            id TEXT PRIMARY KEY,
+            created_at DATETIME,
+            alert_type TEXT,
+            alert_class TEXT,
+            asset_type TEXT,
+            trigger_value REAL,
+            condition TEXT,
+            notification_type TEXT,
+            level TEXT,
+            last_triggered DATETIME,
+            status TEXT,
+            frequency INTEGER,
+            counter INTEGER,
+            liquidation_distance REAL,
+            travel_percent REAL,
+            liquidation_price REAL,
+            notes TEXT,
+            description TEXT,
+            position_reference_id TEXT,
+            evaluated_value REAL
+        )
+    """)
+    _add_column_if_missing(cursor, "alerts", "position_type", "TEXT")
+
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS alert_ledger (
+            id TEXT PRIMARY KEY,
+            alert_id TEXT,
+            modified_by TEXT,
+            reason TEXT,
+            before_value TEXT,
+            after_value TEXT,
+            timestamp DATETIME
+        )
+    """)
+
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS brokers (
+            name TEXT PRIMARY KEY,
+            image_path TEXT,
+            web_address TEXT,
+            total_holding REAL DEFAULT 0.0
+        )
+    """)
+
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS wallets (
+            name TEXT PRIMARY KEY,
+            public_address TEXT,
+            private_address TEXT,
+            image_path TEXT,
+            balance REAL DEFAULT 0.0
+        )
+    """)
+
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS portfolio_entries (
+            id TEXT PRIMARY KEY,
+            snapshot_time DATETIME,
+            total_value REAL NOT NULL
+        )
+    """)
+
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS positions_totals_history (
+            id TEXT PRIMARY KEY,
+            snapshot_time DATETIME,
+            total_size REAL,
+            total_value REAL,
+            total_collateral REAL,
+            avg_leverage REAL,
+            avg_travel_percent REAL,
+            avg_heat_index REAL
+        )
+    """)
+
+
+def migration_002_prices_latest(cursor: sqlite3.Cursor):
+    """Latest price per asset, maintained by DataLocker.insert_price."""
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS prices_latest (
+            asset_type TEXT PRIMARY KEY,
+            id TEXT,
+            current_price REAL,
+            previous_price REAL,
+            last_update_time DATETIME,
+            previous_update_time DATETIME,
+            source TEXT
+        )
+    """)
+    cursor.execute("SELECT COUNT(*) FROM prices_latest")
+    if cursor.fetchone()[0] == 0:
+        # Backfill from existing history; the newest row per asset wins.
+        cursor.execute("""
+            INSERT OR REPLACE INTO prices_latest (
+                asset_type, id, current_price, previous_price,
+                last_update_time, previous_update_time, source
+            )
+            SELECT p.asset_type, p.id, p.current_price, p.previous_price,
+                   p.last_update_time, p.previous_update_time, p.source
+              FROM prices p
+             WHERE p.asset_type IS NOT NULL
+             ORDER BY p.last_update_time ASC
+        """)
+
+
+def migration_003_hot_path_indexes(cursor: sqlite3.Cursor):
+    """Indexes for the columns the cycle and dashboard filter/sort on."""
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_prices_asset_time ON prices(asset_type, last_update_time)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_alerts_position_type ON alerts(position_reference_id, alert_type)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_positions_wallet_asset ON positions(wallet_name, asset_type)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_totals_history_time ON positions_totals_history(snapshot_time)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_alert_ledger_alert_time ON alert_ledger(alert_id, timestamp)")
+
+
+def migration_004_price_bars(cursor: sqlite3.Cursor):
+    """OHLC bars compacted from raw prices (see prices/price_compactor.py)."""
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS price_bars (
+            asset_type TEXT NOT NULL,
+            resolution TEXT NOT NULL,
+            bucket_start INTEGER NOT NULL,  -- epoch seconds
+            open REAL,
+            high REAL,
+            low REAL,
+            close REAL,
+            open_ts REAL,
+            close_ts REAL,
+            samples INTEGER DEFAULT 0,
+            PRIMARY KEY (asset_type, resolution, bucket_start)
+        )
+    """)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS price_compaction_state (
+            id INTEGER PRIMARY KEY,
+            last_rowid INTEGER DEFAULT 0,
+            last_run_time DATETIME
+        )
+    """)
+    cursor.execute("INSERT OR IGNORE INTO price_compaction_state (id, last_rowid) VALUES (1, 0)")
+
+
+def migration_005_cycle_metrics(cursor: sqlite3.Cursor):
+    """Per-step Cyclone timings and DB counters (see cyclone/cycle_profile.py)."""
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS cycle_metrics (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            cycle_id TEXT NOT NULL,
+            step TEXT NOT NULL,
+            started_at DATETIME,
+            wall_ms REAL,
+            cpu_ms REAL,
+            queries INTEGER DEFAULT 0,
+            rows_read INTEGER DEFAULT 0,
+            rows_written INTEGER DEFAULT 0,
+            status TEXT,
+            on_critical_path INTEGER DEFAULT 0
+        )
+    """)
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_cycle_metrics_cycle ON cycle_metrics(cycle_id)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_cycle_metrics_step_time ON cycle_metrics(step, started_at)")
+
+
+def migration_006_position_status(cursor: sqlite3.Cursor):
+    """
+    Positions that vanish from the exchange are marked CLOSED by the differential
+    sync instead of the whole table being wiped every cycle.
+    """
+    _add_column_if_missing(cursor, "positions", "status", "TEXT DEFAULT 'OPEN'")
+    _add_column_if_missing(cursor, "positions", "closed_at", "DATETIME")
+
+
+def migration_007_position_content_hash(cursor: sqlite3.Cursor):
+    """
+    Hash of the exchange-owned position fields, so bulk imports can skip rows
+    that did not change. NULL (pre-existing rows) counts as changed once.
+    """
+    _add_column_if_missing(cursor, "positions", "content_hash", "TEXT")
+
+
+def migration_008_data_versions(cursor: sqlite3.Cursor):
+    """
+    Change counters for positions and latest prices, bumped by triggers on every
+    insert/update/delete (from any process), so readers can cache derived data
+    until the underlying rows change.
+    """
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS data_versions (
+            name TEXT PRIMARY KEY,
+            version INTEGER NOT NULL DEFAULT 0
+        )
+    """)
+    for name, table in (("positions", "positions"), ("prices", "prices_latest")):
+        cursor.execute("INSERT OR IGNORE INTO data_versions (name, version) VALUES (?, 0)", (name,))
+        for event in ("INSERT", "UPDATE", "DELETE"):
+            cursor.execute(f"""
+                CREATE TRIGGER IF NOT EXISTS trg_{table}_version_{event.lower()}
+                AFTER {event} ON {table}
+                BEGIN
+                    UPDATE data_versions SET version = version + 1 WHERE name = '{name}';
+                END
+            """)
+
+
+def migration_009_liquidation_probability(cursor: sqlite3.Cursor):
+    """
+    Closed-form probability of the price touching the liquidation price within
+    the alert horizon, the per-horizon values as JSON ({"1h": p, ...}) and the
+    annualized volatility they were computed with.
+    """
+    _add_column_if_missing(cursor, "positions", "liquidation_probability", "REAL DEFAULT 0.0")
+    _add_column_if_missing(cursor, "positions", "liquidation_probabilities", "TEXT")
+    _add_column_if_missing(cursor, "positions", "liquidation_volatility", "REAL")
+
+
+def migration_010_asset_stats(cursor: sqlite3.Cursor):
+    """
+    Rolling per-asset statistics (EWMA volatility, 1h/24h/7d returns) kept up to
+    date tick by tick (see prices/rolling_stats.py). `state` holds the JSON
+    the incremental update resumes from.
+    """
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS asset_stats (
+            asset_type TEXT PRIMARY KEY,
+            last_price REAL,
+            last_ts REAL,                   -- epoch seconds
+            samples INTEGER DEFAULT 0,
+            ewma_variance REAL,             -- annualized
+            volatility REAL,                -- annualized, sqrt(ewma_variance)
+            return_1h REAL,                 -- percent
+            return_24h REAL,
+            return_7d REAL,
+            state TEXT,
+            updated_at DATETIME
+        )
+    """)
+
+
+MIGRATIONS: List[Callable[[sqlite3.Cursor], None]] = [
+    migration_001_base_schema,
+    migration_002_prices_latest,
+    migration_003_hot_path_indexes,
+    migration_004_price_bars,
+    migration_005_cycle_metrics,
+    migration_006_position_status,
+    migration_007_position_content_hash,
+    migration_008_data_versions,
+    migration_009_liquidation_probability,
+    migration_010_asset_stats,
+]
+
+SCHEMA_VERSION = len(MIGRATIONS)
+
+
+# ----------------------------------------------------------------
+# RUNNER
+# ----------------------------------------------------------------
+
+def get_schema_version(conn: sqlite3.Connection) -> int:
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+
+def apply_migrations(conn: sqlite3.Connection) -> int:
+    """
+    Applies every migration newer than the database's user_version and returns
+    the resulting version. A failing migration is rolled back and re-raised,
+    leaving user_version at the last one that succeeded.
+    """
+    current = get_schema_version(conn)
+    if current >= SCHEMA_VERSION:
+        return current
+
+    conn.commit()
+    for version, migration in enumerate(MIGRATIONS, start=1):
+        if version <= current:
+            continue
+        cursor = conn.cursor()
+        try:
+            cursor.execute("BEGIN")
+            migration(cursor)
+            cursor.execute(f"PRAGMA user_version = {version}")
+            conn.commit()
+            logger.info(f"Applied schema migration {version}: {migration.__name__}")
+        except Exception:
+            conn.rollback()
+            logger.error(f"Schema migration {version} ({migration.__name__}) failed.", exc_info=True)
+            raise
+        finally:
+            cursor.close()
+    return SCHEMA_VERSION
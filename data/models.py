@@ -37,6 +37,7 @@ class AlertType(str, Enum):
     TIME = "Time"
     PROFIT = "Profit"         # New alert type for profit alerts
     HEAT_INDEX = "HeatIndex"  # New alert type for heat index alerts
+    LIQUIDATION_PROBABILITY = "LiquidationProbability"  # Closed-form chance of touching liquidation
 
 class AlertClass(str, Enum):
     SYSTEM = "System"
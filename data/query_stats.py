@@ -0,0 +1,101 @@
+#!/usr/bin/env python
+"""
+query_stats.py
+Description:
+    Per-task DB counters used to profile Cyclone steps.
+
+    A QueryStats is made current with track(); every pooled connection reports
+    executed statements and fetched/written rows to whichever QueryStats is
+    current in the calling context. The current stats live in a ContextVar, so
+    they follow asyncio tasks and AsyncDataLocker.run() executor calls (which
+    copy the caller's context) without being threaded through call signatures.
+
+    Counted per stats object:
+      - queries       statements executed (transaction control excluded)
+      - rows_read     rows returned by fetchone/fetchmany/fetchall
+      - rows_written  rowcount of INSERT/UPDATE/DELETE statements
+      - cpu_time      thread CPU seconds of work run via AsyncDataLocker
+Usage:
+    stats = QueryStats()
+    with track(stats):
+        dl.get_positions()
+    stats.as_dict()
+"""
+
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Optional
+
+_TRANSACTION_CONTROL = ("BEGIN", "COMMIT", "END", "ROLLBACK", "SAVEPOINT", "RELEASE")
+
+
+class QueryStats:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.queries = 0
+        self.rows_read = 0
+        self.rows_written = 0
+        self.cpu_time = 0.0
+
+    def add(self, queries: int = 0, rows_read: int = 0, rows_written: int = 0, cpu_time: float = 0.0):
+        # One step may have work in flight on several executor threads.
+        with self._lock:
+            self.queries += queries
+            self.rows_read += rows_read
+            self.rows_written += rows_written
+            self.cpu_time += cpu_time
+
+    def as_dict(self) -> dict:
+        with self._lock:
+            return {
+                "queries": self.queries,
+                "rows_read": self.rows_read,
+                "rows_written": self.rows_written,
+                "cpu_time": self.cpu_time,
+            }
+
+
+_current: ContextVar[Optional[QueryStats]] = ContextVar("query_stats", default=None)
+
+
+def current() -> Optional[QueryStats]:
+    return _current.get()
+
+
+@contextmanager
+def track(stats: QueryStats):
+    """Makes `stats` current for the enclosed block (and tasks/threads that copy this context)."""
+    token = _current.set(stats)
+    try:
+        yield stats
+    finally:
+        _current.reset(token)
+
+
+def record_statement(sql: str):
+    """sqlite3 trace callback; installed on every pooled connection."""
+    stats = _current.get()
+    if stats is None:
+        return
+    if sql.lstrip().upper().startswith(_TRANSACTION_CONTROL):
+        return
+    stats.add(queries=1)
+
+
+def record_rows_read(count: int):
+    stats = _current.get()
+    if stats is not None and count:
+        stats.add(rows_read=count)
+
+
+def record_rows_written(count: int):
+    stats = _current.get()
+    if stats is not None and count > 0:
+        stats.add(rows_written=count)
+
+
+def record_cpu_time(seconds: float):
+    stats = _current.get()
+    if stats is not None:
+        stats.add(cpu_time=seconds)
@@ -15,7 +15,7 @@ def dashboard():
     """
     try:
         # Retrieve positions from the PositionService and update with latest prices.
-        positions = PositionService.get_all_positions(DB_PATH)
+        positions = PositionService.get_positions_snapshot(DB_PATH)
         positions = PositionService.fill_positions_with_latest_price(positions)
     except Exception as e:
         current_app.logger.error("Error fetching positions for Jupiter Dash: %s", e)
@@ -178,9 +178,7 @@ def delete_wallet(wallet_name):
         if wallet is None:
             flash(f"Wallet '{wallet_name}' not found.", "danger")
         else:
-            dl._init_sqlite_if_needed()
-            dl.cursor.execute("DELETE FROM wallets WHERE name=?", (wallet_name,))
-            dl.conn.commit()
+            dl.delete_wallet(wallet_name)
             flash(f"Wallet '{wallet_name}' deleted successfully!", "success")
     except Exception as e:
         flash(f"Error deleting wallet: {e}", "danger")
@@ -3,11 +3,13 @@ import os
 import logging
 import asyncio
 from datetime import datetime, timezone
-from typing import Dict
+from typing import Dict, Optional
 
 import requests
 from monitor.common_monitor_utils import BaseMonitor
 from data.data_locker import DataLocker
+from prices.price_aggregator import PriceAggregator
+from prices.rolling_stats import RollingStatsService
 from utils.unified_logger import UnifiedLogger
 
 # Constants
@@ -45,8 +47,9 @@ class GPTIsFuckingStupid:
 
 class PriceMonitor(BaseMonitor):
     """
-    Standalone price monitor using GPTIsFuckingStupid fetcher.
-    Fetches prices, writes to DataLocker, and writes ledger entries automatically.
+    Standalone price monitor. Prices come from the PriceAggregator consensus
+    across the enabled sources, with GPTIsFuckingStupid as the fallback when
+    no source answers. Writes to DataLocker and ledger entries automatically.
     """
     def __init__(self, timer_config_path: str = None, ledger_filename: str = None):
         super().__init__(
@@ -57,28 +60,42 @@ class PriceMonitor(BaseMonitor):
         self.data_locker = DataLocker.get_instance()
         self.u_logger = UnifiedLogger()
         self.fetcher = GPTIsFuckingStupid()
+        self.aggregator = PriceAggregator.get_instance()
+        self.rolling_stats = RollingStatsService(self.data_locker)
 
-    def _do_work(self) -> dict:
+    def _do_work(self, prices: Optional[Dict[str, float]] = None) -> dict:
         """
-        Fetches current prices and writes each to DataLocker.
+        Fetches current prices (unless given) and writes each to DataLocker.
         Returns metadata for heartbeat (loop_counter).
         """
-        prices = self.fetcher.get_prices()
+        if prices is None:
+            try:
+                prices = self.aggregator.fetch_prices_sync()
+            except Exception as e:
+                logger.error(f"Price aggregator failed: {e}")
+                prices = {}
+        source = "Consensus"
+        if not prices:
+            prices = self.fetcher.get_prices()
+            source = "Fetched"
         count = 0
-        for symbol, price in prices.items():
-            if price is not None:
-                self.data_locker.insert_or_update_price(symbol, price, "Fetched")
-                count += 1
-        # Update last update timestamp
         now = datetime.now(timezone.utc)
-        self.data_locker.set_last_update_times(prices_dt=now, prices_source="GPTFetch")
+        # Price rows, rolling stats and the last update timestamp are committed together.
+        with self.data_locker.batch():
+            for symbol, price in prices.items():
+                if price is not None:
+                    self.data_locker.insert_or_update_price(symbol, price, source)
+                    self.rolling_stats.update(symbol, price, now.timestamp())
+                    count += 1
+            self.data_locker.set_last_update_times(
+                prices_dt=now, prices_source="Consensus" if source == "Consensus" else "GPTFetch")
         # Write a manual ledger entry
         entry = {
             "timestamp": now.isoformat(),
             "component": self.name,
             "operation": "price_update",
             "status": "Success",
-            "metadata": {"fetched_count": count}
+            "metadata": {"fetched_count": count, "source": source}
         }
         self.ledger_writer.write(self.ledger_file, entry)
         # Also log cycle complete in UnifiedLogger
@@ -92,10 +109,17 @@ class PriceMonitor(BaseMonitor):
 
     async def update_prices(self, source: str = "Manual") -> dict:
         """
-        Async entry-point for Cyclone: offloads _do_work to executor.
+        Async entry-point for Cyclone: fetches from all sources on the running
+        loop, then offloads the writes in _do_work to the shared DataLocker executor.
         """
-        loop = asyncio.get_event_loop()
-        metadata = await loop.run_in_executor(None, self._do_work)
+        from data.async_data_locker import AsyncDataLocker
+        try:
+            prices = await self.aggregator.fetch_prices()
+        except Exception as e:
+            logger.error(f"Price aggregator failed: {e}")
+            prices = {}
+        # An empty dict makes _do_work fall back to the synchronous fetcher.
+        metadata = await AsyncDataLocker.get_instance(self.data_locker).run(self._do_work, prices)
         return metadata
 
 if __name__ == '__main__':
@@ -0,0 +1,104 @@
+# positions/jupiter_fetcher.py
+"""
+jupiter_fetcher.py
+Description:
+    Concurrent Jupiter Perps position fetcher. All wallets are requested at
+    once over a single aiohttp ClientSession, so TCP/TLS connections to the
+    Jupiter API are kept alive and reused across wallets (and across cycles
+    when the caller owns the session). Each request has its own timeout and
+    the number of in-flight requests is capped by a semaphore.
+
+    A failing wallet never fails the batch: its result carries an error and
+    no items, and the caller decides what that means (PositionService does
+    not close positions for wallets it could not read).
+Usage:
+    results = await fetch_wallet_positions([("Main", "9xQ..."), ...])
+    for r in results:
+        r["wallet"], r["items"], r["error"], r["elapsed"]
+"""
+
+import asyncio
+import logging
+import time
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import aiohttp
+
+logger = logging.getLogger("JupiterFetcher")
+
+JUPITER_BASE_URL = "https://perps-api.jup.ag/v1"
+
+DEFAULT_TIMEOUT_SECONDS = 10.0
+DEFAULT_MAX_CONCURRENCY = 8
+# How long an idle pooled connection is kept open for reuse.
+KEEPALIVE_SECONDS = 60.0
+
+
+def create_session(max_concurrency: int = DEFAULT_MAX_CONCURRENCY) -> aiohttp.ClientSession:
+    """A keep-alive session sized for max_concurrency parallel requests."""
+    connector = aiohttp.TCPConnector(limit=max_concurrency, keepalive_timeout=KEEPALIVE_SECONDS)
+    return aiohttp.ClientSession(connector=connector)
+
+
+async def fetch_wallet(session: aiohttp.ClientSession, wallet_name: str, public_address: str,
+                       base_url: str = JUPITER_BASE_URL,
+                       timeout: float = DEFAULT_TIMEOUT_SECONDS,
+                       semaphore: Optional[asyncio.Semaphore] = None) -> Dict:
+    """
+    Fetches one wallet's positions.
+    Returns {"wallet", "address", "items" (list, or None on failure), "error", "elapsed"}.
+    """
+    url = f"{base_url}/positions"
+    params = {"walletAddress": public_address, "showTpslRequests": "true"}
+    result = {"wallet": wallet_name, "address": public_address, "items": None, "error": None, "elapsed": 0.0}
+    started = time.perf_counter()
+    try:
+        async with semaphore or asyncio.Semaphore(1):
+            async with session.get(url, params=params, timeout=aiohttp.ClientTimeout(total=timeout)) as resp:
+                if resp.status != 200:
+                    result["error"] = f"status {resp.status}"
+                    logger.error(f"Jupiter fetch failed for wallet {wallet_name}: status {resp.status}")
+                else:
+                    data = await resp.json()
+                    result["items"] = data.get("dataList", []) or []
+    except asyncio.TimeoutError:
+        result["error"] = f"timed out after {timeout}s"
+        logger.error(f"Jupiter fetch timed out for wallet {wallet_name} after {timeout}s")
+    except Exception as e:
+        result["error"] = str(e)
+        logger.error(f"Error fetching Jupiter positions for wallet {wallet_name}: {e}", exc_info=True)
+    result["elapsed"] = time.perf_counter() - started
+    return result
+
+
+async def fetch_wallet_positions(wallets: Iterable[Tuple[str, str]],
+                                 base_url: str = JUPITER_BASE_URL,
+                                 timeout: float = DEFAULT_TIMEOUT_SECONDS,
+                                 max_concurrency: int = DEFAULT_MAX_CONCURRENCY,
+                                 session: Optional[aiohttp.ClientSession] = None) -> List[Dict]:
+    """
+    Fetches every (wallet_name, public_address) concurrently and returns one
+    result per wallet, in input order. Pass a long-lived `session` to keep
+    connections warm between calls; otherwise one is opened for this batch.
+    """
+    wallets = list(wallets)
+    if not wallets:
+        return []
+    semaphore = asyncio.Semaphore(max_concurrency)
+
+    async def _gather(s: aiohttp.ClientSession) -> List[Dict]:
+        return await asyncio.gather(*(
+            fetch_wallet(s, name, address, base_url, timeout, semaphore) for name, address in wallets
+        ))
+
+    started = time.perf_counter()
+    if session is not None:
+        results = await _gather(session)
+    else:
+        async with create_session(max_concurrency) as own_session:
+            results = await _gather(own_session)
+    failed = sum(1 for r in results if r["error"])
+    logger.info(f"Fetched {len(results)} Jupiter wallet(s) in {time.perf_counter() - started:.2f}s "
+                f"({failed} failed).")
+    return results
+
@@ -0,0 +1,75 @@
+import asyncio
+import time
+import unittest
+
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+
+from positions import jupiter_fetcher
+
+
+class TestJupiterFetcher(unittest.IsolatedAsyncioTestCase):
+    """Runs the fetcher against a local stub of the Jupiter positions endpoint."""
+
+    DELAY = 0.2
+
+    async def asyncSetUp(self):
+        self.in_flight = 0
+        self.max_in_flight = 0
+        app = web.Application()
+        app.router.add_get("/v1/positions", self._positions)
+        self.server = TestServer(app)
+        await self.server.start_server()
+        self.base_url = str(self.server.make_url("/v1"))
+
+    async def asyncTearDown(self):
+        await self.server.close()
+
+    async def _positions(self, request):
+        wallet = request.query["walletAddress"]
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            if wallet == "slow":
+                await asyncio.sleep(5)
+            await asyncio.sleep(self.DELAY)
+        finally:
+            self.in_flight -= 1
+        if wallet == "broken":
+            return web.Response(status=500)
+        return web.json_response({"dataList": [{"positionPubkey": f"pos-{wallet}"}]})
+
+    async def test_wallets_are_fetched_concurrently(self):
+        wallets = [(f"W{i}", f"addr{i}") for i in range(5)]
+        results = await jupiter_fetcher.fetch_wallet_positions(wallets, base_url=self.base_url)
+
+        self.assertEqual(self.max_in_flight, len(wallets))
+        self.assertEqual([r["wallet"] for r in results], [w[0] for w in wallets])
+        self.assertEqual(results[2]["items"], [{"positionPubkey": "pos-addr2"}])
+
+    async def test_concurrency_is_capped(self):
+        wallets = [(f"W{i}", f"addr{i}") for i in range(6)]
+        await jupiter_fetcher.fetch_wallet_positions(wallets, base_url=self.base_url, max_concurrency=2)
+        self.assertEqual(self.max_in_flight, 2)
+
+    async def test_failures_are_isolated(self):
+        wallets = [("Good", "good"), ("Slow", "slow"), ("Broken", "broken")]
+        results = await jupiter_fetcher.fetch_wallet_positions(wallets, base_url=self.base_url, timeout=1.0)
+        by_wallet = {r["wallet"]: r for r in results}
+
+        self.assertIsNone(by_wallet["Good"]["error"])
+        self.assertIn("timed out", by_wallet["Slow"]["error"])
+        self.assertIsNone(by_wallet["Slow"]["items"])
+        self.assertEqual(by_wallet["Broken"]["error"], "status 500")
+
+    async def test_shared_session_is_reused(self):
+        async with jupiter_fetcher.create_session() as session:
+            await jupiter_fetcher.fetch_wallet_positions([("A", "a")], base_url=self.base_url, session=session)
+            results = await jupiter_fetcher.fetch_wallet_positions([("B", "b")], base_url=self.base_url,
+                                                                   session=session)
+            self.assertFalse(session.closed)
+        self.assertIsNone(results[0]["error"])
+
+
+if __name__ == "__main__":
+    unittest.main()
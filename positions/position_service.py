@@ -10,17 +10,24 @@ Description:
       - Record snapshots of aggregated positions data.
 """
 
+import asyncio
+import json
 import logging
-from typing import List, Dict, Any
-import requests
+import threading
+from typing import List, Dict, Any, Optional
 from datetime import datetime
 from data.data_locker import DataLocker
+from data.async_data_locker import AsyncDataLocker
 from config.config_constants import DB_PATH
 from utils.calc_services import CalcServices
 from alerts.alert_evaluator import AlertEvaluator
+from alerts.alert_rules import load_rules
+from prices.price_compactor import realized_volatility
+from prices.rolling_stats import stored_volatility
 from utils.unified_logger import UnifiedLogger
 from sonic_labs.hedge_manager import HedgeManager
 from api.dydx_api import DydxAPI
+from positions import jupiter_fetcher
 
 logger = logging.getLogger(__name__)
 logger.setLevel(logging.DEBUG)
@@ -40,6 +47,11 @@ class PositionService:
         "So11111111111111111111111111111111111111112": "SOL"
     }
 
+    # Cache behind get_positions_snapshot(), keyed by (db_path, positions version, prices version).
+    _snapshot_lock = threading.Lock()
+    _snapshot_key = None
+    _snapshot_positions: List[Dict[str, Any]] = []
+
     def update_position_and_alert(pos: dict, data_locker):
         """
         After updating a position, re-evaluate its alert state and update the alert record.
@@ -50,62 +62,132 @@ class PositionService:
         evaluator.update_alert_for_position(pos)
 
     @staticmethod
-    def get_all_positions(db_path: str = DB_PATH) -> List[Dict[str, Any]]:
+    def enrich_positions_readonly(dl, raw_positions: Optional[List[dict]] = None) -> List[Dict[str, Any]]:
+        """
+        Reads the open positions (unless given), sets current_price from the
+        latest stored market price and enriches them in one vectorized pass.
+        Nothing is written.
+        """
+        if raw_positions is None:
+            raw_positions = dl.read_positions()
+        positions = [dict(pos) for pos in raw_positions]
+        latest_prices = dl.get_latest_prices({p.get("asset_type") for p in positions if p.get("asset_type")})
+        for pos in positions:
+            asset_type = pos.get("asset_type")
+            if not asset_type:
+                logger.warning("Position missing 'asset_type' field.")
+                continue
+            latest_price_data = latest_prices.get(asset_type)
+            if latest_price_data and latest_price_data.get("current_price") is not None:
+                try:
+                    pos["current_price"] = float(latest_price_data["current_price"])
+                except (ValueError, TypeError) as e:
+                    # Fall back to the stored price if conversion fails.
+                    logger.error(f"Error converting latest price for asset {asset_type}: {e}")
+            else:
+                logger.warning(f"No latest price found for asset type: {asset_type}")
+        positions = CalcServices().enrich_batch(positions)
+        return PositionService.apply_liquidation_probabilities(dl, positions)
+
+    @staticmethod
+    def apply_liquidation_probabilities(dl, positions: List[Dict[str, Any]],
+                                        settings: Optional[dict] = None) -> List[Dict[str, Any]]:
+        """
+        Sets liquidation_probability (at the alert horizon), liquidation_probabilities
+        (JSON, one entry per configured horizon) and liquidation_volatility on each
+        position, using one volatility per asset: the rolling EWMA stats when
+        available, else the realized volatility of the stored prices.
+        Settings come from liquidation_probability_ranges in alert_limits.json.
+        """
+        if not positions:
+            return positions
+        settings = settings or load_rules().liquidation_settings
+        primary = settings["horizon_hours"]
+        horizons = list(settings["horizons_hours"])
+        if primary not in horizons:
+            horizons.append(primary)
+
+        # Precomputed EWMA volatility first; rescan the history only for assets without stats.
+        assets = {p.get("asset_type") for p in positions if p.get("asset_type")}
+        volatility = stored_volatility(dl, assets)
+        for asset in assets - set(volatility):
+            realized = realized_volatility(dl, asset, settings["lookback_hours"])
+            volatility[asset] = realized if realized else settings["default_volatility"]
+
+        probabilities = CalcServices().calculate_liquidation_probabilities(
+            positions, volatility, horizons, drift=settings["drift"]
+        ).tolist()
+        primary_index = horizons.index(primary)
+        for pos, row in zip(positions, probabilities):
+            if row[primary_index] != row[primary_index]:  # NaN: no price or liquidation price
+                pos["liquidation_probability"] = None
+                pos["liquidation_probabilities"] = None
+                pos["liquidation_volatility"] = None
+                continue
+            pos["liquidation_probability"] = round(row[primary_index], 4)
+            pos["liquidation_probabilities"] = json.dumps(
+                {f"{hours:g}h": round(p, 4) for hours, p in zip(settings["horizons_hours"], row)}
+            )
+            pos["liquidation_volatility"] = round(volatility[pos.get("asset_type")], 4)
+        return positions
+
+    @staticmethod
+    def get_positions_snapshot(db_path: str = DB_PATH) -> List[Dict[str, Any]]:
         """
-        Retrieve all positions from the database, enrich each position,
-        update the current_price field using the latest market price from the DB,
-        and update the database with the enriched values.
+        Enriched positions for the web tier. Read-only: page renders never write.
+        The enriched list is cached and rebuilt only when the positions/prices
+        version counters (DataLocker.get_data_versions) move, i.e. after a cycle
+        or an import changed the data. Returns copies, so callers may modify them.
+        """
+        dl = DataLocker.get_instance(db_path)
+        versions = dl.get_data_versions()
+        if not versions:
+            return PositionService.enrich_positions_readonly(dl)
+        # Versions are read before the rows, so a write racing the rebuild only
+        # causes one extra rebuild on the next call, never a stale cache.
+        key = (db_path, versions.get("positions"), versions.get("prices"))
+        with PositionService._snapshot_lock:
+            if PositionService._snapshot_key != key:
+                PositionService._snapshot_positions = PositionService.enrich_positions_readonly(dl)
+                PositionService._snapshot_key = key
+                logger.debug(f"Rebuilt positions snapshot for versions {versions}.")
+            positions = PositionService._snapshot_positions
+        return [dict(pos) for pos in positions]
+
+    @staticmethod
+    def get_all_positions(db_path: str = DB_PATH, data_locker=None) -> List[Dict[str, Any]]:
+        """
+        Retrieve all positions from the database, update the current_price field
+        using the latest market price from the DB, enrich each position and
+        update the database with the enriched values.
+        Cyclone passes its CycleContext view as data_locker, so the positions and
+        prices come from the cycle's snapshot and the updates are buffered.
+        Web routes should use get_positions_snapshot(), which never writes.
         """
         try:
             # Get the DataLocker instance and read raw positions.
-            dl = DataLocker.get_instance(db_path)
+            dl = data_locker or DataLocker.get_instance(db_path)
             raw_positions = dl.read_positions()
-            positions = []
-            # Enrich each position.
-            for pos in raw_positions:
-                pos_dict = {key: pos[key] for key in pos.keys()}
-                enriched = PositionService.enrich_position(pos_dict)
-                positions.append(enriched)
-
-            # Update current_price for each position from the latest market price stored in DB.
-            for pos in positions:
-                asset_type = pos.get("asset_type")
-                if asset_type:
-                    latest_price_data = dl.get_latest_price(asset_type)
-                    if latest_price_data and "current_price" in latest_price_data:
-                        try:
-                            new_price = float(latest_price_data["current_price"])
-                            logger.debug(f"For asset {asset_type}, latest price from DB is {new_price}")
-                            pos["current_price"] = new_price
-                        except (ValueError, TypeError) as e:
-                            logger.error(f"Error converting latest price for asset {asset_type}: {e}")
-                            # Fallback to existing price if conversion fails.
-                            pos["current_price"] = pos.get("current_price", 0.0)
-                    else:
-                        logger.warning(f"No latest price found for asset type: {asset_type}")
-                else:
-                    logger.warning("Position missing 'asset_type' field.")
-
-            # Update the database with the enriched values.
-            for enriched in positions:
-                cursor = dl.conn.cursor()
-                cursor.execute("""
-                    UPDATE positions 
-                       SET travel_percent = ?,
-                           liquidation_distance = ?,
-                           heat_index = ?,
-                           current_heat_index = ?,
-                           current_price = ?
-                     WHERE id = ?
-                """, (
-                    float(enriched.get("travel_percent", 0.0)),
-                    float(enriched.get("liquidation_distance", 0.0)),
-                    float(enriched.get("heat_index", 0.0)),
-                    float(enriched.get("current_heat_index", 0.0)),
-                    float(enriched.get("current_price", 0.0)),
-                    enriched.get("id")
-                ))
-            dl.conn.commit()
+            stored = {pos["id"]: pos for pos in raw_positions}
+            positions = PositionService.enrich_positions_readonly(dl, raw_positions)
+
+            # Write back only the enriched values that changed, in a single transaction.
+            with dl.batch():
+                for enriched in positions:
+                    fields = {
+                        "travel_percent": float(enriched.get("travel_percent") or 0.0),
+                        "liquidation_distance": float(enriched.get("liquidation_distance") or 0.0),
+                        "heat_index": float(enriched.get("heat_index") or 0.0),
+                        "current_heat_index": float(enriched.get("current_heat_index") or 0.0),
+                        "current_price": float(enriched.get("current_price") or 0.0),
+                        "liquidation_probability": enriched.get("liquidation_probability"),
+                        "liquidation_probabilities": enriched.get("liquidation_probabilities"),
+                        "liquidation_volatility": enriched.get("liquidation_volatility"),
+                    }
+                    before = stored.get(enriched.get("id"), {})
+                    changes = {k: v for k, v in fields.items() if before.get(k) != v}
+                    if changes:
+                        dl.update_position_fields(enriched.get("id"), changes)
             return positions
 
         except Exception as e:
@@ -220,9 +302,7 @@ class PositionService:
 
             # Step 2: Clear hedge associations referencing this position.
             # If the position is part of any hedge, reset its hedge_buddy_id to NULL.
-            cursor = dl.conn.cursor()
-            cursor.execute("UPDATE positions SET hedge_buddy_id = NULL WHERE hedge_buddy_id = ?", (position_id,))
-            dl.conn.commit()
+            dl.clear_hedge_links(position_id)
             logger.info(f"Cleared hedge associations for position {position_id}")
 
             # Step 3: Delete the position record
@@ -237,13 +317,14 @@ class PositionService:
     def fill_positions_with_latest_price(positions: List[Any]) -> List[Dict[str, Any]]:
         try:
             dl = DataLocker.get_instance()
+            latest_prices = dl.get_latest_prices()
             for i, pos in enumerate(positions):
                 if not isinstance(pos, dict):
                     pos = dict(pos)
                     positions[i] = pos
                 asset_type = pos.get('asset_type')
                 if asset_type:
-                    latest_price_data = dl.get_latest_price(asset_type)
+                    latest_price_data = latest_prices.get(asset_type)
                     if latest_price_data and 'current_price' in latest_price_data:
                         try:
                             pos['current_price'] = float(latest_price_data['current_price'])
@@ -259,111 +340,178 @@ class PositionService:
             logger.error(f"Error in fill_positions_with_latest_price: {e}", exc_info=True)
             raise
 
+    # Exchange-owned columns; see DataLocker.upsert_positions().
+    SYNC_FIELDS = DataLocker.POSITION_SYNC_FIELDS
+
     @staticmethod
-    def update_jupiter_positions(db_path: str = DB_PATH) -> dict:
+    def sync_positions(fetched: List[Dict[str, Any]], wallet_names: List[str], db_path: str = DB_PATH) -> dict:
         """
-        Updates positions from the Jupiter API without deleting existing positions.
-        Each position from Jupiter is identified by a unique positionPubkey.
-        If a position with that ID already exists in the database, it is skipped.
-        Logs the processing of each position (its unique ID) for debugging purposes.
+        Differential sync of the positions fetched for `wallet_names`:
+          - fetched positions go through DataLocker.upsert_positions(), which
+            inserts new IDs and rewrites existing rows only when their content
+            hash changed (a CLOSED row that shows up again is reopened),
+          - open rows in those wallets that were not fetched are marked CLOSED.
+        All writes go out in one transaction.
+
+        Returns counts plus the IDs that appeared (new or reopened) and vanished,
+        so alert steps can act on just those positions.
+        """
+        dl = DataLocker.get_instance(db_path)
+        wallets = set(wallet_names)
+        fetched_ids = {pos["id"] for pos in fetched}
+
+        with dl.batch():
+            upserted = dl.upsert_positions(fetched)
+            vanished = [
+                p["id"] for p in dl.get_positions()
+                if p.get("wallet_name") in wallets and p["id"] not in fetched_ids
+            ]
+            if vanished:
+                dl.close_positions(vanished)
+
+        appeared = upserted["inserted_ids"] + upserted["reopened_ids"]
+        logger.info(
+            f"Position sync: {upserted['inserted']} new, {upserted['updated']} updated, "
+            f"{upserted['unchanged']} unchanged, {len(vanished)} closed."
+        )
+        return {
+            "imported": upserted["inserted"],
+            "updated": upserted["updated"],
+            "unchanged": upserted["unchanged"],
+            "skipped": upserted["unchanged"],
+            "closed": len(vanished),
+            "appeared": appeared,
+            "vanished": vanished,
+        }
+
+    @staticmethod
+    def map_jupiter_item(item: dict, wallet_name: str) -> Dict[str, Any]:
+        """Maps one Jupiter `dataList` entry to a position dict; raises on malformed data."""
+        pos_pubkey = item.get("positionPubkey")
+        if not pos_pubkey:
+            raise ValueError("missing positionPubkey")
+
+        # Log the Jupiter position ID being processed:
+        logger.debug(f"Processing Jupiter position with ID: {pos_pubkey}")
+
+        epoch_time = float(item.get("updatedTime", 0))
+        updated_dt = datetime.fromtimestamp(epoch_time)
+        mint = item.get("marketMint", "")
+        # Map the mint to an asset type; fallback to "BTC" if unknown.
+        asset_type = PositionService.MINT_TO_ASSET.get(mint, "BTC")
+        side = item.get("side", "short").capitalize()
+        travel_pct_value = item.get("pnlChangePctAfterFees")
+        travel_percent = float(travel_pct_value) if travel_pct_value is not None else 0.0
+
+        return {
+            "id": pos_pubkey,
+            "asset_type": asset_type,
+            "position_type": side,
+            "entry_price": float(item.get("entryPrice", 0.0)),
+            "liquidation_price": float(item.get("liquidationPrice", 0.0)),
+            "collateral": float(item.get("collateral", 0.0)),
+            "size": float(item.get("size", 0.0)),
+            "leverage": float(item.get("leverage", 0.0)),
+            "value": float(item.get("value", 0.0)),
+            "last_updated": updated_dt.isoformat(),
+            "wallet_name": wallet_name,
+            "pnl_after_fees_usd": float(item.get("pnlAfterFeesUsd", 0.0)),
+            "travel_percent": travel_percent
+        }
+
+    @staticmethod
+    async def update_jupiter_positions_async(db_path: str = DB_PATH,
+                                             base_url: str = jupiter_fetcher.JUPITER_BASE_URL,
+                                             timeout: float = jupiter_fetcher.DEFAULT_TIMEOUT_SECONDS,
+                                             max_concurrency: int = jupiter_fetcher.DEFAULT_MAX_CONCURRENCY,
+                                             session=None) -> dict:
+        """
+        Syncs positions from the Jupiter API into the database without deleting
+        anything. All wallets are fetched concurrently over one pooled HTTP
+        session (see jupiter_fetcher); the DB work runs on the AsyncDataLocker
+        executor so the event loop is never blocked. Each position from Jupiter
+        is identified by a unique positionPubkey; see sync_positions() for how
+        new, changed and vanished positions are handled.
+
+        A wallet whose request failed or timed out, or whose feed had malformed
+        items, is left out of the closing pass so a bad read never closes
+        positions.
 
         Returns:
-            A dictionary with a message and counts of imported and skipped (duplicate) positions.
+            A dictionary with a message, counts (imported/updated/unchanged/closed),
+            the IDs of positions that appeared or vanished and the wallets that failed.
         """
         logger.info("Jupiter: Updating positions from Jupiter API...")
         try:
-            dl = DataLocker.get_instance(db_path)
-            wallets_list = dl.read_wallets()
+            adl = AsyncDataLocker.get_instance(DataLocker.get_instance(db_path))
+            wallets_list = await adl.read_wallets()
             if not wallets_list:
                 logger.info("No wallets found in DB.")
-                return {"message": "No wallets found in DB", "imported": 0, "skipped": 0}
+                return {"message": "No wallets found in DB", "imported": 0, "skipped": 0,
+                        "appeared": [], "vanished": []}
 
-            new_positions = []
+            wallets = []
             for w in wallets_list:
-                public_addr = w.get("public_address", "").strip()
+                public_addr = (w.get("public_address") or "").strip()
                 if not public_addr:
                     logger.info(f"Skipping wallet {w['name']} (no public_address).")
                     continue
+                wallets.append((w["name"], public_addr))
 
-                jupiter_url = f"https://perps-api.jup.ag/v1/positions?walletAddress={public_addr}&showTpslRequests=true"
-                resp = requests.get(jupiter_url)
-                resp.raise_for_status()
-                data = resp.json()
-                data_list = data.get("dataList", [])
-                if not data_list:
-                    logger.info(f"No positions for wallet {w['name']} ({public_addr}).")
-                    continue
+            fetched = await jupiter_fetcher.fetch_wallet_positions(
+                wallets, base_url=base_url, timeout=timeout,
+                max_concurrency=max_concurrency, session=session
+            )
 
-                for item in data_list:
+            new_positions = []
+            failed_wallets = []
+            synced_wallets = []
+            for r in fetched:
+                if r["error"]:
+                    failed_wallets.append(r["wallet"])
+                    continue
+                if not r["items"]:
+                    logger.info(f"No positions for wallet {r['wallet']} ({r['address']}).")
+                partial = False
+                for item in r["items"]:
                     try:
-                        pos_pubkey = item.get("positionPubkey")
-                        if not pos_pubkey:
-                            logger.warning(f"Skipping item for wallet {w['name']} due to missing positionPubkey")
-                            continue
-
-                        # Log the Jupiter position ID being processed:
-                        logger.debug(f"Processing Jupiter position with ID: {pos_pubkey}")
-
-                        epoch_time = float(item.get("updatedTime", 0))
-                        updated_dt = datetime.fromtimestamp(epoch_time)
-                        mint = item.get("marketMint", "")
-                        # Map the mint to an asset type; fallback to "BTC" if unknown.
-                        asset_type = PositionService.MINT_TO_ASSET.get(mint, "BTC")
-                        side = item.get("side", "short").capitalize()
-                        travel_pct_value = item.get("pnlChangePctAfterFees")
-                        travel_percent = float(travel_pct_value) if travel_pct_value is not None else 0.0
-
-                        pos_dict = {
-                            "id": pos_pubkey,
-                            "asset_type": asset_type,
-                            "position_type": side,
-                            "entry_price": float(item.get("entryPrice", 0.0)),
-                            "liquidation_price": float(item.get("liquidationPrice", 0.0)),
-                            "collateral": float(item.get("collateral", 0.0)),
-                            "size": float(item.get("size", 0.0)),
-                            "leverage": float(item.get("leverage", 0.0)),
-                            "value": float(item.get("value", 0.0)),
-                            "last_updated": updated_dt.isoformat(),
-                            "wallet_name": w["name"],
-                            "pnl_after_fees_usd": float(item.get("pnlAfterFeesUsd", 0.0)),
-                            "travel_percent": travel_percent
-                        }
-                        new_positions.append(pos_dict)
+                        new_positions.append(PositionService.map_jupiter_item(item, r["wallet"]))
                     except Exception as map_err:
-                        logger.warning(f"Skipping item for wallet {w['name']} due to mapping error: {map_err}")
-
-            new_count = 0
-            duplicate_count = 0
-            for p in new_positions:
-                logger.debug(f"Checking Jupiter position with ID: {p['id']}")
-                cursor = dl.conn.cursor()
-                cursor.execute("SELECT COUNT(*) FROM positions WHERE id = ?", (p["id"],))
-                dup_count = cursor.fetchone()[0]
-                cursor.close()
-                if dup_count == 0:
-                    dl.create_position(p)
-                    new_count += 1
-                    logger.debug(f"Imported new Jupiter position: {p['id']}")
-                else:
-                    duplicate_count += 1
-                    logger.info(f"Skipping duplicate Jupiter position: {p['id']}")
+                        logger.warning(f"Skipping item for wallet {r['wallet']} due to mapping error: {map_err}")
+                        partial = True
+                # Don't close this wallet's positions on the strength of a partial read.
+                if not partial:
+                    synced_wallets.append(r["wallet"])
+
+            result = await adl.run(PositionService.sync_positions, new_positions, synced_wallets, db_path)
 
             # (Optionally) update hedges if needed:
-            hedges = PositionService.find_hedges(db_path)
-            msg = "Jupiter positions updated successfully."
-            return {"message": msg, "imported": new_count, "skipped": duplicate_count}
+            await adl.run(PositionService.find_hedges, db_path)
+            result["failed_wallets"] = failed_wallets
+            result["message"] = (
+                f"Jupiter positions synced: {result['imported']} new, {result['updated']} updated, "
+                f"{result['unchanged']} unchanged, {result['closed']} closed."
+            )
+            if failed_wallets:
+                result["message"] += f" Failed wallets: {', '.join(failed_wallets)}."
+            return result
         except Exception as e:
             logger.error(f"Error in update_jupiter_positions: {e}", exc_info=True)
             return {"error": str(e)}
 
+    @staticmethod
+    def update_jupiter_positions(db_path: str = DB_PATH) -> dict:
+        """
+        Blocking wrapper around update_jupiter_positions_async() for callers
+        without an event loop (Flask routes, scripts).
+        """
+        return asyncio.run(PositionService.update_jupiter_positions_async(db_path))
+
     @staticmethod
     def delete_all_jupiter_positions(db_path: str = DB_PATH):
         try:
             dl = DataLocker.get_instance(db_path)
-            cursor = dl.conn.cursor()
-            cursor.execute("DELETE FROM positions WHERE wallet_name IS NOT NULL")
-            dl.conn.commit()
-            cursor.close()
+            dl.execute_write("DELETE FROM positions WHERE wallet_name IS NOT NULL")
             logger.info("All Jupiter positions deleted.")
         except Exception as e:
             logger.error(f"Error deleting Jupiter positions: {e}", exc_info=True)
@@ -379,7 +527,7 @@ class PositionService:
 
             dydx_positions = client.get_perpetual_positions(wallet_address, subaccount_number)
             dl = DataLocker.get_instance(db_path)
-            new_count = 0
+            rows = []
 
             for pos in dydx_positions:
                 pos_dict = {
@@ -401,17 +549,15 @@ class PositionService:
                     "current_heat_index": 0.0,
                     "pnl_after_fees_usd": float(pos.get("pnlAfterFeesUsd", 0.0)) if pos.get("pnlAfterFeesUsd") else 0.0,
                 }
-                cursor = dl.conn.cursor()
-                cursor.execute("SELECT COUNT(*) FROM positions WHERE id = ?", (pos_dict["id"],))
-                dup_count = cursor.fetchone()[0]
-                cursor.close()
-                if dup_count == 0:
-                    dl.create_position(pos_dict)
-                    new_count += 1
-
-            msg = f"Imported {new_count} new dYdX position(s)."
+                rows.append(pos_dict)
+
+            # One bulk upsert: existing positions get fresh size/pnl, unchanged ones are skipped.
+            result = dl.upsert_positions(rows)
+            msg = (f"dYdX positions: {result['inserted']} new, {result['updated']} updated, "
+                   f"{result['unchanged']} unchanged.")
             logger.info(msg)
-            return {"message": msg, "imported": new_count}
+            return {"message": msg, "imported": result["inserted"], "updated": result["updated"],
+                    "unchanged": result["unchanged"]}
         except Exception as e:
             logger.error("Error updating dYdX positions: %s", e, exc_info=True)
             return {"error": str(e)}
@@ -454,11 +600,7 @@ class PositionService:
     @staticmethod
     def clear_hedge_data(db_path: str = DB_PATH) -> None:
         try:
-            dl = DataLocker.get_instance(db_path)
-            cursor = dl.conn.cursor()
-            cursor.execute("UPDATE positions SET hedge_buddy_id = NULL WHERE hedge_buddy_id IS NOT NULL")
-            dl.conn.commit()
-            cursor.close()
+            DataLocker.get_instance(db_path).clear_hedge_links()
             UnifiedLogger().log_operation(
                 operation_type="Clear Hedge Data",
                 primary_text="Cleared hedge association data from positions.",
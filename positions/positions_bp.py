@@ -113,7 +113,7 @@ def get_strategy_performance():
 @positions_bp.route("/", methods=["GET"])
 def list_positions():
     try:
-        positions = PositionService.get_all_positions(DB_PATH)
+        positions = PositionService.get_positions_snapshot(DB_PATH)
         dl = DataLocker.get_instance(DB_PATH)
         for pos in positions:
             wallet_name = pos.get("wallet_name")
@@ -337,7 +337,7 @@ def position_trends():
 def positions_table():
     try:
         dl = DataLocker.get_instance(DB_PATH)
-        positions = PositionService.get_all_positions(DB_PATH)
+        positions = PositionService.get_positions_snapshot(DB_PATH)
         totals = CalcServices().calculate_totals(positions)
         return render_template("positions_table.html", positions=positions, totals=totals)
     except Exception as e:
@@ -428,7 +428,7 @@ def positions_data_api():
                     "asset_type": row["asset_type"],
                     "current_price": float(row["current_price"])
                 })
-        positions = PositionService.get_all_positions(DB_PATH)
+        positions = PositionService.get_positions_snapshot(DB_PATH)
         for pos in positions:
             wallet_name = pos.get("wallet_name")
             pos["wallet_name"] = dl.get_wallet_by_name(wallet_name) if wallet_name else None
@@ -448,7 +448,7 @@ def positions_mobile():
     try:
         dl = DataLocker.get_instance(DB_PATH)
         calc = CalcServices()
-        positions = PositionService.get_all_positions(DB_PATH)
+        positions = PositionService.get_positions_snapshot(DB_PATH)
         for pos in positions:
             wallet_name = pos.get("wallet_name")
             pos["wallet_name"] = dl.get_wallet_by_name(wallet_name) if wallet_name else None
@@ -685,7 +685,7 @@ def update_jupiter():
     # Step 2.5: Update hedges using HedgeManager.
     try:
         logger.debug("Step 2.5: Updating hedges using HedgeManager...")
-        positions = PositionService.get_all_positions(DB_PATH)
+        positions = PositionService.get_positions_snapshot(DB_PATH)
         logger.debug(f"Fetched {len(positions)} positions for hedge update.")
         from sonic_labs.hedge_manager import HedgeManager
         hedge_manager = HedgeManager(positions)
@@ -847,7 +847,7 @@ def save_theme():
 @positions_bp.route("/top_positions", methods=["GET"])
 def show_top_positions():
     try:
-        all_positions = PositionService.get_all_positions(DB_PATH)
+        all_positions = PositionService.get_positions_snapshot(DB_PATH)
         # Filter positions with a valid current_travel_percent
         valid_positions = [pos for pos in all_positions if pos.get("current_travel_percent") is not None]
 
@@ -877,7 +877,7 @@ def show_top_positions():
 def top_bottom_positions():
     try:
         # Retrieve and enrich all positions
-        positions = PositionService.get_all_positions(DB_PATH)
+        positions = PositionService.get_positions_snapshot(DB_PATH)
 
         # Filter out any positions without a travel percent value
         valid_positions = [p for p in positions if p.get("travel_percent") is not None]
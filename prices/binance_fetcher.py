@@ -1,38 +1,55 @@
+import asyncio
 import aiohttp
 import logging
-from typing import Dict, List
+from typing import Dict, List, Optional
 
 logger = logging.getLogger("BinanceFetcher")
 
 BINANCE_BASE_URL = "https://api.binance.com"
 
-async def fetch_current_binance(symbols: List[str]) -> Dict[str, float]:
+async def fetch_current_binance(symbols: List[str],
+                                session: Optional[aiohttp.ClientSession] = None,
+                                raise_errors: bool = False) -> Dict[str, float]:
     """
     Fetch the latest spot prices from Binance for each symbol in 'symbols'.
     Each symbol is typically in the form "BTCUSDT", "ETHUSDT", etc.
+    The symbols are requested concurrently, over `session` when given
+    (the caller keeps it open), else over a session of our own.
+    With `raise_errors`, HTTP and connection errors are raised instead of
+    logged and swallowed.
     
     Returns a dict: { "BTC": 12345.67, "ETH": 2345.67, ... } by stripping "USDT".
     """
     result = {}
+
+    async def fetch_one(client: aiohttp.ClientSession, sym: str):
+        url = f"{BINANCE_BASE_URL}/api/v3/ticker/price?symbol={sym}"
+        async with client.get(url) as resp:
+            if resp.status != 200:
+                if raise_errors:
+                    resp.raise_for_status()
+                logger.error(f"Binance fetch failed for {sym}: status {resp.status}")
+                return
+            data = await resp.json()
+            logger.debug(f"Binance response for {sym}: {data}")
+
+            # data looks like: { "symbol": "BTCUSDT", "price": "12345.67" }
+            price_str = data.get("price")
+            if price_str is not None:
+                # We'll map "BTCUSDT" -> "BTC"
+                # If you use BUSD or something else, adapt the slicing
+                base_coin = sym.replace("USDT", "")  # naive approach
+                result[base_coin.upper()] = float(price_str)
+
     try:
-        async with aiohttp.ClientSession() as session:
-            for sym in symbols:
-                url = f"{BINANCE_BASE_URL}/api/v3/ticker/price?symbol={sym}"
-                async with session.get(url) as resp:
-                    if resp.status != 200:
-                        logger.error(f"Binance fetch failed for {sym}: status {resp.status}")
-                        continue
-                    data = await resp.json()
-                    logger.debug(f"Binance response for {sym}: {data}")
-                    
-                    # data looks like: { "symbol": "BTCUSDT", "price": "12345.67" }
-                    price_str = data.get("price")
-                    if price_str is not None:
-                        # We'll map "BTCUSDT" -> "BTC"
-                        # If you use BUSD or something else, adapt the slicing
-                        base_coin = sym.replace("USDT", "")  # naive approach
-                        result[base_coin.upper()] = float(price_str)
+        if session is not None:
+            await asyncio.gather(*(fetch_one(session, sym) for sym in symbols))
+        else:
+            async with aiohttp.ClientSession() as own_session:
+                await asyncio.gather(*(fetch_one(own_session, sym) for sym in symbols))
     except Exception as e:
+        if raise_errors:
+            raise
         logger.error(f"Error fetching from Binance: {e}", exc_info=True)
 
     return result
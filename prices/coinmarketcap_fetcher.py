@@ -1,21 +1,24 @@
 # price_sources/coinmarketcap_fetcher.py
 import aiohttp
 import logging
-from typing import Dict, List, Any
+from typing import Dict, List, Any, Optional
 import datetime
 
 logger = logging.getLogger("CoinMarketCapFetcher")
 
 CMC_BASE_URL = "https://pro-api.coinmarketcap.com/v1"
 
-import aiohttp
-from typing import List, Dict
-
 async def fetch_current_cmc(
     symbols: List[str],
     convert: str,
-    api_key: str
+    api_key: str,
+    session: Optional[aiohttp.ClientSession] = None
 ) -> Dict[str, float]:
+    """
+    Latest quotes for `symbols` (e.g. ["BTC", "ETH"]); a symbol missing from
+    the response maps to 0.0. Uses `session` when given (the caller keeps it
+    open), else a session of its own. Raises on HTTP errors.
+    """
     # Make sure our API key isn’t None
     if not api_key:
         raise ValueError("CoinMarketCap API key is missing or empty.")
@@ -29,10 +32,16 @@ async def fetch_current_cmc(
         "convert": convert or "USD"      # default to USD if convert is falsy
     }
 
-    async with aiohttp.ClientSession() as session:
-        async with session.get(url, headers=headers, params=params) as resp:
+    async def get_payload(client: aiohttp.ClientSession) -> dict:
+        async with client.get(url, headers=headers, params=params) as resp:
             resp.raise_for_status()
-            payload = await resp.json()
+            return await resp.json()
+
+    if session is not None:
+        payload = await get_payload(session)
+    else:
+        async with aiohttp.ClientSession() as own_session:
+            payload = await get_payload(own_session)
 
     results: Dict[str, float] = {}
     for sym in symbols:
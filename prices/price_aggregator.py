@@ -0,0 +1,278 @@
+#!/usr/bin/env python
+"""
+price_aggregator.py
+Description:
+    Fetches the tracked assets from every enabled price source at once and
+    reduces the quotes to one consensus price per asset.
+
+      - Sources (CoinGecko, CoinMarketCap, CoinPaprika, Binance) run
+        concurrently over one aiohttp session per fetch, each bounded by its own
+        timeout, so a cycle takes as long as the slowest source that answers
+        in time rather than the sum of all of them.
+      - consensus() takes the median of the quotes, drops any quote more than
+        max_deviation_pct away from it and returns the median of the rest.
+      - Per-source request count, errors, timeouts and latency are kept in
+        memory and exposed through get_source_stats().
+
+    Sources are switched on by "<source>_api_enabled": "ENABLE" in the
+    'api_config' block of sonic_config.json. aiohttp and the fetcher modules
+    are imported on first use.
+Usage:
+    aggregator = PriceAggregator.get_instance()    # sources from api_config
+    prices = await aggregator.fetch_prices()       # {"BTC": 67012.5, ...}
+    prices = aggregator.fetch_prices_sync()        # from synchronous code
+    aggregator.get_source_stats()                  # {"binance": {"error_rate": 0.0, ...}}
+"""
+
+import asyncio
+import json
+import logging
+import statistics
+import threading
+import time
+from contextlib import asynccontextmanager
+from typing import Awaitable, Callable, Dict, Iterable, List, Optional
+
+from config.config_constants import CONFIG_PATH
+
+logger = logging.getLogger("PriceAggregator")
+
+DEFAULT_ASSETS = ("BTC", "ETH", "SOL")
+DEFAULT_TIMEOUT_SECONDS = 5.0
+DEFAULT_MAX_DEVIATION_PCT = 2.0
+
+# Source fetch: (session, assets) -> {asset: price}
+SourceFetch = Callable[[object, List[str]], Awaitable[Dict[str, float]]]
+
+COINGECKO_IDS = {"BTC": "bitcoin", "ETH": "ethereum", "SOL": "solana"}
+COINPAPRIKA_IDS = {"BTC": "btc-bitcoin", "ETH": "eth-ethereum", "SOL": "sol-solana"}
+BINANCE_QUOTE = "USDT"
+
+
+# ----------------------------------------------------------------
+# Source adapters: map our asset symbols to each API and back.
+# They ask the fetchers to raise, so failures reach the source stats.
+# ----------------------------------------------------------------
+
+async def _coingecko(session, assets: List[str]) -> Dict[str, float]:
+    from prices.coingecko_fetcher import fetch_current_coingecko
+    slugs = {COINGECKO_IDS[a]: a for a in assets if a in COINGECKO_IDS}
+    quotes = await fetch_current_coingecko(list(slugs), "USD", session=session, raise_errors=True)
+    # The fetcher keys by the upper-cased slug ("BITCOIN").
+    return {slugs[slug]: quotes[slug.upper()] for slug in slugs if slug.upper() in quotes}
+
+
+async def _coinpaprika(session, assets: List[str]) -> Dict[str, float]:
+    from prices.coinpaprika_fetcher import fetch_current_coinpaprika
+    ids = [COINPAPRIKA_IDS[a] for a in assets if a in COINPAPRIKA_IDS]
+    return await fetch_current_coinpaprika(ids, session=session, raise_errors=True)
+
+
+async def _binance(session, assets: List[str]) -> Dict[str, float]:
+    from prices.binance_fetcher import fetch_current_binance
+    return await fetch_current_binance([f"{a}{BINANCE_QUOTE}" for a in assets], session=session,
+                                       raise_errors=True)
+
+
+def _coinmarketcap(api_key: str) -> SourceFetch:
+    async def fetch(session, assets: List[str]) -> Dict[str, float]:
+        from prices.coinmarketcap_fetcher import fetch_current_cmc
+        # Missing symbols come back as 0.0; consensus() ignores non-positive quotes.
+        return await fetch_current_cmc(list(assets), "USD", api_key, session=session)
+    return fetch
+
+
+# ----------------------------------------------------------------
+# Consensus
+# ----------------------------------------------------------------
+
+def consensus(quotes: Dict[str, float], max_deviation_pct: float = DEFAULT_MAX_DEVIATION_PCT) -> Optional[dict]:
+    """
+    Reduces {source: price} for one asset to
+    {"price", "median", "sources", "outliers"}, or None without a usable quote.
+    Quotes further than max_deviation_pct from the median are outliers; if
+    every quote is an outlier (two sources that disagree) all are kept.
+    """
+    valid = {src: float(p) for src, p in quotes.items() if p is not None and float(p) > 0}
+    if not valid:
+        return None
+    median = statistics.median(valid.values())
+    kept = {src: p for src, p in valid.items() if abs(p - median) / median * 100 <= max_deviation_pct}
+    if not kept:
+        kept = valid
+    return {
+        "price": statistics.median(kept.values()),
+        "median": median,
+        "sources": sorted(kept),
+        "outliers": {src: p for src, p in valid.items() if src not in kept},
+    }
+
+
+# ----------------------------------------------------------------
+# Aggregator
+# ----------------------------------------------------------------
+
+class PriceAggregator:
+    _instance = None
+    _instance_lock = threading.Lock()
+
+    def __init__(self, sources: Dict[str, SourceFetch], timeout: float = DEFAULT_TIMEOUT_SECONDS,
+                 max_deviation_pct: float = DEFAULT_MAX_DEVIATION_PCT,
+                 assets: Iterable[str] = DEFAULT_ASSETS,
+                 session_factory: Optional[Callable[[], object]] = None):
+        self.sources = dict(sources)
+        self.timeout = float(timeout)
+        self.max_deviation_pct = float(max_deviation_pct)
+        self.assets = list(assets)
+        self._session_factory = session_factory or self._aiohttp_session
+        self._lock = threading.Lock()
+        self._stats = {name: self._empty_stats() for name in self.sources}
+
+    @classmethod
+    def from_config(cls, config_path=CONFIG_PATH, **kwargs) -> "PriceAggregator":
+        """Aggregator over the sources enabled in api_config."""
+        try:
+            with open(config_path, "r", encoding="utf-8") as f:
+                config = json.load(f)
+        except Exception as e:
+            logger.error(f"Error reading {config_path}: {e}")
+            config = {}
+        api_config = config.get("api_config", {})
+
+        def enabled(name: str) -> bool:
+            return str(api_config.get(f"{name}_api_enabled", "")).upper() == "ENABLE"
+
+        sources: Dict[str, SourceFetch] = {}
+        if enabled("coingecko"):
+            sources["coingecko"] = _coingecko
+        if enabled("coinmarketcap"):
+            api_key = api_config.get("coinmarketcap_api_key") or config.get("cmc_api_key")
+            if api_key:
+                sources["coinmarketcap"] = _coinmarketcap(api_key)
+            else:
+                logger.warning("CoinMarketCap is enabled but has no API key; skipping it.")
+        if enabled("coinpaprika"):
+            sources["coinpaprika"] = _coinpaprika
+        if enabled("binance"):
+            sources["binance"] = _binance
+        return cls(sources, **kwargs)
+
+    @classmethod
+    def get_instance(cls) -> "PriceAggregator":
+        """Process-wide aggregator from config, so source stats accumulate across cycles."""
+        with cls._instance_lock:
+            if cls._instance is None:
+                cls._instance = cls.from_config()
+            return cls._instance
+
+    # ----------------------------------------------------------------
+    # Session
+    # ----------------------------------------------------------------
+
+    def _aiohttp_session(self):
+        import aiohttp
+        return aiohttp.ClientSession()
+
+    @asynccontextmanager
+    async def _session(self):
+        """
+        A session shared by the sources for one fetch and closed after it.
+        Callers run on different event loops (asyncio.run per manual update),
+        and a session can't outlive the loop it was opened on.
+        """
+        session = self._session_factory()
+        try:
+            yield session
+        finally:
+            await session.close()
+
+    # ----------------------------------------------------------------
+    # Fetching
+    # ----------------------------------------------------------------
+
+    async def _fetch_source(self, name: str, session, assets: List[str]) -> Dict[str, float]:
+        start = time.perf_counter()
+        error = None
+        quotes: Dict[str, float] = {}
+        try:
+            quotes = await asyncio.wait_for(self.sources[name](session, assets), self.timeout)
+            quotes = quotes or {}
+            if not quotes:
+                error = "no quotes"
+                logger.warning(f"{name} returned no quotes")
+        except asyncio.TimeoutError:
+            error = "timeout"
+            logger.warning(f"{name} timed out after {self.timeout}s")
+        except Exception as e:
+            error = str(e) or type(e).__name__
+            logger.error(f"{name} fetch failed: {e}")
+        self._record(name, time.perf_counter() - start, error)
+        return quotes
+
+    async def fetch(self, assets: Optional[Iterable[str]] = None) -> dict:
+        """
+        Queries every source concurrently. Returns
+        {"prices": {asset: price}, "consensus": {asset: consensus()}, "quotes": {source: {asset: price}}}.
+        """
+        assets = list(assets or self.assets)
+        if not self.sources:
+            logger.warning("No price sources enabled.")
+            return {"prices": {}, "consensus": {}, "quotes": {}}
+        names = list(self.sources)
+        async with self._session() as session:
+            results = await asyncio.gather(*(self._fetch_source(name, session, assets) for name in names))
+        quotes = dict(zip(names, results))
+
+        prices, details = {}, {}
+        for asset in assets:
+            agreed = consensus({name: q.get(asset) for name, q in quotes.items()}, self.max_deviation_pct)
+            if agreed is None:
+                logger.warning(f"No source returned a price for {asset}")
+                continue
+            if agreed["outliers"]:
+                logger.warning(f"{asset}: outlier quotes {agreed['outliers']} vs median {agreed['median']:.6g}")
+            prices[asset] = agreed["price"]
+            details[asset] = agreed
+        return {"prices": prices, "consensus": details, "quotes": quotes}
+
+    async def fetch_prices(self, assets: Optional[Iterable[str]] = None) -> Dict[str, float]:
+        return (await self.fetch(assets))["prices"]
+
+    def fetch_prices_sync(self, assets: Optional[Iterable[str]] = None) -> Dict[str, float]:
+        """fetch_prices() on a fresh event loop, for synchronous callers."""
+        return asyncio.run(self.fetch_prices(assets))
+
+    # ----------------------------------------------------------------
+    # Stats
+    # ----------------------------------------------------------------
+
+    @staticmethod
+    def _empty_stats() -> dict:
+        return {"requests": 0, "errors": 0, "timeouts": 0, "total_latency": 0.0,
+                "last_latency": None, "last_error": None, "last_success": None}
+
+    def _record(self, name: str, latency: float, error: Optional[str]):
+        with self._lock:
+            stats = self._stats.setdefault(name, self._empty_stats())
+            stats["requests"] += 1
+            stats["total_latency"] += latency
+            stats["last_latency"] = latency
+            if error is None:
+                stats["last_success"] = time.time()
+            else:
+                stats["errors"] += 1
+                stats["last_error"] = error
+                if error == "timeout":
+                    stats["timeouts"] += 1
+
+    def get_source_stats(self) -> Dict[str, dict]:
+        """{source: counts, avg/last latency in seconds, error_rate in [0, 1]}."""
+        with self._lock:
+            out = {}
+            for name, stats in self._stats.items():
+                requests = stats["requests"]
+                row = {k: v for k, v in stats.items() if k != "total_latency"}
+                row["avg_latency"] = stats["total_latency"] / requests if requests else None
+                row["error_rate"] = stats["errors"] / requests if requests else 0.0
+                out[name] = row
+            return out
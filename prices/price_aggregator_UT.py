@@ -0,0 +1,170 @@
+import asyncio
+import json
+import os
+import socket
+import tempfile
+import unittest
+from unittest import mock
+
+from prices.price_aggregator import PriceAggregator, _binance, _coingecko, _coinpaprika, consensus
+
+
+class FakeSession:
+    def __init__(self):
+        self.closed = False
+
+    async def close(self):
+        self.closed = True
+
+
+def source(quotes, delay=0.0, error=None):
+    async def fetch(session, assets):
+        await asyncio.sleep(delay)
+        if error:
+            raise error
+        return {a: p for a, p in quotes.items() if a in assets}
+    return fetch
+
+
+class TestConsensus(unittest.TestCase):
+    def test_median_without_outliers(self):
+        result = consensus({"a": 100.0, "b": 101.0, "c": 99.5})
+        self.assertEqual(result["price"], 100.0)
+        self.assertEqual(result["sources"], ["a", "b", "c"])
+        self.assertEqual(result["outliers"], {})
+
+    def test_outlier_dropped(self):
+        result = consensus({"a": 100.0, "b": 100.4, "c": 100.2, "d": 150.0}, max_deviation_pct=2.0)
+        self.assertEqual(result["outliers"], {"d": 150.0})
+        self.assertAlmostEqual(result["price"], 100.2)
+
+    def test_invalid_quotes_ignored(self):
+        self.assertIsNone(consensus({"a": None, "b": 0.0}))
+        self.assertEqual(consensus({"a": 0.0, "b": 42.0})["price"], 42.0)
+
+    def test_two_disagreeing_sources_kept(self):
+        result = consensus({"a": 100.0, "b": 120.0}, max_deviation_pct=2.0)
+        self.assertEqual(result["price"], 110.0)
+        self.assertEqual(result["outliers"], {})
+
+
+class TestPriceAggregator(unittest.TestCase):
+    def make(self, sources, **kwargs):
+        self.sessions = []
+
+        def factory():
+            session = FakeSession()
+            self.sessions.append(session)
+            return session
+        return PriceAggregator(sources, session_factory=factory, **kwargs)
+
+    def test_sources_run_concurrently(self):
+        in_flight = {"now": 0, "max": 0}
+
+        def tracked(quotes):
+            inner = source(quotes, delay=0.05)
+
+            async def fetch(session, assets):
+                in_flight["now"] += 1
+                in_flight["max"] = max(in_flight["max"], in_flight["now"])
+                try:
+                    return await inner(session, assets)
+                finally:
+                    in_flight["now"] -= 1
+            return fetch
+
+        agg = self.make({
+            "a": tracked({"BTC": 100.0, "ETH": 10.0}),
+            "b": tracked({"BTC": 101.0, "ETH": 10.1}),
+            "c": tracked({"BTC": 99.0}),
+        }, assets=["BTC", "ETH"])
+        result = asyncio.run(agg.fetch())
+        self.assertEqual(in_flight["max"], 3)
+        self.assertEqual(result["prices"]["BTC"], 100.0)
+        self.assertAlmostEqual(result["prices"]["ETH"], 10.05)
+        self.assertEqual(result["consensus"]["ETH"]["sources"], ["a", "b"])
+
+    def test_timeouts_and_errors_recorded(self):
+        agg = self.make({
+            "fast": source({"BTC": 100.0}),
+            "slow": source({"BTC": 100.0}, delay=1.0),
+            "broken": source({}, error=RuntimeError("HTTP 500")),
+        }, timeout=0.1, assets=["BTC"])
+        self.assertEqual(agg.fetch_prices_sync(), {"BTC": 100.0})
+        agg.fetch_prices_sync()
+
+        stats = agg.get_source_stats()
+        self.assertEqual(stats["fast"]["requests"], 2)
+        self.assertEqual(stats["fast"]["error_rate"], 0.0)
+        self.assertEqual(stats["slow"]["timeouts"], 2)
+        self.assertEqual(stats["slow"]["error_rate"], 1.0)
+        self.assertEqual(stats["broken"]["last_error"], "HTTP 500")
+        self.assertIsNotNone(stats["fast"]["avg_latency"])
+        # One session per fetch, closed when it ends.
+        self.assertEqual(len(self.sessions), 2)
+        self.assertTrue(all(s.closed for s in self.sessions))
+
+    def test_sources_share_one_session_per_fetch(self):
+        seen = []
+
+        async def record(session, assets):
+            seen.append(session)
+            return {"BTC": 100.0}
+        agg = self.make({"a": record, "b": record}, assets=["BTC"])
+
+        async def twice():
+            await agg.fetch()
+            await agg.fetch()
+        asyncio.run(twice())
+        self.assertEqual(seen, [self.sessions[0]] * 2 + [self.sessions[1]] * 2)
+        self.assertTrue(all(s.closed for s in self.sessions))
+
+    def test_unreachable_sources_count_as_errors(self):
+        # A port nothing listens on: the fetchers' connection errors must reach the stats.
+        with socket.socket() as sock:
+            sock.bind(("127.0.0.1", 0))
+            base = f"http://127.0.0.1:{sock.getsockname()[1]}"
+        agg = PriceAggregator({"coingecko": _coingecko, "binance": _binance, "coinpaprika": _coinpaprika},
+                              timeout=5.0, assets=["BTC"])
+        with mock.patch("prices.coingecko_fetcher.COINGECKO_BASE_URL", base), \
+                mock.patch("prices.binance_fetcher.BINANCE_BASE_URL", base), \
+                mock.patch("prices.coinpaprika_fetcher.COINPAPRIKA_BASE_URL", base):
+            self.assertEqual(agg.fetch_prices_sync(), {})
+
+        for name, stats in agg.get_source_stats().items():
+            self.assertEqual(stats["errors"], 1, name)
+            self.assertEqual(stats["error_rate"], 1.0, name)
+            self.assertIsNone(stats["last_success"], name)
+
+    def test_empty_quotes_count_as_error(self):
+        agg = self.make({"a": source({"BTC": 100.0}), "empty": source({})}, assets=["BTC"])
+        self.assertEqual(agg.fetch_prices_sync(), {"BTC": 100.0})
+        stats = agg.get_source_stats()
+        self.assertEqual(stats["a"]["error_rate"], 0.0)
+        self.assertEqual(stats["empty"]["error_rate"], 1.0)
+        self.assertEqual(stats["empty"]["last_error"], "no quotes")
+
+    def test_no_prices(self):
+        agg = self.make({"a": source({}, error=ValueError("down"))}, assets=["BTC"])
+        self.assertEqual(agg.fetch_prices_sync(), {})
+
+    def test_from_config(self):
+        config = {"api_config": {
+            "coingecko_api_enabled": "ENABLE",
+            "coinmarketcap_api_enabled": "ENABLE",
+            "coinpaprika_api_enabled": "DISABLE",
+            "binance_api_enabled": "ENABLE",
+            "coinmarketcap_api_key": "key",
+        }}
+        fd, path = tempfile.mkstemp(suffix=".json")
+        try:
+            with os.fdopen(fd, "w") as f:
+                json.dump(config, f)
+            agg = PriceAggregator.from_config(path)
+        finally:
+            os.remove(path)
+        self.assertEqual(sorted(agg.sources), ["binance", "coingecko", "coinmarketcap"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,222 @@
+#!/usr/bin/env python
+"""
+price_compactor.py
+Description:
+    Rolls raw rows from the append-only 'prices' table into 1m/5m/1h/1d OHLC bars
+    (table 'price_bars') and prunes raw rows and fine-grained bars past their
+    retention window. Compaction is incremental: a rowid watermark records the
+    last raw row folded into bars, so each run only touches new rows.
+
+    Readers (price charts, percent-change API) call load_price_series() /
+    percent_change(), which pick the coarsest resolution that still gives a
+    useful number of points for the requested window.
+Usage:
+    PriceCompactor().compact()   # also available as the Cyclone "compact_prices" step
+"""
+
+import logging
+import math
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+
+from data.data_locker import DataLocker
+
+logger = logging.getLogger("PriceCompactor")
+
+# Resolution name -> bucket width in seconds, finest first.
+RESOLUTIONS: Dict[str, int] = {
+    "1m": 60,
+    "5m": 300,
+    "1h": 3600,
+    "1d": 86400,
+}
+
+DEFAULT_RAW_RETENTION_HOURS = 48
+# None means keep forever.
+DEFAULT_BAR_RETENTION_HOURS: Dict[str, Optional[int]] = {
+    "1m": 48,
+    "5m": 24 * 14,
+    "1h": 24 * 180,
+    "1d": None,
+}
+
+# A chart or change calculation wants at least this many points in its window.
+MIN_POINTS = 60
+
+
+def choose_resolution(hours: float, min_points: int = MIN_POINTS) -> str:
+    """Coarsest resolution that still yields min_points buckets across `hours`."""
+    window_seconds = max(float(hours), 0.0) * 3600
+    chosen = "1m"
+    for name, seconds in RESOLUTIONS.items():
+        if window_seconds / seconds >= min_points:
+            chosen = name
+    return chosen
+
+
+def _parse_ts(value) -> Optional[float]:
+    if not value:
+        return None
+    try:
+        return datetime.fromisoformat(str(value)).timestamp()
+    except ValueError:
+        return None
+
+
+class PriceCompactor:
+    def __init__(self, data_locker: Optional[DataLocker] = None,
+                 raw_retention_hours: float = DEFAULT_RAW_RETENTION_HOURS,
+                 bar_retention_hours: Optional[Dict[str, Optional[int]]] = None,
+                 chunk_size: int = 5000):
+        self.data_locker = data_locker or DataLocker.get_instance()
+        self.raw_retention_hours = raw_retention_hours
+        self.bar_retention_hours = dict(DEFAULT_BAR_RETENTION_HOURS)
+        if bar_retention_hours:
+            self.bar_retention_hours.update(bar_retention_hours)
+        self.chunk_size = chunk_size
+
+    @staticmethod
+    def build_bars(rows: List[dict]) -> List[dict]:
+        """Aggregates raw price rows into partial OHLC bars for every resolution."""
+        bars: Dict[Tuple[str, str, int], dict] = {}
+        for row in rows:
+            ts = _parse_ts(row.get("last_update_time"))
+            asset = row.get("asset_type")
+            price = row.get("current_price")
+            if ts is None or not asset or price is None:
+                continue
+            price = float(price)
+            for resolution, seconds in RESOLUTIONS.items():
+                bucket_start = int(ts // seconds) * seconds
+                key = (asset, resolution, bucket_start)
+                bar = bars.get(key)
+                if bar is None:
+                    bars[key] = {
+                        "asset_type": asset,
+                        "resolution": resolution,
+                        "bucket_start": bucket_start,
+                        "open": price, "high": price, "low": price, "close": price,
+                        "open_ts": ts, "close_ts": ts,
+                        "samples": 1,
+                    }
+                    continue
+                if ts < bar["open_ts"]:
+                    bar["open"], bar["open_ts"] = price, ts
+                if ts >= bar["close_ts"]:
+                    bar["close"], bar["close_ts"] = price, ts
+                bar["high"] = max(bar["high"], price)
+                bar["low"] = min(bar["low"], price)
+                bar["samples"] += 1
+        return list(bars.values())
+
+    def compact(self) -> dict:
+        """
+        Folds all raw rows past the watermark into bars, then applies retention.
+        Returns counts for logging.
+        """
+        dl = self.data_locker
+        watermark = dl.get_price_compaction_watermark()
+        compacted = 0
+        bar_writes = 0
+        while True:
+            rows = dl.get_prices_after_rowid(watermark, self.chunk_size)
+            if not rows:
+                break
+            bars = self.build_bars(rows)
+            new_watermark = rows[-1]["row_id"]
+            # Bars and the watermark move together so a crash can't double-count.
+            with dl.batch():
+                dl.upsert_price_bars(bars)
+                dl.set_price_compaction_watermark(new_watermark)
+            watermark = new_watermark
+            compacted += len(rows)
+            bar_writes += len(bars)
+            if len(rows) < self.chunk_size:
+                break
+
+        pruned_raw, pruned_bars = self.prune(watermark)
+        summary = {
+            "compacted": compacted,
+            "bar_writes": bar_writes,
+            "pruned_raw": pruned_raw,
+            "pruned_bars": pruned_bars,
+        }
+        logger.info(f"Price compaction complete: {summary}")
+        return summary
+
+    def prune(self, watermark: int) -> Tuple[int, int]:
+        dl = self.data_locker
+        now = datetime.now()
+        pruned_raw = 0
+        if self.raw_retention_hours is not None:
+            cutoff = (now - timedelta(hours=self.raw_retention_hours)).isoformat()
+            pruned_raw = dl.prune_prices(cutoff, watermark)
+        pruned_bars = 0
+        for resolution, hours in self.bar_retention_hours.items():
+            if hours is None:
+                continue
+            cutoff_ts = (now - timedelta(hours=hours)).timestamp()
+            pruned_bars += dl.prune_price_bars(resolution, cutoff_ts)
+        return pruned_raw, pruned_bars
+
+
+# ---------------------------------------------------------------------------
+# Read helpers
+# ---------------------------------------------------------------------------
+
+def load_price_series(data_locker: DataLocker, asset_type: str, hours: float) -> List[List[float]]:
+    """
+    Returns [[epoch_ms, price], ...] for the last `hours`, oldest first, using the
+    coarsest bar resolution that fits the window. Falls back to raw rows when no
+    bars have been compacted yet.
+    """
+    since = datetime.now() - timedelta(hours=hours)
+    resolution = choose_resolution(hours)
+    bars = data_locker.get_price_bars(asset_type, resolution, since.timestamp())
+    if bars:
+        return [[bar["bucket_start"] * 1000, float(bar["close"])] for bar in bars]
+
+    series = []
+    for row in data_locker.get_price_points(asset_type, since.isoformat()):
+        ts = _parse_ts(row.get("last_update_time"))
+        if ts is not None and row.get("current_price") is not None:
+            series.append([int(ts * 1000), float(row["current_price"])])
+    return series
+
+
+def percent_change(data_locker: DataLocker, asset_type: str, hours: float) -> Optional[float]:
+    """Percent change from the start of the window to the latest stored price."""
+    since = datetime.now() - timedelta(hours=hours)
+    bars = data_locker.get_price_bars(asset_type, choose_resolution(hours), since.timestamp())
+    if bars:
+        start_price = bars[0]["open"]
+    else:
+        points = data_locker.get_price_points(asset_type, since.isoformat())
+        start_price = points[0]["current_price"] if points else None
+
+    latest = data_locker.get_latest_price(asset_type) or {}
+    end_price = latest.get("current_price")
+    if not start_price or end_price is None:
+        return None
+    return (float(end_price) - float(start_price)) / float(start_price) * 100
+
+
+SECONDS_IN_YEAR = 365 * 24 * 3600
+
+
+def realized_volatility(data_locker: DataLocker, asset_type: str, hours: float) -> Optional[float]:
+    """
+    Annualized volatility of the stored prices over the last `hours`:
+    sqrt(sum of squared log returns / elapsed years), so uneven spacing between
+    points is accounted for. None with fewer than two usable prices.
+    """
+    series = [(ts, price) for ts, price in load_price_series(data_locker, asset_type, hours) if price > 0]
+    if len(series) < 2:
+        return None
+    sum_sq = 0.0
+    for (_, previous), (_, price) in zip(series, series[1:]):
+        sum_sq += math.log(price / previous) ** 2
+    elapsed_years = (series[-1][0] - series[0][0]) / 1000.0 / SECONDS_IN_YEAR
+    if elapsed_years <= 0:
+        return None
+    return math.sqrt(sum_sq / elapsed_years)
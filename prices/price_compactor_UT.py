@@ -0,0 +1,65 @@
+import math
+import unittest
+from datetime import datetime, timedelta
+
+from data.data_locker import DataLocker
+from prices.price_compactor import PriceCompactor, choose_resolution, load_price_series, realized_volatility
+
+
+class TestPriceCompactor(unittest.TestCase):
+    def setUp(self):
+        DataLocker._instance = None
+        self.dl = DataLocker(":memory:")
+
+    def tearDown(self):
+        self.dl.close()
+        DataLocker._instance = None
+
+    def _insert(self, when, price, asset="BTC"):
+        self.dl.insert_price({"asset_type": asset, "current_price": price, "last_update_time": when.isoformat()})
+
+    def test_choose_resolution_picks_coarsest_that_fits(self):
+        self.assertEqual(choose_resolution(1), "1m")
+        self.assertEqual(choose_resolution(6), "5m")
+        self.assertEqual(choose_resolution(24 * 7), "1h")
+        self.assertEqual(choose_resolution(24 * 90), "1d")
+
+    def test_compaction_builds_ohlc_and_is_incremental(self):
+        start = datetime.now().replace(second=0, microsecond=0) - timedelta(minutes=30)
+        for i, price in enumerate([10.0, 12.0, 9.0]):
+            self._insert(start + timedelta(seconds=10 * i), price)
+        compactor = PriceCompactor(self.dl, raw_retention_hours=None)
+        self.assertEqual(compactor.compact()["compacted"], 3)
+
+        self._insert(start + timedelta(seconds=50), 11.0)
+        self.assertEqual(compactor.compact()["compacted"], 1)
+
+        bar = self.dl.get_price_bars("BTC", "1m", start.timestamp())[0]
+        self.assertEqual((bar["open"], bar["high"], bar["low"], bar["close"]), (10.0, 12.0, 9.0, 11.0))
+        self.assertEqual(bar["samples"], 4)
+
+    def test_retention_prunes_only_compacted_raw_rows(self):
+        old = datetime.now() - timedelta(hours=72)
+        self._insert(old, 5.0)
+        PriceCompactor(self.dl, raw_retention_hours=48).compact()
+        self.assertEqual(self.dl.get_prices("BTC"), [])
+        self.assertTrue(self.dl.get_price_bars("BTC", "1h", (old - timedelta(hours=1)).timestamp()))
+
+    def test_series_falls_back_to_raw_rows(self):
+        self._insert(datetime.now() - timedelta(minutes=5), 100.0)
+        series = load_price_series(self.dl, "BTC", 1)
+        self.assertEqual(len(series), 1)
+        self.assertEqual(series[0][1], 100.0)
+
+
+    def test_realized_volatility_annualizes_log_returns(self):
+        start = datetime.now() - timedelta(hours=2)
+        for i, price in enumerate([100.0, 101.0, 100.0, 101.0]):
+            self._insert(start + timedelta(minutes=10 * i), price)
+        log_move = math.log(101.0 / 100.0)
+        expected = math.sqrt(3 * log_move ** 2 / (30 * 60 / (365 * 24 * 3600)))
+        self.assertAlmostEqual(realized_volatility(self.dl, "BTC", 3), expected, places=6)
+        self.assertIsNone(realized_volatility(self.dl, "ETH", 3))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -22,7 +22,9 @@ from flask import Blueprint, request, jsonify, render_template, redirect, url_fo
 # Import configuration constants and modules
 from config.config_constants import DB_PATH, CONFIG_PATH
 from data.data_locker import DataLocker
+from prices.price_compactor import load_price_series
 from monitor.price_monitor import PriceMonitor
+from prices.price_aggregator import PriceAggregator
 
 
 # ---------------------------------------------------------------------------
@@ -33,12 +35,8 @@ def _get_top_prices_for_assets(db_path, assets):
     Retrieve the latest price for each asset.
     """
     dl = DataLocker.get_instance(db_path)
-    top_prices = []
-    for asset in assets:
-        row = dl.get_latest_price(asset)
-        if row:
-            top_prices.append(row)
-    return top_prices
+    latest_prices = dl.get_latest_prices(assets)
+    return [latest_prices[asset] for asset in assets if asset in latest_prices]
 
 
 def _get_recent_prices(db_path, limit=15):
@@ -72,35 +70,14 @@ ASSETS_LIST = ["BTC", "ETH", "SOL", "SP500"]
 def price_charts():
     """
     Render price charts for BTC, ETH, SOL, and SP500 over a specified timeframe.
+    Reads compacted OHLC bars at the coarsest resolution that fits the window.
     URL Params:
       - hours: (optional, default=6) Number of hours to look back.
     """
     try:
         hours = request.args.get("hours", default=6, type=int)
-        cutoff_time = datetime.now() - timedelta(hours=hours)
-        cutoff_iso = cutoff_time.isoformat()
-        conn = sqlite3.connect(DB_PATH)
-        conn.row_factory = sqlite3.Row
-        cur = conn.cursor()
-        chart_data = {asset: [] for asset in ASSETS_LIST}
-        for asset in ASSETS_LIST:
-            cur.execute(
-                """
-                SELECT current_price, last_update_time
-                FROM prices
-                WHERE asset_type = ? AND last_update_time >= ?
-                ORDER BY last_update_time ASC
-                """,
-                (asset, cutoff_iso)
-            )
-            rows = cur.fetchall()
-            for row in rows:
-                iso_str = row["last_update_time"]
-                price = float(row["current_price"])
-                dt_obj = datetime.fromisoformat(iso_str)
-                epoch_ms = int(dt_obj.timestamp() * 1000)
-                chart_data[asset].append([epoch_ms, price])
-        conn.close()
+        dl = DataLocker.get_instance(DB_PATH)
+        chart_data = {asset: load_price_series(dl, asset, hours) for asset in ASSETS_LIST}
         return render_template("price_charts.html", chart_data=chart_data, timeframe=hours)
     except Exception as e:
         logger.error("Error in price_charts: %s", e, exc_info=True)
@@ -186,6 +163,22 @@ def update_prices_route():
         return jsonify({"status": "error", "message": str(e)}), 500
 
 
+# ---------------------------------------------------------------------------
+# Price Source Health
+# ---------------------------------------------------------------------------
+@prices_bp.route("/sources", methods=["GET"])
+def price_sources():
+    """
+    Per-source request/error/timeout counts, latency and error rate of the
+    consensus price aggregator, since the process started.
+    """
+    try:
+        return jsonify(PriceAggregator.get_instance().get_source_stats())
+    except Exception as e:
+        logger.exception("Error reading price source stats: %s", e)
+        return jsonify({"error": str(e)}), 500
+
+
 # ---------------------------------------------------------------------------
 # (Optional) API Endpoint for Price Data
 # ---------------------------------------------------------------------------
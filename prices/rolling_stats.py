@@ -0,0 +1,189 @@
+#!/usr/bin/env python
+"""
+rolling_stats.py
+Description:
+    Per-asset rolling statistics updated in O(1) per price tick, so readers
+    (simulator defaults, asset percent changes, liquidation risk) never rescan
+    the prices table.
+
+      - EWMA volatility: time-aware exponentially weighted variance of log
+        returns, annualized. Each return is weighted by its own interval, so
+        irregular ticks (and gaps) are handled; weights halve every
+        `halflife_hours`.
+      - Rolling returns over 1h / 24h / 7d: each window keeps a ring of
+        RING_BUCKETS buckets holding the first price seen in the bucket; the
+        return is measured from the first price in the oldest bucket still
+        inside the window. Resolution is window / RING_BUCKETS (75s for 1h,
+        3.5h for 7d).
+
+    Stats live in the 'asset_stats' table (migration 010) with the ring state
+    as JSON, so a restarted monitor carries on where it stopped.
+Usage:
+    stats = RollingStatsService(data_locker)
+    stats.update("BTC", 67000.0)            # inside the price insert batch
+    data_locker.get_asset_stats(["BTC"])    # {"BTC": {"volatility", "return_24h", ...}}
+"""
+
+import json
+import logging
+import math
+import threading
+import time
+from datetime import datetime
+from typing import Dict, Optional
+
+logger = logging.getLogger("RollingStats")
+
+SECONDS_IN_YEAR = 365 * 24 * 3600
+
+# Window name (column suffix) -> seconds.
+WINDOWS: Dict[str, int] = {
+    "1h": 3600,
+    "24h": 24 * 3600,
+    "7d": 7 * 24 * 3600,
+}
+RING_BUCKETS = 48
+DEFAULT_HALFLIFE_HOURS = 24.0
+# Fewer ticks than this and readers fall back to their own volatility.
+MIN_SAMPLES = 10
+
+
+class RollingAssetStats:
+    """Incremental statistics for one asset."""
+
+    def __init__(self, asset_type: str, halflife_hours: float = DEFAULT_HALFLIFE_HOURS):
+        self.asset_type = asset_type
+        self.halflife_seconds = float(halflife_hours) * 3600
+        self.last_price: Optional[float] = None
+        self.last_ts: Optional[float] = None
+        self.samples = 0
+        self.ewma_variance: Optional[float] = None
+        # window -> parallel rings of bucket index and first price in that bucket
+        self.rings = {name: {"buckets": [None] * RING_BUCKETS, "prices": [None] * RING_BUCKETS}
+                      for name in WINDOWS}
+
+    def update(self, ts: float, price: float):
+        price = float(price)
+        if price <= 0:
+            return
+        if self.last_ts is not None and ts < self.last_ts:
+            # Out-of-order tick: too late for the returns, and it would look like a jump.
+            return
+        if self.last_price is not None and ts > self.last_ts:
+            dt = ts - self.last_ts
+            # Squared log return per year of elapsed time: an unbiased variance sample.
+            sample = math.log(price / self.last_price) ** 2 / (dt / SECONDS_IN_YEAR)
+            if self.ewma_variance is None:
+                self.ewma_variance = sample
+            else:
+                decay = 0.5 ** (dt / self.halflife_seconds)
+                self.ewma_variance = decay * self.ewma_variance + (1.0 - decay) * sample
+
+        for name, window in WINDOWS.items():
+            ring = self.rings[name]
+            bucket = int(ts // (window / RING_BUCKETS))
+            slot = bucket % RING_BUCKETS
+            if ring["buckets"][slot] != bucket:
+                ring["buckets"][slot] = bucket
+                ring["prices"][slot] = price
+
+        self.last_price, self.last_ts = price, ts
+        self.samples += 1
+
+    def window_return(self, name: str) -> Optional[float]:
+        """Percent change from the first price in the window to the last price; None without history."""
+        if self.last_ts is None:
+            return None
+        width = WINDOWS[name] / RING_BUCKETS
+        ring = self.rings[name]
+        current = int(self.last_ts // width)
+        # The ring holds the RING_BUCKETS buckets up to the current one; the
+        # oldest in use gives the first price in the window. Constant work per read.
+        for bucket in range(current - RING_BUCKETS + 1, current + 1):
+            slot = bucket % RING_BUCKETS
+            if ring["buckets"][slot] == bucket:
+                first = ring["prices"][slot]
+                return (self.last_price - first) / first * 100
+        return None
+
+    @property
+    def volatility(self) -> Optional[float]:
+        return math.sqrt(self.ewma_variance) if self.ewma_variance is not None else None
+
+    # ----------------------------------------------------------------
+    # Persistence
+    # ----------------------------------------------------------------
+
+    def to_row(self) -> dict:
+        row = {
+            "asset_type": self.asset_type,
+            "last_price": self.last_price,
+            "last_ts": self.last_ts,
+            "samples": self.samples,
+            "ewma_variance": self.ewma_variance,
+            "volatility": self.volatility,
+            "state": json.dumps({"rings": self.rings}),
+            "updated_at": datetime.now().isoformat(),
+        }
+        for name in WINDOWS:
+            row[f"return_{name}"] = self.window_return(name)
+        return row
+
+    @classmethod
+    def from_row(cls, row: dict, halflife_hours: float = DEFAULT_HALFLIFE_HOURS) -> "RollingAssetStats":
+        stats = cls(row["asset_type"], halflife_hours)
+        stats.last_price = row.get("last_price")
+        stats.last_ts = row.get("last_ts")
+        stats.samples = int(row.get("samples") or 0)
+        stats.ewma_variance = row.get("ewma_variance")
+        try:
+            rings = json.loads(row.get("state") or "{}").get("rings", {})
+        except ValueError:
+            rings = {}
+        for name in WINDOWS:
+            ring = rings.get(name)
+            if ring and len(ring.get("buckets", ())) == RING_BUCKETS:
+                stats.rings[name] = ring
+        return stats
+
+
+class RollingStatsService:
+    """
+    Keeps RollingAssetStats per asset in memory (loaded from asset_stats on
+    first use) and writes each update back through the DataLocker, so a call
+    inside data_locker.batch() commits with the price rows.
+    """
+
+    def __init__(self, data_locker, halflife_hours: float = DEFAULT_HALFLIFE_HOURS):
+        self.data_locker = data_locker
+        self.halflife_hours = halflife_hours
+        self._lock = threading.Lock()
+        self._stats: Dict[str, RollingAssetStats] = {}
+
+    def _get(self, asset_type: str) -> RollingAssetStats:
+        stats = self._stats.get(asset_type)
+        if stats is None:
+            row = self.data_locker.get_asset_stats([asset_type]).get(asset_type)
+            stats = (RollingAssetStats.from_row(row, self.halflife_hours) if row
+                     else RollingAssetStats(asset_type, self.halflife_hours))
+            self._stats[asset_type] = stats
+        return stats
+
+    def update(self, asset_type: str, price: float, ts: Optional[float] = None) -> dict:
+        """Folds one tick into the asset's stats and stores them; returns the stored row."""
+        ts = time.time() if ts is None else ts
+        with self._lock:
+            stats = self._get(asset_type)
+            stats.update(ts, price)
+            row = stats.to_row()
+        self.data_locker.upsert_asset_stats(row)
+        return row
+
+
+def stored_volatility(data_locker, assets) -> Dict[str, float]:
+    """{asset: annualized EWMA volatility} for the assets with at least MIN_SAMPLES ticks of stats."""
+    return {
+        asset: row["volatility"]
+        for asset, row in data_locker.get_asset_stats(list(assets)).items()
+        if row.get("volatility") and (row.get("samples") or 0) >= MIN_SAMPLES
+    }
@@ -0,0 +1,81 @@
+import math
+import unittest
+
+from data.data_locker import DataLocker
+from prices.rolling_stats import (MIN_SAMPLES, SECONDS_IN_YEAR, RollingAssetStats, RollingStatsService,
+                                  stored_volatility)
+
+T0 = 1_700_000_000.0
+
+
+class TestRollingAssetStats(unittest.TestCase):
+    def test_constant_volatility_converges(self):
+        # Alternating +/- moves of the same size every minute: every variance sample is equal.
+        stats = RollingAssetStats("BTC", halflife_hours=1)
+        move = 0.001
+        price = 100.0
+        for i in range(500):
+            price *= math.exp(move if i % 2 else -move)
+            stats.update(T0 + 60 * i, price)
+        expected = math.sqrt(move ** 2 / (60 / SECONDS_IN_YEAR))
+        self.assertAlmostEqual(stats.volatility, expected, places=6)
+
+    def test_window_returns(self):
+        stats = RollingAssetStats("BTC")
+        # One tick every 5 minutes for 2 days, rising 1 per tick.
+        for i in range(2 * 24 * 12 + 1):
+            stats.update(T0 + 300 * i, 1000.0 + i)
+        last = 1000.0 + 2 * 24 * 12
+        # 1h: first tick in the window is 11 ticks back (the 12th back sits on the boundary bucket).
+        self.assertAlmostEqual(stats.window_return("1h"), (last - (last - 11)) / (last - 11) * 100, places=6)
+        r24 = stats.window_return("24h")
+        self.assertGreater(r24, (last - (last - 288)) / (last - 288) * 100 * 0.95)
+        self.assertLess(r24, (last - (last - 288)) / (last - 288) * 100)
+        # 7d: the window covers all history, so the return is from the first tick.
+        self.assertAlmostEqual(stats.window_return("7d"), (last - 1000.0) / 1000.0 * 100, places=6)
+
+    def test_out_of_order_and_bad_ticks_are_ignored(self):
+        stats = RollingAssetStats("BTC")
+        stats.update(T0, 100.0)
+        stats.update(T0 + 60, 101.0)
+        stats.update(T0 + 30, 50.0)
+        stats.update(T0 + 90, 0.0)
+        self.assertEqual((stats.last_price, stats.samples), (101.0, 2))
+
+    def test_row_round_trip(self):
+        stats = RollingAssetStats("BTC")
+        for i in range(20):
+            stats.update(T0 + 60 * i, 100.0 + i % 3)
+        restored = RollingAssetStats.from_row(stats.to_row())
+        self.assertEqual(restored.to_row()["return_1h"], stats.to_row()["return_1h"])
+        self.assertEqual(restored.volatility, stats.volatility)
+
+
+class TestRollingStatsService(unittest.TestCase):
+    def setUp(self):
+        DataLocker._instance = None
+        self.dl = DataLocker(":memory:")
+
+    def tearDown(self):
+        self.dl.close()
+        DataLocker._instance = None
+
+    def test_updates_persist_and_resume(self):
+        service = RollingStatsService(self.dl)
+        for i in range(MIN_SAMPLES):
+            service.update("BTC", 100.0 + i, T0 + 60 * i)
+        row = self.dl.get_asset_stats(["BTC"])["BTC"]
+        self.assertEqual(row["samples"], MIN_SAMPLES)
+        self.assertAlmostEqual(row["return_1h"], 9.0)
+        self.assertIn("BTC", stored_volatility(self.dl, ["BTC", "ETH"]))
+
+        # A new service (e.g. after a restart) carries on from the stored state.
+        resumed = RollingStatsService(self.dl)
+        resumed.update("BTC", 120.0, T0 + 60 * MIN_SAMPLES)
+        row = self.dl.get_asset_stats(["BTC"])["BTC"]
+        self.assertEqual(row["samples"], MIN_SAMPLES + 1)
+        self.assertAlmostEqual(row["return_1h"], 20.0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,136 @@
+#!/usr/bin/env python
+"""
+backtest.py
+Description:
+    Historical backtests for the hedging simulator.
+
+    historical_prices() streams one asset's recorded prices for a time range,
+    either raw 'prices' rows or compacted price_bars closes at a resolution,
+    as (epoch_seconds, price) pairs read from the database in chunks.
+    run_backtest() pushes that stream through PositionSimulator.run_backtest
+    (the same rebalance rules as the GBM simulation) and runs
+    run_monte_carlo with the same parameters over the same duration, so the
+    realized hedge count, cost and profit can be read against the GBM
+    estimate.
+
+    When entry_price is not given the position is opened at the first
+    recorded price, and the liquidation price keeps the default distance
+    from entry (SIM_DEFAULTS: 20% away) unless liquidation_price is given.
+    The GBM comparison runs at most MAX_PATHS_PER_POINT paths and
+    MAX_PATH_STEPS paths x steps (see sweep.py), whatever n_paths asks for.
+Usage:
+    report = run_backtest({"rebalance_threshold": -10}, "BTC",
+                          start=datetime(2025, 1, 1), end=datetime(2025, 3, 1))
+    report["backtest"], report["gbm"], report["comparison"]
+"""
+
+import itertools
+import logging
+from datetime import datetime
+from typing import Iterator, Optional, Tuple
+
+from data.data_locker import DataLocker
+from prices.price_compactor import RESOLUTIONS, _parse_ts
+from simulator.simulation import PositionSimulator
+from simulator.sweep import MAX_PATH_STEPS, MAX_PATHS_PER_POINT, SIM_DEFAULTS, normalize_params
+
+logger = logging.getLogger("SimulatorBacktest")
+
+# The GBM comparison uses at most this many steps; a longer range uses coarser steps.
+MAX_GBM_STEPS = 5000
+
+
+def historical_prices(data_locker: DataLocker, asset_type: str, start: datetime,
+                      end: Optional[datetime] = None, resolution: Optional[str] = None,
+                      chunk_size: int = 5000) -> Iterator[Tuple[float, float]]:
+    """(epoch_seconds, price) for the range, oldest first; bar closes when resolution is given."""
+    if resolution:
+        if resolution not in RESOLUTIONS:
+            raise ValueError(f"Unknown resolution {resolution!r}; expected one of {list(RESOLUTIONS)}.")
+        end_ts = end.timestamp() if end else None
+        for bar in data_locker.iter_price_bars(asset_type, resolution, start.timestamp(), end_ts, chunk_size):
+            # A bar closes at the end of its bucket.
+            yield bar["bucket_start"] + RESOLUTIONS[resolution], float(bar["close"])
+        return
+
+    end_iso = end.isoformat() if end else None
+    for row in data_locker.iter_price_points(asset_type, start.isoformat(), end_iso, chunk_size):
+        ts = _parse_ts(row.get("last_update_time"))
+        if ts is not None and row.get("current_price"):
+            yield ts, float(row["current_price"])
+
+
+def _position_params(params: dict, first_price: float) -> dict:
+    """Simulator parameters with entry/liquidation defaulted from the first recorded price."""
+    sim = normalize_params(params)
+    if not params.get("entry_price"):
+        sim["entry_price"] = first_price
+        if not params.get("liquidation_price"):
+            distance = 1.0 - SIM_DEFAULTS["liquidation_price"] / SIM_DEFAULTS["entry_price"]
+            sign = -1.0 if sim["position_side"] == "long" else 1.0
+            sim["liquidation_price"] = first_price * (1.0 + sign * distance)
+    return sim
+
+
+def _simulator(sim: dict) -> PositionSimulator:
+    return PositionSimulator(
+        entry_price=sim["entry_price"],
+        liquidation_price=sim["liquidation_price"],
+        position_size=sim["position_size"],
+        collateral=sim["collateral"],
+        rebalance_threshold=sim["rebalance_threshold"],
+        hedging_cost_pct=sim["hedging_cost_pct"],
+        position_side=sim["position_side"],
+    )
+
+
+def run_backtest(params: dict, asset_type: str, start: datetime, end: Optional[datetime] = None,
+                 resolution: Optional[str] = None, data_locker: Optional[DataLocker] = None,
+                 compare_gbm: bool = True) -> dict:
+    """
+    Backtests `params` (SIM_DEFAULTS keys) on the recorded prices of asset_type.
+    Returns {"params", "backtest", "gbm", "comparison"}; "gbm" is the
+    run_monte_carlo summary for the same duration (None when compare_gbm is
+    False or the range has fewer than two prices).
+    """
+    params = dict(params or {})
+    data_locker = data_locker or DataLocker.get_instance()
+    stream = historical_prices(data_locker, asset_type, start, end, resolution)
+    first = next(stream, None)
+    if first is None:
+        raise ValueError(f"No recorded prices for {asset_type} in the requested range.")
+
+    sim = _position_params(params, first[1])
+    backtest = _simulator(sim).run_backtest(itertools.chain([first], stream))
+    backtest.pop("simulation_log")
+    report = {"params": sim, "asset_type": asset_type, "resolution": resolution or "raw",
+              "backtest": backtest, "gbm": None, "comparison": None}
+
+    if compare_gbm and backtest["elapsed_minutes"] > 0:
+        duration = backtest["elapsed_minutes"]
+        dt_minutes = max(backtest["avg_dt_minutes"], duration / MAX_GBM_STEPS)
+        steps = max(int(duration / dt_minutes), 1)
+        n_paths = max(min(sim["n_paths"], MAX_PATHS_PER_POINT, MAX_PATH_STEPS // steps), 1)
+        results = _simulator(sim).run_monte_carlo(
+            n_paths=n_paths,
+            simulation_duration=duration,
+            dt_minutes=dt_minutes,
+            drift=sim["drift"],
+            volatility=sim["volatility"],
+            seed=sim["seed"],
+        )
+        gbm = dict(results["summary"], n_paths=n_paths, dt_minutes=dt_minutes, steps=results["steps"],
+                   mean_hedging_cost=float(results["total_hedging_cost"].mean()))
+        report["gbm"] = gbm
+        report["comparison"] = {
+            "profit_vs_mean": backtest["total_profit"] - gbm["mean_profit"],
+            "rebalances_vs_mean": backtest["rebalance_count"] - gbm["mean_rebalances"],
+            "hedging_cost_vs_mean": backtest["total_hedging_cost"] - gbm["mean_hedging_cost"],
+            "profit_within_p5_p95": gbm["p5_profit"] <= backtest["total_profit"] <= gbm["p95_profit"],
+            "realized_vs_assumed_volatility": backtest["realized_volatility"] - sim["volatility"],
+        }
+    logger.info(
+        f"Backtest {asset_type} ({report['resolution']}): {backtest['prices']} prices, "
+        f"{backtest['rebalance_count']} rebalances, profit {backtest['total_profit']:.2f}."
+    )
+    return report
@@ -0,0 +1,54 @@
+import unittest
+from datetime import datetime, timedelta
+
+from data.data_locker import DataLocker
+from simulator.backtest import historical_prices, run_backtest
+from simulator.simulation import PositionSimulator
+from simulator.simulation_UT import PARAMS, replay
+from simulator.sweep import MAX_PATHS_PER_POINT
+
+
+class TestBacktest(unittest.TestCase):
+    def setUp(self):
+        DataLocker._instance = None
+        self.dl = DataLocker(":memory:")
+        self.start = datetime(2024, 1, 1)
+        self.prices = [10000, 9500, 9000, 9400, 8800, 9900, 10400, 9800]
+        for i, price in enumerate(self.prices):
+            self.dl.insert_price({"asset_type": "BTC", "current_price": price,
+                                  "last_update_time": (self.start + timedelta(minutes=i)).isoformat()})
+
+    def tearDown(self):
+        self.dl.close()
+        DataLocker._instance = None
+
+    def test_backtest_applies_simulation_rules(self):
+        sim = PositionSimulator(**dict(PARAMS, position_side="long"))
+        stream = historical_prices(self.dl, "BTC", self.start, chunk_size=3)
+        result = sim.run_backtest(stream)
+        expected = replay("long", self.prices)
+        self.assertEqual(result["prices"], len(self.prices))
+        self.assertEqual(result["rebalance_count"], expected["rebalance_count"])
+        self.assertAlmostEqual(result["total_profit"], expected["total_profit"], places=6)
+        self.assertEqual(result["elapsed_minutes"], 7.0)
+        self.assertGreater(result["realized_volatility"], 0.0)
+
+    def test_report_compares_with_gbm(self):
+        report = run_backtest({"n_paths": 50, "rebalance_threshold": -25}, "BTC", self.start,
+                              data_locker=self.dl)
+        self.assertEqual(report["params"]["entry_price"], 10000.0)
+        self.assertAlmostEqual(report["params"]["liquidation_price"], 8000.0)
+        self.assertEqual(report["gbm"]["steps"], 7)
+        self.assertIn("profit_vs_mean", report["comparison"])
+
+    def test_gbm_paths_are_capped(self):
+        report = run_backtest({"n_paths": 1000000}, "BTC", self.start, data_locker=self.dl)
+        self.assertEqual(report["gbm"]["n_paths"], MAX_PATHS_PER_POINT)
+
+    def test_empty_range_raises(self):
+        with self.assertRaises(ValueError):
+            run_backtest({}, "ETH", self.start, data_locker=self.dl)
+
+
+if __name__ == "__main__":
+    unittest.main()
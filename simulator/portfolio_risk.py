@@ -0,0 +1,285 @@
+#!/usr/bin/env python
+"""
+portfolio_risk.py
+Description:
+    Portfolio-level Monte Carlo risk for the open positions.
+
+    Asset log returns are taken from the stored price history (compacted
+    price_bars at one resolution, raw 'prices' rows bucketed the same way when
+    no bars exist yet), aligned on common buckets, and turned into a per-step
+    covariance matrix. Correlated GBM paths are drawn for every asset at once
+    (Cholesky factor of that covariance, vectorized over paths) from the latest
+    stored price out to the horizon.
+
+    Each position (size = USD notional at entry, as in CalcServices) is marked
+    along its asset's path:
+      - liquidated if the path touches its liquidation_price at any step; the
+        position then loses its remaining equity (collateral + current PnL),
+      - otherwise its PnL change is the move from the current price to the
+        horizon price.
+    Reported: per-position and portfolio (any position) liquidation
+    probability, the portfolio PnL distribution, and VaR/CVaR at `confidence`.
+
+    Liquidation is checked at the simulation steps only, so a barrier touched
+    between steps is missed; a finer resolution gives more steps.
+Usage:
+    engine = PortfolioRiskEngine(horizon_hours=24, n_paths=10000)
+    report = engine.run()              # loads positions via PositionService
+"""
+
+import logging
+import math
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from data.data_locker import DataLocker
+from positions.position_service import PositionService
+from prices.price_compactor import RESOLUTIONS, _parse_ts
+from prices.rolling_stats import stored_volatility
+
+logger = logging.getLogger("PortfolioRisk")
+
+SECONDS_IN_YEAR = 525600 * 60
+# Fewer aligned returns than this and the estimate falls back to per-asset volatility.
+MIN_RETURNS = 10
+DEFAULT_VOLATILITY = 0.8   # annualized, same default as the single-position simulator
+HISTOGRAM_BINS = 40
+
+
+# ----------------------------------------------------------------
+# Covariance from stored prices
+# ----------------------------------------------------------------
+
+def load_closes(data_locker: DataLocker, asset_type: str, resolution: str,
+                lookback_hours: float) -> Dict[int, float]:
+    """{bucket_start: close} for one asset over the lookback window."""
+    since = datetime.now() - timedelta(hours=lookback_hours)
+    bars = data_locker.get_price_bars(asset_type, resolution, since.timestamp())
+    if bars:
+        return {int(bar["bucket_start"]): float(bar["close"]) for bar in bars if bar.get("close")}
+
+    seconds = RESOLUTIONS[resolution]
+    closes: Dict[int, float] = {}
+    for row in data_locker.get_price_points(asset_type, since.isoformat()):
+        ts = _parse_ts(row.get("last_update_time"))
+        if ts is None or not row.get("current_price"):
+            continue
+        # Rows are oldest first, so the last one in a bucket is its close.
+        closes[int(ts // seconds) * seconds] = float(row["current_price"])
+    return closes
+
+
+def aligned_log_returns(series: List[Dict[int, float]], step_seconds: int) -> np.ndarray:
+    """
+    (n_returns, n_assets) log returns between consecutive buckets every asset
+    has a price for. A return spanning a gap is scaled down to one step.
+    """
+    if not series:
+        return np.empty((0, 0))
+    common = sorted(set.intersection(*(set(s) for s in series)))
+    if len(common) < 2:
+        return np.empty((0, len(series)))
+    times = np.array(common, dtype=float)
+    prices = np.array([[s[t] for s in series] for t in common], dtype=float)
+    returns = np.diff(np.log(prices), axis=0)
+    gaps = np.diff(times) / step_seconds
+    return returns / np.sqrt(gaps)[:, None]
+
+
+def estimate_covariance(data_locker: DataLocker, assets: List[str], resolution: str = "1h",
+                        lookback_hours: float = 24 * 30) -> Tuple[np.ndarray, dict]:
+    """
+    Per-step covariance of the assets' log returns at `resolution`, plus
+    {"n_returns", "estimated", "annual_volatility"}. With too little common
+    history it falls back to uncorrelated assets at their rolling EWMA
+    volatility (DEFAULT_VOLATILITY for assets without stats).
+    """
+    step_seconds = RESOLUTIONS[resolution]
+    series = [load_closes(data_locker, asset, resolution, lookback_hours) for asset in assets]
+    returns = aligned_log_returns(series, step_seconds)
+    n_returns = returns.shape[0]
+    if n_returns >= MIN_RETURNS:
+        cov = np.atleast_2d(np.cov(returns, rowvar=False))
+        estimated = True
+    else:
+        logger.warning(f"Only {n_returns} aligned returns for {assets}; using rolling/default volatility.")
+        stored = stored_volatility(data_locker, assets)
+        annual_vol = np.array([stored.get(asset, DEFAULT_VOLATILITY) for asset in assets])
+        cov = np.diag(annual_vol ** 2 * step_seconds / SECONDS_IN_YEAR)
+        estimated = False
+    annual = np.sqrt(np.diag(cov) * SECONDS_IN_YEAR / step_seconds)
+    return cov, {
+        "n_returns": int(n_returns),
+        "estimated": estimated,
+        "annual_volatility": {asset: float(vol) for asset, vol in zip(assets, annual)},
+    }
+
+
+def cholesky_factor(cov: np.ndarray) -> np.ndarray:
+    """Lower Cholesky factor; a matrix that isn't positive definite is clipped to one that is."""
+    try:
+        return np.linalg.cholesky(cov)
+    except np.linalg.LinAlgError:
+        # Assets with (near) identical returns, or fewer returns than assets.
+        eigenvalues, eigenvectors = np.linalg.eigh((cov + cov.T) / 2)
+        floor = max(float(eigenvalues.max()), 1e-12) * 1e-10
+        clipped = (eigenvectors * np.maximum(eigenvalues, floor)) @ eigenvectors.T
+        return np.linalg.cholesky(clipped)
+
+
+# ----------------------------------------------------------------
+# Simulation
+# ----------------------------------------------------------------
+
+def _is_short(position: dict) -> bool:
+    return str(position.get("position_type") or "long").lower() == "short"
+
+
+def simulate_portfolio(positions: List[dict], spot: Dict[str, float], cov: np.ndarray,
+                       assets: List[str], n_steps: int, n_paths: int = 10000,
+                       drift_per_step: float = 0.0, confidence: float = 0.95,
+                       seed: Optional[int] = None) -> dict:
+    """
+    Correlated GBM over n_steps of the per-step covariance `cov` (order of
+    `assets`); positions are marked against spot[asset]. Returns the report
+    described in the module docstring.
+    """
+    rng = np.random.default_rng(seed)
+    n_assets = len(assets)
+    chol = cholesky_factor(cov)
+    log_drift = drift_per_step - 0.5 * np.diag(cov)
+
+    # Per-position parameters as arrays, positions along the last axis.
+    asset_index = np.array([assets.index(p["asset_type"]) for p in positions], dtype=int)
+    sign = np.array([-1.0 if _is_short(p) else 1.0 for p in positions])
+    entry = np.array([float(p.get("entry_price") or 0.0) for p in positions])
+    size = np.array([float(p.get("size") or 0.0) for p in positions])
+    collateral = np.array([float(p.get("collateral") or 0.0) for p in positions])
+    liq = np.array([float(p.get("liquidation_price") or 0.0) for p in positions])
+    units = np.divide(size, entry, out=np.zeros_like(size), where=entry > 0)
+    start = np.array([spot[p["asset_type"]] for p in positions])
+    equity_now = collateral + sign * units * (start - entry)
+
+    # Seeded from spot itself: exp(log(spot)) can land a hair above it, which
+    # would miss a liquidation price sitting exactly at spot.
+    running_min = np.tile([float(spot[a]) for a in assets], (n_paths, 1))
+    running_max = running_min.copy()
+    log_price = np.log(running_min)
+    for _ in range(n_steps):
+        log_price += log_drift + rng.standard_normal((n_paths, n_assets)) @ chol.T
+        price = np.exp(log_price)
+        np.minimum(running_min, price, out=running_min)
+        np.maximum(running_max, price, out=running_max)
+    final = np.exp(log_price)
+
+    # (n_paths, n_positions): longs die at the path's low, shorts at its high.
+    has_liq = liq > 0
+    liquidated = has_liq & np.where(sign > 0, running_min[:, asset_index] <= liq,
+                                    running_max[:, asset_index] >= liq)
+    pnl = np.where(liquidated, -np.maximum(equity_now, 0.0),
+                   sign * units * (final[:, asset_index] - start))
+    portfolio_pnl = pnl.sum(axis=1)
+
+    cutoff = np.quantile(portfolio_pnl, 1.0 - confidence)
+    tail = portfolio_pnl[portfolio_pnl <= cutoff]
+    counts, edges = np.histogram(portfolio_pnl, bins=HISTOGRAM_BINS)
+
+    per_position = []
+    for i, position in enumerate(positions):
+        per_position.append({
+            "id": position.get("id"),
+            "asset_type": position.get("asset_type"),
+            "position_type": "SHORT" if sign[i] < 0 else "LONG",
+            "current_price": float(start[i]),
+            "liquidation_price": float(liq[i]),
+            "liquidation_probability": float(liquidated[:, i].mean()),
+            "mean_pnl": float(pnl[:, i].mean()),
+            "p5_pnl": float(np.percentile(pnl[:, i], 5)),
+            "p95_pnl": float(np.percentile(pnl[:, i], 95)),
+        })
+
+    return {
+        "positions": per_position,
+        "portfolio": {
+            "liquidation_probability": float(liquidated.any(axis=1).mean()),
+            "mean_pnl": float(portfolio_pnl.mean()),
+            "std_pnl": float(portfolio_pnl.std()),
+            "p5_pnl": float(np.percentile(portfolio_pnl, 5)),
+            "p50_pnl": float(np.percentile(portfolio_pnl, 50)),
+            "p95_pnl": float(np.percentile(portfolio_pnl, 95)),
+            "var": float(-cutoff),
+            "cvar": float(-tail.mean()) if tail.size else float(-cutoff),
+            "confidence": confidence,
+        },
+        "distribution": {"counts": counts.tolist(), "edges": edges.tolist()},
+    }
+
+
+class PortfolioRiskEngine:
+    def __init__(self, data_locker: Optional[DataLocker] = None, horizon_hours: float = 24.0,
+                 n_paths: int = 10000, confidence: float = 0.95, resolution: str = "1h",
+                 lookback_hours: float = 24 * 30, drift: float = 0.0, seed: Optional[int] = None):
+        if resolution not in RESOLUTIONS:
+            raise ValueError(f"Unknown resolution {resolution!r}; expected one of {list(RESOLUTIONS)}.")
+        if not 0.0 < confidence < 1.0:
+            raise ValueError("confidence must be between 0 and 1.")
+        self.data_locker = data_locker or DataLocker.get_instance()
+        self.horizon_hours = float(horizon_hours)
+        self.n_paths = int(n_paths)
+        self.confidence = float(confidence)
+        self.resolution = resolution
+        self.lookback_hours = float(lookback_hours)
+        self.drift = float(drift)   # annualized
+        self.seed = seed
+
+    def load_positions(self) -> List[dict]:
+        return PositionService.get_positions_snapshot(self.data_locker.db_path)
+
+    def run(self, positions: Optional[List[dict]] = None) -> dict:
+        positions = self.load_positions() if positions is None else positions
+        latest = self.data_locker.get_latest_prices()
+
+        spot, usable, skipped = {}, [], []
+        for position in positions:
+            asset = position.get("asset_type")
+            price = (latest.get(asset) or {}).get("current_price") or position.get("current_price")
+            if not asset or not price or not position.get("size") or not position.get("entry_price"):
+                skipped.append(position.get("id"))
+                continue
+            spot.setdefault(asset, float(price))
+            usable.append(position)
+        if skipped:
+            logger.info(f"Portfolio risk: skipped {len(skipped)} position(s) without price/size/entry.")
+
+        report = {
+            "horizon_hours": self.horizon_hours,
+            "n_paths": self.n_paths,
+            "resolution": self.resolution,
+            "skipped": skipped,
+        }
+        if not usable:
+            return dict(report, positions=[], portfolio=None, distribution=None, covariance=None)
+
+        assets = sorted(spot)
+        cov, cov_info = estimate_covariance(self.data_locker, assets, self.resolution, self.lookback_hours)
+        step_seconds = RESOLUTIONS[self.resolution]
+        n_steps = max(1, math.ceil(self.horizon_hours * 3600 / step_seconds))
+        # Steps cover the horizon exactly; rescale the per-bucket covariance to the step length.
+        step_fraction = self.horizon_hours * 3600 / n_steps / step_seconds
+        result = simulate_portfolio(
+            usable, spot, cov * step_fraction, assets, n_steps, n_paths=self.n_paths,
+            drift_per_step=self.drift * step_fraction * step_seconds / SECONDS_IN_YEAR,
+            confidence=self.confidence, seed=self.seed,
+        )
+        std = np.sqrt(np.diag(cov))
+        correlation = cov / np.outer(std, std) if np.all(std > 0) else np.eye(len(assets))
+        report.update(result)
+        report["covariance"] = dict(cov_info, assets=assets, correlation=correlation.tolist())
+        logger.info(
+            f"Portfolio risk over {self.horizon_hours}h: VaR={result['portfolio']['var']:.2f}, "
+            f"CVaR={result['portfolio']['cvar']:.2f}, "
+            f"P(liquidation)={result['portfolio']['liquidation_probability']:.3f}."
+        )
+        return report
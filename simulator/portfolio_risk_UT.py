@@ -0,0 +1,83 @@
+import unittest
+from datetime import datetime, timedelta
+
+import numpy as np
+
+from data.data_locker import DataLocker
+from simulator.portfolio_risk import (PortfolioRiskEngine, cholesky_factor, estimate_covariance,
+                                      simulate_portfolio)
+
+POSITION = dict(asset_type="BTC", position_type="LONG", entry_price=100.0, size=1000.0,
+                collateral=200.0, liquidation_price=80.0)
+
+
+class TestPortfolioRisk(unittest.TestCase):
+    def setUp(self):
+        DataLocker._instance = None
+        self.dl = DataLocker(":memory:")
+
+    def tearDown(self):
+        self.dl.close()
+        DataLocker._instance = None
+
+    def _insert_history(self, hours=100):
+        rng = np.random.default_rng(0)
+        start = datetime.now() - timedelta(hours=hours)
+        btc, eth = 100.0, 50.0
+        for i in range(hours):
+            shock = rng.standard_normal()
+            btc *= np.exp(0.01 * shock)
+            eth *= np.exp(0.01 * (0.9 * shock + 0.3 * rng.standard_normal()))
+            when = (start + timedelta(hours=i)).isoformat()
+            self.dl.insert_price({"asset_type": "BTC", "current_price": btc, "last_update_time": when})
+            self.dl.insert_price({"asset_type": "ETH", "current_price": eth, "last_update_time": when})
+
+    def test_covariance_from_raw_prices(self):
+        self._insert_history()
+        cov, info = estimate_covariance(self.dl, ["BTC", "ETH"], "1h", lookback_hours=200)
+        self.assertTrue(info["estimated"])
+        self.assertGreater(info["n_returns"], 90)
+        correlation = cov[0, 1] / np.sqrt(cov[0, 0] * cov[1, 1])
+        self.assertGreater(correlation, 0.8)
+
+    def test_falls_back_without_history(self):
+        cov, info = estimate_covariance(self.dl, ["BTC"], "1h")
+        self.assertFalse(info["estimated"])
+        self.assertAlmostEqual(info["annual_volatility"]["BTC"], 0.8)
+
+    def test_cholesky_of_singular_matrix(self):
+        chol = cholesky_factor(np.array([[1.0, 1.0], [1.0, 1.0]]) * 1e-4)
+        self.assertTrue(np.allclose(chol @ chol.T, [[1e-4, 1e-4], [1e-4, 1e-4]], atol=1e-8))
+
+    def test_liquidation_and_tail_risk(self):
+        cov = np.array([[0.02 ** 2]])
+        safe = dict(POSITION, id="safe", liquidation_price=1.0)
+        at_liq = dict(POSITION, id="at_liq", liquidation_price=100.0)
+        result = simulate_portfolio([safe, at_liq], {"BTC": 100.0}, cov, ["BTC"], n_steps=24,
+                                    n_paths=2000, seed=1)
+        by_id = {p["id"]: p for p in result["positions"]}
+        self.assertEqual(by_id["safe"]["liquidation_probability"], 0.0)
+        self.assertEqual(by_id["at_liq"]["liquidation_probability"], 1.0)
+        self.assertEqual(by_id["at_liq"]["mean_pnl"], -200.0)
+        portfolio = result["portfolio"]
+        self.assertGreater(portfolio["var"], 0.0)
+        self.assertGreaterEqual(portfolio["cvar"], portfolio["var"])
+        self.assertEqual(sum(result["distribution"]["counts"]), 2000)
+
+    def test_short_liquidates_on_rally(self):
+        short = dict(POSITION, position_type="SHORT", liquidation_price=101.0)
+        result = simulate_portfolio([short], {"BTC": 100.0}, np.array([[0.05 ** 2]]), ["BTC"],
+                                    n_steps=24, n_paths=2000, seed=2)
+        self.assertGreater(result["positions"][0]["liquidation_probability"], 0.5)
+
+    def test_engine_run_skips_unpriced_positions(self):
+        self._insert_history(30)
+        engine = PortfolioRiskEngine(self.dl, horizon_hours=6, n_paths=500, seed=3)
+        report = engine.run([dict(POSITION, id="p1"), dict(POSITION, id="p2", asset_type="XYZ")])
+        self.assertEqual(report["skipped"], ["p2"])
+        self.assertEqual([p["id"] for p in report["positions"]], ["p1"])
+        self.assertEqual(report["covariance"]["assets"], ["BTC"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -9,6 +9,11 @@ normalized by the range from entry to liquidation) falls below a threshold, a he
 executed—resetting the effective entry price and incurring a cost.
 
 This version uses minute-based time steps.
+
+run_monte_carlo() runs the same rebalance rules over many paths at once: all
+price paths are drawn as one NumPy matrix and each step updates every path's
+effective entry, profit and rebalance count as arrays, returning the
+distributions instead of a per-step log.
 """
 
 import numpy as np
@@ -197,6 +202,188 @@ class PositionSimulator:
             "position_side": self.position_side
         }
 
+    def run_monte_carlo(self,
+                        n_paths: int = 1000,
+                        simulation_duration: float = 60,  # in minutes
+                        dt_minutes: float = 1,            # time step in minutes
+                        drift: float = 0.05,
+                        volatility: float = 0.8,
+                        seed=None,
+                        return_paths: bool = False):
+        """
+        Run the rebalance simulation over n_paths GBM price paths in vectorized form.
+
+        Every path starts from the entry price with the simulator's parameters;
+        the simulator's own state (simulation_log, cumulative_profit, ...) is
+        left untouched. A path "hits liquidation" when its price reaches the
+        liquidation price at any step (the path keeps running, as in
+        run_simulation).
+
+        Returns a dict of per-path arrays ("total_profit", "cumulative_profit",
+        "rebalance_count", "total_hedging_cost", "liquidation_hit",
+        "final_price") plus "summary" statistics; "paths" (n_paths x steps
+        prices) is included when return_paths is True.
+        """
+        dt = dt_minutes / MINUTES_IN_YEAR
+        num_steps = int(simulation_duration / dt_minutes)
+        rng = np.random.default_rng(seed)
+        logger.info(f"Running Monte Carlo: {n_paths} paths x {num_steps} steps over {simulation_duration} minutes")
+
+        # All paths at once: cumulative GBM log-returns from the entry price.
+        shocks = rng.standard_normal((n_paths, num_steps))
+        log_steps = (drift - 0.5 * volatility ** 2) * dt + volatility * np.sqrt(dt) * shocks
+        paths = self.entry_price * np.exp(np.cumsum(log_steps, axis=1))
+
+        is_long = self.position_side == "long"
+        # +1: profit when price rises (long); -1: profit when price falls (short).
+        direction = 1.0 if is_long else -1.0
+        effective_entry = np.full(n_paths, float(self.entry_price))
+        cumulative_profit = np.zeros(n_paths)
+        hedging_cost = np.zeros(n_paths)
+        rebalance_count = np.zeros(n_paths, dtype=np.int64)
+        liquidation_hit = np.zeros(n_paths, dtype=bool)
+
+        for step in range(num_steps):
+            price = paths[:, step]
+            # Same travel percent as _calculate_travel_percent, per path.
+            denominator = direction * (effective_entry - self.liquidation_price)
+            safe = np.where(denominator == 0, 1.0, denominator)
+            travel = np.where(denominator == 0, 0.0, direction * (price - effective_entry) / safe * 100)
+
+            rebalance = travel <= self.rebalance_threshold
+            if rebalance.any():
+                trade_profit = direction * (price - effective_entry) * self.position_size
+                cost = np.abs(price * self.position_size) * self.hedging_cost_pct
+                cumulative_profit += np.where(rebalance, trade_profit - cost, 0.0)
+                hedging_cost += np.where(rebalance, cost, 0.0)
+                rebalance_count += rebalance
+                effective_entry = np.where(rebalance, price, effective_entry)
+
+            liquidation_hit |= (price <= self.liquidation_price) if is_long else (price >= self.liquidation_price)
+
+        final_price = paths[:, -1] if num_steps else np.full(n_paths, float(self.entry_price))
+        total_profit = cumulative_profit + direction * (final_price - effective_entry) * self.position_size
+
+        results = {
+            "n_paths": n_paths,
+            "steps": num_steps,
+            "total_profit": total_profit,
+            "cumulative_profit": cumulative_profit,
+            "rebalance_count": rebalance_count,
+            "total_hedging_cost": hedging_cost,
+            "liquidation_hit": liquidation_hit,
+            "final_price": final_price,
+            "summary": self.summarize_monte_carlo(total_profit, rebalance_count, liquidation_hit),
+            "collateral": self.collateral,
+            "position_size": self.position_size,
+            "position_side": self.position_side,
+        }
+        if return_paths:
+            results["paths"] = paths
+        summary = results["summary"]
+        logger.info(
+            f"Monte Carlo complete: mean profit {summary['mean_profit']:.2f}, "
+            f"mean rebalances {summary['mean_rebalances']:.2f}, "
+            f"liquidation probability {summary['liquidation_probability']:.2%}")
+        return results
+
+    @staticmethod
+    def summarize_monte_carlo(total_profit, rebalance_count, liquidation_hit) -> dict:
+        """Plain-float summary of Monte Carlo distributions (JSON-friendly)."""
+        if len(total_profit) == 0:
+            return {"mean_profit": 0.0, "std_profit": 0.0, "p5_profit": 0.0, "p50_profit": 0.0,
+                    "p95_profit": 0.0, "mean_rebalances": 0.0, "max_rebalances": 0,
+                    "liquidation_probability": 0.0}
+        p5, p50, p95 = np.percentile(total_profit, [5, 50, 95])
+        return {
+            "mean_profit": float(np.mean(total_profit)),
+            "std_profit": float(np.std(total_profit)),
+            "p5_profit": float(p5),
+            "p50_profit": float(p50),
+            "p95_profit": float(p95),
+            "mean_rebalances": float(np.mean(rebalance_count)),
+            "max_rebalances": int(np.max(rebalance_count)),
+            "liquidation_probability": float(np.mean(liquidation_hit)),
+        }
+
+    def run_backtest(self, prices, keep_log: bool = False):
+        """
+        Run the rebalance rules over a recorded price stream instead of GBM.
+
+        `prices` is any iterable of (epoch_seconds, price), oldest first; it is
+        consumed one item at a time, so a generator over months of rows never
+        sits in memory. The per-step log is only kept when keep_log is True.
+        Besides the run_simulation totals, reports the realized annualized
+        volatility and average step length of the stream, which is what a GBM
+        comparison for the same period needs.
+        """
+        is_long = self.position_side == "long"
+        current_price = None
+        start_ts = end_ts = None
+        count = 0
+        sum_sq_log_returns = 0.0
+        liquidation_hit = False
+
+        for ts, price in prices:
+            price = float(price)
+            if price <= 0:
+                continue
+            if current_price is not None:
+                sum_sq_log_returns += math.log(price / current_price) ** 2
+            else:
+                start_ts = ts
+            end_ts = ts
+            count += 1
+
+            dynamic_travel_pct = self._calculate_travel_percent(price)
+            hedge_details = None
+            if dynamic_travel_pct <= self.rebalance_threshold:
+                hedge_details = self._execute_rebalance(price)
+            liquidation_hit |= (price <= self.liquidation_price) if is_long else (price >= self.liquidation_price)
+            if keep_log:
+                step_log = {
+                    "step": count,
+                    "timestamp": datetime.datetime.fromtimestamp(ts).isoformat(),
+                    "price": price,
+                    "travel_percent": dynamic_travel_pct,
+                    "action": "REBALANCE" if hedge_details else "NONE",
+                    "cumulative_profit": self.cumulative_profit
+                }
+                if hedge_details:
+                    step_log.update(hedge_details)
+                self.simulation_log.append(step_log)
+            current_price = price
+
+        if current_price is None:
+            current_price = self.entry_price
+        direction = 1.0 if is_long else -1.0
+        final_unrealized = direction * (current_price - self.effective_entry_price) * self.position_size
+        elapsed_minutes = (end_ts - start_ts) / 60.0 if count > 1 else 0.0
+        realized_volatility = (math.sqrt(sum_sq_log_returns / (elapsed_minutes / MINUTES_IN_YEAR))
+                               if elapsed_minutes > 0 else 0.0)
+        logger.info(
+            f"Backtest complete: {count} prices, Rebalances {self.rebalance_count}, "
+            f"Total Profit {self.cumulative_profit + final_unrealized:.2f}")
+        return {
+            "simulation_log": self.simulation_log,
+            "prices": count,
+            "start_ts": start_ts,
+            "end_ts": end_ts,
+            "elapsed_minutes": elapsed_minutes,
+            "avg_dt_minutes": elapsed_minutes / (count - 1) if count > 1 else 0.0,
+            "realized_volatility": realized_volatility,
+            "final_price": current_price,
+            "final_unrealized_pnl": final_unrealized,
+            "cumulative_profit": self.cumulative_profit,
+            "total_profit": self.cumulative_profit + final_unrealized,
+            "rebalance_count": self.rebalance_count,
+            "total_hedging_cost": self.total_hedging_cost,
+            "liquidation_hit": liquidation_hit,
+            "collateral": self.collateral,
+            "position_size": self.position_size,
+            "position_side": self.position_side
+        }
+
     def export_log_to_csv(self, filename: str):
         if not self.simulation_log:
             logger.warning("No simulation log data to export.")
@@ -0,0 +1,56 @@
+import unittest
+
+import numpy as np
+
+from simulator.simulation import PositionSimulator
+
+PARAMS = dict(entry_price=10000, liquidation_price=8000, position_size=1.0, collateral=1000.0,
+              rebalance_threshold=-25.0, hedging_cost_pct=0.001)
+
+
+def replay(side: str, prices) -> dict:
+    """run_simulation's per-step rules applied to a given price path."""
+    sim = PositionSimulator(**dict(PARAMS, position_side=side,
+                                   liquidation_price=8000 if side == "long" else 12000))
+    for price in prices:
+        if sim._calculate_travel_percent(price) <= sim.rebalance_threshold:
+            sim._execute_rebalance(price)
+    sign = 1.0 if side == "long" else -1.0
+    final = prices[-1]
+    return {
+        "total_profit": sim.cumulative_profit + sign * (final - sim.effective_entry_price) * sim.position_size,
+        "rebalance_count": sim.rebalance_count,
+    }
+
+
+class TestMonteCarlo(unittest.TestCase):
+    def _run(self, side, **kwargs):
+        sim = PositionSimulator(**dict(PARAMS, position_side=side,
+                                       liquidation_price=8000 if side == "long" else 12000))
+        return sim.run_monte_carlo(seed=3, return_paths=True, **kwargs)
+
+    def test_matches_per_step_rules(self):
+        for side in ("long", "short"):
+            results = self._run(side, n_paths=50, simulation_duration=600, volatility=3.0)
+            for i in range(50):
+                expected = replay(side, results["paths"][i])
+                self.assertAlmostEqual(results["total_profit"][i], expected["total_profit"], places=6)
+                self.assertEqual(results["rebalance_count"][i], expected["rebalance_count"])
+            self.assertGreater(results["rebalance_count"].sum(), 0)
+
+    def test_liquidation_hits_and_summary(self):
+        results = self._run("long", n_paths=200, simulation_duration=1440, volatility=5.0)
+        touched = (results["paths"] <= 8000).any(axis=1)
+        self.assertTrue(np.array_equal(results["liquidation_hit"], touched))
+        self.assertAlmostEqual(results["summary"]["liquidation_probability"], touched.mean())
+        self.assertNotIn("paths", PositionSimulator(**PARAMS).run_monte_carlo(n_paths=2, seed=1))
+
+    def test_10k_paths(self):
+        sim = PositionSimulator(**PARAMS)
+        results = sim.run_monte_carlo(n_paths=10_000, simulation_duration=60, seed=7)
+        self.assertEqual(len(results["total_profit"]), 10_000)
+        self.assertEqual(sim.simulation_log, [])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -9,15 +9,28 @@ time step, drift, volatility, position side, etc.) via interactive controls and
 charts comparing simulated results with historical data pulled from the database via DataLocker.
 """
 
-from flask import Blueprint, render_template, request, current_app, url_for, jsonify
+from flask import Blueprint, render_template, request, current_app, url_for, jsonify, Response, stream_with_context
+import json
 import logging
 from datetime import datetime, timedelta
 from simulator.simulation import PositionSimulator
+from simulator import backtest, sweep
+from simulator.portfolio_risk import PortfolioRiskEngine
 from data.data_locker import DataLocker
+from prices.rolling_stats import stored_volatility
 
 simulator_bp = Blueprint('simulator', __name__, template_folder='templates')
 logger = logging.getLogger("SimulatorBP")
 
+def default_volatility(asset_type: str = "BTC", fallback: float = 0.8) -> float:
+    """The asset's rolling EWMA volatility (prices/rolling_stats.py), or fallback without stats."""
+    try:
+        return round(stored_volatility(DataLocker.get_instance(), [asset_type]).get(asset_type, fallback), 4)
+    except Exception as e:
+        logger.error("Error reading rolling volatility for %s: %s", asset_type, e)
+        return fallback
+
+
 def generate_simulated_position(sim_results):
     """
     Generates a simulated position summary from the simulation log.
@@ -67,7 +80,8 @@ def simulator_dashboard():
             simulation_duration = float(data.get("simulation_duration", 60))
             dt_minutes = float(data.get("dt_minutes", 1))
             drift = float(data.get("drift", 0.05))
-            volatility = float(data.get("volatility", 0.8))
+            volatility = float(data["volatility"]) if data.get("volatility") is not None \
+                else default_volatility(data.get("asset_type", "BTC"))
             position_side = data.get("position_side", "long").lower()
         except Exception as e:
             logger.error("Error parsing simulation parameters: %s", e)
@@ -133,7 +147,7 @@ def simulator_dashboard():
             "simulation_duration": 60,
             "dt_minutes": 1,
             "drift": 0.05,
-            "volatility": 0.8,
+            "volatility": default_volatility(),
             "position_side": "long"
         }
         return render_template("simulator_dashboard.html", params=params)
@@ -264,3 +278,112 @@ def compare_simulation():
         timeframe=24,  # Example timeframe; adjust as needed.
         now=datetime.now()
     )
+
+
+@simulator_bp.route('/sweep', methods=['GET', 'POST'])
+def parameter_sweep():
+    """
+    Parameter sweep over grids of rebalance_threshold, hedging_cost_pct, collateral
+    and volatility (see simulator/sweep.py).
+    On GET: renders simulator_sweep.html (heatmap of expected profit vs threshold).
+    On POST: expects JSON {"base": {...}, "grid": {"param": [values], ...},
+    "x": "rebalance_threshold", "y": "volatility"} (base n_paths capped at
+    sweep.MAX_PATHS_PER_POINT; n_paths x simulation_duration / dt_minutes
+    at most sweep.MAX_PATH_STEPS) and streams newline-delimited
+    JSON: one {"point": ...} per grid point as it finishes, then
+    {"done": true, "heatmap": {...}}.
+    """
+    if request.method == "GET":
+        return render_template("simulator_sweep.html", defaults=sweep.SIM_DEFAULTS,
+                               sweep_params=sweep.SWEEP_PARAMS)
+
+    data = request.get_json() or {}
+    base = dict(data.get("base", {}))
+    grid = data.get("grid", {})
+    x_param = data.get("x", "rebalance_threshold")
+    y_param = data.get("y", "volatility")
+    try:
+        # Validate before the stream starts so bad input gets a 400.
+        for axis in (x_param, y_param):
+            if axis not in sweep.SIM_DEFAULTS:
+                raise ValueError(f"Unknown heatmap axis {axis!r}; expected one of {list(sweep.SIM_DEFAULTS)}.")
+        n_paths = int(base.get("n_paths") or sweep.SIM_DEFAULTS["n_paths"])
+        base["n_paths"] = min(n_paths, sweep.MAX_PATHS_PER_POINT)
+        sim = sweep.normalize_params(base)
+        if not (sim["simulation_duration"] > 0 and sim["dt_minutes"] > 0):
+            raise ValueError("simulation_duration and dt_minutes must be positive.")
+        steps = int(sim["simulation_duration"] / sim["dt_minutes"])
+        if sim["n_paths"] * steps > sweep.MAX_PATH_STEPS:
+            raise ValueError(f"{sim['n_paths']} paths x {steps} steps exceeds the limit of "
+                             f"{sweep.MAX_PATH_STEPS}; use fewer paths or a larger dt_minutes.")
+        total = len(sweep.expand_grid(base, grid))
+    except (TypeError, ValueError, OverflowError) as e:
+        logger.error("Error parsing sweep parameters: %s", e)
+        return jsonify(error=str(e)), 400
+
+    def generate():
+        points = []
+        yield json.dumps({"total": total}) + "\n"
+        try:
+            for point in sweep.run_sweep(base, grid):
+                points.append(point)
+                yield json.dumps({"point": point}) + "\n"
+            heatmap = sweep.heatmap(points, x=x_param, y=y_param)
+        except Exception as e:
+            logger.error("Sweep failed: %s", e, exc_info=True)
+            yield json.dumps({"error": str(e)}) + "\n"
+            return
+        yield json.dumps({"done": True, "heatmap": heatmap}) + "\n"
+
+    return Response(stream_with_context(generate()), mimetype="application/x-ndjson")
+
+
+@simulator_bp.route('/portfolio_risk', methods=['GET'])
+def portfolio_risk():
+    """
+    Correlated Monte Carlo risk for the current positions (see simulator/portfolio_risk.py).
+    Query parameters: horizon_hours (24), n_paths (10000), confidence (0.95),
+    resolution ("1h"), lookback_hours (720). Returns per-position and portfolio
+    liquidation probability, the portfolio PnL distribution and VaR/CVaR as JSON.
+    """
+    try:
+        engine = PortfolioRiskEngine(
+            horizon_hours=float(request.args.get("horizon_hours", 24)),
+            n_paths=min(int(request.args.get("n_paths", 10000)), 100000),
+            confidence=float(request.args.get("confidence", 0.95)),
+            resolution=request.args.get("resolution", "1h"),
+            lookback_hours=float(request.args.get("lookback_hours", 24 * 30)),
+        )
+    except (TypeError, ValueError) as e:
+        logger.error("Error parsing portfolio risk parameters: %s", e)
+        return jsonify(error=str(e)), 400
+    try:
+        return jsonify(engine.run())
+    except Exception as e:
+        logger.error("Portfolio risk failed: %s", e, exc_info=True)
+        return jsonify(error=str(e)), 500
+
+
+@simulator_bp.route('/backtest', methods=['POST'])
+def historical_backtest():
+    """
+    Replays recorded prices through the hedging rules (see simulator/backtest.py).
+    Expects JSON {"asset_type": "BTC", "start": iso, "end": iso (optional),
+    "resolution": "1m"|"5m"|"1h"|"1d" (optional, raw rows when omitted),
+    "params": {...}} and returns the backtest, the GBM estimate and their comparison.
+    The GBM estimate's n_paths is capped by run_backtest.
+    """
+    data = request.get_json() or {}
+    try:
+        asset_type = data.get("asset_type", "BTC")
+        start = datetime.fromisoformat(data["start"]) if data.get("start") else datetime.now() - timedelta(days=1)
+        end = datetime.fromisoformat(data["end"]) if data.get("end") else None
+        report = backtest.run_backtest(data.get("params", {}), asset_type, start, end,
+                                       resolution=data.get("resolution"))
+    except (TypeError, ValueError) as e:
+        logger.error("Error running backtest: %s", e)
+        return jsonify(error=str(e)), 400
+    except Exception as e:
+        logger.error("Backtest failed: %s", e, exc_info=True)
+        return jsonify(error=str(e)), 500
+    return jsonify(report)
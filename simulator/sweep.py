@@ -0,0 +1,199 @@
+#!/usr/bin/env python
+"""
+sweep.py
+Description:
+    Parameter sweeps for the hedging simulator.
+
+    A sweep is a base parameter set plus a grid of values for any of
+    SWEEP_PARAMS; every combination is one grid point, evaluated with
+    PositionSimulator.run_monte_carlo. Points run in parallel on a process
+    pool and are yielded as they finish, so callers can stream partial
+    results. Finished points are cached by a hash of their parameters; a
+    repeated or overlapping sweep only runs the points it hasn't seen.
+
+    All points of a sweep share the Monte Carlo seed (common random numbers),
+    so differences across the grid come from the parameters, not from noise.
+Usage:
+    grid = {"rebalance_threshold": [-10, -25, -50], "volatility": [0.4, 0.8]}
+    for point in run_sweep({"n_paths": 500}, grid):
+        ...                                   # {"params", "hash", "summary", "cached"}
+    heatmap(points, x="rebalance_threshold", y="volatility")
+"""
+
+import hashlib
+import itertools
+import json
+import logging
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Dict, Iterator, List, Optional
+
+from simulator.simulation import PositionSimulator
+
+logger = logging.getLogger("SimulatorSweep")
+
+SIM_DEFAULTS = {
+    "entry_price": 10000.0,
+    "liquidation_price": 8000.0,
+    "position_size": 1.0,
+    "collateral": 1000.0,
+    "rebalance_threshold": -25.0,
+    "hedging_cost_pct": 0.001,
+    "simulation_duration": 60,
+    "dt_minutes": 1,
+    "drift": 0.05,
+    "volatility": 0.8,
+    "position_side": "long",
+    "n_paths": 500,
+    "seed": 42,
+}
+
+SWEEP_PARAMS = ("rebalance_threshold", "hedging_cost_pct", "collateral", "volatility")
+
+MAX_GRID_POINTS = 2000
+# Paths per grid point accepted from the web route (the sweep form's limit).
+MAX_PATHS_PER_POINT = 20000
+# Paths x time steps per Monte Carlo run; run_monte_carlo holds a few arrays this size.
+MAX_PATH_STEPS = 10_000_000
+CACHE_SIZE = 5000
+
+
+def normalize_params(params: dict) -> dict:
+    """SIM_DEFAULTS overlaid with params, coerced to the types the simulator expects."""
+    merged = dict(SIM_DEFAULTS)
+    merged.update({k: v for k, v in (params or {}).items() if k in SIM_DEFAULTS and v is not None})
+    for key, default in SIM_DEFAULTS.items():
+        if isinstance(default, str):
+            merged[key] = str(merged[key]).lower()
+        elif isinstance(default, int) and key in ("n_paths", "seed"):
+            merged[key] = int(merged[key])
+        else:
+            merged[key] = float(merged[key])
+    return merged
+
+
+def param_hash(params: dict) -> str:
+    return hashlib.sha1(json.dumps(normalize_params(params), sort_keys=True).encode("utf-8")).hexdigest()
+
+
+def expand_grid(base_params: dict, grid: Dict[str, list]) -> List[dict]:
+    """Every combination of the grid values over base_params."""
+    unknown = set(grid) - set(SWEEP_PARAMS)
+    if unknown:
+        raise ValueError(f"Cannot sweep {sorted(unknown)}; sweepable: {list(SWEEP_PARAMS)}")
+    keys = [k for k in SWEEP_PARAMS if grid.get(k)]
+    total = 1
+    for key in keys:
+        total *= len(grid[key])
+    if total > MAX_GRID_POINTS:
+        raise ValueError(f"Grid has {total} points; the limit is {MAX_GRID_POINTS}.")
+    base = normalize_params(base_params)
+    return [normalize_params({**base, **dict(zip(keys, values))})
+            for values in itertools.product(*(grid[k] for k in keys))]
+
+
+def run_point(params: dict) -> dict:
+    """Runs one grid point (in a worker process); returns its summary."""
+    params = normalize_params(params)
+    simulator = PositionSimulator(
+        entry_price=params["entry_price"],
+        liquidation_price=params["liquidation_price"],
+        position_size=params["position_size"],
+        collateral=params["collateral"],
+        rebalance_threshold=params["rebalance_threshold"],
+        hedging_cost_pct=params["hedging_cost_pct"],
+        position_side=params["position_side"],
+    )
+    results = simulator.run_monte_carlo(
+        n_paths=params["n_paths"],
+        simulation_duration=params["simulation_duration"],
+        dt_minutes=params["dt_minutes"],
+        drift=params["drift"],
+        volatility=params["volatility"],
+        seed=params["seed"],
+    )
+    return {"params": params, "hash": param_hash(params), "summary": results["summary"]}
+
+
+class SweepCache:
+    """Completed grid points by parameter hash (LRU, thread-safe)."""
+
+    def __init__(self, max_size: int = CACHE_SIZE):
+        self.max_size = max_size
+        self._lock = threading.Lock()
+        self._points: "OrderedDict[str, dict]" = OrderedDict()
+
+    def get(self, key: str) -> Optional[dict]:
+        with self._lock:
+            point = self._points.get(key)
+            if point is not None:
+                self._points.move_to_end(key)
+            return point
+
+    def put(self, point: dict):
+        with self._lock:
+            self._points[point["hash"]] = point
+            self._points.move_to_end(point["hash"])
+            while len(self._points) > self.max_size:
+                self._points.popitem(last=False)
+
+    def __len__(self):
+        with self._lock:
+            return len(self._points)
+
+
+_cache = SweepCache()
+
+
+def run_sweep(base_params: dict, grid: Dict[str, list], max_workers: Optional[int] = None,
+              cache: Optional[SweepCache] = None, executor=None) -> Iterator[dict]:
+    """
+    Yields {"params", "hash", "summary", "cached"} for every grid point: cached
+    points first, then the rest as the pool finishes them.
+    """
+    cache = _cache if cache is None else cache
+    pending = []
+    for params in expand_grid(base_params, grid):
+        key = param_hash(params)
+        point = cache.get(key)
+        if point is not None:
+            yield dict(point, cached=True)
+        else:
+            pending.append(params)
+    if not pending:
+        return
+
+    logger.info(f"Sweep: {len(pending)} grid point(s) to run, {len(cache)} cached.")
+    own_executor = executor is None
+    if own_executor:
+        executor = ProcessPoolExecutor(max_workers=max_workers or min(len(pending), os.cpu_count() or 1))
+    try:
+        futures = [executor.submit(run_point, params) for params in pending]
+        for future in as_completed(futures):
+            point = future.result()
+            cache.put(point)
+            yield dict(point, cached=False)
+    finally:
+        if own_executor:
+            # A client that stopped reading doesn't leave queued points running.
+            executor.shutdown(wait=False, cancel_futures=True)
+
+
+def heatmap(points: List[dict], x: str = "rebalance_threshold", y: str = "volatility",
+            value: str = "mean_profit") -> dict:
+    """
+    {"x": [...], "y": [...], "z": [[...]]} of summary[value] over two swept
+    parameters; z[i][j] is the mean over the other parameters at (y[i], x[j]),
+    None where no point landed.
+    """
+    cells: Dict[tuple, list] = {}
+    for point in points:
+        params = point["params"]
+        cells.setdefault((params[y], params[x]), []).append(point["summary"][value])
+    xs = sorted({key[1] for key in cells})
+    ys = sorted({key[0] for key in cells})
+    z = [[(sum(cells[(yv, xv)]) / len(cells[(yv, xv)])) if (yv, xv) in cells else None for xv in xs]
+         for yv in ys]
+    return {"x": xs, "y": ys, "z": z, "x_param": x, "y_param": y, "value": value}
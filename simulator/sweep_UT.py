@@ -0,0 +1,43 @@
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+
+from simulator import sweep
+
+GRID = {"rebalance_threshold": [-10, -25, -50], "volatility": [0.4, 0.8]}
+BASE = {"n_paths": 50, "simulation_duration": 30}
+
+
+class TestParameterSweep(unittest.TestCase):
+    def test_expand_grid(self):
+        points = sweep.expand_grid(BASE, GRID)
+        self.assertEqual(len(points), 6)
+        self.assertEqual({p["n_paths"] for p in points}, {50})
+        with self.assertRaises(ValueError):
+            sweep.expand_grid(BASE, {"entry_price": [1, 2]})
+
+    def test_param_hash_ignores_spelling(self):
+        self.assertEqual(sweep.param_hash({"collateral": 1000}), sweep.param_hash({"collateral": 1000.0}))
+        self.assertNotEqual(sweep.param_hash({"collateral": 1000}), sweep.param_hash({"collateral": 1100}))
+
+    def test_completed_points_are_cached(self):
+        cache = sweep.SweepCache()
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            first = list(sweep.run_sweep(BASE, GRID, cache=cache, executor=executor))
+            grown = dict(GRID, volatility=[0.4, 0.8, 1.2])
+            second = list(sweep.run_sweep(BASE, grown, cache=cache, executor=executor))
+        self.assertFalse(any(p["cached"] for p in first))
+        self.assertEqual(sum(p["cached"] for p in second), 6)
+        self.assertEqual(len(cache), 9)
+
+    def test_heatmap(self):
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            points = list(sweep.run_sweep(BASE, GRID, cache=sweep.SweepCache(), executor=executor))
+        hm = sweep.heatmap(points)
+        self.assertEqual(hm["x"], [-50.0, -25.0, -10.0])
+        self.assertEqual(hm["y"], [0.4, 0.8])
+        self.assertEqual(len(hm["z"]), 2)
+        self.assertTrue(all(v is not None for row in hm["z"] for v in row))
+
+
+if __name__ == "__main__":
+    unittest.main()
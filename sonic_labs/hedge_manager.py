@@ -109,11 +109,11 @@ class HedgeManager:
         return self.hedges
 
     @staticmethod
-    def find_hedges(db_path: str = DB_PATH) -> List[list]:
+    def find_hedges(db_path: str = DB_PATH, data_locker=None) -> List[list]:
         logger.debug("Entering HedgeManager.find_hedges")
         try:
             from uuid import uuid4
-            dl = DataLocker.get_instance(db_path)
+            dl = data_locker or DataLocker.get_instance(db_path)
             raw_positions = dl.read_positions()
             logger.debug(f"Retrieved {len(raw_positions)} raw positions from the database.")
 
@@ -144,15 +144,19 @@ class HedgeManager:
                 has_short = any(pos.get("position_type", "").strip().lower() == "short" for pos in pos_list)
                 logger.debug(f"Group {key}: has_long={has_long}, has_short={has_short}")
                 if has_long and has_short:
+                    current_ids = {pos.get("hedge_buddy_id") for pos in pos_list}
+                    if len(current_ids) == 1 and None not in current_ids:
+                        # Already linked as one group; keep the id instead of rewriting every row.
+                        hedged_groups.append(pos_list)
+                        logger.debug(f"Group {key} already linked with hedge_id {current_ids.pop()}.")
+                        continue
                     hedge_id = str(uuid4())
                     logger.debug(f"Group {key} qualifies for hedge. Assigning hedge_id {hedge_id}.")
-                    for pos in pos_list:
-                        pos["hedge_buddy_id"] = hedge_id
-                        cursor = dl.conn.cursor()
-                        cursor.execute("UPDATE positions SET hedge_buddy_id = ? WHERE id = ?", (hedge_id, pos["id"]))
-                        dl.conn.commit()
-                        cursor.close()
-                        logger.debug(f"Updated position id={pos.get('id')} with hedge_buddy_id {hedge_id}.")
+                    with dl.batch():
+                        for pos in pos_list:
+                            pos["hedge_buddy_id"] = hedge_id
+                            dl.update_position_fields(pos["id"], {"hedge_buddy_id": hedge_id})
+                            logger.debug(f"Updated position id={pos.get('id')} with hedge_buddy_id {hedge_id}.")
                     hedged_groups.append(pos_list)
                     logger.debug(f"Group {key} added as a hedge group. Total positions in group: {len(pos_list)}")
                 else:
@@ -170,11 +174,7 @@ class HedgeManager:
         Clears hedge association data by setting the hedge_buddy_id field to NULL for all positions in the database.
         """
         try:
-            dl = DataLocker.get_instance(db_path)
-            cursor = dl.conn.cursor()
-            cursor.execute("UPDATE positions SET hedge_buddy_id = NULL WHERE hedge_buddy_id IS NOT NULL")
-            dl.conn.commit()
-            cursor.close()
+            DataLocker.get_instance(db_path).clear_hedge_links()
             logger.info("Hedge association data cleared.")
         except Exception as e:
             logger.error(f"Error in clear_hedge_data: {e}", exc_info=True)
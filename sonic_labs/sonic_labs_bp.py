@@ -11,7 +11,7 @@ sonic_labs_bp = Blueprint("sonic_labs", __name__, template_folder="templates")
 @sonic_labs_bp.route("/hedge_calculator", methods=["GET"])
 def hedge_calculator():
     try:
-        positions = PositionService.get_all_positions(DB_PATH)
+        positions = PositionService.get_positions_snapshot(DB_PATH)
         long_positions = [p for p in positions if p.get("position_type", "").upper() == "LONG"]
         short_positions = [p for p in positions if p.get("position_type", "").upper() == "SHORT"]
 
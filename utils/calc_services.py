@@ -1,6 +1,27 @@
 from typing import Optional, List, Dict
 import sqlite3
 import logging
+import math
+
+import numpy as np
+
+def _as_float(value) -> float:
+    """float(value), or NaN for None / unparsable values."""
+    if value is None:
+        return np.nan
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return np.nan
+
+
+# Standard normal CDF, elementwise over arrays.
+_erfc = np.vectorize(math.erfc, otypes=[float])
+
+
+def _norm_cdf(z: np.ndarray) -> np.ndarray:
+    return 0.5 * _erfc(-np.asarray(z, dtype=float) / math.sqrt(2.0))
+
 
 @staticmethod
 def get_profit_alert_class(profit, low_thresh, med_thresh, high_thresh):
@@ -137,6 +158,127 @@ class CalcServices:
         except Exception as e:
             return None
 
+    # Numeric columns enrich_batch() loads into arrays.
+    BATCH_FIELDS = ("entry_price", "current_price", "liquidation_price", "collateral", "size")
+
+    def enrich_batch(self, positions: List[dict], as_arrays: bool = False):
+        """
+        Vectorized PositionService.enrich_position() for many positions at once.
+        The numeric columns are loaded into NumPy arrays once and profit,
+        leverage, travel percent, liquidation distance and the composite risk
+        (heat) index are computed in a single pass, with the same guards as the
+        per-position methods:
+          - missing numbers default to 0.0 (current_price falls back to entry_price),
+          - leverage is None without collateral, 0.0 without size,
+          - travel percent is 0.0 for invalid prices or an unknown position type,
+          - the heat index is None when calculate_composite_risk_index() would
+            refuse the position, and floored at 5.0 otherwise.
+
+        Returns the positions, enriched in place, or with as_arrays=True a dict
+        of arrays keyed by field name (NaN where the dict form has None).
+        """
+        n = len(positions)
+        cols = {
+            field: np.fromiter((_as_float(p.get(field)) for p in positions), dtype=float, count=n)
+            for field in self.BATCH_FIELDS
+        }
+        entry = np.nan_to_num(cols["entry_price"], nan=0.0)
+        current = np.where(np.isnan(cols["current_price"]), entry, cols["current_price"])
+        liquidation = np.nan_to_num(cols["liquidation_price"], nan=0.0)
+        collateral = np.nan_to_num(cols["collateral"], nan=0.0)
+        size = np.nan_to_num(cols["size"], nan=0.0)
+        # calculate_travel_percent() strips the type; calculate_composite_risk_index()
+        # treats a missing type as LONG and anything else as SHORT.
+        travel_type = np.array([(p.get("position_type") or "").strip().upper() for p in positions], dtype=object)
+        risk_is_long = np.array([(p.get("position_type") or "LONG").upper() == "LONG" for p in positions], dtype=bool)
+
+        with np.errstate(divide="ignore", invalid="ignore"):
+            profit = np.round(size, 2)
+            leverage = np.where(collateral > 0, np.where(size > 0, np.round(size / collateral, 2), 0.0), np.nan)
+
+            is_long = travel_type == "LONG"
+            is_short = travel_type == "SHORT"
+            prices_ok = (entry > 0) & (liquidation > 0) & (entry != liquidation)
+            travel = np.where(is_long, (current - entry) / (entry - liquidation),
+                              (entry - current) / (liquidation - entry)) * 100
+            travel = np.where(prices_ok & (is_long | is_short), travel, 0.0)
+
+            liquidation_distance = np.round(np.abs(liquidation - current), 2)
+
+            ndl = np.where(risk_is_long, (current - liquidation) / (entry - liquidation),
+                           (liquidation - current) / (liquidation - entry))
+            ndl = np.clip(ndl, 0.0, 1.0)
+            collateral_ratio = np.minimum(collateral / size, 1.0)
+            risk = ((1.0 - ndl) ** 0.45) * ((leverage / 100.0) ** 0.35) * ((1.0 - collateral_ratio) ** 0.20) * 100.0
+            risk = np.round(np.maximum(risk, 5.0), 2)
+            risk_ok = ((entry > 0) & (liquidation > 0) & (collateral > 0) & (size > 0)
+                       & (np.abs(entry - liquidation) >= 1e-6))
+            heat_index = np.where(risk_ok & ~np.isnan(risk), risk, np.nan)
+
+        arrays = {
+            "entry_price": entry,
+            "current_price": current,
+            "liquidation_price": liquidation,
+            "collateral": collateral,
+            "size": size,
+            "profit": profit,
+            "leverage": leverage,
+            "travel_percent": travel,
+            "liquidation_distance": liquidation_distance,
+            "heat_index": heat_index,
+        }
+        if as_arrays:
+            return arrays
+
+        # One tolist() per column is far cheaper than indexing arrays per position.
+        columns = {field: values.tolist() for field, values in arrays.items()}
+        for i, pos in enumerate(positions):
+            for field, values in columns.items():
+                value = values[i]
+                pos[field] = None if value != value else value  # NaN -> None
+            pos["current_heat_index"] = pos["heat_index"]
+        return positions
+
+    HOURS_IN_YEAR = 24 * 365
+
+    def calculate_liquidation_probabilities(self, positions: List[dict], volatility: Dict[str, float],
+                                            horizons_hours: List[float], drift: float = 0.0) -> np.ndarray:
+        """
+        Probability that each position's price touches its liquidation price
+        within each horizon, assuming GBM with annualized `drift` and the
+        asset's annualized volatility (volatility[asset_type]).
+
+        With d = ln(liquidation/current) signed so it is negative while the
+        position is alive (flipped for shorts), nu = drift - sigma^2/2 (also
+        flipped for shorts) and t in years, the first-passage probability is
+            P = N((d - nu*t) / (sigma*sqrt(t))) + exp(2*nu*d / sigma^2) * N((d + nu*t) / (sigma*sqrt(t)))
+        A position at or past its liquidation price has P = 1.
+
+        Returns an (n_positions, n_horizons) array; NaN rows for positions
+        without a current/liquidation price or a volatility for their asset.
+        """
+        n = len(positions)
+        current = np.fromiter((_as_float(p.get("current_price")) for p in positions), dtype=float, count=n)
+        liquidation = np.fromiter((_as_float(p.get("liquidation_price")) for p in positions), dtype=float, count=n)
+        sigma = np.fromiter((_as_float(volatility.get(p.get("asset_type"))) for p in positions), dtype=float, count=n)
+        is_short = np.array([(p.get("position_type") or "LONG").upper() == "SHORT" for p in positions], dtype=bool)
+        side = np.where(is_short, -1.0, 1.0)[:, None]
+        t = np.asarray(horizons_hours, dtype=float)[None, :] / self.HOURS_IN_YEAR
+
+        with np.errstate(divide="ignore", invalid="ignore", over="ignore"):
+            valid = (current > 0) & (liquidation > 0) & (sigma >= 0)
+            d = side * np.log(liquidation / current)[:, None]
+            s = sigma[:, None]
+            nu = side * (drift - 0.5 * s ** 2)
+            scale = s * np.sqrt(t)
+            reflection = np.exp(np.minimum(2.0 * nu * d / s ** 2, 700.0)) * _norm_cdf((d + nu * t) / scale)
+            # inf * 0 when sigma is tiny: the reflected term vanishes.
+            p = _norm_cdf((d - nu * t) / scale) + np.nan_to_num(reflection, nan=0.0)
+            # No volatility or no time: only a position already past the barrier is hit.
+            p = np.where(scale > 0, p, 0.0)
+            p = np.where(d >= 0, 1.0, np.clip(p, 0.0, 1.0))
+        return np.where(valid[:, None], p, np.nan)
+
     def calculate_value(self, position):
         size = float(position.get("size") or 0.0)
         return round(size, 2)
@@ -219,102 +361,56 @@ class CalcServices:
         For each position in `positions`, compute travel percent,
         liquidation distance, value, leverage, and heat index.
         Also updates the DB with the new travel_percent, liquidation_distance,
-        heat_index, current_heat_index, and current_price.
-        After the update, it performs a read to confirm the updated values.
+        heat_index, current_heat_index, and current_price, in one batch
+        through the DataLocker writer.
+
+        The columns come from enrich_batch(as_arrays=True), so missing or
+        None numbers get its guards (current_price falls back to entry_price).
+        A missing position_type counts as LONG, and the heat index here is
+        calculate_heat_index() (size * leverage / collateral, 0.0 without
+        collateral), not the composite risk index.
         """
-        import sqlite3
-        conn = DataLocker.get_instance(db_path).conn
-        cursor = conn.cursor()
-
-        for pos in positions:
-            position_type = (pos.get("position_type") or "LONG").upper()
-            entry_price = float(pos.get("entry_price", 0.0))
-            current_price = float(pos.get("current_price", 0.0))
-            liquidation_price = float(pos.get("liquidation_price", 0.0))
-            collateral = float(pos.get("collateral", 0.0))
-            size = float(pos.get("size", 0.0))
-
-            travel_percent = self.calculate_travel_percent(
-                position_type,
-                entry_price,
-                current_price,
-                liquidation_price
-            )
-            pos["travel_percent"] = travel_percent
-
-            liq_distance = self.calculate_liquid_distance(
-                current_price=current_price,
-                liquidation_price=liquidation_price
-            )
-            pos["liquidation_distance"] = liq_distance
-
-            try:
-                cursor.execute(
-                    "UPDATE positions SET travel_percent = ? WHERE id = ?",
-                    (travel_percent, pos["id"])
-                )
-            except Exception as e:
-                print(f"Error updating travel_percent for position {pos['id']}: {e}")
-
-            try:
-                cursor.execute(
-                    "UPDATE positions SET liquidation_distance = ? WHERE id = ?",
-                    (liq_distance, pos["id"])
-                )
-            except Exception as e:
-                print(f"Error updating liquidation_distance for position {pos['id']}: {e}")
-
-            if entry_price > 0:
-                token_count = size / entry_price
-                if position_type == "LONG":
-                    pnl = (current_price - entry_price) * token_count
-                else:
-                    pnl = (entry_price - current_price) * token_count
-            else:
-                pnl = 0.0
-            pos["value"] = round(collateral + pnl, 2)
-
-            if collateral > 0:
-                pos["leverage"] = round(size / collateral, 2)
-            else:
-                pos["leverage"] = 0.0
-
-            heat_index = self.calculate_heat_index(pos) or 0.0
-            pos["heat_index"] = heat_index
-            pos["current_heat_index"] = heat_index
-
-            try:
-                cursor.execute(
-                    "UPDATE positions SET heat_index = ?, current_heat_index = ? WHERE id = ?",
-                    (heat_index, heat_index, pos["id"])
-                )
-            except Exception as e:
-                print(f"Error updating heat indexes for position {pos['id']}: {e}")
-
-            try:
-                cursor.execute(
-                    "UPDATE positions SET current_price = ? WHERE id = ?",
-                    (current_price, pos["id"])
-                )
-            except Exception as e:
-                print(f"Error updating current_price for position {pos['id']}: {e}")
-
-            try:
-                cursor.execute(
-                    "SELECT heat_index, current_heat_index, current_price FROM positions WHERE id = ?",
-                    (pos["id"],)
-                )
-                updated_row = cursor.fetchone()
-                if updated_row:
-                    print(
-                        f"[DEBUG] Confirmed update for position {pos['id']}: heat_index = {updated_row[0]}, current_heat_index = {updated_row[1]}, current_price = {updated_row[2]}")
-                else:
-                    print(f"[DEBUG] No updated record found for position {pos['id']}")
-            except Exception as e:
-                print(f"Error reading back updated values for position {pos['id']}: {e}")
+        from data.data_locker import DataLocker
+        dl = DataLocker.get_instance(db_path)
+        if not positions:
+            return positions
+
+        typed = [p if p.get("position_type") else dict(p, position_type="LONG") for p in positions]
+        arrays = self.enrich_batch(typed, as_arrays=True)
+        entry, current = arrays["entry_price"], arrays["current_price"]
+        collateral, size = arrays["collateral"], arrays["size"]
+        is_long = np.array([p["position_type"].upper() == "LONG" for p in typed], dtype=bool)
+
+        with np.errstate(divide="ignore", invalid="ignore"):
+            pnl = np.where(entry > 0, np.where(is_long, current - entry, entry - current) * (size / entry), 0.0)
+            value = np.round(collateral + pnl, 2)
+            leverage = np.nan_to_num(arrays["leverage"], nan=0.0)
+            heat_index = np.where(collateral > 0, np.round(size * leverage / collateral, 2), 0.0)
+
+        columns = {
+            "travel_percent": arrays["travel_percent"].tolist(),
+            "liquidation_distance": arrays["liquidation_distance"].tolist(),
+            "value": value.tolist(),
+            "leverage": leverage.tolist(),
+            "heat_index": heat_index.tolist(),
+        }
+        current_prices = current.tolist()
+        with dl.batch():
+            for i, pos in enumerate(positions):
+                for field, values in columns.items():
+                    pos[field] = values[i]
+                pos["current_heat_index"] = pos["heat_index"]
+                try:
+                    dl.update_position_fields(pos["id"], {
+                        "travel_percent": pos["travel_percent"],
+                        "liquidation_distance": pos["liquidation_distance"],
+                        "heat_index": pos["heat_index"],
+                        "current_heat_index": pos["heat_index"],
+                        "current_price": current_prices[i],
+                    })
+                except Exception as e:
+                    self.logger.error(f"Error updating calculated fields for position {pos['id']}: {e}")
 
-        conn.commit()
-        conn.close()
         return positions
 
     def calculate_liquid_distance(self, current_price: float, liquidation_price: float) -> float:
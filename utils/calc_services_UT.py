@@ -0,0 +1,178 @@
+import math
+import random
+import unittest
+
+from data.data_locker import DataLocker
+from utils.calc_services import CalcServices
+
+
+def scalar_enrich(calc: CalcServices, position: dict) -> dict:
+    """The per-position path (PositionService.enrich_position) built from CalcServices' scalar methods."""
+    pos = dict(position)
+    for field in ("entry_price", "current_price", "liquidation_price", "collateral", "size"):
+        if pos.get(field) is None:
+            pos[field] = pos["entry_price"] if field == "current_price" and pos.get("entry_price") is not None else 0.0
+        pos[field] = float(pos[field])
+    pos["profit"] = calc.calculate_value(pos)
+    pos["leverage"] = calc.calculate_leverage(pos["size"], pos["collateral"]) if pos["collateral"] > 0 else None
+    pos["travel_percent"] = calc.calculate_travel_percent(
+        pos.get("position_type", ""), pos["entry_price"], pos["current_price"], pos["liquidation_price"]
+    )
+    pos["liquidation_distance"] = calc.calculate_liquid_distance(pos["current_price"], pos["liquidation_price"])
+    pos["heat_index"] = calc.calculate_composite_risk_index(pos)
+    pos["current_heat_index"] = pos["heat_index"]
+    return pos
+
+
+def random_positions(n: int, seed: int = 7) -> list:
+    rng = random.Random(seed)
+    positions = []
+    for i in range(n):
+        entry = rng.uniform(10, 100000)
+        long = rng.random() < 0.5
+        liquidation = entry * (rng.uniform(0.5, 0.95) if long else rng.uniform(1.05, 1.5))
+        positions.append({
+            "id": f"p{i}",
+            "position_type": "LONG" if long else "SHORT",
+            "entry_price": entry,
+            "current_price": entry * rng.uniform(0.6, 1.4),
+            "liquidation_price": liquidation,
+            "collateral": rng.uniform(10, 5000),
+            "size": rng.uniform(10, 50000),
+        })
+    return positions
+
+
+class TestEnrichBatch(unittest.TestCase):
+    FIELDS = ("profit", "leverage", "travel_percent", "liquidation_distance", "heat_index", "current_heat_index")
+
+    def setUp(self):
+        self.calc = CalcServices()
+
+    def assert_matches_scalar(self, positions):
+        expected = [scalar_enrich(self.calc, p) for p in positions]
+        actual = self.calc.enrich_batch([dict(p) for p in positions])
+        for exp, act in zip(expected, actual):
+            for field in self.FIELDS:
+                if exp[field] is None:
+                    self.assertIsNone(act[field], f"{exp['id']}.{field}")
+                else:
+                    self.assertAlmostEqual(act[field], exp[field], places=6, msg=f"{exp['id']}.{field}")
+
+    def test_matches_per_position_path(self):
+        self.assert_matches_scalar(random_positions(500))
+
+    def test_guards(self):
+        self.assert_matches_scalar([
+            {"id": "no_collateral", "position_type": "LONG", "entry_price": 100, "current_price": 90,
+             "liquidation_price": 80, "collateral": 0, "size": 1000},
+            {"id": "no_size", "position_type": "SHORT", "entry_price": 100, "current_price": 90,
+             "liquidation_price": 120, "collateral": 50, "size": 0},
+            {"id": "entry_is_liq", "position_type": "LONG", "entry_price": 100, "current_price": 90,
+             "liquidation_price": 100, "collateral": 50, "size": 500},
+            {"id": "missing_prices", "position_type": "LONG", "entry_price": 100, "current_price": None,
+             "liquidation_price": None, "collateral": 50, "size": 500},
+            {"id": "unknown_type", "position_type": "HEDGE", "entry_price": 100, "current_price": 90,
+             "liquidation_price": 80, "collateral": 50, "size": 500},
+            {"id": "past_liquidation", "position_type": "Long", "entry_price": 100, "current_price": 70,
+             "liquidation_price": 80, "collateral": 50, "size": 500},
+        ])
+
+    def test_as_arrays(self):
+        arrays = self.calc.enrich_batch(random_positions(10), as_arrays=True)
+        self.assertEqual(len(arrays["heat_index"]), 10)
+        self.assertEqual(self.calc.enrich_batch([]), [])
+
+    def test_10k_positions_match_scalar(self):
+        self.assert_matches_scalar(random_positions(10_000))
+
+
+class TestAggregatorPositions(unittest.TestCase):
+    def setUp(self):
+        self.calc = CalcServices()
+        DataLocker._instance = DataLocker(":memory:")
+        self.dl = DataLocker._instance
+
+    def tearDown(self):
+        self.dl.close()
+        DataLocker._instance = None
+
+    def scalar(self, pos: dict) -> dict:
+        """The per-position computation aggregator_positions used before it was batched."""
+        position_type = (pos.get("position_type") or "LONG").upper()
+        entry, current, liq = pos["entry_price"], pos["current_price"], pos["liquidation_price"]
+        collateral, size = pos["collateral"], pos["size"]
+        pnl = (current - entry if position_type == "LONG" else entry - current) * size / entry
+        leverage = round(size / collateral, 2) if collateral > 0 else 0.0
+        heat = self.calc.calculate_heat_index({"size": size, "leverage": leverage, "collateral": collateral}) or 0.0
+        return {
+            "travel_percent": self.calc.calculate_travel_percent(position_type, entry, current, liq),
+            "liquidation_distance": self.calc.calculate_liquid_distance(current, liq),
+            "value": round(collateral + pnl, 2),
+            "leverage": leverage,
+            "heat_index": heat,
+        }
+
+    def test_matches_scalar_and_writes_back(self):
+        positions = random_positions(200)
+        positions[0]["position_type"] = None
+        for pos in positions:
+            self.dl.create_position(dict(pos))
+        expected = [self.scalar(p) for p in positions]
+        self.calc.aggregator_positions(positions, ":memory:")
+        for exp, act in zip(expected, positions):
+            for field, value in exp.items():
+                self.assertAlmostEqual(act[field], value, places=6, msg=f"{act['id']}.{field}")
+        stored = {p["id"]: p for p in self.dl.read_positions()}
+        self.assertAlmostEqual(stored["p5"]["heat_index"], positions[5]["heat_index"])
+        self.assertAlmostEqual(stored["p5"]["travel_percent"], positions[5]["travel_percent"])
+
+    def test_none_values(self):
+        pos = {"id": "n1", "position_type": "SHORT", "entry_price": 100.0, "current_price": None,
+               "liquidation_price": None, "collateral": None, "size": 10.0}
+        self.dl.create_position(dict(pos))
+        self.calc.aggregator_positions([pos], ":memory:")
+        self.assertEqual(pos["leverage"], 0.0)
+        self.assertEqual(pos["heat_index"], 0.0)
+        self.assertEqual(pos["value"], 0.0)
+
+
+class TestLiquidationProbability(unittest.TestCase):
+    def setUp(self):
+        self.calc = CalcServices()
+
+    def _prob(self, position, vol=0.8, horizons=(24,), drift=0.0):
+        return self.calc.calculate_liquidation_probabilities([position], {"BTC": vol}, list(horizons), drift)[0]
+
+    def test_driftless_long_matches_reflection_principle(self):
+        # Zero drift in log space: P = 2 * N(ln(L/S) / (sigma*sqrt(t))).
+        vol = 0.8
+        drift = 0.5 * vol ** 2
+        pos = {"asset_type": "BTC", "position_type": "LONG", "current_price": 100.0, "liquidation_price": 90.0}
+        t = 24 / (24 * 365)
+        z = math.log(0.9) / (vol * math.sqrt(t))
+        expected = 2 * 0.5 * math.erfc(-z / math.sqrt(2))
+        self.assertAlmostEqual(self._prob(pos, vol, drift=drift)[0], expected, places=9)
+
+    def test_short_mirrors_long_and_grows_with_horizon(self):
+        long = {"asset_type": "BTC", "position_type": "LONG", "current_price": 100.0, "liquidation_price": 80.0}
+        short = {"asset_type": "BTC", "position_type": "SHORT", "current_price": 100.0, "liquidation_price": 125.0}
+        # Same log distance; only the drift term differs, and it is small over a day.
+        p_long = self._prob(long, horizons=(1, 24, 168))
+        p_short = self._prob(short, horizons=(1, 24, 168))
+        self.assertAlmostEqual(p_long[1], p_short[1], places=3)
+        self.assertTrue(p_long[0] < p_long[1] < p_long[2])
+
+    def test_edge_cases(self):
+        past = {"asset_type": "BTC", "position_type": "LONG", "current_price": 79.0, "liquidation_price": 80.0}
+        missing = {"asset_type": "BTC", "position_type": "LONG", "current_price": 100.0}
+        unknown = {"asset_type": "XYZ", "position_type": "LONG", "current_price": 100.0, "liquidation_price": 80.0}
+        still = {"asset_type": "BTC", "position_type": "LONG", "current_price": 100.0, "liquidation_price": 80.0}
+        self.assertEqual(self._prob(past)[0], 1.0)
+        self.assertTrue(math.isnan(self._prob(missing)[0]))
+        self.assertTrue(math.isnan(self._prob(unknown)[0]))
+        self.assertEqual(self._prob(still, vol=0.0)[0], 0.0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -13,7 +13,6 @@ def log_alert_update(data_locker, alert_id: str, modified_by: str, reason: str,
     :param before_value: The state before the update.
     :param after_value: The new state.
     """
-    cursor = data_locker.conn.cursor()
     ledger_entry = {
         "id": str(uuid4()),
         "alert_id": alert_id,
@@ -30,5 +29,4 @@ def log_alert_update(data_locker, alert_id: str, modified_by: str, reason: str,
             :id, :alert_id, :modified_by, :reason, :before_value, :after_value, :timestamp
         )
     """
-    cursor.execute(sql, ledger_entry)
-    data_locker.conn.commit()
+    data_locker.execute_write(sql, ledger_entry)
@@ -0,0 +1,2 @@
+# Regular package so pytest imports xcom/*_UT.py as xcom.<name>; without it
+# xcom/xcom.py shadows the package when the test directory is put on sys.path.
@@ -0,0 +1,375 @@
+#!/usr/bin/env python
+"""
+notification_dispatcher.py
+Description:
+    Outbound notification queue with a background worker, so alert checks
+    only enqueue and return instead of waiting on SMTP or Twilio.
+
+    Transports are long-lived and reused across messages:
+      - SmtpTransport       one logged-in SMTP connection (reconnects when the
+                            server drops it); sends email.
+      - SmsGatewayTransport email-to-SMS through an SmtpTransport.
+      - TwilioTransport     one Twilio Client; triggers the Studio call flow.
+      - StubTransport       records messages locally; for tests.
+    A transport's send(notification) returns a truthy value on success; a
+    falsy return or an exception is retried with exponential backoff
+    (backoff_seconds * 2 ** (attempt - 1), capped at max_backoff_seconds)
+    until max_attempts, then counted as failed. A message waiting for its
+    retry does not hold up the rest of the queue.
+Usage:
+    dispatcher = get_dispatcher()                 # built from com_config.json
+    dispatcher.enqueue("sms", "BTC heat index High", key="all_alerts")
+    dispatcher.get_stats()
+
+    dispatcher = NotificationDispatcher({"sms": StubTransport()})   # tests
+"""
+
+import heapq
+import itertools
+import logging
+import smtplib
+import ssl
+import threading
+import time
+from email.mime.text import MIMEText
+from typing import Dict, Optional
+
+logger = logging.getLogger("xCom")
+
+CHANNELS = ("email", "sms", "call")
+
+
+class Notification:
+    def __init__(self, channel: str, body: str, recipient: str = "", subject: str = "", key: Optional[str] = None):
+        self.channel = channel
+        self.body = body
+        self.recipient = recipient or ""
+        self.subject = subject or ""
+        self.key = key
+        self.attempts = 0
+        self.created_at = time.time()
+        self.last_error: Optional[str] = None
+
+    def __repr__(self):
+        return f"Notification(channel={self.channel!r}, key={self.key!r}, attempts={self.attempts})"
+
+
+# ----------------------------------------------------------------
+# Transports
+# ----------------------------------------------------------------
+
+class SmtpTransport:
+    """Keeps one SMTP connection open and reuses it for every message."""
+
+    def __init__(self, smtp_config: dict, timeout: float = 10.0):
+        self.server = smtp_config.get("server")
+        self.port = smtp_config.get("port")
+        self.username = smtp_config.get("username")
+        self.password = smtp_config.get("password")
+        self.default_recipient = smtp_config.get("default_recipient")
+        self.timeout = timeout
+        self._smtp: Optional[smtplib.SMTP] = None
+        self._lock = threading.Lock()
+
+    def is_configured(self) -> bool:
+        return all([self.server, self.port, self.username, self.password])
+
+    def _connect(self) -> smtplib.SMTP:
+        smtp = smtplib.SMTP(self.server, self.port, timeout=self.timeout)
+        try:
+            smtp.ehlo()
+            smtp.starttls(context=ssl.create_default_context())
+            smtp.login(self.username, self.password)
+        except Exception:
+            smtp.close()
+            raise
+        logger.debug("Opened SMTP connection to %s:%s", self.server, self.port)
+        return smtp
+
+    def _reset(self):
+        if self._smtp is not None:
+            try:
+                self._smtp.quit()
+            except Exception:
+                self._smtp.close()
+            self._smtp = None
+
+    def send_email(self, recipient: str, subject: str, body: str) -> bool:
+        recipient = recipient or self.default_recipient
+        if not self.is_configured() or not recipient:
+            logger.error("Missing email configuration details.")
+            return False
+        msg = MIMEText(body, "plain")
+        msg["Subject"] = subject
+        msg["From"] = self.username
+        msg["To"] = recipient
+        with self._lock:
+            if self._smtp is None:
+                self._smtp = self._connect()
+            try:
+                self._smtp.send_message(msg)
+            except (smtplib.SMTPServerDisconnected, ConnectionError):
+                # Idle connections get dropped by the server; reconnect once.
+                self._reset()
+                self._smtp = self._connect()
+                self._smtp.send_message(msg)
+            except Exception:
+                self._reset()
+                raise
+        logger.info("Email sent successfully to %s", recipient)
+        return True
+
+    def send(self, notification: Notification) -> bool:
+        return self.send_email(notification.recipient, notification.subject, notification.body)
+
+    def close(self):
+        with self._lock:
+            self._reset()
+
+
+class SmsGatewayTransport:
+    """SMS through the carrier's email-to-SMS gateway, over a shared SmtpTransport."""
+
+    def __init__(self, sms_config: dict, smtp: SmtpTransport):
+        self.carrier_gateway = sms_config.get("carrier_gateway")
+        self.default_recipient = sms_config.get("default_recipient")
+        self.smtp = smtp
+
+    def send(self, notification: Notification) -> bool:
+        recipient = notification.recipient or self.default_recipient
+        if not self.carrier_gateway or not recipient:
+            logger.error("Missing SMS configuration details.")
+            return False
+        return self.smtp.send_email(f"{recipient}@{self.carrier_gateway}", "", notification.body)
+
+    def close(self):
+        pass
+
+
+class TwilioTransport:
+    """
+    Triggers the Twilio Studio flow with one Client for the life of the transport.
+    Accepts either the com_config provider keys (default_to_phone/default_from_phone)
+    or the alert config's twilio_config keys (to_phone/from_phone).
+    """
+
+    def __init__(self, twilio_config: dict):
+        self.account_sid = twilio_config.get("account_sid")
+        self.auth_token = twilio_config.get("auth_token")
+        self.flow_sid = twilio_config.get("flow_sid")
+        self.to_phone = twilio_config.get("to_phone") or twilio_config.get("default_to_phone")
+        self.from_phone = twilio_config.get("from_phone") or twilio_config.get("default_from_phone")
+        self._client = None
+        self._lock = threading.Lock()
+
+    def is_configured(self) -> bool:
+        return all([self.account_sid, self.auth_token, self.flow_sid, self.to_phone, self.from_phone])
+
+    def _get_client(self):
+        with self._lock:
+            if self._client is None:
+                from twilio.rest import Client
+                self._client = Client(self.account_sid, self.auth_token)
+            return self._client
+
+    def send(self, notification: Notification):
+        if not self.is_configured():
+            logger.error("Missing Twilio configuration details.")
+            return False
+        execution = self._get_client().studio.v2.flows(self.flow_sid).executions.create(
+            to=notification.recipient or self.to_phone,
+            from_=self.from_phone,
+            parameters={"custom_message": notification.body}
+        )
+        logger.info("Call triggered successfully. Execution SID: %s", execution.sid)
+        return execution.sid
+
+    def close(self):
+        pass
+
+
+class StubTransport:
+    """Records notifications instead of sending them. Fails the first `fail_times` sends."""
+
+    def __init__(self, fail_times: int = 0, delay: float = 0.0):
+        self.fail_times = fail_times
+        self.delay = delay
+        self.sent = []
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def send(self, notification: Notification) -> bool:
+        if self.delay:
+            time.sleep(self.delay)
+        with self._lock:
+            self.calls += 1
+            if self.calls <= self.fail_times:
+                raise ConnectionError(f"stub failure {self.calls}")
+            self.sent.append(notification)
+        return True
+
+    def close(self):
+        pass
+
+
+# ----------------------------------------------------------------
+# Dispatcher
+# ----------------------------------------------------------------
+
+class NotificationDispatcher:
+    def __init__(self, transports: Optional[Dict[str, object]] = None, max_attempts: int = 4,
+                 backoff_seconds: float = 2.0, max_backoff_seconds: float = 60.0, max_pending: int = 1000):
+        self.transports: Dict[str, object] = dict(transports or {})
+        self.max_attempts = max(1, max_attempts)
+        self.backoff_seconds = backoff_seconds
+        self.max_backoff_seconds = max_backoff_seconds
+        self.max_pending = max_pending
+        self._cond = threading.Condition()
+        # (due time, sequence, notification); retries wait here with a later due time.
+        self._heap = []
+        self._seq = itertools.count()
+        self._in_flight = 0
+        self._stopping = False
+        self._thread: Optional[threading.Thread] = None
+        self._stats = {"enqueued": 0, "sent": 0, "retried": 0, "failed": 0, "dropped": 0}
+
+    @classmethod
+    def from_config(cls, com_config: dict, twilio_config: Optional[dict] = None, **kwargs) -> "NotificationDispatcher":
+        """Transports for the enabled providers in com_config.json; twilio_config overrides its Twilio block."""
+        providers = com_config.get("communication", {}).get("providers", {})
+        transports = {}
+        smtp = SmtpTransport(providers.get("email", {}).get("smtp", {}))
+        if providers.get("email", {}).get("enabled", False):
+            transports["email"] = smtp
+        if providers.get("sms", {}).get("enabled", False):
+            transports["sms"] = SmsGatewayTransport(providers["sms"], smtp)
+        if twilio_config:
+            transports["call"] = TwilioTransport(twilio_config)
+        elif providers.get("twilio", {}).get("enabled", False):
+            transports["call"] = TwilioTransport(providers["twilio"])
+        return cls(transports, **kwargs)
+
+    def register(self, channel: str, transport):
+        with self._cond:
+            self.transports[channel] = transport
+
+    def start(self):
+        with self._cond:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._stopping = False
+            self._thread = threading.Thread(target=self._run, name="NotificationDispatcher", daemon=True)
+            self._thread.start()
+
+    def stop(self, timeout: float = 5.0):
+        """Stops the worker after the messages that are due now; closes the transports."""
+        with self._cond:
+            self._stopping = True
+            self._cond.notify_all()
+            thread = self._thread
+        if thread is not None:
+            thread.join(timeout)
+        with self._cond:
+            if self._heap:
+                logger.warning("Notification dispatcher stopped with %d message(s) still queued.", len(self._heap))
+        for transport in self.transports.values():
+            try:
+                transport.close()
+            except Exception as e:
+                logger.debug("Error closing transport %r: %s", transport, e)
+
+    def enqueue(self, channel: str, body: str, recipient: str = "", subject: str = "",
+                key: Optional[str] = None) -> bool:
+        """Queues a message and returns immediately. False when the channel is unknown or the queue is full."""
+        with self._cond:
+            if channel not in self.transports:
+                logger.error("No transport configured for %s notifications; dropping %s.", channel, key)
+                self._stats["dropped"] += 1
+                return False
+            if len(self._heap) >= self.max_pending:
+                logger.error("Notification queue full (%d); dropping %s.", self.max_pending, key)
+                self._stats["dropped"] += 1
+                return False
+            notification = Notification(channel, body, recipient, subject, key)
+            heapq.heappush(self._heap, (time.monotonic(), next(self._seq), notification))
+            self._stats["enqueued"] += 1
+            self._cond.notify()
+        self.start()
+        return True
+
+    def wait_idle(self, timeout: float = 10.0) -> bool:
+        """Blocks until nothing is queued or in flight (retries included). Returns False on timeout."""
+        deadline = time.monotonic() + timeout
+        with self._cond:
+            while self._heap or self._in_flight:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                self._cond.wait(min(remaining, 0.05))
+        return True
+
+    def get_stats(self) -> dict:
+        with self._cond:
+            return dict(self._stats, pending=len(self._heap) + self._in_flight)
+
+    def _backoff(self, attempts: int) -> float:
+        return min(self.backoff_seconds * (2 ** (attempts - 1)), self.max_backoff_seconds)
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while True:
+                    if self._heap and self._heap[0][0] <= time.monotonic():
+                        _, _, notification = heapq.heappop(self._heap)
+                        transport = self.transports.get(notification.channel)
+                        self._in_flight += 1
+                        break
+                    if self._stopping:
+                        return
+                    timeout = self._heap[0][0] - time.monotonic() if self._heap else None
+                    self._cond.wait(timeout)
+            try:
+                self._deliver(notification, transport)
+            finally:
+                with self._cond:
+                    self._in_flight -= 1
+                    self._cond.notify_all()
+
+    def _deliver(self, notification: Notification, transport):
+        notification.attempts += 1
+        try:
+            ok = transport.send(notification)
+            error = None if ok else "transport returned no result"
+        except Exception as e:
+            ok, error = False, str(e)
+
+        with self._cond:
+            if ok:
+                self._stats["sent"] += 1
+                logger.debug("Sent %r", notification)
+                return
+            notification.last_error = error
+            if notification.attempts >= self.max_attempts or self._stopping:
+                self._stats["failed"] += 1
+                logger.error("Giving up on %r after %d attempt(s): %s",
+                             notification, notification.attempts, error)
+                return
+            delay = self._backoff(notification.attempts)
+            self._stats["retried"] += 1
+            heapq.heappush(self._heap, (time.monotonic() + delay, next(self._seq), notification))
+            self._cond.notify_all()
+        logger.warning("Delivery of %r failed (%s); retrying in %.1fs.", notification, error, delay)
+
+
+_default_lock = threading.Lock()
+_default_dispatcher: Optional[NotificationDispatcher] = None
+
+
+def get_dispatcher() -> NotificationDispatcher:
+    """Process-wide dispatcher built from com_config.json."""
+    global _default_dispatcher
+    with _default_lock:
+        if _default_dispatcher is None:
+            from xcom.xcom import load_com_config
+            _default_dispatcher = NotificationDispatcher.from_config(load_com_config())
+        return _default_dispatcher
@@ -0,0 +1,76 @@
+import threading
+import time
+import unittest
+
+from xcom.notification_dispatcher import NotificationDispatcher, StubTransport
+
+
+class GatedTransport(StubTransport):
+    """StubTransport whose sends wait until the gate opens."""
+
+    def __init__(self):
+        super().__init__()
+        self.gate = threading.Event()
+
+    def send(self, notification):
+        self.gate.wait(5)
+        return super().send(notification)
+
+
+class TestNotificationDispatcher(unittest.TestCase):
+    def tearDown(self):
+        self.dispatcher.stop()
+
+    def test_enqueue_returns_before_delivery(self):
+        stub = GatedTransport()
+        self.dispatcher = NotificationDispatcher({"sms": stub})
+        for i in range(3):
+            self.assertTrue(self.dispatcher.enqueue("sms", f"message {i}", key=f"k{i}"))
+        # Nothing can have been delivered while the gate is closed.
+        self.assertEqual(stub.sent, [])
+
+        stub.gate.set()
+        self.assertTrue(self.dispatcher.wait_idle(5))
+        self.assertEqual([n.body for n in stub.sent], ["message 0", "message 1", "message 2"])
+        self.assertEqual(self.dispatcher.get_stats()["sent"], 3)
+
+    def test_failures_are_retried_with_backoff(self):
+        stub = StubTransport(fail_times=2)
+        self.dispatcher = NotificationDispatcher({"call": stub}, backoff_seconds=0.05)
+        self.dispatcher.enqueue("call", "wake up", key="call")
+        self.assertTrue(self.dispatcher.wait_idle(5))
+
+        stats = self.dispatcher.get_stats()
+        self.assertEqual((stats["sent"], stats["retried"], stats["failed"]), (1, 2, 0))
+        self.assertEqual(stub.sent[0].attempts, 3)
+
+    def test_gives_up_after_max_attempts(self):
+        self.dispatcher = NotificationDispatcher({"sms": StubTransport(fail_times=10)},
+                                                 max_attempts=2, backoff_seconds=0.01)
+        self.dispatcher.enqueue("sms", "lost")
+        self.assertTrue(self.dispatcher.wait_idle(5))
+        self.assertEqual(self.dispatcher.get_stats()["failed"], 1)
+
+    def test_retry_does_not_block_other_messages(self):
+        failing, healthy = StubTransport(fail_times=1), StubTransport()
+        self.dispatcher = NotificationDispatcher({"call": failing, "sms": healthy}, backoff_seconds=30.0)
+        self.dispatcher.enqueue("call", "first")
+        self.dispatcher.enqueue("sms", "second")
+        # "first" waits 30s for its retry; "second" goes out meanwhile.
+        deadline = time.monotonic() + 5
+        while not healthy.sent and time.monotonic() < deadline:
+            time.sleep(0.01)
+        self.assertEqual([n.body for n in healthy.sent], ["second"])
+        self.assertEqual(failing.sent, [])
+
+    def test_unknown_channel_and_full_queue_are_dropped(self):
+        self.dispatcher = NotificationDispatcher({"sms": StubTransport(delay=0.2)}, max_pending=1)
+        self.assertFalse(self.dispatcher.enqueue("email", "no transport"))
+        self.dispatcher.enqueue("sms", "a")
+        self.dispatcher.enqueue("sms", "b")
+        self.dispatcher.enqueue("sms", "c")
+        self.assertGreaterEqual(self.dispatcher.get_stats()["dropped"], 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
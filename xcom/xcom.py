@@ -1,18 +1,30 @@
 import os
 import json
 import logging
-import smtplib
-import ssl
-from email.mime.text import MIMEText
-from twilio.rest import Client
+import threading
 
 # Import constants from your config_constants module
 from config.config_constants import COM_CONFIG_PATH
+from xcom.notification_dispatcher import Notification, SmtpTransport, TwilioTransport
 
 # Configure module-level logging
 logging.basicConfig(level=logging.DEBUG)
 logger = logging.getLogger("xCom")
 
+# SMTP connections / Twilio clients reused across calls, one per distinct provider config.
+_transports_lock = threading.Lock()
+_transports = {}
+
+
+def _shared_transport(kind: str, settings: dict):
+    key = (kind, json.dumps(settings, sort_keys=True, default=str))
+    with _transports_lock:
+        transport = _transports.get(key)
+        if transport is None:
+            transport = SmtpTransport(settings) if kind == "smtp" else TwilioTransport(settings)
+            _transports[key] = transport
+        return transport
+
 
 def load_com_config():
     """
@@ -51,32 +63,9 @@ def send_email(recipient: str, subject: str, body: str, config: dict = None) ->
         logger.error("Email provider is disabled in configuration.")
         return False
 
-    smtp_config = email_config.get("smtp", {})
-    server = smtp_config.get("server")
-    port = smtp_config.get("port")
-    username = smtp_config.get("username")
-    password = smtp_config.get("password")
-    if not recipient:
-        recipient = smtp_config.get("default_recipient")
-
-    if not all([server, port, username, password, recipient]):
-        logger.error("Missing email configuration details.")
-        return False
-
     try:
-        msg = MIMEText(body, "plain")
-        msg["Subject"] = subject
-        msg["From"] = username
-        msg["To"] = recipient
-
-        context = ssl.create_default_context()
-        with smtplib.SMTP(server, port) as smtp:
-            smtp.ehlo()
-            smtp.starttls(context=context)
-            smtp.login(username, password)
-            smtp.send_message(msg)
-        logger.info("Email sent successfully to %s", recipient)
-        return True
+        # The SMTP connection stays open for the next message.
+        return _shared_transport("smtp", email_config.get("smtp", {})).send_email(recipient, subject, body)
     except Exception as e:
         logger.error("Error sending email: %s", e, exc_info=True)
         return False
@@ -125,28 +114,8 @@ def send_call(recipient: str, message: str, config: dict = None):
         logger.error("Twilio provider is disabled in configuration.")
         return False
 
-    account_sid = twilio_config.get("account_sid")
-    auth_token = twilio_config.get("auth_token")
-    flow_sid = twilio_config.get("flow_sid")
-    default_to_phone = twilio_config.get("default_to_phone")
-    default_from_phone = twilio_config.get("default_from_phone")
-
-    if not recipient:
-        recipient = default_to_phone
-
-    if not all([account_sid, auth_token, flow_sid, recipient, default_from_phone]):
-        logger.error("Missing Twilio configuration details.")
-        return False
-
     try:
-        client = Client(account_sid, auth_token)
-        execution = client.studio.v2.flows(flow_sid).executions.create(
-            to=recipient,
-            from_=default_from_phone,
-            parameters={"custom_message": message}
-        )
-        logger.info("Call triggered successfully. Execution SID: %s", execution.sid)
-        return execution.sid
+        return _shared_transport("twilio", twilio_config).send(Notification("call", message, recipient))
     except Exception as e:
         logger.error("Error sending call via Twilio: %s", e, exc_info=True)
         return False